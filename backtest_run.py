@@ -3,49 +3,19 @@ import numpy as np
 from datetime import datetime, timedelta
 import math
 
+from indicators import (
+    calculate_bollinger_bands, calculate_ema, calculate_hammer_star_pattern, calculate_macd, calculate_rolling_mean,
+    calculate_rsi, calculate_stoch_rsi,
+)
+
 # 거래 비용 설정
 SPREAD_EURUSD = 0.0001
 SPREAD_GBPUSD = 0.00012
 SPREAD_USDJPY = 0.012
 
-# 주요 지표 계산 함수
-def calculate_rsi(series, period=14):
-    delta = series.diff()
-    gain = delta.clip(lower=0).rolling(window=period).mean()
-    loss = -delta.clip(upper=0).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-def calculate_macd(series):
-    ema12 = series.ewm(span=12).mean()
-    ema26 = series.ewm(span=26).mean()
-    macd = ema12 - ema26
-    signal = macd.ewm(span=9).mean()
-    return macd, signal
-
-def calculate_stoch_rsi(rsi, period=14):
-    min_rsi = rsi.rolling(window=period).min()
-    max_rsi = rsi.rolling(window=period).max()
-    return (rsi - min_rsi) / (max_rsi - min_rsi)
-
-def calculate_bollinger_bands(series, window=20):
-    mid = series.rolling(window=window).mean()
-    std = series.rolling(window=window).std()
-    upper = mid + 2 * std
-    lower = mid - 2 * std
-    return upper, mid, lower
-
-# 캔들 패턴 및 심리 필터
-def detect_candle_pattern(row):
-    body = abs(row['close'] - row['open'])
-    upper_wick = row['high'] - max(row['close'], row['open'])
-    lower_wick = min(row['close'], row['open']) - row['low']
-    if lower_wick > 2 * body and upper_wick < body:
-        return "HAMMER"
-    elif upper_wick > 2 * body and lower_wick < body:
-        return "SHOOTING_STAR"
-    return "NEUTRAL"
+# 🟦 [PERF-13] 지표(RSI/MACD/StochRSI/볼린저/EMA)와 HAMMER/SHOOTING_STAR 패턴은 라이브(main.py)와 같은 indicators.py 구현
 
+# 캔들 심리 필터
 def candle_psychology_score(row, signal):
     score = 0
     body = abs(row['close'] - row['open'])
@@ -76,6 +46,7 @@ def fast_fury_signal(row):
 def process_alert(df, pair_name):
     results = []
     spread = SPREAD_EURUSD if pair_name=="EURUSD" else SPREAD_GBPUSD if pair_name=="GBPUSD" else SPREAD_USDJPY
+    vol_ma20 = calculate_rolling_mean(df['volume'], 20)   # 🟦 [PERF-13] 봉마다 다시 계산하지 않고 한 번만
 
     for i in range(50, len(df)):
         row = df.iloc[i]
@@ -129,7 +100,7 @@ def process_alert(df, pair_name):
             results.append({"time": time, "pair": pair_name, "signal": "SELL", "entry": entry, "tp": tp, "sl": sl})
 
         # === VOLUME BOOM REVERSAL ===
-        avg_vol = df['volume'].rolling(window=20).mean().iloc[i]
+        avg_vol = vol_ma20.iloc[i]
         if volume > avg_vol * 1.5:
             if row['close'] > row['open'] and trendConfirmLong:
                 entry = row['close'] + spread
@@ -179,9 +150,9 @@ def run_full_backtest():
         df['macd'], df['macd_signal'] = calculate_macd(df['close'])
         df['stoch_rsi'] = calculate_stoch_rsi(df['rsi'])
         df['boll_up'], df['boll_mid'], df['boll_low'] = calculate_bollinger_bands(df['close'])
-        df['ema9'] = df['close'].ewm(span=9).mean()
-        df['ema21'] = df['close'].ewm(span=21).mean()
-        df['pattern'] = df.apply(detect_candle_pattern, axis=1)
+        df['ema9'] = calculate_ema(df['close'], 9)
+        df['ema21'] = calculate_ema(df['close'], 21)
+        df['pattern'] = calculate_hammer_star_pattern(df)   # 🟦 [PERF-13] 행마다 apply 대신 한 번에
 
         pair_results = process_alert(df, pair_name)
         all_results.append(pair_results)
@@ -0,0 +1,153 @@
+# 🟦 [PERF-11] 틱 → 봉 집계기: 가격 스트림(price_stream.py) 틱으로 M1/M5/M15/M30/H1 봉을 실시간으로 만든다.
+#    알림은 봉 마감 직후에 오는데, 그때마다 방금 닫힌 봉을 REST로 다시 받고 있었다
+#    (브로커가 봉을 확정하기 전에 받아서 값이 어긋나는 경우도 있었다).
+#    - 봉 시작 = floor(epoch / 봉 길이) — OANDA/Alpaca의 H1 이하 봉 정렬(UTC 정시/정분)과 같다
+#    - 봉 마감 시각 + grace가 지나면 닫고 on_close(symbol, granularity, bar)로 넘긴다 (main.py가 링버퍼에 반영)
+#    - 스트림이 그 봉 시작 전부터 끊김 없이 붙어 있던 봉만 "완전한 봉"으로 본다. 중간에 구독을 시작했거나
+#      재접속한 봉은 버린다 → 그 구간은 REST로 채운다
+#    - 틱 처리/마감은 이벤트 루프 한 곳에서만, 형성 중 봉 조회(forming)는 어느 스레드에서든 (튜플 통째 교체라 락 없음)
+import asyncio
+import os
+import time as _t
+from typing import NamedTuple
+
+from candle_store import granularity_seconds
+
+
+LIVE_BAR_GRANULARITIES = tuple(
+    g.strip().upper() for g in os.getenv("LIVE_BAR_GRANULARITIES", "M1,M5,M15,M30,H1").split(",") if g.strip()
+)
+LIVE_BAR_CLOSE_GRACE_SEC = float(os.getenv("LIVE_BAR_CLOSE_GRACE_SEC", "0.3"))   # 늦게 도착하는 마지막 틱 여유
+LIVE_BAR_FLUSH_SEC = 0.1
+_PENDING_MAX_AGE_SEC = 5.0   # 링버퍼 lock이 계속 잡혀 있으면 이 시간 뒤 포기 (REST가 채운다)
+
+
+class Bar(NamedTuple):
+    start: int          # 봉 시작 epoch 초
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int
+
+
+class BarBuilder:
+    def __init__(self, granularities=LIVE_BAR_GRANULARITIES, on_close=None, grace_sec=LIVE_BAR_CLOSE_GRACE_SEC):
+        self.granularities = {}
+        for g in granularities:
+            sec = granularity_seconds(g)
+            # 정시에 맞아떨어지는 H1 이하만 (H4/D는 세션 기준 정렬이라 여기서 만들지 않는다)
+            if sec and sec <= 3600 and 3600 % sec == 0:
+                self.granularities[str(g).upper()] = sec
+        self.on_close = on_close
+        self.grace_sec = grace_sec
+        self._bars = {}          # (symbol, gran) → 형성 중 Bar
+        self._live_since = {}    # symbol → 틱이 끊김 없이 들어오기 시작한 시각
+        self._pending = []       # on_close가 False(나중에 다시)를 돌려준 (symbol, gran, bar, 처음 시도 시각)
+        self.ticks = 0
+        self.late_ticks = 0
+        self.closed = 0
+        self.published = 0
+        self.dropped_partial = 0
+
+    def tracks(self, symbol, granularity):
+        return str(granularity).upper() in self.granularities and str(symbol).upper() in self._live_since
+
+    def live_since(self, symbol):
+        """이 종목 틱이 끊김 없이 들어오기 시작한 시각(epoch 초). 구독 전이면 None."""
+        return self._live_since.get(str(symbol).upper())
+
+    def reset(self, symbols, now=None):
+        """이 종목들은 지금부터 틱이 새로 이어진다 — 형성 중 봉은 불완전하므로 버린다."""
+        now = _t.time() if now is None else now
+        for s in symbols:
+            key = str(s).upper()
+            self._live_since[key] = now
+            for g in self.granularities:
+                self._bars.pop((key, g), None)
+
+    def on_tick(self, symbol, price, size, event_ts):
+        key = str(symbol).upper()
+        since = self._live_since.get(key)
+        if since is None:
+            return
+        self.ticks += 1
+        for g, sec in self.granularities.items():
+            start = int(event_ts // sec) * sec
+            bar = self._bars.get((key, g))
+            if bar is None or start > bar.start:
+                if bar is not None:
+                    self._close(key, g, bar)
+                if start < since:
+                    continue    # 구독 시작 전에 열린 봉 — 앞부분 틱을 못 봤다
+                self._bars[(key, g)] = Bar(start, price, price, price, price, int(size))
+            elif start == bar.start:
+                self._bars[(key, g)] = Bar(start, bar.open, max(bar.high, price), min(bar.low, price),
+                                           price, bar.volume + int(size))
+            else:
+                self.late_ticks += 1    # 이미 닫은 봉의 틱
+
+    def forming(self, symbol, granularity, now=None):
+        """지금 형성 중인 완전한 봉(Bar) 또는 None."""
+        g = str(granularity).upper()
+        sec = self.granularities.get(g)
+        bar = self._bars.get((str(symbol).upper(), g))
+        if sec is None or bar is None:
+            return None
+        now = _t.time() if now is None else now
+        return bar if bar.start == int(now // sec) * sec else None
+
+    def _close(self, symbol, granularity, bar):
+        self.closed += 1
+        if bar.start < self._live_since.get(symbol, float("inf")):
+            self.dropped_partial += 1
+            return
+        self._publish(symbol, granularity, bar, _t.time())
+
+    def _publish(self, symbol, granularity, bar, first_try):
+        if self.on_close is None:
+            return
+        ok = self.on_close(symbol, granularity, bar)
+        if ok is False:
+            self._pending.append((symbol, granularity, bar, first_try))
+        else:
+            self.published += 1
+
+    def flush(self, now=None):
+        """마감 시각(+grace)이 지난 형성 중 봉을 닫는다. 닫은 개수 반환."""
+        now = _t.time() if now is None else now
+        pending, self._pending = self._pending, []
+        for symbol, g, bar, first_try in pending:
+            if now - first_try < _PENDING_MAX_AGE_SEC:
+                self._publish(symbol, g, bar, first_try)
+            else:
+                # 반영 못 한 봉이 생겼다 → 이 종목은 여기서 연속성이 끊긴 것으로 본다
+                self.reset([symbol], now)
+        n = 0
+        for (symbol, g), bar in list(self._bars.items()):
+            if bar.start + self.granularities[g] + self.grace_sec <= now:
+                del self._bars[(symbol, g)]
+                self._close(symbol, g, bar)
+                n += 1
+        return n
+
+    async def run(self, interval=LIVE_BAR_FLUSH_SEC):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ [봉집계] flush 오류: {e}")
+
+    def stats(self):
+        return {
+            "granularities": sorted(self.granularities, key=self.granularities.get),
+            "symbols": len(self._live_since),
+            "forming": len(self._bars),
+            "ticks": self.ticks,
+            "late_ticks": self.late_ticks,
+            "closed": self.closed,
+            "published": self.published,
+            "dropped_partial": self.dropped_partial,
+            "pending": len(self._pending),
+        }
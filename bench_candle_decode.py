@@ -0,0 +1,110 @@
+# 🟦 [PERF-09] 캔들 디코딩 벤치마크: 기존 list-of-dicts 경로 vs candle_decode (JSON → NumPy 컬럼)
+#    사용법: python bench_candle_decode.py [반복횟수]
+#    네트워크 없이 OANDA/Alpaca 응답과 같은 모양의 JSON을 만들어서 파싱 + DataFrame 생성까지만 잰다.
+import json
+import sys
+import time as _t
+
+import numpy as np
+import pandas as pd
+
+import candle_decode
+
+
+def make_oanda_payload(n, seed=0):
+    rng = np.random.default_rng(seed)
+    px = 150 + np.cumsum(rng.normal(0, 0.02, n))
+    t0 = pd.Timestamp("2026-10-01T00:00:00Z")
+    candles = []
+    for i in range(n):
+        o = px[i]
+        candles.append({
+            "complete": True,
+            "volume": int(rng.integers(1, 500)),
+            "time": (t0 + pd.Timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%S.000000000Z"),
+            "mid": {"o": f"{o:.3f}", "h": f"{o + 0.02:.3f}", "l": f"{o - 0.02:.3f}", "c": f"{o + 0.01:.3f}"},
+        })
+    return json.dumps({"instrument": "USD_JPY", "granularity": "M1", "candles": candles}).encode()
+
+
+def make_alpaca_payload(n, seed=0):
+    rng = np.random.default_rng(seed)
+    px = 100 + np.cumsum(rng.normal(0, 0.05, n))
+    t0 = pd.Timestamp("2026-10-01T13:30:00Z")
+    bars = []
+    for i in range(n):
+        o = round(float(px[i]), 2)
+        bars.append({
+            "t": (t0 + pd.Timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "o": o, "h": round(o + 0.1, 2), "l": round(o - 0.1, 2), "c": round(o + 0.05, 2),
+            "v": int(rng.integers(100, 10000)), "n": 10, "vw": o,
+        })
+    return json.dumps({"bars": bars, "symbol": "NVDA", "next_page_token": None}).encode()
+
+
+# ---- 기존 경로 (main.py의 예전 구현 그대로) ----
+def legacy_oanda(content):
+    candles = json.loads(content).get("candles", [])
+    return pd.DataFrame([
+        {
+            "time": c["time"],
+            "open": float(c["mid"]["o"]),
+            "high": float(c["mid"]["h"]),
+            "low": float(c["mid"]["l"]),
+            "close": float(c["mid"]["c"]),
+            "volume": c.get("volume", 0)
+        }
+        for c in candles
+    ])
+
+
+def legacy_alpaca(content):
+    bars = json.loads(content).get("bars", [])
+    return pd.DataFrame([
+        {
+            "time": b.get("t"),
+            "open": float(b["o"]),
+            "high": float(b["h"]),
+            "low": float(b["l"]),
+            "close": float(b["c"]),
+            "volume": b.get("v", 0),
+        }
+        for b in bars
+    ])
+
+
+def fast_oanda(content):
+    return candle_decode.decode_oanda_candles(content).to_frame()
+
+
+def fast_alpaca(content):
+    return candle_decode.decode_alpaca_bars(content).to_frame()
+
+
+def _bench(fn, content, repeat):
+    fn(content)   # 워밍업
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = _t.perf_counter()
+        fn(content)
+        best = min(best, _t.perf_counter() - t0)
+    return best * 1000.0
+
+
+def main(repeat=20):
+    print(f"JSON 파서: {'orjson' if candle_decode._orjson is not None else 'json(표준)'} / 반복 {repeat}회 중 최솟값")
+    print(f"{'source':<8}{'bars':>7}{'legacy ms':>12}{'decode ms':>12}{'speedup':>10}")
+    for source, make, legacy, fast in (
+        ("oanda", make_oanda_payload, legacy_oanda, fast_oanda),
+        ("alpaca", make_alpaca_payload, legacy_alpaca, fast_alpaca),
+    ):
+        for n in (200, 5000):
+            content = make(n)
+            pd.testing.assert_frame_equal(legacy(content), fast(content))   # 결과 동일성 먼저 확인
+            a = _bench(legacy, content, repeat)
+            b = _bench(fast, content, repeat)
+            print(f"{source:<8}{n:>7}{a:>12.2f}{b:>12.2f}{a / b:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
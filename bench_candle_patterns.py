@@ -0,0 +1,120 @@
+# 🟦 [PERF-16] 전 구간 캔들 패턴 분류(indicators.candle_patterns) 결과 일치 확인 + 벤치마크
+#    사용법: python bench_candle_patterns.py
+#    예전 detect_candle_pattern(마지막 봉 1개를 파이썬으로 판정)을 그대로 두고, 프레임의 모든 봉에서
+#    "그 봉까지 자른 캔들"로 부른 결과와 한 번에 분류한 라벨이 같은지 본다 (도지 연속, NaN 봉, 장악형이 잦은 프레임 포함).
+import time as _t
+
+import numpy as np
+import pandas as pd
+
+import indicators as ind
+from bench_indicator_engine import make_bars
+
+
+# ---- 예전 구현 그대로 (main.py detect_candle_pattern) ----
+def old_detect_candle_pattern(candles):
+    if candles is None or candles.empty:
+        return "NEUTRAL"
+    last = candles.iloc[-1]
+    for c in ("open", "high", "low", "close"):
+        if c not in candles.columns or pd.isna(last[c]):
+            return "NEUTRAL"
+    o, h, l, c_ = float(last["open"]), float(last["high"]), float(last["low"]), float(last["close"])
+    body = abs(c_ - o)
+    rng = h - l
+    if rng <= 0:
+        return "NEUTRAL"
+    upper_wick = h - max(c_, o)
+    lower_wick = min(c_, o) - l
+    bull = c_ > o
+    bear = c_ < o
+    try:
+        prev = candles.iloc[-11:-1]
+        avg_body = float((prev["close"] - prev["open"]).abs().mean())
+    except Exception:
+        avg_body = 0.0
+    if not avg_body or pd.isna(avg_body) or avg_body <= 0:
+        avg_body = rng * 0.3
+    if len(candles) >= 2:
+        p = candles.iloc[-2]
+        if not any(pd.isna(p[c]) for c in ("open", "high", "low", "close")):
+            po, pc = float(p["open"]), float(p["close"])
+            p_body = abs(pc - po)
+            p_bull, p_bear = pc > po, pc < po
+            p_mid = (po + pc) / 2.0
+            if bull and p_bear and c_ >= po and o <= pc and body > p_body:
+                return "BULLISH_ENGULFING"
+            if bear and p_bull and c_ <= po and o >= pc and body > p_body:
+                return "BEARISH_ENGULFING"
+            if bull and p_bear and o < pc and c_ > p_mid and c_ < po:
+                return "PIERCING_LINE"
+            if bear and p_bull and o > pc and c_ < p_mid and c_ > po:
+                return "DARK_CLOUD_COVER"
+    if body >= avg_body * 1.8 and body >= rng * 0.6:
+        return "LONG_BODY_BULL" if bull else "LONG_BODY_BEAR"
+    if body > 0:
+        if lower_wick > 2 * body and upper_wick < body:
+            return "HAMMER"
+        if upper_wick > 2 * body and lower_wick < body:
+            return "SHOOTING_STAR"
+    return "NEUTRAL"
+
+
+def frames():
+    """(이름, 캔들) — 랜덤 / 횡보(도지 연속) / 갭(장악형·관통형이 잦음) / NaN 봉 / JPY 스케일."""
+    yield "random", make_bars(600, seed=1)
+    yield "flat", make_bars(600, seed=2, flat_every=20)
+    rng = np.random.default_rng(3)
+    # 시가가 직전 종가에서 조금씩 떨어진(갭) 봉 — 장악형/관통형/흑운형이 자주 나온다
+    body = rng.normal(0, 0.0006, 600)
+    gaps = rng.normal(0, 0.0003, 600)
+    open_ = np.round(1.10 + np.cumsum(body + gaps) - body, 5)
+    close = np.round(open_ + body, 5)
+    gap = make_bars(600, seed=3)
+    gap["open"], gap["close"] = open_, close
+    gap["high"] = np.round(np.maximum(open_, close) + rng.uniform(0, 0.0003, 600), 5)
+    gap["low"] = np.round(np.minimum(open_, close) - rng.uniform(0, 0.0003, 600), 5)
+    yield "gap", gap
+    holes = make_bars(600, seed=4)
+    rng = np.random.default_rng(4)
+    for i, col in zip(rng.integers(0, 600, 40), rng.choice(["open", "high", "low", "close"], 40)):
+        holes.loc[i, col] = np.nan
+    yield "nan", holes
+    jpy = make_bars(600, seed=5, start=150.0, flat_every=30)
+    yield "jpy", jpy
+
+
+def parity():
+    for name, df in frames():
+        got = ind.calculate_candle_patterns(df)
+        counts = {}
+        for i in range(len(df)):
+            want = old_detect_candle_pattern(df.iloc[:i + 1])
+            assert got.iloc[i] == want, f"{name} {i}번째 봉: 예전 {want} / 새 {got.iloc[i]}"
+            counts[want] = counts.get(want, 0) + 1
+        print(f"   {name:<7} {len(df)}봉 모두 일치  {dict(sorted(counts.items()))}")
+
+
+def bench():
+    df = make_bars(2_000, seed=7)
+    t0 = _t.perf_counter()
+    for i in range(len(df)):
+        old_detect_candle_pattern(df.iloc[:i + 1])
+    per_bar = (_t.perf_counter() - t0) / len(df)
+    for n in (2_000, 100_000, 1_000_000):
+        big = make_bars(n, seed=7)
+        t0 = _t.perf_counter()
+        ind.calculate_candle_patterns(big)
+        dt = _t.perf_counter() - t0
+        print(f"   {n:>9,}봉: 봉마다 예전 판정 ≈{per_bar * n:9.2f} s / 한 번에 분류 {dt * 1000:8.2f} ms")
+
+
+def main():
+    print("결과 일치:")
+    parity()
+    print("벤치마크:")
+    bench()
+
+
+if __name__ == "__main__":
+    main()
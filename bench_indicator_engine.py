@@ -0,0 +1,140 @@
+# 🟦 [PERF-12] 증분 지표 엔진 수치 일치 확인 + 벤치마크
+#    사용법: python bench_indicator_engine.py [알림횟수]
+#    200봉 프레임을 한 봉씩 밀면서(알림마다 새 봉 1개 + 형성 중 봉) main.py의 calculate_* 결과와 비교하고 시간을 잰다.
+#    - rolling 계열(RSI/StochRSI/ATR/볼린저): 부동소수 반올림 수준(1e-9)까지 일치해야 한다
+#    - MACD/시그널(ewm adjust=True)은 pandas가 매번 프레임 첫 봉부터 다시 가중하므로, 엔진(더 긴 이력)과
+#      프레임 앞쪽은 다르고 뒤로 갈수록 (1-α)^k로 수렴한다 → 스코어가 읽는 최근 14봉만 상대오차로 비교
+import sys
+import time as _t
+
+import numpy as np
+import pandas as pd
+
+from indicator_engine import IndicatorEngine
+
+
+# ---- main.py의 calculate_* 그대로 ----
+def calculate_rsi(series, period=14):
+    delta = series.diff()
+    gain = delta.clip(lower=0).rolling(window=period).mean()
+    loss = -delta.clip(upper=0).rolling(window=period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def calculate_macd(series):
+    ema12 = series.ewm(span=12).mean()
+    ema26 = series.ewm(span=26).mean()
+    macd = ema12 - ema26
+    signal = macd.ewm(span=9).mean()
+    return macd, signal
+
+
+def calculate_stoch_rsi(rsi, period=14):
+    min_rsi = rsi.rolling(window=period).min()
+    max_rsi = rsi.rolling(window=period).max()
+    return (rsi - min_rsi) / (max_rsi - min_rsi)
+
+
+def calculate_bollinger_bands(series, window=20):
+    mid = series.rolling(window=window).mean()
+    std = series.rolling(window=window).std()
+    upper = mid + 2 * std
+    lower = mid - 2 * std
+    return upper, mid, lower
+
+
+def calculate_atr(candles, period=14):
+    high_low = candles['high'] - candles['low']
+    high_close = np.abs(candles['high'] - candles['close'].shift())
+    low_close = np.abs(candles['low'] - candles['close'].shift())
+    tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+    return tr.rolling(window=period).mean()
+
+
+def legacy(candles):
+    close = candles["close"]
+    rsi = calculate_rsi(close)
+    macd, signal = calculate_macd(close)
+    up, mid, low = calculate_bollinger_bands(close)
+    return {"rsi": rsi, "stoch_rsi": calculate_stoch_rsi(rsi), "macd": macd, "macd_signal": signal,
+            "atr": calculate_atr(candles), "boll_up": up, "boll_mid": mid, "boll_low": low}
+
+
+def make_bars(n, seed=0, start=1.10, flat_every=0):
+    rng = np.random.default_rng(seed)
+    close = start + np.cumsum(rng.normal(0, 0.0004, n))
+    if flat_every:
+        # 가격이 안 움직이는 구간(거래 없는 종목) — RSI 0/0, StochRSI 분모 0 같은 경계 확인용
+        for s in range(flat_every, n - 20, flat_every * 3):
+            close[s:s + 16] = close[s]
+    close = np.round(close, 5)
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + np.round(rng.uniform(0, 0.0003, n), 5)
+    low = np.minimum(open_, close) - np.round(rng.uniform(0, 0.0003, n), 5)
+    t = pd.date_range("2026-10-01", periods=n, freq="30min", tz="UTC").strftime("%Y-%m-%dT%H:%M:%S.000000000Z")
+    return pd.DataFrame({"time": t.to_numpy(dtype=object), "open": open_, "high": high, "low": low,
+                         "close": close, "volume": rng.integers(1, 500, n)})
+
+
+def _max_diff(a, b):
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    if not np.array_equal(np.isnan(a), np.isnan(b)):
+        return float("inf")
+    m = ~np.isnan(a)
+    return float(np.max(np.abs(a[m] - b[m]))) if m.any() else 0.0
+
+
+def parity(bars, alerts, frame=200):
+    engine = IndicatorEngine()
+    worst = {}
+    for k in range(alerts):
+        df = bars.iloc[k:k + frame].reset_index(drop=True).copy()
+        # 형성 중 봉: 알림 시점엔 아직 덜 움직인 값 → 다음 알림 땐 최종값으로 들어온다
+        df.loc[frame - 1, ["high", "low", "close"]] = df.loc[frame - 1, ["open"]].to_numpy().repeat(3)
+        got = engine.series_for(("TEST", "M30"), df)
+        ref = legacy(df)
+        for col, s in ref.items():
+            if col in ("macd", "macd_signal"):
+                tail = s.iloc[-14:]
+                scale = float(np.nanmax(np.abs(tail.to_numpy()))) or 1.0
+                d = _max_diff(got[col].iloc[-14:], tail) / scale
+            else:
+                d = _max_diff(got[col], s)
+            worst[col] = max(worst.get(col, 0.0), d)
+    return worst, engine.stats()
+
+
+def bench(bars, alerts, frame=200):
+    frames = []
+    for k in range(alerts):
+        frames.append(bars.iloc[k:k + frame].reset_index(drop=True))
+    t0 = _t.perf_counter()
+    for df in frames:
+        legacy(df)
+    a = (_t.perf_counter() - t0) / alerts * 1000
+    engine = IndicatorEngine()
+    engine.series_for(("TEST", "M30"), frames[0])   # 첫 알림(전체 계산)은 제외
+    t0 = _t.perf_counter()
+    for df in frames[1:]:
+        engine.series_for(("TEST", "M30"), df)
+    b = (_t.perf_counter() - t0) / (alerts - 1) * 1000
+    return a, b
+
+
+def main(alerts=300):
+    for name, bars in (("random", make_bars(alerts + 200, seed=1)),
+                       ("flat", make_bars(alerts + 200, seed=2, flat_every=40))):
+        worst, st = parity(bars, alerts)
+        print(f"[{name}] 알림 {alerts}회, 엔진 {st}")
+        for col, d in worst.items():
+            note = " (최근 14봉 상대오차)" if col in ("macd", "macd_signal") else ""
+            print(f"   {col:<12} 최대 차이 {d:.3e}{note}")
+            limit = 1e-4 if col in ("macd", "macd_signal") else 1e-9
+            assert d <= limit, f"{name}/{col} 불일치: {d}"
+    a, b = bench(make_bars(alerts + 200, seed=3), alerts)
+    print(f"알림 1회당: pandas calculate_* {a:.3f} ms / 증분 엔진 {b:.3f} ms ({a / b:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,149 @@
+# 🟦 [PERF-13] 공용 지표 라이브러리(indicators.py) 수치 일치 확인 + 벤치마크
+#    사용법: python bench_indicators.py
+#    예전 pandas 구현(main.py / 백테스트 / fx_webhook_fastapi.py에 있던 것 그대로)과 ta 패키지 결과를
+#    100 / 200 / 100,000봉에서 비교하고(1e-9 이내), 지표별로 걸리는 시간을 잰다.
+import time as _t
+
+import numpy as np
+import pandas as pd
+
+import indicators as ind
+from bench_indicator_engine import _max_diff, make_bars
+
+try:
+    import ta
+except ImportError:   # ta가 없으면 Wilder RSI/ta MACD 비교만 건너뛴다
+    ta = None
+
+
+SIZES = (100, 200, 100_000)
+TOLERANCE = 1e-9
+
+
+# ---- 예전 pandas 구현 그대로 ----
+def pd_rsi(series, period=14):
+    delta = series.diff()
+    gain = delta.clip(lower=0).rolling(window=period).mean()
+    loss = -delta.clip(upper=0).rolling(window=period).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def pd_macd(series, fast=12, slow=26, signal=9, adjust=True):
+    ema_fast = series.ewm(span=fast, adjust=adjust).mean()
+    ema_slow = series.ewm(span=slow, adjust=adjust).mean()
+    macd = ema_fast - ema_slow
+    return macd, macd.ewm(span=signal, adjust=adjust).mean()
+
+
+def pd_stoch_rsi(rsi, period=14):
+    min_rsi = rsi.rolling(window=period).min()
+    max_rsi = rsi.rolling(window=period).max()
+    return (rsi - min_rsi) / (max_rsi - min_rsi)
+
+
+def pd_bollinger_bands(series, window=20):
+    mid = series.rolling(window=window).mean()
+    std = series.rolling(window=window).std()
+    return mid + 2 * std, mid, mid - 2 * std
+
+
+def pd_atr(candles, period=14):
+    high_low = candles['high'] - candles['low']
+    high_close = np.abs(candles['high'] - candles['close'].shift())
+    low_close = np.abs(candles['low'] - candles['close'].shift())
+    tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+    return tr.rolling(window=period).mean()
+
+
+def cases(df):
+    """(이름, pandas/ta 기준 함수, indicators 함수) — 각 함수는 결과 배열 리스트를 돌려준다."""
+    close = df["close"]
+    out = [
+        ("rsi", lambda: [pd_rsi(close)], lambda: [ind.rsi(close)]),
+        ("macd(adjust=True)", lambda: list(pd_macd(close)), lambda: list(ind.macd(close))),
+        ("macd(adjust=False)", lambda: list(pd_macd(close, adjust=False)),
+         lambda: list(ind.macd(close, adjust=False))),
+        ("stoch_rsi", lambda: [pd_stoch_rsi(pd_rsi(close))], lambda: [ind.stoch_rsi(ind.rsi(close))]),
+        ("bollinger", lambda: list(pd_bollinger_bands(close)), lambda: list(ind.bollinger_bands(close))),
+        ("atr", lambda: [pd_atr(df)], lambda: [ind.atr(df["high"], df["low"], df["close"])]),
+        ("ema20(adjust=False)", lambda: [close.ewm(span=20, adjust=False).mean()],
+         lambda: [ind.ewm_mean(close, span=20, adjust=False)]),
+    ]
+    if ta is not None:
+        out += [
+            ("ta rsi", lambda: [ta.momentum.RSIIndicator(close=close, window=14).rsi()],
+             lambda: [ind.wilder_rsi(close)]),
+            ("ta macd", lambda: [(m := ta.trend.MACD(close=close)).macd(), m.macd_signal()],
+             lambda: list(ind.macd(close, adjust=False, warmup=True))),
+            ("ta stoch_rsi", lambda: [ta.momentum.StochRSIIndicator(close=close, window=14).stochrsi()],
+             lambda: [ind.stoch_rsi(ind.wilder_rsi(close))]),
+            ("ta ema20", lambda: [ta.trend.ema_indicator(close, window=20)],
+             lambda: [ind.ewm_mean(close, span=20, adjust=False, min_periods=20)]),
+        ]
+    return out
+
+
+def _rel_diff(a, b):
+    # RSI(0~100)와 가격(1.1 / 150)처럼 크기가 다른 값을 같은 기준으로 보려고 값의 크기로 나눈다
+    b = np.asarray(b, dtype=float)
+    finite = np.isfinite(b)
+    scale = max(1.0, float(np.max(np.abs(b[finite])))) if finite.any() else 1.0
+    a, b = np.asarray(a, dtype=float), b.copy()
+    # ±inf는 같은 위치/부호여야 하고 차이 계산에서는 뺀다
+    if not np.array_equal(np.isinf(a), np.isinf(b)) or not np.array_equal(a[np.isinf(a)], b[np.isinf(b)]):
+        return float("inf")
+    a[np.isinf(a)] = 0.0
+    b[np.isinf(b)] = 0.0
+    return _max_diff(a, b) / scale
+
+
+def _flat_rsi_windows(df, label):
+    """RSI가 창 전체에서 (반올림 오차 안에서) 일정한 위치. 여기서 StochRSI = 0/0 이라 pandas 결과도
+    합산 순서에 따른 반올림 노이즈로 0 / 1 / NaN 중 하나가 된다 → 비교에서 뺀다."""
+    r = ind.wilder_rsi(df["close"]) if label.startswith("ta ") else ind.rsi(df["close"])
+    with np.errstate(invalid="ignore"):
+        return (ind.rolling_max(r, 14) - ind.rolling_min(r, 14)) < 1e-9
+
+
+def parity():
+    for n in SIZES:
+        for name, df in (("random", make_bars(n, seed=n)), ("flat", make_bars(n, seed=n + 1, flat_every=40)),
+                         ("jpy", make_bars(n, seed=n + 2, start=150.0))):
+            for label, ref, got in cases(df):
+                for r, g in zip(ref(), got()):
+                    if "stoch_rsi" in label:
+                        flat = _flat_rsi_windows(df, label)
+                        r, g = np.where(flat, np.nan, r), np.where(flat, np.nan, g)
+                    d = _rel_diff(g, r)
+                    assert d <= TOLERANCE, f"{n}봉 {name}/{label} 불일치: {d}"
+        print(f"   {n:>7,}봉: 모든 지표 일치 (상대오차 ≤ {TOLERANCE:g})")
+
+
+def _timeit(fn, n):
+    repeat = 2000 if n <= 200 else 5
+    fn()
+    t0 = _t.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (_t.perf_counter() - t0) / repeat * 1000
+
+
+def bench():
+    for n in SIZES:
+        df = make_bars(n, seed=7)
+        print(f"   [{n:,}봉]")
+        for label, ref, got in cases(df):
+            a, b = _timeit(ref, n), _timeit(got, n)
+            print(f"      {label:<20} pandas/ta {a:8.3f} ms / numpy {b:8.3f} ms ({a / b:5.1f}x)")
+
+
+def main():
+    print("수치 일치:")
+    parity()
+    print("벤치마크 (호출 1회당):")
+    bench()
+
+
+if __name__ == "__main__":
+    main()
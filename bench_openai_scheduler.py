@@ -0,0 +1,211 @@
+# 🟦 [PERF-20] OpenAI 호출 스케줄러(openai_scheduler) 동작 확인 + 버스트 대기 시간
+#    사용법: python bench_openai_scheduler.py   (네트워크/키 없이 스케줄러만 돈다)
+#    버킷을 비워 둔 스케줄러에 실시간 진입(async) / 주간 리포트(스레드) 티켓을 한꺼번에 넣고
+#    - 실시간(PRIORITY_LIVE)이 먼저 온 리포트(PRIORITY_REPORT)보다 모두 먼저 나가는지
+#    - 동시에 안에 있는 호출이 max_concurrency까지 차되 넘지 않는지
+#    - 스레드 티켓이 기다리는 동안 이벤트 루프가 멈추지 않는지, 스레드 ↔ 루프 사이 깨우기가 되는지
+#    - 대기 중 취소 / 슬롯을 받은 직후 취소(_abandon)에 슬롯이 돌아오는지
+#    - 동시성 때문에 기한 없이 자던 맨 앞 티켓이 _release 뒤 버킷 대기로 다시 깨는지
+#    를 본다.
+import asyncio
+import threading
+import time as _t
+
+from openai_scheduler import PRIORITY_LIVE, PRIORITY_REPORT, OpenAIScheduler
+
+TIMEOUT_SEC = 5.0   # 이 안에 안 나가면 깨우기가 빠진 것 (멈춤)
+HOLD_SEC = 0.25     # 버스트에서 호출 하나가 슬롯을 쥐는 시간
+
+
+class _Gauge:
+    """티켓 안에 동시에 몇 개 있는지 (스레드/루프 양쪽에서 센다)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.now = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.now += 1
+            self.peak = max(self.peak, self.now)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.now -= 1
+
+
+def _empty(s, requests=0.0):
+    """요청 버킷을 비워 둔다 — 초당 rpm/60개씩만 나간다."""
+    s._requests.level = requests
+    return s
+
+
+async def burst(lives=12, reports=4, max_concurrency=2):
+    """리포트 스레드가 먼저 줄을 서고 실시간 알림이 몰려온다. 버킷은 0.1초에 1개씩 차고,
+    호출 하나는 0.25초 걸린다 → 버킷보다 동시성 상한이 먼저 막힌다."""
+    s = _empty(OpenAIScheduler(rpm=600, tpm=10 ** 7, max_concurrency=max_concurrency))
+    gauge, order = _Gauge(), []
+    t0 = _t.perf_counter()
+
+    async def live(i):
+        async with s.ticket(1000, PRIORITY_LIVE):
+            with gauge:
+                order.append(("live", i, _t.perf_counter() - t0))
+                await asyncio.sleep(HOLD_SEC)
+
+    def report(i):
+        with s.ticket(1000, PRIORITY_REPORT):
+            with gauge:
+                order.append(("report", i, _t.perf_counter() - t0))
+                _t.sleep(HOLD_SEC)
+
+    ticks = 0
+
+    async def heartbeat():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    hb = asyncio.create_task(heartbeat())
+    threads = [threading.Thread(target=report, args=(i,)) for i in range(reports)]
+    for th in threads:
+        th.start()
+    while s.stats()["queued"] < reports:
+        await asyncio.sleep(0.001)
+    await asyncio.wait_for(asyncio.gather(*(live(i) for i in range(lives))), TIMEOUT_SEC)
+    await asyncio.to_thread(lambda: [th.join(TIMEOUT_SEC) for th in threads])
+    hb.cancel()
+    elapsed = _t.perf_counter() - t0
+
+    kinds = [k for k, _, _ in order]
+    assert len(order) == lives + reports, f"나간 티켓 {len(order)} / {lives + reports}"
+    assert kinds == ["live"] * lives + ["report"] * reports, f"실시간보다 리포트가 먼저 나감: {kinds}"
+    assert gauge.peak == max_concurrency, f"동시 호출 최대 {gauge.peak} (상한 {max_concurrency})"
+    # 스레드 티켓이 자는 동안에도 루프는 돈다 (10ms 하트비트가 경과 시간의 절반 이상은 찍혀야)
+    assert ticks >= elapsed / 0.01 * 0.5, f"이벤트 루프 멈춤: 하트비트 {ticks}회 / {elapsed:.2f}s"
+    st = s.stats()
+    assert st["in_flight"] == 0 and st["queued"] == 0, st
+    w = st["wait_by_priority"]
+    print(f"   버스트 live {lives} + report {reports} (동시 {max_concurrency}, 초당 10개): {elapsed:.2f}s, "
+          f"동시 최대 {gauge.peak}, 하트비트 {ticks}회")
+    print(f"     대기 p50/p99 live {w[str(PRIORITY_LIVE)]['p50_ms']}/{w[str(PRIORITY_LIVE)]['p99_ms']} ms, "
+          f"report {w[str(PRIORITY_REPORT)]['p50_ms']}/{w[str(PRIORITY_REPORT)]['p99_ms']} ms")
+
+
+async def thread_to_loop():
+    """스레드가 쥔 슬롯을 돌려주면 루프 쪽 대기 티켓이 깬다 (call_soon_threadsafe)."""
+    s = OpenAIScheduler(rpm=6000, tpm=10 ** 7, max_concurrency=1)
+    held, release = threading.Event(), threading.Event()
+
+    def holder():
+        with s.ticket(10, PRIORITY_REPORT):
+            held.set()
+            release.wait(TIMEOUT_SEC)
+
+    th = threading.Thread(target=holder)
+    th.start()
+    await asyncio.to_thread(held.wait, TIMEOUT_SEC)
+
+    async def waiter():
+        async with s.ticket(10, PRIORITY_LIVE):
+            return _t.perf_counter()
+
+    task = asyncio.create_task(waiter())
+    await asyncio.sleep(0.05)
+    assert not task.done(), "슬롯이 1개인데 두 번째 티켓이 나감"
+    t0 = _t.perf_counter()
+    release.set()
+    granted_at = await asyncio.wait_for(task, TIMEOUT_SEC)
+    th.join(TIMEOUT_SEC)
+    print(f"   스레드 → 루프 깨우기: 반납 후 {(granted_at - t0) * 1000:.1f} ms에 진입")
+
+
+async def cancel_queued():
+    """줄 서 있다 취소된 티켓은 큐에서 빠지고, 뒤 티켓이 그대로 나간다."""
+    s = _empty(OpenAIScheduler(rpm=60, tpm=10 ** 7, max_concurrency=1))
+
+    async def enter(prio):
+        async with s.ticket(10, prio):
+            pass
+
+    task = asyncio.create_task(enter(PRIORITY_LIVE))
+    await asyncio.sleep(0.05)
+    assert s.stats()["queued"] == 1
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    st = s.stats()
+    assert st["queued"] == 0 and st["in_flight"] == 0 and st["abandoned"] == 1, st
+    _empty(s, requests=1.0)
+    await asyncio.wait_for(enter(PRIORITY_REPORT), TIMEOUT_SEC)
+    print("   대기 중 취소: 큐에서 빠지고 다음 티켓 정상 진입")
+
+
+async def cancel_after_grant():
+    """슬롯을 받았지만(granted) 깨어나기 전에 취소 — _abandon이 in_flight를 돌려줘야 한다."""
+    s = OpenAIScheduler(rpm=6000, tpm=10 ** 7, max_concurrency=1)
+    first = s.ticket(10)
+    await first.__aenter__()
+    second = s.ticket(10)
+
+    async def enter():
+        async with second:
+            pass
+
+    task = asyncio.create_task(enter())
+    await asyncio.sleep(0.05)
+    assert not second.granted
+    # 반납(→ _pump가 second에 슬롯을 줌)과 취소 사이에 루프를 돌리지 않는다
+    await first.__aexit__(None, None, None)
+    assert second.granted, "반납했는데 다음 티켓에 슬롯이 안 감"
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    st = s.stats()
+    assert st["in_flight"] == 0 and st["abandoned"] == 1, f"슬롯 받은 뒤 취소 → 슬롯 샘: {st}"
+    third = s.ticket(10)
+    await asyncio.wait_for(third.__aenter__(), TIMEOUT_SEC)
+    await third.__aexit__(None, None, None)
+    print("   슬롯 받은 직후 취소: 슬롯 반납, 다음 티켓 정상 진입")
+
+
+async def rewake_head():
+    """동시성 상한 때문에 기한 없이(delay None) 자던 맨 앞 티켓은, 반납 시점에 버킷이 비어 있어도
+    _release가 깨워 줘야 버킷 대기 시간을 다시 재고 나간다 (안 깨우면 영원히 잔다)."""
+    s = _empty(OpenAIScheduler(rpm=600, tpm=10 ** 7, max_concurrency=1), requests=1.0)
+    first = s.ticket(10)
+    await first.__aenter__()          # 버킷의 마지막 1개
+
+    async def enter():
+        async with s.ticket(10):
+            return _t.perf_counter()
+
+    task = asyncio.create_task(enter())
+    await asyncio.sleep(0.02)
+    t0 = _t.perf_counter()
+    await first.__aexit__(None, None, None)
+    granted_at = await asyncio.wait_for(task, TIMEOUT_SEC)
+    print(f"   반납 후 맨 앞 재깨움: 버킷 대기 {(granted_at - t0) * 1000:.0f} ms 뒤 진입 (초당 10개)")
+
+
+async def run_all():
+    await burst()
+    await thread_to_loop()
+    await cancel_queued()
+    await cancel_after_grant()
+    await rewake_head()
+
+
+def main_():
+    print("스케줄러 확인:")
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main_()
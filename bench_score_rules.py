@@ -0,0 +1,1315 @@
+# 🟦 [PERF-17] 규칙 테이블 채점(score_rules) 결과 일치 확인 + 벤치마크
+#    사용법: python bench_score_rules.py   (main.py를 import 하므로 서버와 같은 환경변수가 필요)
+#    예전 score_signal_with_filters(+ must_capture_opportunity / additional_opportunity_score / 구조 SL·TP 등)를
+#    그대로 두고(로그 print만 뺌), 봉마다 무작위 지표 입력으로 부른 (점수, reasons)가
+#    스칼라 모드(main.score_signal_with_filters)와 배열 모드(SIGNAL_RULES.score_batch → row(i)) 모두에서 정확히 같은지 본다.
+import contextlib
+import io
+import time as _t
+
+import numpy as np
+
+import main
+from bench_indicator_engine import make_bars
+from indicators import calculate_atr
+from main import ALPACA_SL_BUFFER_ATR_MULT, atr_in_pips, is_stock_pair, pip_value_for
+from score_rules import SIGNAL_RULES
+
+BENCH_HOUR = 0   # 예전 함수의 '지금 시각(ET)' 대신
+
+
+# ---- 예전 구현 그대로 (main.py) ----
+def old_recent_high_break(highs, last_n=2):
+    if not highs or last_n <= 0:
+        return False
+    if len(highs) < last_n + 1:
+        return False
+    prev_high = max(highs[:-last_n])
+    recent_high = max(highs[-last_n:])
+    return recent_high > prev_high
+
+
+def old_recent_low_break(lows, last_n=2):
+    if not lows or last_n <= 0:
+        return False
+    if len(lows) < last_n + 1:
+        return False
+    prev_low = min(lows[:-last_n])
+    recent_low = min(lows[-last_n:])
+    return recent_low < prev_low
+
+
+def old_must_capture_opportunity(rsi, stoch_rsi, macd, macd_signal, pattern, candles, trend, atr, price, bollinger_upper, bollinger_lower, support, resistance, support_distance, resistance_distance, pip_size, expected_direction=None):
+    opportunity_score = 0
+    reasons = []
+
+    is_buy = expected_direction == "BUY"
+    is_sell = expected_direction == "SELL"
+
+    breakout_confirmed = (price is not None and resistance is not None and price > resistance)
+
+    if macd_signal is None:
+        macd_signal = macd
+        reasons.append("⚠️ macd_signal 없음 → macd 자체 사용")
+
+    if stoch_rsi < 0.05 and rsi > 50 and macd > macd_signal and is_buy:
+        opportunity_score += 2
+        reasons.append("💡 Stoch RSI 극단 과매도 + RSI 상단 + MACD 상승 → 강한 BUY (+2)")
+
+    if stoch_rsi < 0.1 and rsi < 40 and macd < 0 and is_sell:
+        opportunity_score += 0.5
+        reasons.append("⚠️ 약한 SELL 조건 충족 (+0.5)")
+
+    if stoch_rsi > 0.9:
+
+        if (
+            resistance_distance < atr * 0.3
+            and not breakout_confirmed
+        ):
+
+            opportunity_score -= 2
+            reasons.append(
+                "🔴 과열 + 저항 근접 + breakout 실패 위험"
+            )
+
+        elif trend == "UPTREND" and macd > macd_signal:
+
+            opportunity_score -= 0.3
+            reasons.append(
+                "⚠️ 과열이지만 continuation 유지"
+            )
+
+    if is_buy and stoch_rsi < 0.1:
+        if (pattern is None or pattern == "NEUTRAL") and macd < macd_signal:
+            opportunity_score -= 2.0
+            reasons.append("🔴 (방어) Stoch RSI 극단 과매도(<0.1) + 반등 패턴 없음 + MACD 약화 → 하락 가속 위험 (opportunity -2)")
+        elif (pattern is None or pattern == "NEUTRAL"):
+            opportunity_score -= 1.0
+            reasons.append("⚠️ (방어) Stoch RSI 극단 과매도(<0.1) + 반등 패턴 없음 → 반등 신뢰도 낮음 (opportunity -1)")
+
+    if is_sell and stoch_rsi > 0.9:
+        if (pattern is None or pattern == "NEUTRAL") and macd > macd_signal:
+            opportunity_score -= 2.0
+            reasons.append("🔴 (방어) Stoch RSI 극단 과매수(>0.9) + 반전 패턴 없음 + MACD 강세 → 상승 지속 위험(SELL 말림) (opportunity -2)")
+        elif (pattern is None or pattern == "NEUTRAL"):
+            opportunity_score -= 1.0
+            reasons.append("⚠️ (방어) Stoch RSI 극단 과매수(>0.9) + 반전 패턴 없음 → 반전 신뢰도 낮음 (opportunity -1)")
+    highs = list(candles["high"].tail(20).astype(float).values)
+    lows  = list(candles["low"].tail(20).astype(float).values)
+    if is_buy and trend == "DOWNTREND":
+
+        opportunity_score -= 1.5
+
+        reasons.append(
+            "🟠 하락 추세 + BUY 역방향 → continuation 신뢰도 낮음 (-1.5)"
+        )
+
+    if is_sell and trend == "UPTREND":
+
+        opportunity_score -= 1.5
+
+        reasons.append(
+            "🟠 상승 추세 + SELL 역방향 → continuation 신뢰도 낮음 (-1.5)"
+        )
+
+    if is_buy and trend == "UPTREND":
+        if rsi > 65:
+            if not old_recent_high_break(highs, last_n=2):
+                opportunity_score -= 0.5
+                reasons.append(
+                    "⚠️ 과매수 이후 고점 갱신 실패 → 되밀림 위험 BUY 감점 (-0.5)"
+                )
+
+    if is_sell and trend == "DOWNTREND":
+        if rsi < 35:
+            if not old_recent_low_break(lows, last_n=2):
+                opportunity_score -= 0.5
+                reasons.append(
+                    "⚠️ 과매도 이후 저점 갱신 실패 → 반등 위험 SELL 감점 (-0.5)"
+                )
+    if is_buy and pattern in ["HAMMER", "BULLISH_ENGULFING", "PIERCING_LINE"]:
+        opportunity_score += 0.5
+        reasons.append(f"🕯 BUY 패턴 {pattern} (0.5)")
+
+    if is_sell and pattern in ["SHOOTING_STAR", "BEARISH_ENGULFING", "DARK_CLOUD_COVER"]:
+        opportunity_score += 0.5
+        reasons.append(f"🕯 SELL 패턴 {pattern} (0.5)")
+
+    if atr is not None and atr < 0.001:
+        opportunity_score -= 0.5
+        reasons.append("⚠️ ATR 매우 낮음 → 변동성 부족 (-0.5)")
+
+    if is_buy and opportunity_score < 0:
+        opportunity_score -= 1.5
+        reasons.append("⚠️ BUY 기대 방향 대비 opportunity_score 역행 → 신호 약화 (-1.5)")
+
+    if is_sell and opportunity_score < 0:
+        opportunity_score -= 1.5
+        reasons.append("⚠️ SELL 기대 방향 대비 opportunity_score 역행 → 신호 약화 (-1.5)")
+
+    return opportunity_score, reasons
+
+
+def old_additional_opportunity_score(rsi, stoch_rsi, macd, macd_signal, pattern, trend, signal):
+    """ 기존 필터 이후, 추가 가중치 기반 보완 점수 """
+    score = 0
+    reasons = []
+    is_buy = signal == "BUY"
+    is_sell = signal == "SELL"
+
+    if macd_signal is None:
+        macd_signal = macd
+        reasons.append("⚠️ macd_signal 없음 → macd 사용")
+
+    if is_buy and (macd > 0) and (macd < macd_signal):
+        if (stoch_rsi >= 0.80) or (rsi >= 65):
+            score -= 0.5
+            reasons.append("⚠️ BUY 중 MACD 약화 + 과열 구간 → 되돌림 위험 (감점 -0.5)")
+
+    if is_sell and (macd < 0) and (macd > macd_signal):
+        if (stoch_rsi <= 0.25) or (rsi <= 45):
+            score -= 0.5
+            reasons.append("⚠️ SELL 중 MACD 반등 + 과매도 구간 → 되돌림 위험 (감점 -0.5)")
+
+    if is_sell and (trend == "NEUTRAL"):
+        if (macd < 0) and (macd < macd_signal) and (rsi >= 50) and (stoch_rsi >= 0.55):
+            score += 1.0
+            reasons.append("✅ NEUTRAL이지만 되돌림 후 하락 재개(continuation) → SELL 가점 +1.0")
+
+    if is_buy and (trend == "NEUTRAL"):
+        if (macd > 0) and (macd > macd_signal) and (rsi <= 50) and (stoch_rsi <= 0.45):
+            score += 1.0
+            reasons.append("✅ NEUTRAL이지만 되돌림 후 상승 재개(continuation) → BUY 가점 +1.0")
+
+    return score, reasons
+
+
+def old_dynamic_thresholds(pair: str, atr_value: float):
+    pv = pip_value_for(pair)
+
+    if is_stock_pair(pair):
+        ap_stock = atr_in_pips(atr_value, pair)  # = ATR/price*10000 (가격 스케일 무관 변동성 비율)
+        near_pips_stock          = max(8.0,  0.35 * ap_stock)
+        box_threshold_pips_stock = max(12.0, 0.80 * ap_stock)
+        breakout_buf_pips_stock  = max(1.0,  0.10 * ap_stock)
+        macd_strong_stock = 20 * pv  # 참고용 값. 실제 MACD 채점은 score_signal_with_filters의 ATR 기반 strong/weak를 사용.
+        macd_weak_stock   = 10 * pv
+
+        return {
+            "near_pips": near_pips_stock,
+            "box_threshold_pips": box_threshold_pips_stock,
+            "breakout_buf_pips": breakout_buf_pips_stock,
+            "macd_strong": macd_strong_stock,
+            "macd_weak": macd_weak_stock,
+            "pip_value": pv,
+        }
+
+    ap = max(6.0, atr_in_pips(atr_value, pair))     # ATR(pips), 최소 8pip
+
+    min_near = 6 if pair in ("EUR_USD", "GBP_USD") else 8
+
+    near_pips          = int(max(min_near, min(14, 0.35 * ap)))  # 지지/저항 근접 금지
+    box_threshold_pips = int(max(12,     min(30, 0.80 * ap)))    # 박스 폭 임계
+    breakout_buf_pips  = int(max(1,      min(3,  0.10 * ap)))
+
+    macd_strong = 20 * pv
+    macd_weak   = 10 * pv
+
+    return {
+        "near_pips": near_pips,
+        "box_threshold_pips": box_threshold_pips,
+        "breakout_buf_pips": breakout_buf_pips,
+        "macd_strong": macd_strong,
+        "macd_weak": macd_weak,
+        "pip_value": pv
+    }
+
+
+def old_pips_between(a: float, b: float, pair: str) -> float:
+    return abs(a - b) / pip_value_for(pair)
+
+
+def old_conflict_check(rsi, pattern, trend, signal):
+    """
+    추세-패턴-시그널 충돌 방지 필터 (V2 최종)
+    """
+
+    if rsi > 85 and pattern in ["SHOOTING_STAR", "BEARISH_ENGULFING"] and trend == "UPTREND":
+        return True
+    if rsi < 15 and pattern in ["HAMMER", "BULLISH_ENGULFING"] and trend == "DOWNTREND":
+        return True
+
+    if pattern == "NEUTRAL":
+        if (signal == "BUY" and trend == "UPTREND") or (signal == "SELL" and trend == "DOWNTREND"):
+            return False   # 패턴은 없지만 신호와 추세가 일치 → 충돌 아님
+
+    if trend == "UPTREND" and signal == "SELL" and rsi > 80:
+        return True
+    if trend == "DOWNTREND" and signal == "BUY" and rsi < 20:
+        return True
+
+    return False
+
+
+def old_calculate_structured_sl_tp(entry_price, direction, symbol, support, resistance, pip_size, atr=None):
+    """
+    🟥 [FIX-B8] 구조적(지지/저항 기반) SL/TP.
+
+    기존 구현은 TP를 항상 `SL거리 × 1.8`로 만들었기 때문에 r_ratio가 수학적으로
+    언제나 정확히 1.8이었다. 그런데 호출부에서는 `if r_ratio < 1.4: -4.0점` 감점을
+    걸어놨다 — 절대 발동할 수 없는 죽은 감점이었다.
+    → r_ratio를 "구조상 실제로 얻을 수 있는 손익비"로 계산하도록 바꾼다.
+       즉 TP는 저항(BUY)/지지(SELL)라는 실제 구조 목표에 두고, 그 목표까지의 거리와
+       SL 거리의 비율을 r_ratio로 본다. 구조 목표가 없으면 기존 1.8 폴백을 쓴다.
+    """
+    buffer = old_get_buffer_by_symbol(symbol, atr=atr)
+
+    if direction == 'BUY':
+        sl = support - buffer if support is not None else None
+        structural_tp = resistance
+    else:
+        sl = resistance + buffer if resistance is not None else None
+        structural_tp = support
+
+    if sl is None or entry_price is None or abs(sl - entry_price) < 1e-12:
+        return sl, None, 1.8
+
+    risk = abs(entry_price - sl)
+
+    if structural_tp is not None:
+        reward = abs(structural_tp - entry_price)
+        wrong_side = (
+            (direction == 'BUY' and structural_tp <= entry_price)
+            or (direction != 'BUY' and structural_tp >= entry_price)
+        )
+        if wrong_side or reward < risk * 0.1:
+            tp = entry_price + risk * 1.8 if direction == 'BUY' else entry_price - risk * 1.8
+        else:
+            tp = structural_tp
+    else:
+        tp = entry_price + risk * 1.8 if direction == 'BUY' else entry_price - risk * 1.8
+
+    r_ratio = abs(tp - entry_price) / risk
+
+    return sl, tp, r_ratio
+
+
+def old_get_buffer_by_symbol(symbol, atr=None):
+    if is_stock_pair(symbol):
+        try:
+            atr_val = float(atr.iloc[-1]) if hasattr(atr, "iloc") else float(atr or 0)
+        except Exception:
+            atr_val = 0.0
+        if atr_val > 0:
+            return atr_val * ALPACA_SL_BUFFER_ATR_MULT
+        return 10 * pip_value_for(symbol)
+
+    return 10 * pip_value_for(symbol)
+
+
+def old_score_signal_with_filters(rsi, macd, macd_signal, stoch_rsi, prev_stoch_rsi, trend, prev_trend, signal, liquidity, pattern, pair, candles, atr, price, bollinger_upper, bollinger_lower, support, resistance, support_distance, resistance_distance, pip_size, macd_trend=None, expected_direction=None, strategy_name=None, ctx=None):
+    signal_score = 0
+    opportunity_score = 0
+    reasons = []
+
+    score, base_reasons = old_must_capture_opportunity(rsi, stoch_rsi, macd, macd_signal, pattern, candles, trend, atr, price, bollinger_upper, bollinger_lower, support, resistance, support_distance, resistance_distance, pip_size, expected_direction=signal)
+    extra_score, extra_reasons = old_additional_opportunity_score(rsi, stoch_rsi, macd, macd_signal, pattern, trend, signal)
+
+    thr = old_dynamic_thresholds(pair, atr)
+    pv = thr["pip_value"]           # pip 크기 (JPY=0.01, 그 외=0.0001)
+    NEAR_PIPS = thr["near_pips"]    # 지지/저항 근접 금지 임계(pips)
+    close = None
+    try:
+        if candles is not None and not candles.empty and "close" in candles.columns:
+            close = float(candles["close"].iloc[-1])
+    except Exception:
+        close = None
+
+    if price is None:
+        price = close
+    if close is None:
+        close = price
+
+    is_buy = expected_direction == "BUY"
+    is_sell = expected_direction == "SELL"
+
+    if 45 <= rsi <= 55 and trend == "NEUTRAL":
+        score -= 0.3
+        reasons.append("⚠️ RSI 중립(45~55) + 트렌드 NEUTRAL → 진입 신호 약화 (-0.3)")
+
+    if is_buy:
+        if (
+            rsi > 40
+            and stoch_rsi > 0.4
+            and macd < macd_signal
+            and trend != "UPTREND"
+        ):
+            score -= 1.0
+            reasons.append(
+                "📉 RSI & Stoch RSI 반등 중이나 MACD 약세 + 추세 불확실 → BUY 감점 (-1.0)"
+            )
+
+    elif is_sell:
+        if (
+            rsi < 60
+            and stoch_rsi < 0.6
+            and macd > macd_signal
+            and trend != "DOWNTREND"
+        ):
+            score -= 1.0
+            reasons.append(
+                "📈 RSI & Stoch RSI 하락 중이나 MACD 강세 + 추세 불확실 → SELL 감점 (-1.0)"
+            )
+
+    entry_price = price
+    direction = signal
+    symbol = pair
+
+    sl, tp, r_ratio = old_calculate_structured_sl_tp(entry_price, direction, symbol, support, resistance, pv, atr=atr)
+
+    if r_ratio < 1.0:
+        signal_score -= 2.0
+        reasons.append("📉 구조 손익비 매우 낮음 (%.2f < 1.0) → 감점 -2.0" % r_ratio)
+    elif r_ratio < 1.4:
+        signal_score -= 1.0
+        reasons.append("📉 구조 손익비 낮음 (%.2f < 1.4) → 감점 -1.0" % r_ratio)
+
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+
+    now_atlanta = datetime.now(ZoneInfo("America/New_York"))
+    atlanta_hour = BENCH_HOUR
+
+    if (not is_stock_pair(pair)) and 19 <= atlanta_hour < 23:
+        signal_score -= 3
+        reasons.append("🌙 FX 19~23시(ET) 유동성 저하 구간 감점 (-3)")
+
+    _macd_recovering = (
+        macd_trend and len(macd_trend) >= 3
+        and macd_trend[-1] > macd_trend[-2] > macd_trend[-3]
+    )
+    _macd_weak_thresh = -(atr * 0.02) if (is_stock_pair(pair) and atr) else -0.02
+    if macd < _macd_weak_thresh and trend != "DOWNTREND":
+        if _macd_recovering:
+            score -= 0.75
+            reasons.append("🔻 MACD 음수지만 회복 중 → 약세 판정 완화 (감점 -0.75, 기존 -1.5)")
+        else:
+            score -= 1.5
+            reasons.append("🔻 MACD 약세 + 추세 모호 → 신호 신뢰도 낮음 (감점 -1.5)")
+
+    if signal == "SELL" and rsi > 70 and stoch_rsi > 0.85:
+        score -= 1.5
+        reasons.append("🔻 RSI + Stoch RSI 과매수 → SELL 진입 위험 (감점 -1.5)")
+    if signal == "SELL" and trend == "NEUTRAL":
+        if (macd < 0) and (macd < macd_signal) and (stoch_rsi >= 0.6) and (rsi >= 50):
+            signal_score += 1.5
+            reasons.append("✅ NEUTRAL 구간이지만 MACD 약세 + 되돌림(고Stoch) → 하락 재개 SELL 가점 +1.5")
+
+    if rsi < 30 and stoch_rsi < 0.15 and (pattern is None or trend == "NEUTRAL"):
+        score -= 1.5
+        reasons.append("⚠️ RSI + Stoch RSI 과매도 + 반등 근거 부족 → 진입 위험 (감점 -1.5)")
+
+    if signal == "BUY" and stoch_rsi < 0.15 and prev_stoch_rsi > 0.3 and (macd < 0 or trend != "UPTREND"):
+        score -= 1.5
+        reasons.append("⚠️ Stoch RSI 급락 + MACD/추세 불확실 → 하락 지속 우려 (감점 -1.5)")
+    if signal == "BUY" and candles["close"].iloc[-1] < candles["open"].iloc[-1] and \
+       (candles["open"].iloc[-1] - candles["close"].iloc[-1]) > (candles["high"].iloc[-2] - candles["low"].iloc[-2]) * 0.9 and \
+       pattern is None and trend != "UPTREND":
+        score -= 1.5
+        reasons.append("📉 장대 음봉 직후 + 반등 패턴 없음 + 추세 불확실 ➝ BUY 진입 위험 (감점 -1.5)")
+
+    if signal == "SELL" and candles["close"].iloc[-1] > candles["open"].iloc[-1] and \
+       (candles["close"].iloc[-1] - candles["open"].iloc[-1]) > (candles["high"].iloc[-2] - candles["low"].iloc[-2]) * 0.9 and \
+       pattern is None and trend != "DOWNTREND":
+        score -= 1.5
+        reasons.append("📈 장대 양봉 직후 + 반전 패턴 없음 + 추세 불확실 ➝ SELL 진입 위험 (감점 -1.5)")
+
+    if signal == "BUY" and trend != "UPTREND":
+
+        if (
+            candles["close"].iloc[-1] < candles["open"].iloc[-1] and
+            candles["close"].iloc[-2] < candles["open"].iloc[-2] and
+            rsi < 40
+        ):
+
+            score -= 0.5
+
+            reasons.append(
+                "⚠ 최근 약세 흐름 지속 → BUY continuation 약화 (-0.5)"
+            )
+
+    if signal == "SELL" and trend != "DOWNTREND":
+
+        if (
+            candles["close"].iloc[-1] > candles["open"].iloc[-1] and
+            candles["close"].iloc[-2] > candles["open"].iloc[-2] and
+            rsi > 60
+        ):
+
+            score -= 0.5
+
+            reasons.append(
+                "⚠ 최근 강세 흐름 지속 → SELL continuation 약화 (-0.5)"
+            )
+
+    if trend == "UPTREND" and prev_trend == "DOWNTREND" and signal == "BUY":
+        score -= 1.0
+        reasons.append("🔄 하락→상승 추세 전환 직후 BUY → 조기 진입 경고 (감점 -1.0)")
+
+    if trend == "DOWNTREND" and prev_trend == "UPTREND" and signal == "SELL":
+        score -= 1.0
+        reasons.append("🔄 상승→하락 추세 전환 직후 SELL → 조기 진입 경고 (감점 -1.0)")
+
+    signal_score += score + extra_score
+    reasons.extend(base_reasons + extra_reasons)
+    if signal == "BUY" and trend == "UPTREND" and pattern in ["BULLISH_ENGULFING", "HAMMER", "PIERCING_LINE"]:
+        signal_score += 1
+        opportunity_score += 0.5  # ✅ 패턴-추세 일치 시 추가 점수
+        reasons.append("✅ 강한 상승추세 + 매수 캔들 패턴 일치 → 보너스 + 기회 점수 강화 가점 +1.5")
+
+    elif signal == "SELL" and trend == "DOWNTREND" and pattern in ["BEARISH_ENGULFING", "SHOOTING_STAR", "DARK_CLOUD_COVER"]:
+        signal_score += 1
+        opportunity_score += 0.5  # ✅ 패턴-추세 일치 시 추가 점수
+        reasons.append("✅ 강한 하락추세 + 매도 캔들 패턴 일치 → 보너스 + 기회 점수 강화 가점 +1.5")
+
+        now_atlanta = datetime.now(ZoneInfo("America/New_York"))
+
+        atlanta_hour = BENCH_HOUR
+        atlanta_minute = now_atlanta.minute
+
+    digits = int(abs(np.log10(pip_value_for(pair))))   # EURUSD=4, JPY계열=2
+    pv = pip_value_for(pair)
+
+    sup_raw = float(support)
+    res_raw = float(resistance)
+
+    sup = round(sup_raw, digits)
+    res = round(res_raw, digits)
+
+    dist_to_res_pips = abs(res_raw - price) / pv
+    dist_to_sup_pips = abs(price - sup_raw) / pv
+
+    conflict_flag = old_conflict_check(rsi, pattern, trend, signal)
+
+    extreme_buy = signal == "BUY" and rsi < 25 and stoch_rsi < 0.2
+    extreme_sell = signal == "SELL" and rsi > 75 and stoch_rsi > 0.8
+    macd_reversal_buy = signal == "BUY" and macd > macd_signal and trend == "DOWNTREND"
+    macd_reversal_sell = signal == "SELL" and macd < macd_signal and trend == "UPTREND"
+
+    if conflict_flag:
+        if extreme_buy or extreme_sell or macd_reversal_buy or macd_reversal_sell:
+            reasons.append("🔄 추세-패턴 충돌 BUT 강한 역추세 조건 충족 → 진입 허용")
+        else:
+            signal_score -= 1
+            reasons.append("⚠️ 추세+패턴 충돌 + 보완 조건 미충족 → 감점-1")
+
+    _near_atr_val = float(atr.iloc[-1]) if hasattr(atr, "iloc") else float(atr or 0)
+
+    if is_stock_pair(pair):
+        _breakout_buf = _near_atr_val * 0.05
+    else:
+        _breakout_buf = 2 * pip_value_for(pair)
+
+    if signal == "BUY":
+        dist_to_res_pips = old_pips_between(price, resistance, pair)
+        if is_stock_pair(pair):
+            near_res_block = (resistance is not None and price is not None
+                               and abs(resistance - price) < (_near_atr_val * 0.15))
+        else:
+            near_res_block = dist_to_res_pips < 3
+        if near_res_block:
+            signal_score -= 2
+            reasons.append(f"📉 저항선 근접 → 신중 진입 필요 (감점-2) [dist={dist_to_res_pips:.1f}pip]")
+
+        last2 = candles.tail(2)
+        over1 = (last2.iloc[-1]['close'] > resistance + _breakout_buf) if not last2.empty else False
+        over2 = (len(last2) > 1 and last2.iloc[-2]['close'] > resistance + _breakout_buf) if not last2.empty else False
+        confirmed_breakout_up = over1 or (over1 and over2)
+
+    if signal == "SELL":
+        dist_to_sup_pips = old_pips_between(price, support, pair)
+        if is_stock_pair(pair):
+            near_sup_block = (support is not None and price is not None
+                               and abs(price - support) < (_near_atr_val * 0.15))
+        else:
+            near_sup_block = dist_to_sup_pips < 3
+        if near_sup_block:
+            signal_score -= 1.5
+            reasons.append(f"📉 지지선 근접 → 신중 진입 필요 (감점-1.5) [dist={dist_to_sup_pips:.1f}pip]")
+
+        last2 = candles.tail(2)
+        under1 = (last2.iloc[-1]['close'] < support - _breakout_buf) if not last2.empty else False
+        under2 = (len(last2) > 1 and last2.iloc[-2]['close'] < support - _breakout_buf) if not last2.empty else False
+        confirmed_breakdown = under1 or (under1 and under2)
+
+    if trend == "NEUTRAL":
+
+        if (
+            47 <= rsi <= 53 and
+            abs(macd) < 0.015 and
+            0.4 <= stoch_rsi <= 0.6
+        ):
+
+            signal_score -= 0.5
+            reasons.append(
+                "⚠️ 완전 횡보(chop) 상태 → 약한 감점 (-0.5)"
+            )
+
+        else:
+            if is_stock_pair(pair):
+                signal_score -= 0.15
+                reasons.append("🟡 NEUTRAL 추세(돌파 초기 지표 지연 가능성) → 약한 감점 (-0.15)")
+            else:
+                signal_score -= 0.3
+                reasons.append("🟡 NEUTRAL 추세 → continuation 신뢰도 낮음 (-0.3)")
+
+    if signal == "BUY" and rsi > 85 and stoch_rsi > 0.9:
+        if macd < macd_signal:
+            signal_score -= 1.0
+            reasons.append("⛔ RSI/Stoch RSI 극단 과열 + MACD 약세 → BUY (감점 -1.0)")
+        else:
+            signal_score -= 0.5
+            reasons.append("⚠️ RSI/Stoch 과열 → BUY 피로 구간 (감점 -0.5)")
+
+    if signal == "SELL" and rsi < 40:
+
+        if trend == "DOWNTREND":
+            if rsi < 30:
+                signal_score -= 0.5
+                reasons.append("⚠️ DOWNTREND지만 RSI<30 극단 과매도 → 반등 리스크 경고 (감점 -0.5)")
+            else:
+                signal_score += 0.5
+                reasons.append("📉 하락 추세 지속 + 과매도 → 추세 SELL 허용 (+0.5)")
+
+        else:
+            if macd > macd_signal and 0.3 < stoch_rsi < 0.7:
+                signal_score += 1
+                reasons.append("✅ 과매도 SELL이나 MACD/Stoch 반등 → 예외적 진입 허용 (+1)")
+            elif stoch_rsi > 0.3:
+                signal_score -= 2
+                reasons.append("⚠️ 과매도 SELL + 반등 가능성 → 신중 (감점 -2)")
+            else:
+                signal_score -= 1.5
+                reasons.append("❌ 과매도 SELL + 반등 신호 부족 → 진입 위험 (감점 -1.5)")
+
+    if stoch_rsi < 0.1 and pattern is None:
+        signal_score -= 1
+        reasons.append("🔴 Stoch RSI 극단 과매도 + 반등 패턴 없음 → 반등 신뢰도 낮음 (감점 -1)")
+
+    if rsi < 30:
+
+        if pattern in ["HAMMER", "BULLISH_ENGULFING"]:
+            signal_score += 2
+            reasons.append("🟢 RSI < 30 + 반등 캔들 패턴 → 진입 강화 (+2)")
+
+        elif (
+            macd < macd_signal
+            and trend == "DOWNTREND"
+            and len(macd_trend) >= 3
+            and macd_trend[-1] <= macd_trend[-2]
+        ):
+            signal_score -= 1.5
+            reasons.append("🔴 RSI < 30 + MACD/추세 약세 지속 → 반등 기대 낮음 (감점 -1.5)")
+
+        elif (
+            len(macd_trend) >= 3
+            and macd_trend[-1] > macd_trend[-2] > macd_trend[-3]
+        ):
+            signal_score += 1.0
+            reasons.append("🟢 RSI 과매도 + MACD 회복 → 반등 기대 (+1.0)")
+
+        else:
+            signal_score -= 0.5
+            reasons.append("⚠️ RSI < 30 but 반등 근거 부족 → 주의 (-0.5)")
+
+    if rsi > 70 and pattern not in ["SHOOTING_STAR", "BEARISH_ENGULFING"]:
+        if macd > macd_signal and macd > 0 and trend == "UPTREND":
+            signal_score += 0.5
+            reasons.append("📈 RSI > 70이나 MACD/UPTREND 유지 → 조건부 BUY 허용 (+0.5)")
+        else:
+            signal_score -= 1
+            reasons.append("⚠️ RSI > 70 + 반전 패턴 없음 → 진입 위험 (감점 -2)")
+
+    BOOST_BUY_PAIRS = {"EUR_USD", "GBP_USD", "USD_JPY"}
+
+    if pair in BOOST_BUY_PAIRS and signal == "BUY":
+
+        if trend != "UPTREND":
+            reasons.append(f"{pair}: 하락/중립 추세 → 눌림목 BUY 보너스 제외")
+
+        elif (
+            rsi is not None and
+            stoch_rsi is not None and
+            rsi > 75 and
+            stoch_rsi > 0.9
+        ):
+            reasons.append(
+                f"{pair}: RSI/Stoch 과열 → late BUY 위험, 눌림목 BUY 보너스 제한"
+            )
+
+        else:
+
+            if 40 <= rsi <= 50:
+                signal_score += 0.7
+                reasons.append(f"{pair}: RSI 40~50 눌림목 영역 (+0.7)")
+
+            if 0.1 <= stoch_rsi <= 0.3:
+                signal_score += 0.5
+                reasons.append(f"{pair}: Stoch RSI 바닥 반등 초기 (+0.5)")
+
+            if pattern in ["HAMMER", "LONG_BODY_BULL"]:
+                signal_score += 0.5
+                reasons.append(f"{pair}: 매수 캔들 패턴 확인 (+0.5)")
+
+            if macd > 0:
+                signal_score += 0.3
+                reasons.append(f"{pair}: MACD 양수 유지 (+0.3)")
+
+    if signal == "BUY" and trend == "DOWNTREND":
+        if rsi < 30 and stoch_rsi < 0.15 and macd > macd_signal:
+            signal_score += 1.5
+            reasons.append("🟢 하락추세 과매도 + MACD 반등 → 제한적 반등 BUY (+1.5)")
+        else:
+            signal_score -= 1
+            reasons.append("❌ 하락추세 BUY → 반등 조건 미흡 (감점 -1)")
+
+    if signal == "BUY" and trend == "UPTREND":
+        if 45 <= rsi <= 55 and 0.0 <= stoch_rsi <= 0.3 and macd > 0:
+            signal_score += 1.5
+            reasons.append("📈 눌림목 BUY 조건 충족 → 반등 기대 (+1.5)")
+
+    if signal == "SELL" and trend == "DOWNTREND":
+        if 45 <= rsi <= 55 and 0.7 <= stoch_rsi <= 1.0 and macd < 0:
+            signal_score += 1.5
+            reasons.append("📉 눌림목 SELL 조건 충족 → 반락 기대 (+1.5)")
+
+    if signal == "BUY" and trend == "UPTREND" and 50 <= rsi <= 60:
+        signal_score += 0.5
+        reasons.append("RSI 중립(50~60) + 상승추세 → 눌림목 반등 기대 (+0.5)")
+
+    if price >= bollinger_upper:
+        reasons.append("🔴 볼린저 상단 → 과매수 경계 (참고)")
+    elif price <= bollinger_lower:
+        reasons.append("🟢 볼린저 하단 → 반등 관찰 구간 (가점 없음)")
+
+    if pattern == "LONG_BODY_BULL":
+        if signal == "BUY":
+            signal_score += 1.5
+            reasons.append("📊 장대 양봉 + BUY → 추세 지속 가능성 (+1.5)")
+        elif signal == "SELL":
+            signal_score -= 1.0
+            reasons.append("⚠️ 장대 양봉인데 SELL → 역방향 진입 위험 (-1.0)")
+    elif pattern == "LONG_BODY_BEAR":
+        if signal == "SELL":
+            signal_score += 1.5
+            reasons.append("📊 장대 음봉 + SELL → 추세 지속 가능성 (+1.5)")
+        elif signal == "BUY":
+            signal_score -= 1.0
+            reasons.append("⚠️ 장대 음봉인데 BUY → 역방향 진입 위험 (-1.0)")
+
+    if ctx is not None:
+        box_info = ctx.memo("box_breakout", detect_box_breakout, candles, pair, atr_series=ctx.series("atr"))
+        high_low_flags = ctx.memo("highs_lows", analyze_highs_lows, candles)
+    else:
+        box_info = old_detect_box_breakout(candles, pair)
+        high_low_flags = old_analyze_highs_lows(candles)
+    if high_low_flags["new_high"]:
+        reasons.append("📈 최근 고점 갱신 → 상승세 유지 가능성↑")
+    if high_low_flags["new_low"]:
+        reasons.append("📉 최근 저점 갱신 → 하락세 지속 가능성↑")
+
+    if trend == "NEUTRAL" \
+       and box_info.get("in_box") \
+       and box_info.get("breakout") in ("UP", "DOWN") \
+       and (high_low_flags.get("new_high") or high_low_flags.get("new_low")):
+
+        aligns = ((box_info["breakout"] == "UP"   and signal == "BUY") or
+              (box_info["breakout"] == "DOWN" and signal == "SELL"))
+
+        if not aligns:
+            signal_score += 1.5
+            reasons.append("🟡 NEUTRAL 예외: 박스 이탈 + 고/저 갱신 → 기본 가점(+1.5)")
+
+    if box_info["in_box"] and box_info["breakout"] == "UP" and signal == "BUY":
+        signal_score += 3
+        reasons.append("📦 박스권 상단 돌파 + 매수 신호 일치 (breakout 가점 강화 +3)")
+    elif box_info["in_box"] and box_info["breakout"] == "DOWN" and signal == "SELL":
+        signal_score += 3
+        reasons.append("📦 박스권 하단 돌파 + 매도 신호 일치 가점+3")
+    elif box_info["in_box"] and box_info["breakout"] is None:
+        reasons.append("📦 박스권 유지 중 → 관망 경계")
+
+    if signal == "SELL" and signal_score > 5:
+        reasons.append("⚠️ SELL 점수 상한 적용 (최대 5점)")
+        signal_score = 5
+
+    macd_diff = macd - macd_signal
+    _macd_atr = float(atr.iloc[-1]) if hasattr(atr, "iloc") else float(atr or 0)
+    if is_stock_pair(pair):
+        strong = max(_macd_atr * 0.20, pv * 1.5)
+        weak = max(_macd_atr * 0.07, pv * 0.5)
+    else:
+        strong = 1.5 * pv
+        weak = 0.5 * pv
+    micro  = 2 * pv               # 미세변동(≈2 pip) 판단용
+
+    if (macd_diff > strong) and trend == "UPTREND":
+        signal_score += 3
+        reasons.append("MACD 골든크로스(강) + 상승추세 일치 가점+3")
+    elif (macd_diff < -strong) and trend == "DOWNTREND":
+        signal_score += 3
+        reasons.append("MACD 데드크로스(강) + 하락추세 일치 가점+3")
+    elif abs(macd_diff) >= weak:
+        signal_score += 1
+        reasons.append("MACD 교차(약) → 초입 가점 +1")
+    else:
+        reasons.append("MACD 미세변동 → 가점 보류")
+    if signal == "BUY" and len(macd_trend) >= 3:
+
+        if (
+            macd_trend[-1] > macd_trend[-2]
+            and macd_trend[-2] > macd_trend[-3]
+        ):
+
+            if macd_trend[-1] < 0:
+                _gap_now  = abs(macd_trend[-1] - (macd_signal if not hasattr(macd_signal, 'iloc') else float(macd_signal.iloc[-1])))
+                _gap_prev = abs(macd_trend[-2] - (macd_signal if not hasattr(macd_signal, 'iloc') else float(macd_signal.iloc[-2])))
+                _recovery_speed = (_gap_prev - _gap_now) / max(_gap_prev, 1e-9)
+
+                if _recovery_speed >= 0.15:
+                    signal_score += 0.7
+                    reasons.append(
+                        f"🟢 MACD 음수권 빠른 회복(수렴속도 {_recovery_speed*100:.0f}%) → 반등 가점 (+0.7)"
+                    )
+                else:
+                    signal_score -= 1.5
+                    reasons.append(
+                        f"🔴 MACD 음수권 느린 회복(수렴속도 {_recovery_speed*100:.0f}%) → 노이즈 의심 강감점 (-1.5)"
+                    )
+
+            else:
+
+                signal_score += 0.3
+
+                reasons.append(
+                    "🟢 MACD 상승 모멘텀 유지 (+0.3)"
+                )
+
+    macd_hist = macd_diff
+    if stoch_rsi is not None and macd is not None and macd_signal is not None:
+
+        if signal == "BUY" and stoch_rsi > 0.8 and macd < macd_signal:
+            signal_score -= 3.0
+            reasons.append("⛔ BUY 차단: Stoch RSI 과열 + MACD 약화(macd<signal) → 추격 매수 위험 강감점 -3")
+
+        if signal == "SELL" and stoch_rsi < 0.2 and macd < macd_signal:
+
+            if trend == "DOWNTREND":
+                signal_score -= 0.5
+                reasons.append("🟡 DOWNTREND + 과매도(Stoch<0.2) + MACD 약화 → 추세형 하락 지속 가능(경고 -0.5)")
+
+            elif trend == "NEUTRAL" and rsi is not None and rsi < 50:
+                reasons.append("🟡 NEUTRAL 전환 구간 + RSI<50 + 과매도(Stoch<0.2) → 추격 숏 단정 금지(중립)")
+
+            else:
+                signal_score -= 2.0
+                reasons.append("⛔ SELL 차단: 과매도(Stoch<0.2) + MACD 약화 + 추세 불리 → 추격 매도 위험 감점 -2")
+
+    _atr_val_early = atr if atr is not None else 0.0
+    _res_val_early = resistance if resistance is not None else None
+    _near_resistance_early = False
+    if _res_val_early is not None and price is not None:
+        _near_resistance_early = (
+            _res_val_early > price
+            and (_res_val_early - price) <= max(10 * pv, _atr_val_early * 0.6)
+        )
+    _buffer_early = max(2 * pv, _atr_val_early * 0.10)
+    _breakout_confirmed_early = False
+    if _res_val_early is not None and close is not None:
+        _breakout_confirmed_early = close >= (_res_val_early + _buffer_early)
+
+    if stoch_rsi >= 0.95:
+        _confirmed_momentum = (trend == "UPTREND" and macd is not None and macd > 0) or (
+            is_stock_pair(pair) and _breakout_confirmed_early and not _near_resistance_early
+            and macd is not None and macd > 0
+        )
+        if _confirmed_momentum:
+            signal_score -= 0.5
+            reasons.append("🟡 Stoch RSI 과열이지만 돌파확정/상승추세 + MACD 양수 → 조건부 감점 -0.5")
+        else:
+            signal_score -= 1
+            reasons.append("🔴 Stoch RSI 1.0 → 극단적 과매수 → 피로감 주의 감점 -1")
+
+    pip = pv  # 🟦 고정 0.01(JPY 가정) 대신 자산군별 pip_value(pv)로 통일 (FX는 페어별, 주식은 가격비례)
+
+    if price is None:
+        price = close
+    if close is None:
+        close = price
+
+    atr_val = atr if atr is not None else 0.0
+    res_val = resistance if resistance is not None else None
+
+    near_resistance = False
+    if res_val is not None and price is not None:
+        near_resistance = (
+            res_val > price
+            and (res_val - price) <= max(10 * pip, atr_val * 0.6)
+        )
+
+    buffer = max(2 * pip, atr_val * 0.10)
+    breakout_confirmed = False
+    if res_val is not None and close is not None:
+        breakout_confirmed = close >= (res_val + buffer)
+
+    if stoch_rsi is not None and stoch_rsi > 0.8:
+
+        if signal == "BUY" and trend == "UPTREND" and rsi < 70 and macd is not None and macd_signal is not None and macd >= macd_signal:
+
+            if breakout_confirmed and not near_resistance:
+                if pair == "USD_JPY":
+                    signal_score += 2
+                    reasons.append("USDJPY: Stoch RSI 과열 + 돌파확정 → 모멘텀 가점 +2")
+                else:
+                    signal_score += 1.5
+                    reasons.append("Stoch RSI 과열 + 돌파확정 → 모멘텀 가점 +1.5")
+            else:
+                signal_score -= 2
+                reasons.append("Stoch RSI 과열 + 저항 근접/돌파미확정 → 추격 BUY 위험 감점 -2")
+
+        else:
+            reasons.append("Stoch RSI 과열 → 고점 피로, 관망")
+
+    elif stoch_rsi < 0.2:
+        if signal == "BUY":
+
+            if stoch_rsi < 0.05 and macd < macd_signal:
+                signal_score -= 1.5
+                reasons.append("🔴 Stoch RSI 극단 과매도(<0.05) + MACD<Signal → 하락 가속/전환 위험 (감점 -1.5)")
+
+            else:
+                if trend == "DOWNTREND":
+                    signal_score += 0.5
+                    reasons.append("Stoch RSI 과매도 + 하락추세 → 반등은 제한적(+0.5)")
+                else:
+                    if (strategy_name or "").strip().lower() == "balance breakout":
+                        reasons.append("ℹ Balance breakout: Stoch RSI 과매도 반등 BUY 가점 미적용")
+                    else:
+                        reasons.append("🟡 Stoch RSI 과매도 → BUY 반등 기대 (데이터상 효과 미검증, 가점 0)")
+
+        else:
+            reasons.append("Stoch RSI 과매도 → SELL은 추격 위험, 관망")
+
+    else:
+        reasons.append("Stoch RSI 중립")
+
+    if trend == "UPTREND" and signal == "BUY":
+
+        if (
+            stoch_rsi is not None and
+            rsi is not None and
+            stoch_rsi > 0.9 and
+            rsi > 75
+        ):
+            reasons.append(
+                "⚠️ RSI/Stoch 과열 → late BUY 위험, 추세 가점 제외"
+            )
+
+        elif stoch_rsi < 0.05 and macd < macd_signal:
+            reasons.append(
+                "⚠️ 표기상 UPTREND지만 Stoch 극단 과매도 + MACD 약화 → 추세 전환 의심(추세일치 가점 제외)"
+            )
+
+        else:
+            signal_score += 0.5
+            reasons.append("추세 상승 + 매수 일치 가점+0.5")
+
+    elif trend == "DOWNTREND" and signal == "SELL":
+
+        if (
+            stoch_rsi is not None and
+            rsi is not None and
+            stoch_rsi < 0.1 and
+            rsi < 25
+        ):
+            reasons.append(
+                "⚠️ RSI/Stoch 과매도 → late SELL 위험, 추세 가점 제외"
+            )
+
+        elif stoch_rsi is not None and stoch_rsi >= 0.95:
+            reasons.append(
+                "⛔ Stoch RSI 과열(≥0.95) → 숏 말림 위험, 추세 매도 가점 미적용"
+            )
+
+        else:
+            signal_score += 0.5
+            reasons.append("추세 하락 + 매도 일치 가점+0.5")
+
+    if liquidity == "좋음":
+        reasons.append("🟡 유동성 양호 (참고)")
+    last_3 = candles.tail(3)
+    if (
+        all(last_3["close"] < last_3["open"])
+        and trend == "DOWNTREND"
+        and pattern in ["NEUTRAL", "SHOOTING_STAR", "LONG_BODY_BEAR"]
+    ):
+
+        if (
+            rsi is not None and
+            stoch_rsi is not None and
+            rsi < 25 and
+            stoch_rsi < 0.1
+        ):
+            reasons.append(
+                "⚠️ 3봉 연속 음봉이지만 RSI/Stoch 과매도 → late SELL 위험, 추가 가점 제외"
+            )
+
+        else:
+            signal_score += 0.5
+            reasons.append(
+                "🔻 최근 3봉 연속 음봉 + 하락추세 → SELL continuation 가점+0.5"
+            )
+
+    recent = candles.tail(10)
+    if not recent.empty:
+        box_high = recent['high'].max()
+        box_low  = recent['low'].min()
+
+        near_top_pips = abs(box_high - price) / pv
+        near_low_pips = abs(price - box_low) / pv
+
+        buf_price = thr["breakout_buf_pips"] * pv  # 가격단위
+
+        if signal == "BUY" and box_info.get("in_box") and box_info.get("breakout") is None:
+            confirmed_top_break = recent.iloc[-1]['close'] > (box_high + buf_price)
+            retest_support = (recent.iloc[-1]['low'] > box_high - buf_price) and (near_top_pips <= NEAR_PIPS)
+            if near_top_pips <= NEAR_PIPS and not (confirmed_top_break or retest_support):
+                signal_score -= 1.5
+                reasons.append("⚠️ 박스 상단 근접 매수 위험 (감점-1.5)")
+
+        if signal == "SELL" and box_info.get("in_box") and box_info.get("breakout") is None:
+            confirmed_bottom_break = recent.iloc[-1]['close'] < (box_low - buf_price)
+            retest_resist = (recent.iloc[-1]['high'] < box_low + buf_price) and (near_low_pips <= NEAR_PIPS)
+            if near_low_pips <= NEAR_PIPS and not (confirmed_bottom_break or retest_resist):
+                signal_score -= 1.5
+                reasons.append("⚠️ 박스 하단 근접 매도 위험 (감점-1.5)")
+
+    if (
+        all(last_3["close"] > last_3["open"])
+        and trend == "UPTREND"
+        and pattern in ["NEUTRAL", "LONG_BODY_BULL", "INVERTED_HAMMER"]
+    ):
+
+        if (
+            rsi is not None and
+            stoch_rsi is not None and
+            rsi > 75 and
+            stoch_rsi > 0.9
+        ):
+            reasons.append(
+                "⚠️ 3봉 연속 양봉이지만 RSI/Stoch 과열 → late BUY 위험, 추가 가점 제외"
+            )
+
+        elif rsi is not None and rsi < 70:
+            reasons.append(
+                "⛔ 3봉 연속 양봉이지만 RSI<70(모멘텀 부족) → 추격 진입 위험, 진입 차단"
+            )
+            signal_score -= 3.0
+
+        else:
+            signal_score += 0.5
+            reasons.append(
+                "🟢 최근 3봉 연속 양봉 + 상승추세 → BUY continuation 가점+0.5"
+            )
+
+    bullish_patterns = ["BULLISH_ENGULFING", "HAMMER", "PIERCING_LINE"]
+    bearish_patterns = ["SHOOTING_STAR", "BEARISH_ENGULFING", "DARK_CLOUD_COVER"]
+    if pattern in bullish_patterns:
+        if is_buy:
+            signal_score += 2
+            reasons.append(f"🟢 강한 매수형 패턴 ({pattern}) ➜ BUY 근거 강화 (+2)")
+        elif is_sell:
+            signal_score -= 1.5
+            reasons.append(f"⚠️ 매수 반전 패턴 ({pattern}) ➜ SELL 신뢰도 하락 (-1.5)")
+
+    elif pattern in bearish_patterns:
+        if is_sell:
+            signal_score += 2
+            reasons.append(f"🔴 강한 매도형 패턴 ({pattern}) ➜ SELL 근거 강화 (+2)")
+        elif is_buy:
+            signal_score -= 1.5
+            reasons.append(f"⚠️ 매도 반전 패턴 ({pattern}) ➜ BUY 신뢰도 하락 (-1.5)")
+
+    try:
+        if trend == "DOWNTREND" and signal == "SELL":
+
+            near_support = (
+                support is not None and
+                price is not None and
+                atr is not None and
+                abs(price - support) <= atr * 0.25
+            )
+
+            if (rsi is not None) and (rsi < 32) and near_support:
+
+                signal_score -= 3.0
+                reasons.append(
+                    "🔴 과매도 + 지지선 매우 근접(ATR 기준) → late SELL / 숏스퀴즈 위험 (-3.0)"
+                )
+
+            elif (rsi is not None) and (rsi < 32):
+
+                signal_score -= 1.0
+                reasons.append(
+                    "🟠 과매도 구간 SELL → 반등 위험 (-1.0)"
+                )
+
+        if trend == "UPTREND" and signal == "BUY":
+
+            near_resistance = (
+                resistance is not None and
+                price is not None and
+                atr is not None and
+                resistance > price and
+                (resistance - price) <= atr * 0.25
+            )
+
+            if (rsi is not None) and (rsi > 68) and near_resistance:
+
+                signal_score -= 3.0
+                reasons.append(
+                    "🔴 과매수 + 저항선 매우 근접(ATR 기준) → late BUY / 돌파 실패 위험 (-3.0)"
+                )
+
+            elif (rsi is not None) and (rsi > 68):
+                reasons.append(
+                    "🟢 과매수 구간 BUY — 모멘텀 전략에서는 오히려 승률이 높은 구간 "
+                    "(실거래 RSI 70~80: 53.0%, 80~100: 53.6%) → 감점 없음"
+                )
+
+    except Exception as e:
+        reasons.append(f"⚠️ 추세 말기 감점 필터 예외 발생(무시): {e}")
+
+    return signal_score, reasons
+
+
+def old_analyze_highs_lows(candles, window=20):
+    highs = candles['high'].tail(window).dropna()
+    lows = candles['low'].tail(window).dropna()
+
+    if highs.empty or lows.empty:
+        return {"new_high": False, "new_low": False}
+
+    new_high = highs.iloc[-1] > highs.iloc[:-1].max()   # 🟥 [FIX-K1]
+    new_low = lows.iloc[-1] < lows.iloc[:-1].min()
+    return {
+        "new_high": new_high,
+        "new_low": new_low
+    }
+
+
+def old_detect_box_breakout(candles, pair, box_window=10, box_threshold_pips=None, atr_series=None):
+    """
+    박스권 돌파 감지 (통합/동적 임계치 버전)
+    - box_threshold_pips가 None이면 ATR 기반으로 동적으로 결정
+    - 🟦 주식은 pip 환산을 거치지 않고 '달러 단위'로 직접 비교 (가독성/정확도 개선).
+      예: TSLA ATR=10 → box_threshold_pips=266.67pip(=$8) 같은 우회 계산 대신 바로 $8.0 사용.
+    """
+    if candles is None or candles.empty:
+        return {"in_box": False, "breakout": None}
+
+    if atr_series is None:
+        atr_series = calculate_atr(candles)
+    last_atr = float(atr_series.dropna().iloc[-1]) if not atr_series.dropna().empty else 0.0
+
+    recent = candles.tail(box_window)
+    high_max = recent["high"].max()
+    low_min  = recent["low"].min()
+
+    if is_stock_pair(pair) and box_threshold_pips is None:
+        box_range_dollars = high_max - low_min
+        box_threshold_dollars = max(last_atr * 0.8, 0.12)  # 최소 12센트 하한(저ATR 종목 안전장치)
+        if box_range_dollars > box_threshold_dollars:
+            return {"in_box": False, "breakout": None}
+    else:
+        thr = old_dynamic_thresholds(pair, last_atr)
+        if box_threshold_pips is None:
+            box_threshold_pips = thr["box_threshold_pips"]
+        pv = thr["pip_value"]  # pip 크기(USDJPY=0.01, 그 외=0.0001)
+        box_range_pips = (high_max - low_min) / pv
+        if box_range_pips > box_threshold_pips:
+            return {"in_box": False, "breakout": None}
+
+    last_close = recent["close"].iloc[-1]
+    box_before = recent.iloc[:-1]   # 🟥 [FIX-K2]
+
+    if last_close > box_before["high"].max():
+        return {"in_box": True, "breakout": "UP"}
+    elif last_close < box_before["low"].min():
+        return {"in_box": True, "breakout": "DOWN"}
+    else:
+        return {"in_box": True, "breakout": None}
+
+# ---- 무작위 입력 ----
+PAIRS = (("EUR_USD", 1.10, 1.0), ("USD_JPY", 150.0, 100.0), ("TSLA", 300.0, 2500.0))
+TRENDS = np.array(["UPTREND", "DOWNTREND", "NEUTRAL"], dtype=object)
+PATTERNS = np.array(["NEUTRAL", None, "HAMMER", "SHOOTING_STAR", "BULLISH_ENGULFING", "BEARISH_ENGULFING",
+                     "PIERCING_LINE", "DARK_CLOUD_COVER", "LONG_BODY_BULL", "LONG_BODY_BEAR", "INVERTED_HAMMER"],
+                    dtype=object)
+STRATEGIES = np.array(["Balance Breakout ", "Momentum", None], dtype=object)
+_BEARISH_P = np.array([1, 1, 1, 3, 1, 3, 1, 3, 1, 6, 1], dtype=float) / 22
+
+
+def _edgy(rng, n, lo, hi, edges):
+    """구간 경계값(0.95, 30 같은 임계치)이 자주 나오도록 균등분포에 경계값을 섞는다."""
+    x = rng.uniform(lo, hi, n)
+    pick = rng.random(n) < 0.25
+    x[pick] = rng.choice(edges, pick.sum())
+    return x
+
+
+def frame(pair, start, scale, n, seed):
+    df = make_bars(n, seed=seed, start=1.10, flat_every=(30 if seed % 2 else 0))
+    if seed % 5 == 4:
+        # 꾸준한 상승 구간 — 3봉 연속 양봉(continuation / late BUY) 규칙 확인용
+        df["close"] = np.round(df["close"] + np.arange(n) * 0.0003, 5)
+        df["open"] = df["close"].shift(1).fillna(df["open"])
+        df["high"] = np.maximum(df["high"], df[["open", "close"]].max(axis=1))
+        df["low"] = np.minimum(df["low"], df[["open", "close"]].min(axis=1))
+    elif seed % 5 == 2:
+        # 계단식 하락 — 좁은 박스 9봉 뒤 1봉이 하단을 깨는 걸 반복 (박스 하단 돌파 / SELL 점수 상한 확인용)
+        i = np.arange(n)
+        df["close"] = np.round(1.10 - (i + 1) // 10 * 0.0007 + np.where(i % 2, 0.0001, -0.0001), 5)
+        df["open"] = df["close"].shift(1).fillna(df["close"])
+        df["high"] = df[["open", "close"]].max(axis=1) + 0.00005
+        df["low"] = df[["open", "close"]].min(axis=1) - 0.00005
+    for c in ("open", "high", "low", "close"):
+        df[c] = np.round(start + (df[c] - 1.10) * scale, 5 if scale == 1.0 else 3)
+    if seed % 3 == 0:
+        # 박스권(같은 고/저가 반복) — in_box / 박스 상하단 근접 규칙 확인용
+        df["high"] = np.minimum(df["high"], df["high"].rolling(30, min_periods=1).min() + 0.0004 * scale)
+        df["low"] = np.minimum(df["low"], df["high"])
+        df["open"] = df["open"].clip(df["low"], df["high"])
+        df["close"] = df["close"].clip(df["low"], df["high"])
+    return df
+
+
+def inputs(df, pair, seed):
+    """봉마다 지표/추세/패턴/지지저항을 무작위로 — 모든 규칙 가지가 골고루 걸리게."""
+    rng = np.random.default_rng(seed)
+    n = len(df)
+    pv = pip_value_for(pair)
+    close = df["close"].to_numpy()
+    atr = calculate_atr(df).to_numpy()
+    atr = np.where(np.isnan(atr), 0.0, atr) if seed % 4 else np.nan_to_num(atr, nan=20 * pv)
+    # seed % 5 == 2: 하락 + 매도형 패턴 + MACD 약세 위주 SELL 프레임 (SELL 점수 상한 확인용)
+    bearish = seed % 5 == 2
+    macd = rng.normal(0, 1, n) * rng.choice([0.3 * pv, 2 * pv, 0.03, 0.5], n)
+    macd_sig = macd - rng.normal(0, 1, n) * rng.choice([0.2 * pv, 1 * pv, 3 * pv, 0.2 * atr.mean() + pv], n)
+    if bearish:
+        macd = -np.abs(macd)
+        macd_sig = macd + np.abs(macd_sig - macd)
+    tl = rng.integers(0, 15, n)
+    t = np.round(macd[:, None] + rng.normal(0, 1, (n, 3)) * rng.choice([pv, 0.01], (n, 1)), 5)
+    signal = rng.choice(np.array(["BUY", "SELL"], dtype=object), n, p=[0.1, 0.9] if bearish else None)
+    direction = np.where(rng.random(n) < 0.9, signal, None).astype(object)
+    span = rng.choice([0.1, 1.0, 3.0, 20.0], n) * np.maximum(atr, pv)
+    hot = seed % 4 == 3 or seed % 5 == 4   # 과열 구간만 모은 프레임 (late BUY 규칙들)
+    # seed % 5 == 1: 저항이 이미 아래에 있는 프레임 (돌파확정 모멘텀 가점 확인용)
+    res_lo = 0.1 if seed % 5 == 1 else -0.2
+    res_sign = -1.0 if seed % 5 == 1 else 1.0
+    return dict(
+        rsi=_edgy(rng, n, 65 if hot else 45 if bearish else 5, 70 if bearish else 95, [15, 20, 25, 30, 32, 40, 45, 47, 50, 53, 55, 60, 65, 68, 70, 75, 80, 85]),
+        stoch=_edgy(rng, n, 0.8 if hot else 0.6 if bearish else 0, 1, [0.0, 0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.45, 0.55, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0]),
+        prev_stoch=rng.uniform(0, 1, n), macd=macd, macd_signal=macd_sig,
+        trend=rng.choice(TRENDS, n, p=[0.1, 0.45, 0.45] if bearish else None), prev_trend=rng.choice(TRENDS, n),
+        pattern=rng.choice(PATTERNS, n, p=_BEARISH_P if bearish else None),
+        atr=atr, price=close + rng.normal(0, 1, n) * rng.choice([0.0, pv, atr.mean()], n),
+        boll_up=close + rng.normal(0, 1, n) * atr, boll_low=close - rng.normal(0, 1, n) * atr,
+        support=np.round(close - span * rng.uniform(-0.2, 1.0, n), 5),
+        resistance=np.round(close + res_sign * span * rng.uniform(res_lo, 1.0, n), 5),
+        liquidity=rng.choice(np.array(["좋음", "낮음"], dtype=object), n),
+        macd_t1=t[:, 2], macd_t2=t[:, 1], macd_t3=t[:, 0], macd_trend_len=tl,
+        signal=signal, direction=direction, strategy_name=rng.choice(STRATEGIES, n),
+        hour=rng.integers(0, 24, n),
+    )
+
+
+def _macd_trend(x, i):
+    """ctx.trend_values("macd", 14, 5)처럼 길이 k 리스트 — 규칙은 끝의 3개만 본다."""
+    k = int(x["macd_trend_len"][i])
+    last3 = [x["macd_t3"][i], x["macd_t2"][i], x["macd_t1"][i]]
+    return ([0.0] * (k - 3) + last3) if k >= 3 else last3[3 - k:]
+
+
+def _legacy_args(df, x, pair, i):
+    price = float(x["price"][i])
+    sup, res = float(x["support"][i]), float(x["resistance"][i])
+    args = (x["rsi"][i], x["macd"][i], x["macd_signal"][i], x["stoch"][i], x["prev_stoch"][i], x["trend"][i],
+            x["prev_trend"][i], x["signal"][i], x["liquidity"][i], x["pattern"][i], pair, df.iloc[:i + 1],
+            float(x["atr"][i]), price, x["boll_up"][i], x["boll_low"][i], sup, res, abs(price - sup),
+            abs(res - price), pip_value_for(pair))
+    kw = dict(macd_trend=_macd_trend(x, i), expected_direction=x["direction"][i], strategy_name=x["strategy_name"][i])
+    return args, kw
+
+
+def cases(count):
+    for k in range(count):
+        for pair, start, scale in PAIRS:
+            df = frame(pair, start, scale, 160, seed=k)
+            yield pair, df, inputs(df, pair, seed=k)
+
+
+def parity(count=16, first=20):
+    global BENCH_HOUR
+    rows, hits = 0, {}
+    for pair, df, x in cases(count):
+        batch = SIGNAL_RULES.score_batch(main._score_features(df, pair, **x))
+        for code, c in batch.hit_counts().items():
+            hits[code] = hits.get(code, 0) + c
+        for i in range(first, len(df)):
+            args, kw = _legacy_args(df, x, pair, i)
+            BENCH_HOUR = int(x["hour"][i])
+            old = old_score_signal_with_filters(*args, **kw)
+            row = batch.row(i)
+            assert (row.score, row.reasons()) == old, f"{pair} 봉{i} 배열: 예전 {old} / 새 {row.score} {row.reasons()}"
+            if i % 7 == 0:
+                # 스칼라 모드는 main 경로 그대로 (시각은 지금 → 예전 함수도 지금 시각으로)
+                BENCH_HOUR = main.datetime.now(main.ZoneInfo("America/New_York")).hour
+                with contextlib.redirect_stdout(io.StringIO()):
+                    new = main.score_signal_with_filters(*args, **kw)
+                assert new == old_score_signal_with_filters(*args, **kw), f"{pair} 봉{i} 스칼라: {new}"
+            rows += 1
+    # 무작위 입력이 모든 가지를 건드렸는지 — 한 번도 안 걸린 규칙은 위 일치 확인이 아무것도 보증하지 않는다
+    missing = [r.code for r in SIGNAL_RULES.rules if not hits.get(r.code)]
+    assert not missing, f"발동 안 한 규칙: {', '.join(missing)}"
+    print(f"   {rows:,}건 (점수, reasons) 일치 — 규칙 {len(SIGNAL_RULES.rules)}개 모두 발동 확인")
+
+
+def bench(n=100_000, calls=300):
+    df = frame("EUR_USD", 1.10, 1.0, n, seed=5)
+    x = inputs(df, "EUR_USD", seed=5)
+    t0 = _t.perf_counter()
+    batch = SIGNAL_RULES.score_batch(main._score_features(df, "EUR_USD", **x))
+    t_batch = _t.perf_counter() - t0
+    print(f"   배열 모드 {n:,}봉: {t_batch * 1000:8.1f} ms  ({t_batch / n * 1e6:.2f} µs/봉, 적중 규칙 {len(batch.masks)}개)")
+
+    for label, fn in (("예전", old_score_signal_with_filters), ("테이블", main.score_signal_with_filters)):
+        t0 = _t.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(n - calls, n):
+                args, kw = _legacy_args(df, x, "EUR_USD", i)
+                fn(*args, **kw)
+        per = (_t.perf_counter() - t0) / calls
+        print(f"   스칼라 {label:<4} 알림 1건 {per * 1000:7.3f} ms  → {n:,}봉이면 {per * n:6.1f} s")
+
+
+def main_():
+    print("결과 일치:")
+    parity()
+    print("벤치마크:")
+    bench()
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,128 @@
+# 🟦 [PERF-15] 지지/저항(get_enhanced_support_resistance) NumPy 버전 결과 일치 확인 + 벤치마크
+#    사용법: python bench_support_resistance.py   (main.py를 import 하므로 서버와 같은 환경변수가 필요)
+#    예전 구현(파이썬 루프 스윙 판정 + 버킷 군집, 2배 창은 처음부터 다시)을 그대로 두고
+#    FX/JPY/주식, 타임프레임별, 횡보(같은 고/저가 반복) 프레임에서 (지지, 저항)이 정확히 같은지 본다.
+import time as _t
+
+import numpy as np
+
+import main
+from bench_indicator_engine import make_bars
+from indicators import calculate_atr
+
+
+# ---- 예전 구현 그대로 ----
+def old_support_resistance(candles, price, atr, timeframe, pair, window=20, min_touch_count=2):
+    window_map = {'M5': 72, 'M15': 32, 'M30': 48, 'H1': 48, 'H4': 60}
+    window = max(window_map.get(timeframe, window), 32)
+    if price is None:
+        return None, None
+    df = candles.tail(window)
+    pip = main.pip_value_for(pair)
+    round_digits = int(abs(np.log10(pip)))
+    last_atr = float(atr.iloc[-1]) if hasattr(atr, "iloc") else float(atr)
+    cluster_pip = pip
+    if main.is_stock_pair(pair) and last_atr:
+        cluster_pip = max(pip, (last_atr * 0.1) / 6.0)
+    order = max(2, min(3, window // 10))
+    if window < (2 * order + 1):
+        order = max(2, (window - 1) // 2)
+    price = float(price)
+
+    def find_local_extrema(candles, order=3):
+        highs = candles["high"].values
+        lows = candles["low"].values
+        resistance = []
+        support = []
+        for i in range(order, len(highs) - order):
+            if highs[i] == max(highs[i - order:i + order + 1]):
+                resistance.append(highs[i])
+            if lows[i] == min(lows[i - order:i + order + 1]):
+                support.append(lows[i])
+        return support, resistance
+
+    def cluster_levels(levels, *, pip, threshold_pips=6, min_touch_count=2):
+        if not levels:
+            return []
+        threshold = threshold_pips * pip
+        buckets = []
+        for lv in sorted(levels):
+            if not buckets or abs(buckets[-1]["val"] - lv) > threshold:
+                buckets.append({"val": lv, "cnt": 1})
+            else:
+                buckets[-1]["val"] = (buckets[-1]["val"] + lv) / 2.0
+                buckets[-1]["cnt"] += 1
+        return [b["val"] for b in buckets if b["cnt"] >= min_touch_count]
+
+    support_levels, resistance_levels = find_local_extrema(df, order=order)
+    support_levels = cluster_levels(support_levels, pip=cluster_pip, min_touch_count=min_touch_count)
+    resistance_levels = cluster_levels(resistance_levels, pip=cluster_pip, min_touch_count=min_touch_count)
+    if (not support_levels) or (not resistance_levels):
+        df2 = candles.tail(window * 2)
+        order2 = max(2, min(3, (window * 2) // 10))
+        if (window * 2) >= (2 * order2 + 1):
+            s2, r2 = find_local_extrema(df2, order=order2)
+            s2 = cluster_levels(s2, pip=cluster_pip, min_touch_count=min_touch_count)
+            r2 = cluster_levels(r2, pip=cluster_pip, min_touch_count=min_touch_count)
+            if s2: support_levels = s2
+            if r2: resistance_levels = r2
+    min_distance = max(6 * pip, 0.8 * last_atr)
+    support_price = max([s for s in support_levels if s < price], default=price - min_distance)
+    resistance_price = min([r for r in resistance_levels if r > price], default=price + min_distance)
+    return round(support_price, round_digits), round(resistance_price, round_digits)
+
+
+PAIRS = (("EUR_USD", 1.10, 1.0), ("USD_JPY", 150.0, 100.0), ("TSLA", 300.0, 2500.0))
+TIMEFRAMES = ("M5", "M15", "M30", "H1", "H4", "D")
+
+
+def frames(count):
+    """(pair, 캔들, ATR) — 랜덤 / 횡보 / 봉 수가 창보다 짧은 프레임, 가격 스케일은 종목별로."""
+    for k in range(count):
+        for pair, start, scale in PAIRS:
+            n = (200, 40, 90, 12)[k % 4]
+            df = make_bars(n, seed=k, start=1.10, flat_every=(20 if k % 3 == 0 else 0))
+            if k % 5 == 0:
+                # 같은 고가/저가가 여러 번 찍히는 박스권 — 스윙 동률/군집 경계 확인용
+                df["high"] = np.minimum(df["high"], df["high"].quantile(0.8))
+                df["low"] = np.maximum(df["low"], df["low"].quantile(0.2))
+            for c in ("open", "high", "low", "close"):
+                df[c] = np.round(start + (df[c] - 1.10) * scale, 5 if scale == 1.0 else 3)
+            yield pair, df, calculate_atr(df)
+
+
+def parity(count=400):
+    checked = 0
+    for pair, df, atr in frames(count):
+        price = float(df["close"].iloc[-1])
+        for tf in TIMEFRAMES:
+            for p in (price, price * 1.002, price * 0.998):
+                a = old_support_resistance(df, p, atr, tf, pair)
+                b = main.get_enhanced_support_resistance(df, p, atr, tf, pair)
+                assert a == b, f"{pair} {tf} {len(df)}봉 price={p}: 예전 {a} / 새 {b}"
+                checked += 1
+    print(f"   {checked:,}건 (지지, 저항) 모두 일치")
+
+
+def bench(repeat=2000):
+    df = make_bars(200, seed=7)
+    atr = calculate_atr(df)
+    price = float(df["close"].iloc[-1])
+    for tf in ("M15", "M30", "H4"):
+        for label, fn in (("예전", old_support_resistance), ("numpy", main.get_enhanced_support_resistance)):
+            fn(df, price, atr, tf, "EUR_USD")
+            t0 = _t.perf_counter()
+            for _ in range(repeat):
+                fn(df, price, atr, tf, "EUR_USD")
+            print(f"   {tf:<4} {label:<6} {(_t.perf_counter() - t0) / repeat * 1000:7.3f} ms")
+
+
+def main_():
+    print("결과 일치:")
+    parity()
+    print("벤치마크 (200봉, 호출 1회당):")
+    bench()
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,142 @@
+# 🟦 [PERF-14] 알림 1건의 캔들 + 파생값 묶음 (CandleContext)
+#    웹훅 한 번에 같은 캔들로 detect_trend 2번(prev_trend는 candles.iloc[:-1]로 처음부터 다시),
+#    같은 StochRSI/ATR Series에 dropna() 여러 번, 지지/저항·MTF 계산마다 candles.copy(),
+#    GPT 재시도마다 MTF 캔들 조회 + 지표 재계산을 하고 있었다.
+#    - (pair, granularity, 마지막 봉 시각 + 마지막 봉 OHLC) 하나당 컨텍스트 하나. 같은 봉의 알림이 또 오면 재사용
+#    - 파생값(지표 Series, 패턴, 지지/저항, 추세, MTF 요약 …)은 처음 필요할 때 한 번만 계산해서 보관
+#    - candles는 읽기 전용으로 공유한다 (컬럼을 추가/수정하려면 호출부에서 copy)
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+CONTEXT_CACHE_SIZE = 64
+
+
+class CandleContext:
+    """한 (pair, granularity, 마지막 봉)의 캔들과 거기서 나온 파생값. 속성은 바꿀 수 없다."""
+
+    __slots__ = ("pair", "granularity", "candles", "key", "_memo", "_stats")
+
+    def __init__(self, pair, granularity, candles, key=None, series=None):
+        set_ = object.__setattr__
+        set_(self, "pair", pair)
+        set_(self, "granularity", str(granularity).upper())
+        set_(self, "candles", candles)
+        set_(self, "key", key if key is not None else context_key(pair, granularity, candles))
+        set_(self, "_memo", {})
+        set_(self, "_stats", {"hits": 0, "misses": 0})
+        for name, s in (series or {}).items():
+            self._memo[("series", name)] = s
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"CandleContext는 바꿀 수 없습니다 ({name})")
+
+    def memo(self, key, fn, *args, **kwargs):
+        """key로 한 번만 fn(*args, **kwargs)를 계산해서 보관. key는 값을 구분하는 해시 가능한 값(문자열/튜플)."""
+        memo = self._memo
+        try:
+            value = memo[key]
+            self._stats["hits"] += 1
+            return value
+        except KeyError:
+            pass
+        self._stats["misses"] += 1
+        value = fn(*args, **kwargs)
+        # 두 스레드가 동시에 계산했으면 먼저 넣은 쪽 값으로 통일
+        return memo.setdefault(key, value)
+
+    async def amemo(self, key, coro_fn, *args, **kwargs):
+        """memo()의 async 버전 — await coro_fn(*args, **kwargs) 결과를 보관."""
+        if key in self._memo:
+            self._stats["hits"] += 1
+            return self._memo[key]
+        self._stats["misses"] += 1
+        value = await coro_fn(*args, **kwargs)
+        return self._memo.setdefault(key, value)
+
+    # ---- 지표 Series (IndicatorEngine 결과) ----
+    def series(self, name):
+        return self._memo[("series", name)]
+
+    def clean(self, name):
+        """NaN을 뺀 Series (dropna 한 번만)."""
+        return self.memo(("clean", name), lambda: self.series(name).dropna())
+
+    def last(self, name, default=None):
+        """NaN이 아닌 마지막 값 (float) — 없으면 default."""
+        def _last():
+            s = self.clean(name)
+            return float(s.iloc[-1]) if not s.empty else None
+        v = self.memo(("last", name), _last)
+        return default if v is None else v
+
+    def prev(self, name, default=None):
+        """NaN이 아닌 끝에서 두 번째 값 — 없으면 default."""
+        def _prev():
+            s = self.clean(name)
+            return float(s.iloc[-2]) if len(s) >= 2 else None
+        v = self.memo(("prev", name), _prev)
+        return default if v is None else v
+
+    def trend_values(self, name, n, digits):
+        """최근 n개 값을 반올림한 리스트 (NaN 포함, 예전 list(series.iloc[-n:].round(d))와 같다)."""
+        return self.memo(("trend", name, n, digits), lambda: list(self.series(name).iloc[-n:].round(digits)))
+
+    def clean_trend_values(self, name, n, digits):
+        """NaN을 뺀 최근 n개 값을 반올림한 리스트."""
+        return self.memo(("clean_trend", name, n, digits), lambda: list(self.clean(name).iloc[-n:].round(digits)))
+
+    # ---- 캔들 ----
+    def tail(self, n):
+        return self.memo(("tail", n), self.candles.tail, n)
+
+    def column(self, name):
+        """캔들 컬럼 float64 배열 (읽기 전용으로 쓴다)."""
+        return self.memo(("column", name), lambda: self.candles[name].to_numpy(dtype=np.float64))
+
+    def stats(self):
+        return {"key": list(map(str, self.key)), "values": len(self._memo), **self._stats}
+
+
+def context_key(pair, granularity, candles):
+    """(PAIR, GRAN, 마지막 봉 time, 봉 수, 마지막 봉 OHLC). 형성 중 봉이 움직이면 다른 키가 된다."""
+    if candles is None or candles.empty:
+        return (str(pair).upper(), str(granularity).upper(), None, 0, None)
+    last = candles.iloc[-1]
+    ohlc = tuple(float(last[c]) for c in ("open", "high", "low", "close"))
+    return (str(pair).upper(), str(granularity).upper(), str(last["time"]), len(candles), ohlc)
+
+
+class CandleContextStore:
+    """최근 CandleContext LRU. 같은 봉에 알림이 겹치면(전략 여러 개 / 재전송) 계산해 둔 값을 그대로 쓴다."""
+
+    def __init__(self, maxsize=CONTEXT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, pair, granularity, candles, series_fn=None):
+        """candles에 맞는 컨텍스트. 없으면 만든다 — series_fn()은 지표 Series dict (새로 만들 때만 호출)."""
+        key = context_key(pair, granularity, candles)
+        with self._lock:
+            ctx = self._items.get(key)
+            if ctx is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return ctx
+            self.misses += 1
+        ctx = CandleContext(pair, granularity, candles, key=key, series=series_fn() if series_fn else None)
+        with self._lock:
+            ctx = self._items.setdefault(key, ctx)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return ctx
+
+    def stats(self):
+        with self._lock:
+            return {"contexts": len(self._items), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,578 @@
+# 🟦 캔들 저장소: main.py의 get_candles()가 같은 알림 처리 중에 반복해서 가져가는 캔들을
+#    프로세스 안에서 재사용하기 위한 모듈.
+#    (한 번의 웹훅에서 base 200개 → MTF 100개 → 주문 후 8개 … 식으로 같은 (pair, granularity)를
+#     여러 번 REST로 다시 받던 문제)
+import os
+import threading
+import time as _t
+
+import numpy as np
+import pandas as pd
+
+
+# OANDA granularity 코드 → 초 단위 봉 길이
+GRANULARITY_SECONDS = {
+    "S5": 5, "S10": 10, "S15": 15, "S30": 30,
+    "M1": 60, "M2": 120, "M4": 240, "M5": 300, "M10": 600, "M15": 900, "M30": 1800,
+    "H1": 3600, "H2": 7200, "H3": 10800, "H4": 14400, "H6": 21600, "H8": 28800, "H12": 43200,
+    "D": 86400,
+}
+
+CANDLE_COLUMNS = ["time", "open", "high", "low", "close", "volume"]
+
+
+def granularity_seconds(granularity):
+    """granularity 코드(M30, H4 …)를 초 단위로 변환. 모르는 코드는 None."""
+    return GRANULARITY_SECONDS.get(str(granularity).upper())
+
+
+def bar_start_epoch(ts):
+    """캔들 time 값(OANDA RFC3339 나노초 / Alpaca ISO)을 UTC epoch 초(float)로 변환. 실패 시 None."""
+    try:
+        t = pd.Timestamp(ts)
+        if t.tzinfo is None:
+            t = t.tz_localize("UTC")
+        return t.value / 1e9
+    except Exception:
+        return None
+
+
+def next_bar_close_epoch(last_bar_start, gran_sec, now=None):
+    """
+    마지막 캔들 시작 시각 기준으로 '지금 이후 처음 닫히는 봉'의 마감 시각(epoch 초).
+    - 마지막 캔들이 형성 중인 봉이면 그 봉의 마감 시각
+    - 응답이 늦게 와서 이미 다음 봉이 열려 있으면 그만큼 앞으로 밀어서 계산
+    """
+    now = _t.time() if now is None else now
+    if now < last_bar_start:
+        return last_bar_start + gran_sec
+    k = int((now - last_bar_start) // gran_sec) + 1
+    return last_bar_start + k * gran_sec
+
+
+class CandleCache:
+    """
+    (pair, granularity) 단위 캔들 캐시.
+
+    - 만료: 해당 granularity의 다음 봉 마감 시각. 봉이 닫히면 새 봉이 생기므로 그 순간 무효화된다.
+    - 단, 마지막(형성 중) 캔들의 close를 current_price로 쓰는 곳이 많아서
+      max_age_sec 이상 지난 항목은 봉 마감 전이라도 다시 받는다.
+    - 슬라이싱: 200개로 받아둔 항목이 있으면 100개/8개 요청은 꼬리만 잘라서 돌려준다.
+    - 빈 DataFrame(요청 실패/데이터 없음)은 캐시하지 않는다.
+    """
+
+    def __init__(self, max_age_sec=60.0, max_entries=256):
+        self.max_age_sec = float(max_age_sec)
+        self.max_entries = int(max_entries)
+        self._lock = threading.Lock()
+        # key -> (df, requested_count, expires_at, fetched_at)
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(pair, granularity):
+        return (str(pair).upper(), str(granularity).upper())
+
+    @staticmethod
+    def _slice(df, count):
+        """꼬리 count개를 복사해서 0부터 시작하는 인덱스로 반환 (원본 캐시 보호)."""
+        n = max(0, min(int(count), len(df)))
+        out = df.iloc[len(df) - n:].copy()
+        out.index = pd.RangeIndex(len(out))
+        return out
+
+    def get(self, pair, granularity, count, now=None):
+        now = _t.time() if now is None else now
+        key = self._key(pair, granularity)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            df, requested, expires_at, fetched_at = entry
+            if now >= expires_at or (now - fetched_at) >= self.max_age_sec:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            # 🟦 브로커가 요청보다 적게 준 경우(상장 직후 등)도 같은 요청이면 다시 받아도 결과가 같으므로
+            #    len(df)가 아니라 "당시 요청한 개수" 기준으로 커버 여부를 판단한다.
+            if int(count) > max(requested, len(df)):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return self._slice(df, count)
+
+    def put(self, pair, granularity, count, df, now=None):
+        if df is None or df.empty or "time" not in df.columns:
+            return
+        gran_sec = granularity_seconds(granularity)
+        last_start = bar_start_epoch(df["time"].iloc[-1])
+        if gran_sec is None or last_start is None:
+            return
+        now = _t.time() if now is None else now
+        expires_at = next_bar_close_epoch(last_start, gran_sec, now)
+        key = self._key(pair, granularity)
+        with self._lock:
+            old = self._entries.get(key)
+            # 같은 봉 구간 안에서 더 긴 항목이 이미 있으면 짧은 결과로 덮어쓰지 않는다
+            if old is not None and now < old[2] and old[1] > int(count) and (now - old[3]) < self.max_age_sec:
+                return
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][3])
+                del self._entries[oldest]
+            self._entries[key] = (df.copy(), int(count), expires_at, now)
+
+    def invalidate(self, pair=None, granularity=None):
+        with self._lock:
+            if pair is None:
+                self._entries.clear()
+                return
+            if granularity is not None:
+                self._entries.pop(self._key(pair, granularity), None)
+                return
+            p = str(pair).upper()
+            for k in [k for k in self._entries if k[0] == p]:
+                del self._entries[k]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+CANDLE_CACHE_MAX_AGE_SEC = float(os.getenv("CANDLE_CACHE_MAX_AGE_SEC", "60"))
+
+
+# =====================================================================
+# 🟦 [PERF-03] (pair, granularity)별 최근 N개 캔들 링버퍼
+#    매번 200개 전체를 다시 받지 않고, 마지막 저장 시각 이후(형성 중인 봉 포함)만 받아서 이어 붙인다.
+#    - 형성 중이던 마지막 봉은 같은 시각의 새 값으로 제자리 교체
+#    - 2*capacity 크기 배열에 뒤로 붙이다가 꽉 차면 최근 capacity개만 앞으로 당김(분할 상환 O(1), 슬라이스는 항상 연속)
+#    - time은 원본 문자열(OANDA 나노초 RFC3339 / Alpaca ISO)을 그대로 보관해서 기존 DataFrame과 동일하게 복원
+# =====================================================================
+CANDLE_RING_SIZE = int(os.getenv("CANDLE_RING_SIZE", "500"))
+
+
+def frame_time_ns(df):
+    """DataFrame time 컬럼 → UTC epoch 나노초 int64 배열."""
+    return pd.to_datetime(df["time"], utc=True).to_numpy(dtype="datetime64[ns]").astype("int64")
+
+
+class CandleRing:
+    def __init__(self, capacity=CANDLE_RING_SIZE):
+        self.capacity = int(capacity)
+        size = self.capacity * 2
+        self.lock = threading.Lock()
+        self._t = np.zeros(size, dtype=np.int64)
+        self._ts = np.empty(size, dtype=object)
+        self._o = np.zeros(size, dtype=np.float64)
+        self._h = np.zeros(size, dtype=np.float64)
+        self._l = np.zeros(size, dtype=np.float64)
+        self._c = np.zeros(size, dtype=np.float64)
+        self._v = np.zeros(size, dtype=np.int64)
+        self._start = 0
+        self._end = 0
+        # 🟦 [PERF-11] 이 시각(epoch ns) 이전 봉은 확정값 — REST는 조회 시점의 형성 봉 시작, 실시간 봉집계는 닫은 봉의 끝
+        self.closed_until_ns = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def last_time_ns(self):
+        return int(self._t[self._end - 1]) if self._end > self._start else None
+
+    @property
+    def last_time_str(self):
+        return self._ts[self._end - 1] if self._end > self._start else None
+
+    def reset(self):
+        self._start = 0
+        self._end = 0
+        self.closed_until_ns = 0
+
+    def _columns(self):
+        return (self._t, self._ts, self._o, self._h, self._l, self._c, self._v)
+
+    def _compact(self):
+        n = len(self)
+        keep = min(n, self.capacity)
+        s = self._end - keep
+        for arr in self._columns():
+            arr[:keep] = arr[s:self._end]
+        self._start, self._end = 0, keep
+
+    def append_arrays(self, t_ns, t_str, o, h, l, c, v):
+        """
+        시간 오름차순 배열을 병합.
+        - 마지막 저장 시각보다 이전 봉: 무시 (이미 닫힌 봉)
+        - 같은 시각: 제자리 교체 (형성 중이던 봉 갱신)
+        - 이후 봉: 뒤에 추가
+        반환: (교체 개수, 추가 개수)
+        """
+        t_ns = np.asarray(t_ns, dtype=np.int64)
+        if t_ns.size == 0:
+            return 0, 0
+        replaced = 0
+        last = self.last_time_ns
+        if last is not None:
+            eq = np.flatnonzero(t_ns == last)
+            if eq.size:
+                i = int(eq[-1])
+                j = self._end - 1
+                self._ts[j] = t_str[i]
+                self._o[j], self._h[j], self._l[j], self._c[j], self._v[j] = o[i], h[i], l[i], c[i], v[i]
+                replaced = 1
+            new_idx = np.flatnonzero(t_ns > last)
+        else:
+            new_idx = np.arange(t_ns.size)
+        if new_idx.size > self.capacity:
+            new_idx = new_idx[-self.capacity:]
+        k = int(new_idx.size)
+        if k == 0:
+            return replaced, 0
+        if self._end + k > self._t.size:
+            self._compact()
+        if self._end + k > self._t.size:
+            # 버퍼보다 많이 들어오면 통째로 갈아끼운다
+            self.reset()
+        e = self._end
+        self._t[e:e + k] = t_ns[new_idx]
+        self._ts[e:e + k] = np.asarray(t_str, dtype=object)[new_idx]
+        self._o[e:e + k] = np.asarray(o, dtype=np.float64)[new_idx]
+        self._h[e:e + k] = np.asarray(h, dtype=np.float64)[new_idx]
+        self._l[e:e + k] = np.asarray(l, dtype=np.float64)[new_idx]
+        self._c[e:e + k] = np.asarray(c, dtype=np.float64)[new_idx]
+        self._v[e:e + k] = np.asarray(v, dtype=np.float64).astype(np.int64)[new_idx]
+        self._end = e + k
+        if len(self) > self.capacity:
+            self._start = self._end - self.capacity
+        return replaced, k
+
+    def merge_frame(self, df):
+        if df is None or df.empty:
+            return 0, 0
+        return self.append_arrays(
+            frame_time_ns(df), df["time"].to_numpy(dtype=object),
+            df["open"].to_numpy(), df["high"].to_numpy(), df["low"].to_numpy(),
+            df["close"].to_numpy(), df["volume"].to_numpy(),
+        )
+
+    def frame(self, count):
+        """최근 count개를 기존 get_candles()와 같은 컬럼 구성의 DataFrame으로 만든다 (복사본)."""
+        n = max(0, min(int(count), len(self)))
+        s, e = self._end - n, self._end
+        return pd.DataFrame({
+            "time": self._ts[s:e].copy(),
+            "open": self._o[s:e].copy(),
+            "high": self._h[s:e].copy(),
+            "low": self._l[s:e].copy(),
+            "close": self._c[s:e].copy(),
+            "volume": self._v[s:e].copy(),
+        })
+
+
+class CandleRingStore:
+    """(pair, granularity) → CandleRing. 델타/전체 수신 횟수와 수신 봉 개수를 같이 센다."""
+
+    def __init__(self, capacity=CANDLE_RING_SIZE):
+        self.capacity = int(capacity)
+        self._lock = threading.Lock()
+        self._rings = {}
+        self.delta_fetches = 0
+        self.full_fetches = 0
+        self.bars_received = 0
+        self.live_reads = 0     # 🟦 [PERF-11] 실시간 봉집계 덕분에 REST 없이 끝난 조회
+
+    def ring(self, pair, granularity):
+        key = (str(pair).upper(), str(granularity).upper())
+        with self._lock:
+            r = self._rings.get(key)
+            if r is None:
+                r = self._rings[key] = CandleRing(self.capacity)
+            return r
+
+    def peek(self, pair, granularity):
+        """있는 링버퍼만 돌려준다 (없으면 None, 새로 만들지 않음)."""
+        with self._lock:
+            return self._rings.get((str(pair).upper(), str(granularity).upper()))
+
+    def count_fetch(self, delta, bars):
+        with self._lock:
+            if delta:
+                self.delta_fetches += 1
+            else:
+                self.full_fetches += 1
+            self.bars_received += int(bars)
+
+    def count_live(self):
+        with self._lock:
+            self.live_reads += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rings": len(self._rings),
+                "delta_fetches": self.delta_fetches,
+                "full_fetches": self.full_fetches,
+                "bars_received": self.bars_received,
+                "live_reads": self.live_reads,
+            }
+
+
+# =====================================================================
+# 🟦 [PERF-04] 디스크 캔들 아카이브 (M1 히스토리용)
+#    결과추적(evaluate_pending_outcomes)이 30분마다 행마다 M1 최대 4500개를 다시 받던 것을
+#    로컬 파일 슬라이스로 바꾸기 위한 저장소.
+#    - 레이아웃: {root}/{PAIR}/{GRAN}/{YYYY-MM-DD}.npy  (UTC 일 단위 파티션)
+#    - 파일 하나 = float64 (6, n) 배열. 행이 컬럼(t초, o, h, l, c, v)이라 컬럼마다 연속 메모리
+#    - 닫힌 봉만 저장(형성 중인 봉은 저장 안 함). 이미 있는 시각은 덮어쓰지 않는 append-only
+#    - 쓰기는 임시 파일에 저장 후 os.replace로 원자적 교체, 읽기는 mmap
+# =====================================================================
+CANDLE_ARCHIVE_DIR = os.getenv("CANDLE_ARCHIVE_DIR", "candle_archive")
+CANDLE_ARCHIVE_GRANULARITIES = tuple(
+    g.strip().upper() for g in os.getenv("CANDLE_ARCHIVE_GRANULARITIES", "M1").split(",") if g.strip()
+)
+
+_ARCHIVE_ROWS = 6   # t, o, h, l, c, v
+_DAY_SEC = 86400
+
+
+def format_bar_times(t_sec, oanda_style=True):
+    """epoch 초 배열 → 캔들 time 문자열 (OANDA: ...T13:30:00.000000000Z / Alpaca: ...T13:30:00Z)."""
+    s = np.datetime_as_string(np.asarray(t_sec, dtype=np.int64).astype("datetime64[s]"), unit="s")
+    suffix = ".000000000Z" if oanda_style else "Z"
+    return np.char.add(s.astype(str), suffix).astype(object)
+
+
+class CandleArchive:
+    def __init__(self, root=CANDLE_ARCHIVE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.local_bars_served = 0
+        self.bars_written = 0
+
+    def lock_for(self, pair, granularity):
+        key = (str(pair).upper(), str(granularity).upper())
+        with self._lock:
+            lk = self._key_locks.get(key)
+            if lk is None:
+                lk = self._key_locks[key] = threading.Lock()
+            return lk
+
+    def _dir(self, pair, granularity):
+        return os.path.join(self.root, str(pair).upper(), str(granularity).upper())
+
+    def _days(self, pair, granularity):
+        d = self._dir(pair, granularity)
+        try:
+            return sorted(f[:-4] for f in os.listdir(d) if f.endswith(".npy"))
+        except FileNotFoundError:
+            return []
+
+    def _load_day(self, pair, granularity, day, mmap=True):
+        path = os.path.join(self._dir(pair, granularity), f"{day}.npy")
+        try:
+            return np.load(path, mmap_mode="r" if mmap else None)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+    def floor(self, pair, granularity):
+        """이 시각(epoch 초) 이후로는 빈 구간 없이 이어져 있다고 보장되는 하한. 없으면 None."""
+        try:
+            with open(os.path.join(self._dir(pair, granularity), "_floor"), "r") as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+    def set_floor(self, pair, granularity, t_sec):
+        d = self._dir(pair, granularity)
+        os.makedirs(d, exist_ok=True)
+        path = os.path.join(d, "_floor")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(str(int(t_sec)))
+        os.replace(tmp, path)
+
+    def last_time(self, pair, granularity):
+        for day in reversed(self._days(pair, granularity)):
+            arr = self._load_day(pair, granularity, day)
+            if arr is not None and arr.ndim == 2 and arr.shape[1]:
+                return int(arr[0, -1])
+        return None
+
+    def append(self, pair, granularity, t_sec, o, h, l, c, v):
+        """닫힌 봉들을 일 파티션에 병합 저장. 이미 저장된 시각은 그대로 둔다. 반환: 새로 쓴 봉 개수."""
+        t_sec = np.asarray(t_sec, dtype=np.int64)
+        if t_sec.size == 0:
+            return 0
+        block = np.vstack([
+            t_sec.astype(np.float64),
+            np.asarray(o, dtype=np.float64), np.asarray(h, dtype=np.float64),
+            np.asarray(l, dtype=np.float64), np.asarray(c, dtype=np.float64),
+            np.asarray(v, dtype=np.float64),
+        ])
+        d = self._dir(pair, granularity)
+        os.makedirs(d, exist_ok=True)
+        written = 0
+        day_idx = t_sec // _DAY_SEC
+        for day_no in np.unique(day_idx):
+            part = block[:, day_idx == day_no]
+            day = str(np.datetime64(int(day_no), "D"))
+            old = self._load_day(pair, granularity, day, mmap=False)
+            if old is not None and old.size:
+                fresh = ~np.isin(part[0], old[0])
+                if not fresh.any():
+                    continue
+                merged = np.hstack([old, part[:, fresh]])
+                written += int(fresh.sum())
+            else:
+                merged = part
+                written += part.shape[1]
+            merged = merged[:, np.argsort(merged[0], kind="stable")]
+            path = os.path.join(d, f"{day}.npy")
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(merged))
+            os.replace(tmp, path)
+        self.bars_written += written
+        return written
+
+    def tail(self, pair, granularity, count):
+        """
+        최근 count개 닫힌 봉을 (6, n) 배열로. 없으면 None.
+        floor 이전 봉은 중간에 빈 구간이 있을 수 있어서 내주지 않는다.
+        """
+        need = int(count)
+        floor = self.floor(pair, granularity)
+        chunks = []
+        for day in reversed(self._days(pair, granularity)):
+            arr = self._load_day(pair, granularity, day)
+            if arr is None or arr.ndim != 2 or arr.shape[0] != _ARCHIVE_ROWS or arr.shape[1] == 0:
+                continue
+            hit_floor = floor is not None and arr[0, 0] < floor
+            if hit_floor:
+                arr = arr[:, arr[0] >= floor]
+            if arr.shape[1]:
+                chunks.append(arr[:, -need:])
+                need -= chunks[-1].shape[1]
+            if need <= 0 or hit_floor:
+                break
+        if not chunks:
+            return None
+        out = np.hstack(list(reversed(chunks)))
+        self.local_bars_served += out.shape[1]
+        return out
+
+    def read_range(self, pair, granularity, start_sec, end_sec=None):
+        """[start_sec, end_sec) 구간의 닫힌 봉을 (6, n) 배열로 (백테스트/분석용 로컬 조회)."""
+        first = str(np.datetime64(int(start_sec) // _DAY_SEC, "D"))
+        last = str(np.datetime64(int(end_sec) // _DAY_SEC, "D")) if end_sec is not None else None
+        chunks = []
+        for day in self._days(pair, granularity):
+            if day < first or (last is not None and day > last):
+                continue
+            arr = self._load_day(pair, granularity, day)
+            if arr is None or arr.ndim != 2 or arr.shape[1] == 0:
+                continue
+            m = arr[0] >= start_sec
+            if end_sec is not None:
+                m &= arr[0] < end_sec
+            if m.any():
+                chunks.append(arr[:, m])
+        if not chunks:
+            return np.empty((_ARCHIVE_ROWS, 0))
+        return np.hstack(chunks)
+
+    @staticmethod
+    def to_frame(block, oanda_style=True):
+        return pd.DataFrame({
+            "time": format_bar_times(block[0], oanda_style),
+            "open": np.array(block[1]),
+            "high": np.array(block[2]),
+            "low": np.array(block[3]),
+            "close": np.array(block[4]),
+            "volume": np.array(block[5]).astype(np.int64),
+        })
+
+    def stats(self):
+        return {"root": self.root, "local_bars_served": self.local_bars_served, "bars_written": self.bars_written}
+
+
+# =====================================================================
+# 🟦 [PERF-08] 로컬 리샘플링: 기준봉(M30/M15 …) → H1/H4
+#    MTF 분석이 알림마다 H1/H4를 따로 REST로 받던 것을, 이미 갖고 있는 기준봉을 묶어서 만든다.
+#    - 버킷 경계는 브로커 세션 기준 (뉴욕 현지 시각에서 anchor만큼 민 지점부터 target 간격)
+#        · OANDA: dailyAlignment=17 (America/New_York) → H4 = 17,21,1,5,9,13시
+#        · Alpaca: 1Hour 바는 정각 기준 (9:00, 10:00 …) → anchor 0
+#          (정규장 09:30 기준으로 묶으면 Alpaca가 주던 H1과 봉이 달라져 지표/점수가 바뀐다.
+#           4Hour 바의 경계는 뉴욕 현지 정각 4시간 단위와 같다고 보장할 수 없어서 주식 H4는 main 쪽에서 브로커 직접 조회)
+#      서머타임 전환은 현지 시각으로 버킷을 나누므로 자동으로 따라간다.
+#    - OHLCV: open=첫 봉, high=max, low=min, close=마지막 봉, volume=합
+#    - 맨 앞 버킷이 기준봉 시작보다 먼저 열렸으면(앞부분이 잘린 버킷) 버린다.
+#      맨 뒤 버킷은 형성 중이어도 남긴다 (브로커 응답도 형성 중인 봉을 포함하므로 동일).
+# =====================================================================
+SESSION_TZ = "America/New_York"
+FX_SESSION_ANCHOR_SEC = 17 * 3600
+STOCK_SESSION_ANCHOR_SEC = 0
+
+
+def resample_ohlcv(t_ns, o, h, l, c, v, target_sec, anchor_sec, tz=SESSION_TZ):
+    """
+    UTC 나노초 시각 + OHLCV 배열을 target_sec 간격 버킷으로 묶는다.
+    return: (t_sec 버킷 시작 UTC epoch 초, o, h, l, c, v) — 입력이 비면 빈 배열들.
+    """
+    t_ns = np.asarray(t_ns, dtype=np.int64)
+    if t_ns.size == 0:
+        empty = np.empty(0, dtype=np.float64)
+        return np.empty(0, dtype=np.int64), empty, empty, empty, empty, np.empty(0, dtype=np.int64)
+
+    local_ns = (
+        pd.DatetimeIndex(t_ns.view("datetime64[ns]"), tz="UTC")
+        .tz_convert(tz).tz_localize(None)
+        .to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    )
+    step = int(target_sec) * 1_000_000_000
+    shifted = local_ns - int(anchor_sec) * 1_000_000_000
+    bucket = np.floor_divide(shifted, step)
+
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], t_ns.size] - 1
+
+    # 버킷 시작의 UTC 시각 = 첫 봉 UTC 시각 - (첫 봉 현지시각 - 버킷 시작 현지시각)
+    first_into_bucket = shifted[starts] - bucket[starts] * step
+    t_start = (t_ns[starts] - first_into_bucket) // 1_000_000_000
+
+    out_o = np.asarray(o, dtype=np.float64)[starts]
+    out_h = np.maximum.reduceat(np.asarray(h, dtype=np.float64), starts)
+    out_l = np.minimum.reduceat(np.asarray(l, dtype=np.float64), starts)
+    out_c = np.asarray(c, dtype=np.float64)[ends]
+    out_v = np.add.reduceat(np.asarray(v, dtype=np.int64), starts)
+
+    if first_into_bucket[0] != 0:
+        t_start, out_o, out_h, out_l, out_c, out_v = (
+            t_start[1:], out_o[1:], out_h[1:], out_l[1:], out_c[1:], out_v[1:]
+        )
+    return t_start, out_o, out_h, out_l, out_c, out_v
+
+
+def resample_frame(df, target_sec, anchor_sec, oanda_style=True, tz=SESSION_TZ):
+    """캔들 DataFrame(time/open/high/low/close/volume) → target_sec 간격으로 리샘플한 DataFrame."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=CANDLE_COLUMNS)
+    t_sec, o, h, l, c, v = resample_ohlcv(
+        frame_time_ns(df),
+        df["open"].to_numpy(), df["high"].to_numpy(), df["low"].to_numpy(), df["close"].to_numpy(),
+        df["volume"].to_numpy(), target_sec, anchor_sec, tz,
+    )
+    return pd.DataFrame({
+        "time": format_bar_times(t_sec, oanda_style),
+        "open": o, "high": h, "low": l, "close": c, "volume": v,
+    })
@@ -0,0 +1,252 @@
+# 🟦 [PERF-24] TradingView 차트 캡처용 상주 Chromium 풀
+#    예전 capture_tradingview_chart()는 알림마다
+#      Chromium 새로 띄움 → 레이아웃 URL networkidle 로딩 → 무조건 10초 sleep → chart_{pair}.png 저장 → 종료
+#    이라서 GPT 호출 전에 15초 안팎이 그대로 붙었고, 같은 종목 알림이 겹치면 PNG 파일을 서로 덮어썼다.
+#    → 브라우저는 한 번만 띄우고, 종목별로 열어 둔 페이지를 재사용한다.
+#    - 같은 종목: 이미 열린 페이지를 그대로 찍는다 (차트는 실시간으로 갱신돼 있다)
+#    - 다른 종목: 페이지가 모자라면 가장 오래 안 쓴 페이지의 심볼만 바꾼다 (TradingViewApi.setSymbol, 안 되면 URL 이동)
+#    - 준비 판정: sleep(10) 대신 DOM 신호(차트 캔버스 + 범례 + 탭 제목에 심볼 + 로딩 스피너 없음)를 기다린다
+#    - 결과는 PNG 바이트(메모리)로 돌려준다 — 파일을 안 쓰니 동시 알림끼리 덮어쓸 일이 없다
+#    - Playwright/Chromium이 없거나 실행이 실패하면 None (호출부는 이미지 없이 GPT로 간다)
+import asyncio
+import os
+import time as _t
+from collections import OrderedDict, deque
+
+try:
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError, async_playwright
+except ImportError:   # 선택 의존성 — 없으면 캡처 없이 진행
+    async_playwright = None
+    PlaywrightTimeoutError = asyncio.TimeoutError
+
+
+CHART_POOL_ENABLED = os.getenv("CHART_POOL_ENABLED", "true").strip().lower() == "true"
+# 사용자 차트 레이아웃 주소 (?symbol= 를 붙여서 연다)
+CHART_LAYOUT_URL = os.getenv("CHART_LAYOUT_URL", "https://www.tradingview.com/chart/iHBYFrNs/")
+CHART_POOL_MAX_PAGES = int(os.getenv("CHART_POOL_MAX_PAGES", "6"))
+# 서버 시작 시 미리 열어 둘 종목 (예: "USD/JPY,EUR/USD")
+CHART_WARM_PAIRS = tuple(s.strip() for s in os.getenv("CHART_WARM_PAIRS", "").split(",") if s.strip())
+# 준비 신호를 이 시간까지 기다리고, 그래도 안 오면 그 상태로 찍는다
+CHART_READY_TIMEOUT_SEC = float(os.getenv("CHART_READY_TIMEOUT_SEC", "8"))
+# 준비 신호 뒤 지표/신호 마커가 그려질 여유
+CHART_SETTLE_MS = int(os.getenv("CHART_SETTLE_MS", "300"))
+# 브라우저 실행이 실패하면 이 시간 동안은 다시 띄우지 않는다 (알림마다 실패 비용을 물지 않게)
+CHART_LAUNCH_RETRY_SEC = float(os.getenv("CHART_LAUNCH_RETRY_SEC", "60"))
+CHART_VIEWPORT = {"width": 1920, "height": 1080}
+
+# 차트 캔버스와 범례가 있고, 탭 제목이 새 심볼로 바뀌었고, 보이는 로딩 스피너가 없으면 준비 완료
+_READY_JS = """(sym) => {
+  if (!document.querySelector('.chart-markup-table canvas, .chart-gui-wrapper canvas')) return false;
+  if (!document.querySelector('[data-name="legend-source-item"], [data-name="legend-series-item"]')) return false;
+  if (sym && !document.title.toUpperCase().includes(sym)) return false;
+  return ![...document.querySelectorAll('[class*="spinner"], [class*="loader"]')].some(e => e.offsetParent !== null);
+}"""
+# 페이지를 다시 불러오지 않고 심볼만 바꾼다. 차트 API가 없으면 false → URL 이동으로 폴백
+_SET_SYMBOL_JS = """(sym) => {
+  try {
+    const chart = window.TradingViewApi && window.TradingViewApi.activeChart();
+    if (!chart) return false;
+    chart.setSymbol(sym);
+    return true;
+  } catch (e) { return false; }
+}"""
+
+
+def tradingview_symbol(pair, is_stock):
+    """'USD/JPY' → 'FX:USDJPY'. 주식은 거래소 prefix 없이 종목명만 (TradingView가 자동 매칭)."""
+    sym = (pair or "").replace("/", "").replace("_", "").upper()
+    return sym if is_stock else f"FX:{sym}"
+
+
+def chart_url(symbol):
+    return f"{CHART_LAYOUT_URL}?symbol={symbol}"
+
+
+class _Slot:
+    __slots__ = ("page", "symbol", "lock")
+
+    def __init__(self, page):
+        self.page = page
+        self.symbol = None      # 지금 페이지에 떠 있는 심볼
+        self.lock = asyncio.Lock()
+
+
+class ChartCapturePool:
+    """
+    종목별 페이지를 열어 두는 Chromium 풀 (이벤트 루프 안에서만 쓴다).
+    - capture(pair) → PNG bytes 또는 None
+    - warm(pairs): 미리 페이지를 열어 둔다 (서버 시작 시)
+    - close(): 종료 시 브라우저 정리
+    같은 페이지는 slot.lock으로 한 번에 하나만 찍고, 다른 종목은 동시에 찍는다.
+    """
+
+    def __init__(self, symbol_for, max_pages=CHART_POOL_MAX_PAGES, enabled=CHART_POOL_ENABLED, window=256):
+        self.symbol_for = symbol_for
+        self.max_pages = max(1, int(max_pages))
+        self.enabled = enabled and async_playwright is not None
+        self._lock = None
+        self._loop = None
+        self._pw = None
+        self._browser = None
+        self._context = None
+        self._slots = OrderedDict()     # pair → _Slot (맨 뒤가 최근 사용)
+        self._launch_failed_at = 0.0
+        self._ms = deque(maxlen=window)
+        self.captures = 0
+        self.reused = 0                 # 이미 그 종목이 떠 있던 페이지
+        self.switched = 0               # 다른 종목 페이지의 심볼만 바꿈
+        self.opened = 0                 # 새 페이지
+        self.ready_timeouts = 0
+        self.failures = 0
+
+    # ---- 브라우저 ----
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # 다른 루프에서 만든 객체는 못 쓴다 (테스트에서 asyncio.run을 여러 번 돌릴 때 등)
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._pw = self._browser = self._context = None
+            self._slots.clear()
+
+    async def _ensure_browser(self):
+        if self._browser is not None and self._browser.is_connected():
+            return self._context
+        if _t.time() - self._launch_failed_at < CHART_LAUNCH_RETRY_SEC:
+            return None
+        await self._shutdown_browser()
+        try:
+            self._pw = await async_playwright().start()
+            self._browser = await self._pw.chromium.launch(headless=True)
+            self._context = await self._browser.new_context(viewport=CHART_VIEWPORT)
+            print("✅ [차트 풀] Chromium 실행")
+            return self._context
+        except Exception as e:
+            self._launch_failed_at = _t.time()
+            print(f"❌ [차트 풀] Chromium 실행 실패 ({CHART_LAUNCH_RETRY_SEC:.0f}초간 캡처 생략): {e}")
+            await self._shutdown_browser()
+            return None
+
+    async def _shutdown_browser(self):
+        self._slots.clear()
+        browser, pw = self._browser, self._pw
+        self._pw = self._browser = self._context = None
+        for closer in (browser.close if browser else None, pw.stop if pw else None):
+            if closer is None:
+                continue
+            try:
+                await closer()
+            except Exception:
+                pass
+
+    # ---- 페이지 배정 ----
+    async def _slot_for(self, pair):
+        """pair를 찍을 페이지. 있으면 재사용, 모자라면 새로 열고, 꽉 찼으면 가장 오래 안 쓴 페이지를 넘겨받는다."""
+        async with self._lock:
+            context = await self._ensure_browser()
+            if context is None:
+                return None
+            slot = self._slots.get(pair)
+            if slot is not None:
+                self._slots.move_to_end(pair)
+                return slot
+            if len(self._slots) >= self.max_pages:
+                _old, slot = self._slots.popitem(last=False)
+            else:
+                slot = _Slot(await context.new_page())
+            self._slots[pair] = slot
+            return slot
+
+    def _drop(self, pair, slot):
+        if self._slots.get(pair) is slot:
+            del self._slots[pair]
+
+    async def _show(self, slot, symbol):
+        """slot 페이지에 symbol을 띄우고 준비 신호까지 기다린다 (slot.lock 안에서)."""
+        page = slot.page
+        if slot.symbol is None:
+            await page.goto(chart_url(symbol), wait_until="domcontentloaded")
+            self.opened += 1
+        elif slot.symbol != symbol:
+            if not await page.evaluate(_SET_SYMBOL_JS, symbol):
+                await page.goto(chart_url(symbol), wait_until="domcontentloaded")
+            self.switched += 1
+        else:
+            self.reused += 1
+        slot.symbol = symbol
+        try:
+            await page.wait_for_function(_READY_JS, arg=symbol.split(":")[-1],
+                                         timeout=CHART_READY_TIMEOUT_SEC * 1000, polling=100)
+            if CHART_SETTLE_MS > 0:
+                await asyncio.sleep(CHART_SETTLE_MS / 1000.0)
+        except PlaywrightTimeoutError:
+            self.ready_timeouts += 1
+            print(f"⚠️ [차트 풀] {symbol} 준비 신호 {CHART_READY_TIMEOUT_SEC:.0f}초 초과 → 현재 화면으로 캡처")
+
+    # ---- 공개 API ----
+    async def capture(self, pair):
+        if not self.enabled:
+            return None
+        self._bind_loop()
+        t0 = _t.perf_counter()
+        slot = await self._slot_for(pair)
+        if slot is None:
+            return None
+        try:
+            async with slot.lock:
+                await self._show(slot, self.symbol_for(pair))
+                png = await slot.page.screenshot(type="png")
+        except Exception as e:
+            self.failures += 1
+            print(f"❌ [차트 풀] {pair} 캡처 실패: {e}")
+            self._drop(pair, slot)
+            try:
+                await slot.page.close()
+            except Exception:
+                pass
+            return None
+        ms = (_t.perf_counter() - t0) * 1000.0
+        self._ms.append(ms)
+        self.captures += 1
+        print(f"📸 [차트 풀] {pair} 캡처 {ms:.0f}ms ({len(png)} bytes)")
+        return png
+
+    async def warm(self, pairs):
+        """pairs 페이지를 미리 열어 둔다 (max_pages까지)."""
+        if not self.enabled or not pairs:
+            return
+        self._bind_loop()
+
+        async def _open(pair):
+            slot = await self._slot_for(pair)
+            if slot is None:
+                return
+            try:
+                async with slot.lock:
+                    await self._show(slot, self.symbol_for(pair))
+            except Exception as e:
+                print(f"⚠️ [차트 풀] {pair} 미리 열기 실패: {e}")
+                self._drop(pair, slot)
+
+        await asyncio.gather(*(_open(p) for p in list(pairs)[:self.max_pages]))
+
+    async def close(self):
+        if self._loop is asyncio.get_running_loop():
+            await self._shutdown_browser()
+
+    def stats(self):
+        ms = sorted(self._ms)
+        n = len(ms)
+        return {
+            "enabled": self.enabled,
+            "browser": self._browser is not None and self._browser.is_connected(),
+            "pages": list(self._slots.keys()),
+            "captures": self.captures,
+            "reused": self.reused,
+            "switched": self.switched,
+            "opened": self.opened,
+            "ready_timeouts": self.ready_timeouts,
+            "failures": self.failures,
+            "p50_ms": round(ms[n // 2], 1) if n else 0.0,
+            "p99_ms": round(ms[min(n - 1, int(n * 0.99))], 1) if n else 0.0,
+        }
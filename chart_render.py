@@ -0,0 +1,207 @@
+# 🟦 [PERF-25] 브라우저 없이 캔들/지표로 직접 그리는 차트 이미지 (GPT 비전 입력용)
+#    GPT에 붙이는 차트는 TradingView 스크린샷일 필요가 없다 — 캔들·볼린저·지지/저항·RSI·MACD는 이미 메모리에 있다.
+#    numpy 배열에 팔레트 인덱스로 그리고 zlib으로 PNG(팔레트 8bit)를 만든다 → 수 ms, Playwright/matplotlib 불필요.
+#    - 위: 캔들 + 볼린저 상/하단 + 지지(초록)/저항(주황) 점선 + 알림 방향 마커(BUY ▲ / SELL ▼)
+#    - 가운데: RSI (30/70 가이드)   - 아래: MACD / 시그널 / 히스토그램
+#    - 오른쪽 여백에 지지·저항·현재가 숫자 (3x5 비트맵 숫자)
+#    - 기본 768x512: OpenAI 이미지 토큰 425 (1920x1080 스크린샷은 1105)
+import os
+import struct
+import zlib
+
+import numpy as np
+
+
+CHART_RENDER_WIDTH = int(os.getenv("CHART_RENDER_WIDTH", "768"))
+CHART_RENDER_HEIGHT = int(os.getenv("CHART_RENDER_HEIGHT", "512"))
+CHART_RENDER_BARS = int(os.getenv("CHART_RENDER_BARS", "80"))
+
+# 팔레트 (TradingView 다크 테마 비슷하게)
+BG, GRID, UP, DOWN, BOLL, SUPPORT, RESIST, TEXT, RSI, MACD, MACD_SIG, GUIDE = range(12)
+_PALETTE = bytes(bytearray(
+    c for rgb in (
+        (19, 23, 34), (42, 46, 57), (38, 166, 154), (239, 83, 80), (41, 98, 255), (0, 200, 83),
+        (255, 152, 0), (209, 212, 220), (126, 87, 194), (41, 98, 255), (255, 109, 0), (80, 84, 96),
+    ) for c in rgb
+))
+
+_LABEL_WIDTH = 72
+_GAP = 4
+# 3x5 숫자 글꼴 (행마다 3비트, 위→아래)
+_GLYPHS = {
+    "0": (7, 5, 5, 5, 7), "1": (2, 6, 2, 2, 7), "2": (7, 1, 7, 4, 7), "3": (7, 1, 7, 1, 7),
+    "4": (5, 5, 7, 1, 1), "5": (7, 4, 7, 1, 7), "6": (7, 4, 7, 5, 7), "7": (7, 1, 1, 1, 1),
+    "8": (7, 5, 7, 5, 7), "9": (7, 5, 7, 1, 7), ".": (0, 0, 0, 0, 2), "-": (0, 0, 7, 0, 0),
+}
+
+
+def _tail(values, n):
+    if values is None:
+        return None
+    a = np.asarray(values, dtype=np.float64)
+    return a[-n:] if len(a) else None
+
+
+class _Canvas:
+    def __init__(self, width, height):
+        self.w, self.h = width, height
+        self.px = np.full((height, width), BG, dtype=np.uint8)
+
+    def rect(self, x0, y0, x1, y1, color):
+        x0, x1 = sorted((int(x0), int(x1)))
+        y0, y1 = sorted((int(y0), int(y1)))
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.w - 1), min(y1, self.h - 1)
+        if x0 <= x1 and y0 <= y1:
+            self.px[y0:y1 + 1, x0:x1 + 1] = color
+
+    def hline(self, y, x0, x1, color, dash=0):
+        y = int(y)
+        if not 0 <= y < self.h:
+            return
+        xs = np.arange(max(int(x0), 0), min(int(x1), self.w - 1) + 1)
+        if dash:
+            xs = xs[(xs // dash) % 2 == 0]
+        self.px[y, xs] = color
+
+    def polyline(self, xs, ys, color):
+        """(xs, ys) 점을 잇는 선. NaN이 낀 구간은 건너뛴다."""
+        pts_x, pts_y = [], []
+        for i in range(1, len(xs)):
+            if not (np.isfinite(ys[i - 1]) and np.isfinite(ys[i])):
+                continue
+            steps = int(max(abs(xs[i] - xs[i - 1]), abs(ys[i] - ys[i - 1]))) + 1
+            pts_x.append(np.linspace(xs[i - 1], xs[i], steps))
+            pts_y.append(np.linspace(ys[i - 1], ys[i], steps))
+        if not pts_x:
+            return
+        x = np.rint(np.concatenate(pts_x)).astype(int)
+        y = np.rint(np.concatenate(pts_y)).astype(int)
+        ok = (x >= 0) & (x < self.w) & (y >= 0) & (y < self.h)
+        self.px[y[ok], x[ok]] = color
+
+    def text(self, x, y, s, color, scale=2):
+        for ch in s:
+            g = _GLYPHS.get(ch)
+            if g is not None:
+                for r, bits in enumerate(g):
+                    for c in range(3):
+                        if bits >> (2 - c) & 1:
+                            self.rect(x + c * scale, y + r * scale, x + c * scale + scale - 1, y + r * scale + scale - 1, color)
+            x += 4 * scale
+
+    def png(self):
+        """팔레트 8bit PNG 바이트 (행마다 필터 0)."""
+        raw = np.hstack([np.zeros((self.h, 1), dtype=np.uint8), self.px]).tobytes()
+
+        def chunk(tag, data):
+            return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+        return (b"\x89PNG\r\n\x1a\n"
+                + chunk(b"IHDR", struct.pack(">IIBBBBB", self.w, self.h, 8, 3, 0, 0, 0))
+                + chunk(b"PLTE", _PALETTE)
+                + chunk(b"IDAT", zlib.compress(raw, 6))
+                + chunk(b"IEND", b""))
+
+
+class _Pane:
+    """캔버스 위 한 칸 (top~bottom 픽셀, lo~hi 값 범위)."""
+
+    def __init__(self, top, bottom, lo, hi):
+        if not hi > lo:
+            hi, lo = lo + 1e-9 + abs(lo) * 1e-6, lo - 1e-9 - abs(lo) * 1e-6
+        self.top, self.bottom, self.lo, self.hi = top, bottom, lo, hi
+
+    def y(self, v):
+        return self.top + (self.hi - np.asarray(v, dtype=np.float64)) / (self.hi - self.lo) * (self.bottom - self.top)
+
+
+def _finite_range(*arrays):
+    vals = [a[np.isfinite(a)] for a in arrays if a is not None]
+    vals = [v for v in vals if v.size]
+    if not vals:
+        return None
+    allv = np.concatenate(vals)
+    return float(allv.min()), float(allv.max())
+
+
+def render_chart(open_, high, low, close, boll_up=None, boll_low=None, rsi=None, macd=None, macd_signal=None,
+                 support=None, resistance=None, signal=None, digits=5,
+                 bars=CHART_RENDER_BARS, width=CHART_RENDER_WIDTH, height=CHART_RENDER_HEIGHT):
+    """캔들/지표 배열 → PNG bytes. 배열은 같은 길이(오래된 것 → 최근)로 끝을 맞춰 준다."""
+    o, h, l, c = (_tail(a, bars) for a in (open_, high, low, close))
+    n = len(c)
+    bu, bl, r, m, ms = (_tail(a, n) for a in (boll_up, boll_low, rsi, macd, macd_signal))
+    cv = _Canvas(width, height)
+
+    plot_w = width - _LABEL_WIDTH
+    slot = plot_w / max(n, 1)
+    xs = (np.arange(n) + 0.5) * slot
+    body = max(1, int(slot * 0.6))
+
+    has_osc = r is not None or m is not None
+    price_bottom = int(height * (0.62 if has_osc else 1.0)) - 1
+    pane_h = (height - price_bottom - 2 * _GAP) // 2
+
+    # ---- 가격 ----
+    levels = [v for v in (support, resistance) if v is not None and np.isfinite(v)]
+    lo, hi = _finite_range(l, h, bu, bl, np.asarray(levels, dtype=np.float64))
+    pad = (hi - lo) * 0.04
+    price = _Pane(4, price_bottom - 4, lo - pad, hi + pad)
+    cv.rect(plot_w, 0, plot_w, price_bottom, GRID)
+    for x, oo, hh, ll, cc in zip(xs, o, h, l, c):
+        if not np.isfinite([oo, hh, ll, cc]).all():
+            continue
+        color = UP if cc >= oo else DOWN
+        cv.rect(x, price.y(hh), x, price.y(ll), color)
+        cv.rect(x - body // 2, price.y(oo), x - body // 2 + body - 1, price.y(cc), color)
+    for band in (bu, bl):
+        if band is not None:
+            cv.polyline(xs, price.y(band), BOLL)
+    for value, color in ((support, SUPPORT), (resistance, RESIST), (c[-1], TEXT)):
+        if value is None or not np.isfinite(value):
+            continue
+        y = price.y(value)
+        cv.hline(y, 0, plot_w - 1, color, dash=0 if color == TEXT else 6)
+        cv.text(plot_w + 4, int(y) - 5, f"{value:.{digits}f}", color)
+
+    # 알림 방향 마커 (마지막 봉)
+    side = str(signal or "").upper()
+    if side in ("BUY", "SELL"):
+        x = int(xs[-1])
+        tip = price.y(l[-1]) + 6 if side == "BUY" else price.y(h[-1]) - 6
+        for k in range(7):
+            dy = k if side == "BUY" else -k
+            cv.rect(x - k, tip + dy, x + k, tip + dy, UP if side == "BUY" else DOWN)
+
+    if not has_osc:
+        return cv.png()
+
+    # ---- RSI ----
+    top = price_bottom + _GAP
+    cv.hline(top - _GAP // 2, 0, width - 1, GRID)
+    rsi_pane = _Pane(top, top + pane_h - 1, 0, 100)
+    for guide in (30, 70):
+        cv.hline(rsi_pane.y(guide), 0, plot_w - 1, GUIDE, dash=4)
+    if r is not None:
+        cv.polyline(xs, rsi_pane.y(r), RSI)
+        if np.isfinite(r[-1]):
+            cv.text(plot_w + 4, int(rsi_pane.y(r[-1])) - 5, f"{r[-1]:.1f}", RSI)
+
+    # ---- MACD ----
+    top = top + pane_h + _GAP
+    cv.hline(top - _GAP // 2, 0, width - 1, GRID)
+    if m is not None:
+        hist = m - ms if ms is not None else None
+        rng = _finite_range(m, ms, hist, np.zeros(1))
+        macd_pane = _Pane(top, height - 2, rng[0], rng[1])
+        zero = macd_pane.y(0.0)
+        cv.hline(zero, 0, plot_w - 1, GUIDE)
+        if hist is not None:
+            for x, v in zip(xs, hist):
+                if np.isfinite(v):
+                    cv.rect(x - body // 2, zero, x - body // 2 + body - 1, macd_pane.y(v), UP if v >= 0 else DOWN)
+        cv.polyline(xs, macd_pane.y(m), MACD)
+        if ms is not None:
+            cv.polyline(xs, macd_pane.y(ms), MACD_SIG)
+    return cv.png()
@@ -0,0 +1,120 @@
+# 🟦 [PERF-10] 로컬 가짜 시세 스트림 서버 (Alpaca 시세 웹소켓 + OANDA pricing stream 흉내)
+#    실계좌/API 키 없이 price_stream.py 구독 경로를 돌려보기 위한 도구. 가격은 랜덤워크.
+#    사용법:
+#      python fake_price_stream.py [--port 8765] [--rate 5]
+#      ALPACA_STREAM_URL=ws://127.0.0.1:8765/v2/iex OANDA_STREAM_BASE_URL=http://127.0.0.1:8765 uvicorn main:app
+import argparse
+import asyncio
+import json
+import random
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+
+def _now_rfc3339():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f000Z")
+
+
+class RandomWalk:
+    """심볼별 가격 랜덤워크. 처음 보는 심볼은 FX(1.x / JPY 1xx) 또는 주식(100 근처)으로 시작."""
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.px = {}
+
+    def next(self, symbol):
+        p = self.px.get(symbol)
+        if p is None:
+            if "_" in symbol:
+                p = 150.0 if symbol.endswith("JPY") else 1.1
+            else:
+                p = 100.0
+        p *= 1.0 + self.rng.gauss(0, 0.0002)
+        self.px[symbol] = p
+        return p
+
+
+def make_app(rate=5.0, seed=None):
+    walk = RandomWalk(seed)
+    interval = 1.0 / max(rate, 0.1)
+
+    async def alpaca_ws(request):
+        ws = web.WebSocketResponse(heartbeat=20)
+        await ws.prepare(request)
+        await ws.send_json([{"T": "success", "msg": "connected"}])
+        subs = set()
+        authed = False
+
+        async def pump():
+            while True:
+                await asyncio.sleep(interval)
+                if not authed or not subs:
+                    continue
+                out = []
+                for s in sorted(subs):
+                    p = walk.next(s)
+                    ts = _now_rfc3339()
+                    out.append({"T": "q", "S": s, "bp": round(p - 0.01, 2), "ap": round(p + 0.01, 2),
+                                "bs": 1, "as": 1, "t": ts})
+                    out.append({"T": "t", "S": s, "p": round(p, 2), "s": random.randint(1, 300), "t": ts})
+                await ws.send_json(out)
+
+        task = asyncio.create_task(pump())
+        try:
+            async for msg in ws:
+                if msg.type != web.WSMsgType.TEXT:
+                    continue
+                m = json.loads(msg.data)
+                action = m.get("action")
+                if action == "auth":
+                    authed = True
+                    await ws.send_json([{"T": "success", "msg": "authenticated"}])
+                elif action in ("subscribe", "unsubscribe") and authed:
+                    names = set(m.get("trades") or []) | set(m.get("quotes") or [])
+                    subs = subs | names if action == "subscribe" else subs - names
+                    await ws.send_json([{"T": "subscription", "trades": sorted(subs), "quotes": sorted(subs)}])
+                else:
+                    await ws.send_json([{"T": "error", "code": 401, "msg": "not authenticated"}])
+        finally:
+            task.cancel()
+        return ws
+
+    async def oanda_stream(request):
+        instruments = [s for s in request.query.get("instruments", "").split(",") if s]
+        if not instruments:
+            return web.json_response({"errorMessage": "Invalid value specified for 'instruments'"}, status=400)
+        resp = web.StreamResponse(headers={"Content-Type": "application/octet-stream"})
+        await resp.prepare(request)
+        beats = 0
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                lines = []
+                for s in instruments:
+                    p = walk.next(s)
+                    spread = 0.02 if s.endswith("JPY") else 0.0002
+                    lines.append({"type": "PRICE", "instrument": s, "time": _now_rfc3339(), "tradeable": True,
+                                  "bids": [{"price": f"{p - spread / 2:.5f}", "liquidity": 1000000}],
+                                  "asks": [{"price": f"{p + spread / 2:.5f}", "liquidity": 1000000}]})
+                beats += 1
+                if beats % max(1, int(5 / interval)) == 0:
+                    lines.append({"type": "HEARTBEAT", "time": _now_rfc3339()})
+                await resp.write("".join(json.dumps(x) + "\n" for x in lines).encode())
+        except ConnectionResetError:   # 클라이언트가 끊음 (구독 종목 변경 재접속 등)
+            pass
+        return resp
+
+    app = web.Application()
+    app.router.add_get("/v2/iex", alpaca_ws)
+    app.router.add_get("/v2/sip", alpaca_ws)
+    app.router.add_get("/v3/accounts/{account_id}/pricing/stream", oanda_stream)
+    return app
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--rate", type=float, default=5.0, help="심볼당 초당 시세 수")
+    args = ap.parse_args()
+    web.run_app(make_app(args.rate), host="127.0.0.1", port=args.port)
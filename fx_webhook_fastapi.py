@@ -11,6 +11,8 @@ from openai import OpenAI
 import numpy as np
 import csv
 
+from indicators import calculate_macd as indicators_macd, calculate_rsi, calculate_stoch_rsi
+
 app = FastAPI()
 
 OANDA_API_KEY = os.getenv("OANDA_API_KEY")
@@ -190,28 +192,9 @@ def get_candles(pair="EUR_USD", granularity="M30", count=200):
         raise ValueError(f"{pair}의 유효한 캔들 데이터가 없습니다 (모두 'complete=False')")
     return df
 
-def calculate_rsi(series, period=14):
-    delta = series.diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
+# 🟦 [PERF-13] calculate_rsi / calculate_stoch_rsi 는 indicators.py 공용 구현. MACD는 이 서버의 기존 공식(adjust=False) 유지
 def calculate_macd(series, fast=12, slow=26, signal=9):
-    ema_fast = series.ewm(span=fast, adjust=False).mean()
-    ema_slow = series.ewm(span=slow, adjust=False).mean()
-    macd = ema_fast - ema_slow
-    signal_line = macd.ewm(span=signal, adjust=False).mean()
-    return macd, signal_line
-
-def calculate_stoch_rsi(rsi_series, period=14):
-    min_rsi = rsi_series.rolling(window=period).min()
-    max_rsi = rsi_series.rolling(window=period).max()
-    stoch_rsi = (rsi_series - min_rsi) / (max_rsi - min_rsi)
-    return stoch_rsi
+    return indicators_macd(series, fast, slow, signal, adjust=False)
 
 def detect_support_resistance(candles, window=10):
     highs = candles["high"].tail(window)
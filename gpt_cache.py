@@ -0,0 +1,138 @@
+# 🟦 [PERF-19] GPT 판단 캐시
+#    같은 종목·같은 봉에 거의 같은 payload가 여러 번 오는 경우가 많다
+#    (BUY_STOCK_PORTFOLIO_A2 / A5처럼 전략만 다른 알림, TradingView 재전송 등).
+#    예전엔 그때마다 analyze_with_gpt를 새로 불러서 지연과 비용을 그대로 다시 냈다.
+#    - 키: (pair, signal, 봉 시각, payload 주요 수치를 구간으로 반올림한 튜플)
+#    - 만료: 그 봉의 다음 마감 시각 (봉이 바뀌면 판단도 새로). 추가로 max_age_sec 상한
+#    - 크기: LRU로 maxsize개까지
+#    - 값: GPT 원문 응답(정상 응답만). 호출부가 같은 parse_gpt_feedback()으로 decision/TP/SL을 꺼낸다
+import math
+import os
+import threading
+import time as _t
+from collections import OrderedDict
+
+
+GPT_CACHE_ENABLED = os.getenv("GPT_CACHE_ENABLED", "true").strip().lower() == "true"
+GPT_CACHE_SIZE = int(os.getenv("GPT_CACHE_SIZE", "256"))
+GPT_CACHE_MAX_AGE_SEC = float(os.getenv("GPT_CACHE_MAX_AGE_SEC", "1800"))
+
+# 반올림 단위 — 이 안에서 달라지는 값은 같은 판단으로 본다
+GPT_CACHE_PRICE_STEP_PIPS = float(os.getenv("GPT_CACHE_PRICE_STEP_PIPS", "2"))    # 가격/지지·저항/볼린저/ATR
+GPT_CACHE_MACD_STEP_PIPS = float(os.getenv("GPT_CACHE_MACD_STEP_PIPS", "0.5"))    # MACD/시그널 (가격 차이라 pip 단위)
+GPT_CACHE_RSI_STEP = float(os.getenv("GPT_CACHE_RSI_STEP", "1"))
+GPT_CACHE_STOCH_STEP = float(os.getenv("GPT_CACHE_STOCH_STEP", "0.05"))
+GPT_CACHE_SCORE_STEP = float(os.getenv("GPT_CACHE_SCORE_STEP", "0.5"))
+
+
+def _bucket(value, step):
+    """value를 step 단위 구간 번호로. 숫자가 아니거나 NaN/inf면 None."""
+    try:
+        x = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(x) or step <= 0:
+        return None
+    return int(round(x / step))
+
+
+def decision_features(payload, pip):
+    """GPT 판단을 가르는 payload 수치 → 반올림한 튜플 (캐시 키의 일부)."""
+    pip = float(pip) if pip else 1.0
+    price_step = GPT_CACHE_PRICE_STEP_PIPS * pip
+    macd_step = GPT_CACHE_MACD_STEP_PIPS * pip
+    g = payload.get
+    return (
+        _bucket(g("price"), price_step),
+        _bucket(g("support"), price_step),
+        _bucket(g("resistance"), price_step),
+        _bucket(g("bollinger_upper"), price_step),
+        _bucket(g("bollinger_lower"), price_step),
+        _bucket(g("atr"), price_step),
+        _bucket(g("macd"), macd_step),
+        _bucket(g("macd_signal"), macd_step),
+        _bucket(g("rsi"), GPT_CACHE_RSI_STEP),
+        _bucket(g("stoch_rsi"), GPT_CACHE_STOCH_STEP),
+        _bucket(g("signal_score"), GPT_CACHE_SCORE_STEP),
+        str(g("trend")),
+        str(g("pattern")),
+        str(g("liquidity")),
+        str(g("news")),
+    )
+
+
+def decision_key(pair, signal, bar_time, payload, pip):
+    return (str(pair).upper(), str(signal).upper(), str(bar_time), decision_features(payload, pip))
+
+
+class GptDecisionCache:
+    """
+    decision_key() → GPT 원문 응답. 봉 단위 만료 + LRU.
+    - get(): 만료된 항목은 지우고 None
+    - put(): expires_at(보통 다음 봉 마감 epoch)과 now+max_age_sec 중 이른 쪽까지 유효
+    """
+
+    def __init__(self, maxsize=GPT_CACHE_SIZE, max_age_sec=GPT_CACHE_MAX_AGE_SEC, enabled=GPT_CACHE_ENABLED):
+        self.maxsize = int(maxsize)
+        self.max_age_sec = float(max_age_sec)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # key -> (value, expires_at)
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, key, now=None):
+        if not self.enabled:
+            return None
+        now = _t.time() if now is None else now
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None and now >= entry[1]:
+                del self._items[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, expires_at=None, now=None):
+        if not self.enabled or not value:
+            return
+        now = _t.time() if now is None else now
+        until = now + self.max_age_sec
+        if expires_at is not None:
+            until = min(until, float(expires_at))
+        if until <= now:
+            return
+        with self._lock:
+            self._items[key] = (value, until)
+            self._items.move_to_end(key)
+            self.stores += 1
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "stores": self.stores,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
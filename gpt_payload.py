@@ -0,0 +1,116 @@
+# 🟦 [PERF-23] GPT에 보내는 payload 압축 (토큰 예산 안으로)
+#    예전엔 webhook payload를 json.dumps 그대로 보냈다:
+#    - score_components: 규칙마다 한 줄짜리 한국어 설명 문장 전체
+#    - rsi/macd/볼린저 등: numpy float 전체 자릿수 (0.00012345678901 …)
+#    - alert_data: TradingView 원본을 그대로 되돌려 보냄, alert_name == strategy_name 중복
+#    - pair/price/support/resistance: [알림 데이터] 섹션과 중복
+#    → 숫자는 종목 자릿수로 반올림, 중복 항목은 빼고, 점수 근거는 "규칙코드±가감점"으로
+#      (0점 안내 규칙은 가감점 대신 "규칙코드:문구" — 문구는 GPT_REASON_EXTRA_CHARS로 자른다).
+#      그래도 예산(GPT_PAYLOAD_TOKEN_BUDGET)을 넘으면 판단에 덜 중요한 항목부터 줄인다.
+#      핵심 판단 입력(방향·지표 현재값·추세·패턴·지지/저항·ATR·점수·뉴스)은 줄이지 않는다.
+import json
+import math
+import os
+
+from token_estimate import gpt_token_estimator, text_tokens
+
+
+GPT_PAYLOAD_TOKEN_BUDGET = int(os.getenv("GPT_PAYLOAD_TOKEN_BUDGET", "800"))
+GPT_REASON_EXTRA_CHARS = int(os.getenv("GPT_REASON_EXTRA_CHARS", "80"))
+
+_PRICE_KEYS = ("price", "bollinger_upper", "bollinger_lower", "support", "resistance", "atr")
+_MACD_KEYS = ("macd", "macd_signal", "macd_trend", "macd_signal_trend")
+_FIXED_DIGITS = {"rsi": 1, "rsi_trend": 1, "stoch_rsi": 3, "stoch_rsi_trend": 3,
+                 "distance_to_support_pips": 1, "distance_to_resistance_pips": 1}
+# 항상 빼는 항목
+_ALWAYS_DROP = ("alert_data", "score_codes")
+
+
+def _round(value, digits):
+    """float(넘파이 포함)만 반올림, 리스트/딕셔너리는 안쪽까지. NaN/inf는 None (JSON에 NaN이 찍히지 않게)."""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_round(v, digits) for v in value]
+    if isinstance(value, dict):
+        return {k: _round(v, digits) for k, v in value.items()}
+    try:
+        x = float(value)
+    except (TypeError, ValueError):
+        return value
+    if not math.isfinite(x):
+        return None
+    if isinstance(value, int) or getattr(value, "dtype", None) is not None and value.dtype.kind in "iu":
+        return int(x)
+    return round(x, digits)
+
+
+def _truncate(text, n):
+    text = str(text)
+    return text if len(text) <= n else text[:n - 1] + "…"
+
+
+def _score_components(payload):
+    """규칙 적중분은 'CODE±가감점'(0점 안내 규칙은 'CODE:문구'), 그 뒤에 붙은 추가 사유(뉴스·역행 감점·threshold 경고 등)는 잘라서."""
+    texts = list(payload.get("score_components") or [])
+    codes = payload.get("score_codes")
+    if codes is None:
+        return [_truncate(t, GPT_REASON_EXTRA_CHARS) for t in texts]
+    return ([_truncate(c, GPT_REASON_EXTRA_CHARS) for c in codes]
+            + [_truncate(t, GPT_REASON_EXTRA_CHARS) for t in texts[len(codes):]])
+
+
+def _shorten_extras(p, n_codes, n):
+    comps = p.get("score_components") or []
+    p["score_components"] = comps[:n_codes] + [_truncate(t, n) for t in comps[n_codes:]]
+
+
+# 예산 초과 시 앞에서부터 적용 (판단에 덜 중요한 것부터). step(압축본, 규칙코드 개수)
+_TRIM_STEPS = (
+    ("macd_signal_trend", lambda p, n: p.pop("macd_signal_trend", None)),
+    ("structure_context", lambda p, n: p.pop("structure_context", None)),
+    ("candle_micro", lambda p, n: p.pop("candle_micro", None)),
+    ("recent_ohlc[-3:]", lambda p, n: p.__setitem__("recent_ohlc", (p.get("recent_ohlc") or [])[-3:])),
+    ("reason_extras[:40]", lambda p, n: _shorten_extras(p, n, 40)),
+    ("breakout_context", lambda p, n: p.pop("breakout_context", None)),
+)
+
+
+def payload_tokens(p):
+    return int(round(text_tokens(json.dumps(p, ensure_ascii=False, separators=(",", ":"))) * gpt_token_estimator.ratio))
+
+
+def compact_payload(payload, price_digits, budget=GPT_PAYLOAD_TOKEN_BUDGET, skip=()):
+    """
+    payload(원본은 안 건드림) → (압축본, 추정 토큰, 줄인 항목 이름 목록).
+    - price_digits: 가격류(가격/볼린저/지지·저항/ATR) 자릿수. MACD는 +2자리, RSI·pip 거리 1자리, StochRSI 3자리
+    - skip: 다른 곳(프롬프트 [알림 데이터] 등)에 이미 있는 키
+    """
+    out = {}
+    for k, v in payload.items():
+        if k in _ALWAYS_DROP or k in skip:
+            continue
+        if k == "alert_name" and str(v).strip() == str(payload.get("strategy_name", "")).strip():
+            continue
+        if k in _PRICE_KEYS:
+            v = _round(v, price_digits)
+        elif k in _MACD_KEYS:
+            v = _round(v, price_digits + 2)
+        elif k in _FIXED_DIGITS:
+            v = _round(v, _FIXED_DIGITS[k])
+        elif k == "score_components":
+            v = _score_components(payload)
+        else:
+            v = _round(v, price_digits + 2)
+        out[k] = v
+
+    n_codes = len(payload.get("score_codes") or ())
+    trimmed = []
+    tokens = payload_tokens(out)
+    for name, step in _TRIM_STEPS:
+        if tokens <= budget:
+            break
+        step(out, n_codes)
+        trimmed.append(name)
+        tokens = payload_tokens(out)
+    return out, tokens, trimmed
@@ -0,0 +1,270 @@
+# 🟦 공용 HTTP 클라이언트: OANDA / Alpaca / OpenAI 등 공급자별 커넥션 풀 + 기본 타임아웃 + 재시도 + 지연시간 집계.
+#    예전엔 requests.get/post를 매번 직접 불러서 호출마다 TCP+TLS 핸드셰이크를 새로 했고,
+#    OANDA 캔들 조회처럼 timeout이 아예 없는 호출도 있었다.
+import asyncio
+import json as _json
+import os
+import random
+import threading
+import time as _t
+from collections import deque
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))     # 웹훅 스레드 동시성(to_thread 기본 풀)에 맞춤
+HTTP_RETRY_TOTAL = int(os.getenv("HTTP_RETRY_TOTAL", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))  # 0.5s, 1s, … (+지터)
+HTTP_RETRY_JITTER = float(os.getenv("HTTP_RETRY_JITTER", "0.3"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# 같은 요청을 다시 보내도 결과가 같은 메서드. POST는 응답을 못 받았어도 서버가 처리(과금/체결) 중일 수 있다
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+SERVER_ERROR_STATUSES = (500, 502, 503, 504)
+
+
+class LatencyStats:
+    """공급자별 호출 수 / 상태코드 분포 / 지연시간(평균·최대·p50·p95) 집계."""
+
+    def __init__(self, window=512):
+        self._lock = threading.Lock()
+        self._window = window
+        self._data = {}
+
+    def record(self, provider, elapsed_ms, status):
+        with self._lock:
+            d = self._data.get(provider)
+            if d is None:
+                d = self._data[provider] = {
+                    "calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "status": {}, "recent": deque(maxlen=self._window),
+                }
+            d["calls"] += 1
+            d["total_ms"] += elapsed_ms
+            d["max_ms"] = max(d["max_ms"], elapsed_ms)
+            d["recent"].append(elapsed_ms)
+            if status is None:
+                d["errors"] += 1
+            else:
+                key = f"{status // 100}xx"
+                d["status"][key] = d["status"].get(key, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            out = {}
+            for name, d in self._data.items():
+                recent = sorted(d["recent"])
+                n = len(recent)
+                out[name] = {
+                    "calls": d["calls"],
+                    "errors": d["errors"],
+                    "status": dict(d["status"]),
+                    "avg_ms": round(d["total_ms"] / d["calls"], 1) if d["calls"] else 0.0,
+                    "max_ms": round(d["max_ms"], 1),
+                    "p50_ms": round(recent[n // 2], 1) if n else 0.0,
+                    "p95_ms": round(recent[min(n - 1, int(n * 0.95))], 1) if n else 0.0,
+                }
+            return out
+
+
+http_latency = LatencyStats()
+
+
+class ProviderSession(requests.Session):
+    """
+    공급자 하나당 세션 하나. keep-alive 풀을 공유하고,
+    timeout을 안 넘기면 기본값을 채우며, 호출마다 지연시간을 http_latency에 기록한다.
+    """
+
+    def __init__(self, name, default_timeout=15, retry_methods=("GET",), retry_statuses=RETRY_STATUSES,
+                 pool_maxsize=HTTP_POOL_MAXSIZE, retries=HTTP_RETRY_TOTAL, read_retries=None):
+        """read_retries: 요청을 보낸 뒤 읽기 타임아웃/끊김 재시도 횟수 (기본 retries). POST를 재시도하는 세션은 0으로."""
+        super().__init__()
+        self.name = name
+        self.default_timeout = default_timeout
+        retry_kw = dict(
+            total=retries,
+            connect=retries,
+            read=retries if read_retries is None else read_retries,
+            status=retries,
+            backoff_factor=HTTP_RETRY_BACKOFF,
+            status_forcelist=retry_statuses,
+            allowed_methods=frozenset(m.upper() for m in retry_methods),
+            respect_retry_after_header=True,
+            # 재시도를 다 써도 예외 대신 마지막 응답을 그대로 돌려준다 (호출부의 status_code 분기 유지)
+            raise_on_status=False,
+        )
+        try:
+            retry = Retry(backoff_jitter=HTTP_RETRY_JITTER, **retry_kw)
+        except TypeError:
+            # urllib3 1.x에는 backoff_jitter가 없다 — 지터 없이 지수 백오프만
+            retry = Retry(**retry_kw)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.default_timeout
+        t0 = _t.perf_counter()
+        try:
+            resp = super().request(method, url, *args, **kwargs)
+        except Exception:
+            http_latency.record(self.name, (_t.perf_counter() - t0) * 1000.0, None)
+            raise
+        http_latency.record(self.name, (_t.perf_counter() - t0) * 1000.0, resp.status_code)
+        return resp
+
+
+# 공급자별 세션
+# - 시세/조회(GET)만 재시도. 주문 POST는 중복 체결 위험이 있어서 재시도하지 않는다.
+# - OpenAI는 접속 실패와 5xx 응답만 재시도. 429는 openai_scheduler가 처리한다.
+#   읽기 타임아웃은 재시도하지 않는다 — 60초 뒤에도 OpenAI가 첫 요청을 처리/과금 중일 수 있고,
+#   _gpt_decide_async가 이미 3번까지 다시 부른다 (재시도까지 겹치면 알림 하나에 과금 요청 6번, 6분 넘게 대기)
+oanda_http = ProviderSession("oanda", default_timeout=15)
+alpaca_data_http = ProviderSession("alpaca_data", default_timeout=15)
+alpaca_trade_http = ProviderSession("alpaca_trade", default_timeout=15)
+openai_http = ProviderSession("openai", default_timeout=60, retry_methods=("POST",),
+                              retry_statuses=SERVER_ERROR_STATUSES, retries=1, read_retries=0)
+web_http = ProviderSession("web", default_timeout=10, pool_maxsize=4)
+
+
+def http_stats():
+    return http_latency.snapshot()
+
+
+# =====================================================================
+# 🟦 [PERF-07] asyncio용 클라이언트 (aiohttp)
+#    웹훅 파이프라인이 이벤트 루프 위에서 캔들/뉴스/브로커/OpenAI를 동시에 기다릴 수 있게 한다.
+#    세션은 이벤트 루프마다 하나(루프가 바뀌면 새로 만든다), 재시도 정책·지연시간 집계는 동기 세션과 같다.
+# =====================================================================
+class AsyncHTTPStatusError(aiohttp.ClientError):
+    """AsyncResponse.raise_for_status()가 던지는 4xx/5xx 에러 (상태코드 + 본문 앞부분).
+    aiohttp.ClientResponseError는 request_info 없이 만들면 str(e)에서 AttributeError가 나서
+    호출부 except 안의 로그 f"{e}"가 다시 예외를 던졌다 → 상태/본문만 담는 전용 예외로."""
+
+    def __init__(self, status, body="", url=None):
+        self.status = status
+        self.body = body
+        self.url = url
+        super().__init__(status, body, url)
+
+    def __str__(self):
+        where = f" ({self.url})" if self.url else ""
+        return f"HTTP {self.status}{where}: {self.body}"
+
+
+class AsyncResponse:
+    """aiohttp 응답을 본문까지 읽어둔 값 객체 (requests.Response와 비슷하게 쓰기 위함)."""
+
+    __slots__ = ("status_code", "headers", "content", "url")
+
+    def __init__(self, status_code, headers, content, url=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", "replace")
+
+    def json(self):
+        return _json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise AsyncHTTPStatusError(self.status_code, self.text[:200], self.url)
+
+
+class AsyncProviderClient:
+    def __init__(self, name, default_timeout=15, retry_methods=("GET",), retry_statuses=RETRY_STATUSES,
+                 limit=HTTP_POOL_MAXSIZE, retries=HTTP_RETRY_TOTAL):
+        self.name = name
+        self.default_timeout = default_timeout
+        self.retry_methods = frozenset(m.upper() for m in retry_methods)
+        self.retry_statuses = frozenset(retry_statuses)
+        self.limit = limit
+        self.retries = retries
+        self._session = None
+        self._loop = None
+
+    def _get_session(self):
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.limit, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._loop = loop
+        return self._session
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                return float(retry_after)
+            except (TypeError, ValueError):
+                pass
+        return HTTP_RETRY_BACKOFF * (2 ** attempt) + random.uniform(0, HTTP_RETRY_JITTER)
+
+    async def request(self, method, url, *, timeout=None, **kwargs):
+        method = method.upper()
+        to = aiohttp.ClientTimeout(total=timeout or self.default_timeout)
+        can_retry = method in self.retry_methods
+        attempt = 0
+        while True:
+            t0 = _t.perf_counter()
+            try:
+                async with self._get_session().request(method, url, timeout=to, **kwargs) as resp:
+                    body = await resp.read()
+                    out = AsyncResponse(resp.status, resp.headers, body, str(resp.url.with_query(None)))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                http_latency.record(self.name, (_t.perf_counter() - t0) * 1000.0, None)
+                # POST 등은 접속 자체가 안 된 경우만 다시 보낸다 (타임아웃/도중 끊김은 서버가 이미 받았을 수 있다)
+                resend_ok = method in IDEMPOTENT_METHODS or isinstance(e, aiohttp.ClientConnectorError)
+                if can_retry and resend_ok and attempt < self.retries:
+                    await asyncio.sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                raise
+            http_latency.record(self.name, (_t.perf_counter() - t0) * 1000.0, out.status_code)
+            if can_retry and out.status_code in self.retry_statuses and attempt < self.retries:
+                await asyncio.sleep(self._backoff(attempt, out.headers.get("Retry-After")))
+                attempt += 1
+                continue
+            return out
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def delete(self, url, **kwargs):
+        return await self.request("DELETE", url, **kwargs)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+oanda_ahttp = AsyncProviderClient("oanda", default_timeout=15)
+alpaca_data_ahttp = AsyncProviderClient("alpaca_data", default_timeout=15)
+alpaca_trade_ahttp = AsyncProviderClient("alpaca_trade", default_timeout=15)
+openai_ahttp = AsyncProviderClient("openai", default_timeout=60, retry_methods=("POST",),
+                                   retry_statuses=SERVER_ERROR_STATUSES, retries=1)
+web_ahttp = AsyncProviderClient("web", default_timeout=10, limit=4)
+
+
+async def close_async_clients():
+    for c in (oanda_ahttp, alpaca_data_ahttp, alpaca_trade_ahttp, openai_ahttp, web_ahttp):
+        try:
+            await c.close()
+        except Exception:
+            pass
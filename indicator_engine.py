@@ -0,0 +1,368 @@
+# 🟦 [PERF-12] 증분 지표 엔진: (종목, 타임프레임)별 상태를 들고 있다가 새 봉 하나만큼만 갱신한다.
+#    예전엔 알림마다 calculate_rsi / calculate_macd / calculate_stoch_rsi / calculate_atr /
+#    calculate_bollinger_bands가 200봉 전체에 pandas rolling/ewm을 다시 돌렸다.
+#    - 공식은 main.py의 calculate_* 와 같다 (RSI는 14봉 단순평균 방식, MACD는 ewm(span, adjust=True))
+#    - rolling 평균/분산은 pandas와 같은 방식(Kahan 보정 누적합, Welford)으로, min/max는 단조 deque로 봉당 O(1)
+#    - 마지막 행(형성 중 봉)은 상태를 복사해서 계산만 하고 확정하지 않는다 → 다음 알림 때 최종값으로 확정
+#    - 캔들 프레임이 상태와 이어지지 않으면(첫 알림, 봉 누락, 값 수정) 그 프레임으로 처음부터 다시 쌓는다
+#    수치 일치 확인 + 벤치마크: bench_indicator_engine.py
+import math
+import os
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+INDICATOR_HISTORY = int(os.getenv("INDICATOR_HISTORY", "500"))   # 종목·TF별로 보관하는 지표 출력 개수
+INDICATOR_COLUMNS = ("rsi", "stoch_rsi", "macd", "macd_signal", "atr", "boll_up", "boll_mid", "boll_low")
+
+# 프레임 앞쪽에서 pandas가 NaN을 내는 봉 수 (rolling 창이 덜 찬 구간). 엔진은 더 긴 이력을 들고 있어서
+# 값이 있지만, calculate_* 와 같은 모양(dropna 길이 포함)을 내려고 똑같이 비운다.
+_WARMUP_ROWS = {"rsi": 14, "stoch_rsi": 27, "macd": 0, "macd_signal": 0, "atr": 13,
+                "boll_up": 19, "boll_mid": 19, "boll_low": 19}
+
+_NAN = float("nan")
+
+
+def _div(a, b):
+    """numpy float64 나눗셈과 같은 결과 (0으로 나누면 ±inf / nan)."""
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a != a or a == 0:
+            return _NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+class RollingMean:
+    """pandas rolling(window).mean()과 같은 계산 (Kahan 보정 합, 같은 값 연속/부호 보정 포함)."""
+
+    __slots__ = ("window", "vals", "nobs", "sum", "comp", "neg", "same", "prev")
+
+    def __init__(self, window):
+        self.window = window
+        self.vals = deque()
+        self.nobs = 0
+        self.sum = 0.0
+        self.comp = 0.0
+        self.neg = 0
+        self.same = 0
+        self.prev = _NAN
+
+    def copy(self):
+        c = RollingMean.__new__(RollingMean)
+        c.window, c.vals = self.window, deque(self.vals)
+        c.nobs, c.sum, c.comp, c.neg, c.same, c.prev = self.nobs, self.sum, self.comp, self.neg, self.same, self.prev
+        return c
+
+    def push(self, val):
+        if len(self.vals) == self.window:
+            old = self.vals.popleft()
+            if old == old:
+                self.nobs -= 1
+                y = -old - self.comp
+                t = self.sum + y
+                self.comp = t - self.sum - y
+                self.sum = t
+                if math.copysign(1.0, old) < 0:
+                    self.neg -= 1
+        self.vals.append(val)
+        if val == val:
+            self.nobs += 1
+            y = val - self.comp
+            t = self.sum + y
+            self.comp = t - self.sum - y
+            self.sum = t
+            if math.copysign(1.0, val) < 0:
+                self.neg += 1
+            self.same = self.same + 1 if val == self.prev else 1
+            self.prev = val
+        if self.nobs < self.window:
+            return _NAN
+        result = self.sum / self.nobs
+        if self.same >= self.nobs:
+            return self.prev
+        if self.neg == 0 and result < 0:
+            return 0.0
+        if self.neg == self.nobs and result > 0:
+            return 0.0
+        return result
+
+
+class RollingStd:
+    """pandas rolling(window).std() (ddof=1) — Welford 가산/제거 + Kahan 보정."""
+
+    __slots__ = ("window", "vals", "nobs", "mean", "ssqdm", "comp", "same", "prev")
+
+    def __init__(self, window):
+        self.window = window
+        self.vals = deque()
+        self.nobs = 0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+        self.comp = 0.0
+        self.same = 0
+        self.prev = _NAN
+
+    def copy(self):
+        c = RollingStd.__new__(RollingStd)
+        c.window, c.vals = self.window, deque(self.vals)
+        c.nobs, c.mean, c.ssqdm, c.comp, c.same, c.prev = (
+            self.nobs, self.mean, self.ssqdm, self.comp, self.same, self.prev)
+        return c
+
+    def _add(self, val):
+        self.nobs += 1
+        self.same = self.same + 1 if val == self.prev else 1
+        self.prev = val
+        prev_mean = self.mean - self.comp
+        y = val - self.comp
+        t = y - self.mean
+        self.comp = t + self.mean - y
+        self.mean = self.mean + t / self.nobs
+        self.ssqdm += (val - prev_mean) * (val - self.mean)
+
+    def _remove(self, val):
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean - self.comp
+            y = val - self.comp
+            t = y - self.mean
+            self.comp = t + self.mean - y
+            self.mean = self.mean - t / self.nobs
+            self.ssqdm -= (val - prev_mean) * (val - self.mean)
+        else:
+            self.mean = 0.0
+            self.ssqdm = 0.0
+
+    def push(self, val):
+        # pandas roll_var 순서: 새 값 추가 → 빠지는 값 제거
+        if val == val:
+            self._add(val)
+        self.vals.append(val)
+        if len(self.vals) > self.window:
+            old = self.vals.popleft()
+            if old == old:
+                self._remove(old)
+        if self.nobs < self.window or self.nobs <= 1:
+            return _NAN
+        if self.same >= self.nobs:
+            return 0.0
+        var = self.ssqdm / (self.nobs - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class RollingMinMax:
+    """rolling(window).min()/max() — 단조 deque. 창 안 값이 모두 있을 때만 값을 낸다."""
+
+    __slots__ = ("window", "i", "nobs", "vals", "mins", "maxs")
+
+    def __init__(self, window):
+        self.window = window
+        self.i = -1
+        self.nobs = 0
+        self.vals = deque()
+        self.mins = deque()     # (index, value) 값 오름차순
+        self.maxs = deque()     # (index, value) 값 내림차순
+
+    def copy(self):
+        c = RollingMinMax.__new__(RollingMinMax)
+        c.window, c.i, c.nobs = self.window, self.i, self.nobs
+        c.vals, c.mins, c.maxs = deque(self.vals), deque(self.mins), deque(self.maxs)
+        return c
+
+    def push(self, val):
+        self.i += 1
+        self.vals.append(val)
+        if len(self.vals) > self.window:
+            old = self.vals.popleft()
+            if old == old:
+                self.nobs -= 1
+        lo = self.i - self.window
+        while self.mins and self.mins[0][0] <= lo:
+            self.mins.popleft()
+        while self.maxs and self.maxs[0][0] <= lo:
+            self.maxs.popleft()
+        if val == val:
+            self.nobs += 1
+            while self.mins and self.mins[-1][1] >= val:
+                self.mins.pop()
+            self.mins.append((self.i, val))
+            while self.maxs and self.maxs[-1][1] <= val:
+                self.maxs.pop()
+            self.maxs.append((self.i, val))
+        if self.nobs < self.window:
+            return _NAN, _NAN
+        return self.mins[0][1], self.maxs[0][1]
+
+
+class EwmMean:
+    """pandas ewm(span=…, adjust=True).mean() 재귀식 (ignore_na=False, min_periods=0)."""
+
+    __slots__ = ("factor", "weighted", "old_wt", "started")
+
+    def __init__(self, span):
+        alpha = 1.0 / (1.0 + (span - 1) / 2.0)     # pandas와 같은 순서로 계산 (span → com → alpha)
+        self.factor = 1.0 - alpha
+        self.weighted = _NAN
+        self.old_wt = 1.0
+        self.started = False
+
+    def copy(self):
+        c = EwmMean.__new__(EwmMean)
+        c.factor, c.weighted, c.old_wt, c.started = self.factor, self.weighted, self.old_wt, self.started
+        return c
+
+    def push(self, val):
+        if not self.started:
+            self.started = True
+            self.weighted = val
+            return val
+        obs = val == val
+        if self.weighted == self.weighted:
+            self.old_wt *= self.factor
+            if obs:
+                if self.weighted != val:
+                    self.weighted = (self.old_wt * self.weighted + val) / (self.old_wt + 1.0)
+                self.old_wt += 1.0
+        elif obs:
+            self.weighted = val
+        return self.weighted
+
+
+class IndicatorState:
+    """(종목, TF) 하나의 지표 상태. step()은 봉 하나를 반영하고 출력 튜플(INDICATOR_COLUMNS 순서)을 돌려준다."""
+
+    def __init__(self, history=INDICATOR_HISTORY):
+        self.history = history
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.prev_close = _NAN
+        self.gain = RollingMean(14)
+        self.loss = RollingMean(14)
+        self.stoch = RollingMinMax(14)
+        self.ema12 = EwmMean(12)
+        self.ema26 = EwmMean(26)
+        self.signal = EwmMean(9)
+        self.tr = RollingMean(14)
+        self.boll_mean = RollingMean(20)
+        self.boll_std = RollingStd(20)
+        # 확정된 봉의 time 문자열 / close / 출력
+        self.times = deque(maxlen=self.history)
+        self.closes = deque(maxlen=self.history)
+        self.outputs = deque(maxlen=self.history)
+
+    def _core_copy(self):
+        c = IndicatorState.__new__(IndicatorState)
+        c.prev_close = self.prev_close
+        for k in ("gain", "loss", "stoch", "ema12", "ema26", "signal", "tr", "boll_mean", "boll_std"):
+            setattr(c, k, getattr(self, k).copy())
+        return c
+
+    def step(self, high, low, close):
+        pc = self.prev_close
+        delta = close - pc
+        # calculate_rsi: delta.clip(lower=0) / -delta.clip(upper=0)  (NaN은 NaN 그대로)
+        gain = self.gain.push(max(delta, 0.0) if delta == delta else _NAN)
+        loss = self.loss.push(-min(delta, 0.0) if delta == delta else _NAN)
+        rsi = 100 - _div(100, 1 + _div(gain, loss))
+        mn, mx = self.stoch.push(rsi)
+        stoch = _div(rsi - mn, mx - mn)
+
+        fast, slow = self.ema12.push(close), self.ema26.push(close)
+        macd = fast - slow
+        signal = self.signal.push(macd)
+
+        # calculate_atr: TR = max(H-L, |H-전봉C|, |L-전봉C|) (전봉이 없으면 H-L)
+        tr = high - low
+        if pc == pc:
+            tr = max(tr, abs(high - pc), abs(low - pc))
+        atr = self.tr.push(tr)
+
+        mid = self.boll_mean.push(close)
+        std = self.boll_std.push(close)
+        self.prev_close = close
+        return (rsi, stoch, macd, signal, atr, mid + 2 * std, mid, mid - 2 * std)
+
+    def commit(self, t, high, low, close):
+        out = self.step(high, low, close)
+        self.times.append(t)
+        self.closes.append(close)
+        self.outputs.append(out)
+        return out
+
+    def peek(self, high, low, close):
+        """상태를 바꾸지 않고 이 봉까지의 지표만 계산 (형성 중 봉용)."""
+        return self._core_copy().step(high, low, close)
+
+
+class IndicatorEngine:
+    """
+    series_for(key, candles) → calculate_* 와 같은 시리즈 dict (candles와 같은 index).
+    상태에 확정된 마지막 봉을 프레임에서 찾아 그 뒤 봉들만 반영하고, 마지막 행은 peek으로 계산한다.
+    """
+
+    def __init__(self, history=INDICATOR_HISTORY):
+        self.history = history
+        self._lock = threading.Lock()
+        self._states = {}
+        self.incremental = 0
+        self.rebuilds = 0
+        self.bars_stepped = 0
+
+    def _state(self, key):
+        with self._lock:
+            st = self._states.get(key)
+            if st is None:
+                st = self._states[key] = IndicatorState(self.history)
+            return st
+
+    def _sync(self, st, times, high, low, close):
+        """상태를 프레임 마지막 직전 봉까지 맞춘다. 이어 붙였으면 True, 다시 쌓았으면 False."""
+        n = len(times)
+        if st.times:
+            hit = np.flatnonzero(times[:n - 1] == st.times[-1])
+            if hit.size:
+                p = int(hit[-1])
+                # 프레임 첫 봉까지 출력이 남아 있고, 확정 봉의 값이 그대로여야 이어 붙인다
+                if len(st.times) >= p + 1 and st.times[-(p + 1)] == times[0] and st.closes[-1] == close[p]:
+                    for i in range(p + 1, n - 1):
+                        st.commit(times[i], high[i], low[i], close[i])
+                    self.bars_stepped += n - 1 - (p + 1)
+                    self.incremental += 1
+                    return True
+        st.reset()
+        for i in range(n - 1):
+            st.commit(times[i], high[i], low[i], close[i])
+        self.bars_stepped += n - 1
+        self.rebuilds += 1
+        return False
+
+    def series_for(self, key, candles):
+        n = len(candles)
+        if n == 0:
+            return {k: pd.Series(dtype=float, index=candles.index) for k in INDICATOR_COLUMNS}
+        times = candles["time"].to_numpy(dtype=object)
+        # 파이썬 float로 (numpy 스칼라 연산은 봉당 오버헤드가 크고 0 나눗셈 경고를 낸다)
+        high = candles["high"].to_numpy(dtype=np.float64).tolist()
+        low = candles["low"].to_numpy(dtype=np.float64).tolist()
+        close = candles["close"].to_numpy(dtype=np.float64).tolist()
+        st = self._state(key)
+        with st.lock:
+            self._sync(st, times, high, low, close)
+            rows = list(st.outputs)[len(st.outputs) - (n - 1):] if n > 1 else []
+            rows.append(st.peek(high[-1], low[-1], close[-1]))
+        block = np.array(rows, dtype=np.float64).reshape(n, len(INDICATOR_COLUMNS))
+        for j, k in enumerate(INDICATOR_COLUMNS):
+            block[:_WARMUP_ROWS[k], j] = np.nan
+        return {k: pd.Series(block[:, j], index=candles.index) for j, k in enumerate(INDICATOR_COLUMNS)}
+
+    def stats(self):
+        with self._lock:
+            n = len(self._states)
+        return {"states": n, "incremental": self.incremental, "rebuilds": self.rebuilds,
+                "bars_stepped": self.bars_stepped}
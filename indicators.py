@@ -0,0 +1,418 @@
+# 🟦 [PERF-13] 공용 지표 라이브러리: main.py / main_backtest_engine.py / backtest_run.py / fx_webhook_fastapi.py 에
+#    복붙돼 있던 RSI/MACD/StochRSI/볼린저/ATR/EMA를 한 곳으로 모았다. 라이브 경로와 백테스트가 같은 값을 쓴다.
+#    - 커널(rsi, macd, …)은 float64 ndarray → ndarray, 봉 단위 파이썬 루프 없는 NumPy 벡터 연산
+#      (rolling은 창 길이만큼, ewm은 수천 봉 블록 단위로만 돈다)
+#      (100~200봉에서는 pandas rolling/ewm 객체 생성 비용이 계산보다 컸다)
+#    - calculate_* 는 기존 함수와 같은 시그니처의 pandas 래퍼 (입력 Series와 같은 index의 Series 반환)
+#    - 공식은 pandas 기본값 그대로: rolling(min_periods=window), std(ddof=1), ewm(span, adjust=True)
+#      ta 패키지 경로(get_multi_tf_scalping_data)는 wilder_rsi / macd(adjust=False, warmup=True)로 같은 공식을 낸다
+#    - 값은 pandas와 1e-9 이내 (합산 순서만 다름). 검증/벤치마크: bench_indicators.py
+import math
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+_EWM_BLOCK_MAX = 4096
+_EWM_BLOCK_SCALE = 100.0   # 블록 안에서 가중치가 10^100 배를 넘지 않게 자른다 (float64 오버플로/정밀도 보호)
+
+
+def as_array(values):
+    """Series/list/ndarray → float64 ndarray (이미 float64면 복사하지 않는다)."""
+    if isinstance(values, pd.Series):
+        values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.asarray(values, dtype=np.float64)
+
+
+def _nan_head(n, k, dtype=np.float64):
+    out = np.empty(n, dtype=dtype)
+    out[:k] = np.nan
+    return out
+
+
+# ====== 기본 커널 ======
+def diff(x):
+    x = as_array(x)
+    out = _nan_head(len(x), min(1, len(x)))
+    np.subtract(x[1:], x[:-1], out=out[1:])
+    return out
+
+
+def _window_slices(x, window):
+    """창 길이만큼 밀린 연속 구간 x[k : k+n-window+1] (k = 0..window-1).
+    sliding_window_view로 축 방향 축약을 하면 보폭이 있는 메모리를 읽어 느리다 → 짧은 창은 window번의 연속 배열 연산이 빠르다."""
+    m = len(x) - window + 1
+    return [x[k:k + m] for k in range(window)]
+
+
+def _windowed(x, window, reduce):
+    x = as_array(x)
+    n = len(x)
+    if window < 1:
+        raise ValueError("window must be >= 1")
+    out = _nan_head(n, min(window - 1, n))
+    if n >= window:
+        # 창 안에 NaN이 하나라도 있으면 NaN (pandas min_periods=window와 같다)
+        reduce(_window_slices(x, window), out[window - 1:])
+    return out
+
+
+def _sum_into(parts, out):
+    np.copyto(out, parts[0])
+    for p in parts[1:]:
+        out += p
+    return out
+
+
+def _mean_into(parts, out):
+    _sum_into(parts, out)
+    out /= len(parts)
+    return out
+
+
+def rolling_mean(x, window):
+    return _windowed(x, window, _mean_into)
+
+
+def rolling_std(x, window, ddof=1):
+    if window <= ddof:
+        return np.full(len(x), np.nan)
+
+    def _std_into(parts, out):
+        # 두 번 읽기(평균 → 편차 제곱합): 가격 수준(1.1, 150)에 비해 표준편차가 작아도 상쇄 오차가 없다
+        mean = _sum_into(parts, np.empty_like(out))
+        mean /= len(parts)
+        out.fill(0.0)
+        dev = np.empty_like(out)
+        for p in parts:
+            np.subtract(p, mean, out=dev)
+            dev *= dev
+            out += dev
+        out /= len(parts) - ddof
+        np.sqrt(out, out=out)
+
+    return _windowed(x, window, _std_into)
+
+
+def _reduce_into(ufunc):
+    def _into(parts, out):
+        np.copyto(out, parts[0])
+        for p in parts[1:]:
+            ufunc(out, p, out=out)
+    return _into
+
+
+def rolling_min(x, window):
+    return _windowed(x, window, _reduce_into(np.minimum))
+
+
+def rolling_max(x, window):
+    return _windowed(x, window, _reduce_into(np.maximum))
+
+
+def _ewm_alpha(span=None, alpha=None):
+    if alpha is not None:
+        return float(alpha)
+    # pandas와 같은 경로(span → com → alpha)로 계산해야 alpha가 비트 단위로 같다
+    com = (span - 1) / 2.0
+    return 1.0 / (1.0 + com)
+
+
+def ewm_mean(x, span=None, alpha=None, adjust=True, min_periods=0):
+    """pandas Series.ewm(span|alpha, adjust, min_periods).mean() 과 같은 값.
+
+    블록마다 가중치 r^-k(r = 1-alpha)를 누적합으로 한 번에 곱해 점화식을 벡터로 푼다.
+    앞쪽 NaN(다른 지표의 워밍업 구간)은 pandas처럼 첫 유효값부터 시작한다. 중간에 NaN이 끼면 pandas로 계산.
+    """
+    x = as_array(x)
+    n = len(x)
+    a = _ewm_alpha(span, alpha)
+    valid = ~np.isnan(x)
+    first = int(np.argmax(valid)) if n and valid.any() else n
+    if first < n and not valid[first:].all():
+        return pd.Series(x).ewm(alpha=a, adjust=adjust, min_periods=min_periods).mean().to_numpy()
+
+    out = np.full(n, np.nan)
+    v = x[first:]
+    m = len(v)
+    if m == 0:
+        return out
+    r = 1.0 - a
+    if r <= 0.0:
+        res = v.copy()
+    else:
+        res = np.empty(m)
+        block = max(1, min(_EWM_BLOCK_MAX, int(_EWM_BLOCK_SCALE / -math.log10(r)) if r < 1.0 else _EWM_BLOCK_MAX))
+        p_full = r ** -np.arange(block, dtype=np.float64)
+        if adjust:
+            # y_t = Σ r^(t-j) x_j / Σ r^(t-j)  →  블록 안에서는 (r·S + cumsum(x·p)) / (r·D + cumsum(p))
+            cp_full = np.cumsum(p_full)
+            s = d = 0.0
+            for b0 in range(0, m, block):
+                xb = v[b0:b0 + block]
+                num = np.cumsum(xb * p_full[:len(xb)])
+                den = cp_full[:len(xb)] + r * d
+                num += r * s
+                np.divide(num, den, out=res[b0:b0 + len(xb)])
+                scale = r ** (len(xb) - 1)
+                s, d = num[-1] * scale, den[-1] * scale
+        else:
+            # y_t = r·y_(t-1) + a·x_t, y_0 = x_0  →  블록 안에서는 r^k·(r·y_prev + a·cumsum(x·p))
+            prev = v[0]
+            for b0 in range(0, m, block):
+                xb = v[b0:b0 + block]
+                p = p_full[:len(xb)]
+                acc = np.cumsum(xb * p)
+                acc *= a
+                acc += r * prev
+                np.divide(acc, p, out=res[b0:b0 + len(xb)])
+                prev = res[b0 + len(xb) - 1]
+    k = min(max(int(min_periods), 1) - 1, m)
+    res[:k] = np.nan
+    out[first:] = res
+    return out
+
+
+# ====== 지표 ======
+def rsi(close, period=14):
+    """단순이동평균 RSI (기존 calculate_rsi): 상승/하락폭의 rolling(period).mean() 비율."""
+    d = diff(close)
+    gain = rolling_mean(np.maximum(d, 0.0), period)
+    loss = rolling_mean(-np.minimum(d, 0.0), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - (100 / (1 + gain / loss))
+
+
+def wilder_rsi(close, period=14):
+    """Wilder RSI (ta.momentum.RSIIndicator 공식): alpha=1/period, adjust=False, min_periods=period."""
+    d = diff(close)
+    up = np.where(d > 0, d, 0.0)
+    down = -np.where(d < 0, d, 0.0)
+    ema_up = ewm_mean(up, alpha=1 / period, adjust=False, min_periods=period)
+    ema_down = ewm_mean(down, alpha=1 / period, adjust=False, min_periods=period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(ema_down == 0, 100.0, 100 - (100 / (1 + ema_up / ema_down)))
+
+
+def macd(close, fast=12, slow=26, signal=9, adjust=True, warmup=False):
+    """(macd, signal). warmup=True면 각 EMA를 자기 span만큼 채운 뒤부터 값을 낸다 (ta.trend.MACD와 같다)."""
+    ema_fast = ewm_mean(close, span=fast, adjust=adjust, min_periods=fast if warmup else 0)
+    ema_slow = ewm_mean(close, span=slow, adjust=adjust, min_periods=slow if warmup else 0)
+    line = ema_fast - ema_slow
+    return line, ewm_mean(line, span=signal, adjust=adjust, min_periods=signal if warmup else 0)
+
+
+def stoch_rsi(rsi_values, period=14):
+    r = as_array(rsi_values)
+    lo = rolling_min(r, period)
+    hi = rolling_max(r, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (r - lo) / (hi - lo)
+
+
+def bollinger_bands(close, window=20, k=2):
+    """(upper, mid, lower) — 표준편차는 pandas 기본값과 같은 표본표준편차(ddof=1)."""
+    mid = rolling_mean(close, window)
+    std = rolling_std(close, window)
+    return mid + k * std, mid, mid - k * std
+
+
+def true_range(high, low, close):
+    high, low, close = as_array(high), as_array(low), as_array(close)
+    prev = np.empty_like(close)
+    prev[:1] = np.nan
+    prev[1:] = close[:-1]
+    # fmax: 첫 봉은 이전 종가가 없으므로 high-low (pandas max(axis=1)의 NaN 건너뛰기와 같다)
+    return np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+
+
+def atr(high, low, close, period=14):
+    """단순이동평균 ATR (기존 calculate_atr)."""
+    return rolling_mean(true_range(high, low, close), period)
+
+
+# ====== pandas 래퍼 (기존 함수 시그니처) ======
+def _series(values, like):
+    return pd.Series(values, index=like.index)
+
+
+def calculate_rsi(series, period=14):
+    return _series(rsi(series, period), series)
+
+
+def calculate_wilder_rsi(series, period=14):
+    return _series(wilder_rsi(series, period), series)
+
+
+def calculate_macd(series, fast=12, slow=26, signal=9, adjust=True, warmup=False):
+    line, sig = macd(series, fast, slow, signal, adjust=adjust, warmup=warmup)
+    return _series(line, series), _series(sig, series)
+
+
+def calculate_stoch_rsi(rsi_series, period=14):
+    return _series(stoch_rsi(rsi_series, period), rsi_series)
+
+
+def calculate_bollinger_bands(series, window=20):
+    return tuple(_series(v, series) for v in bollinger_bands(series, window))
+
+
+def calculate_atr(candles, period=14):
+    return _series(atr(candles['high'], candles['low'], candles['close'], period), candles)
+
+
+def calculate_ema(series, span, adjust=True, min_periods=0):
+    return _series(ewm_mean(series, span=span, adjust=adjust, min_periods=min_periods), series)
+
+
+def calculate_rolling_mean(series, window):
+    return _series(rolling_mean(series, window), series)
+
+
+# ====== 캔들 패턴 (백테스트용 단봉 HAMMER / SHOOTING_STAR) ======
+def hammer_star_pattern(open_, high, low, close):
+    """봉마다 "HAMMER" / "SHOOTING_STAR" / "NEUTRAL" (object 배열). 예전 detect_candle_pattern(row)과 같은 규칙."""
+    o, h, l, c = as_array(open_), as_array(high), as_array(low), as_array(close)
+    body = np.abs(c - o)
+    upper_wick = h - np.maximum(c, o)
+    lower_wick = np.minimum(c, o) - l
+    hammer = (lower_wick > 2 * body) & (upper_wick < body)
+    star = (upper_wick > 2 * body) & (lower_wick < body)
+    return np.where(hammer, "HAMMER", np.where(star, "SHOOTING_STAR", "NEUTRAL")).astype(object)
+
+
+def calculate_hammer_star_pattern(candles):
+    return _series(hammer_star_pattern(candles['open'], candles['high'], candles['low'], candles['close']), candles)
+
+
+# ====== 캔들 패턴 (라이브 detect_candle_pattern 규칙, 전 구간 한 번에) ======
+PATTERN_BODY_WINDOW = 10   # "장대" 기준이 되는 직전 평균 바디 봉 수
+
+
+def _avg_prev_body(body, window=PATTERN_BODY_WINDOW):
+    """i번째 봉 직전 window봉(앞쪽은 있는 만큼)의 바디 평균, NaN 제외. 직전 봉이 없거나 전부 NaN이면 NaN.
+    예전 (prev["close"] - prev["open"]).abs().mean()과 같은 순서로 더한다 (행마다 window개 연속 합)."""
+    n = len(body)
+    valid = ~np.isnan(body)
+    filled = np.where(valid, body, 0.0)
+    out = np.full(n, np.nan)
+    for i in range(1, min(n, window)):
+        cnt = int(valid[:i].sum())
+        if cnt:
+            out[i] = filled[:i].sum() / cnt
+    if n > window:
+        sums = np.ascontiguousarray(sliding_window_view(filled[:-1], window)).sum(axis=1)
+        cnts = sliding_window_view(valid[:-1], window).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[window:] = np.where(cnts > 0, sums / np.maximum(cnts, 1), np.nan)
+    return out
+
+
+def candle_patterns(open_, high, low, close, body_window=PATTERN_BODY_WINDOW):
+    """봉마다 main.detect_candle_pattern과 같은 라벨 (object 배열).
+    우선순위: 2봉 패턴(장악형/관통형/흑운형) → 장대 바디(직전 body_window봉 평균의 1.8배) → 망치형/유성형 → NEUTRAL"""
+    o, h, l, c = as_array(open_), as_array(high), as_array(low), as_array(close)
+    n = len(c)
+    if n == 0:
+        return np.empty(0, dtype=object)
+    body = np.abs(c - o)
+    rng = h - l
+    upper_wick = h - np.maximum(c, o)
+    lower_wick = np.minimum(c, o) - l
+    bull, bear = c > o, c < o
+    complete = ~(np.isnan(o) | np.isnan(h) | np.isnan(l) | np.isnan(c))
+    ok = complete & (rng > 0)
+
+    avg_body = _avg_prev_body(body, body_window)
+    # 직전 봉들이 전부 도지(평균 0)거나 없으면 현재 범위의 30%
+    avg_body = np.where(avg_body > 0, avg_body, rng * 0.3)
+
+    # 2봉 패턴: 직전 봉이 온전할 때만
+    p_ok = np.r_[False, complete[:-1]]
+    po, pc = np.r_[np.nan, o[:-1]], np.r_[np.nan, c[:-1]]
+    p_body = np.abs(pc - po)
+    p_bull, p_bear = p_ok & (pc > po), p_ok & (pc < po)
+    p_mid = (po + pc) / 2.0
+
+    long_body = (body >= avg_body * 1.8) & (body >= rng * 0.6)
+    has_body = body > 0
+    conds = [
+        ~ok,
+        bull & p_bear & (c >= po) & (o <= pc) & (body > p_body),
+        bear & p_bull & (c <= po) & (o >= pc) & (body > p_body),
+        bull & p_bear & (o < pc) & (c > p_mid) & (c < po),
+        bear & p_bull & (o > pc) & (c < p_mid) & (c > po),
+        long_body & bull,
+        long_body,
+        # 🟥 [FIX-B6c] 아래꼬리/위꼬리 패턴은 기존 동작(HAMMER / SHOOTING_STAR)을 그대로 유지한다.
+        #    한때 "상승 흐름 뒤 아래꼬리 = HANGING_MAN(약세)"으로 세분화했으나,
+        #    HANGING_MAN은 bearish_patterns에 들어 있어서 BUY 신호에 -1.5가 붙는다.
+        #    즉 상승추세 중 망치형(원래 +2)이 갑자기 -1.5가 되는 3.5점짜리 역전이 생긴다.
+        #    이 전략은 실거래에서 "과열/추세지속 구간이 더 잘 맞는" 것으로 확인됐으므로,
+        #    검증되지 않은 반전 신호를 새로 도입하지 않는다.
+        has_body & (lower_wick > 2 * body) & (upper_wick < body),
+        has_body & (upper_wick > 2 * body) & (lower_wick < body),
+    ]
+    labels = ["NEUTRAL", "BULLISH_ENGULFING", "BEARISH_ENGULFING", "PIERCING_LINE", "DARK_CLOUD_COVER",
+              "LONG_BODY_BULL", "LONG_BODY_BEAR", "HAMMER", "SHOOTING_STAR"]
+    return np.select(conds, labels, "NEUTRAL").astype(object)
+
+
+def calculate_candle_patterns(candles):
+    return _series(candle_patterns(candles['open'], candles['high'], candles['low'], candles['close']), candles)
+
+
+# ====== 스윙 고점/저점 + 레벨 군집 (get_enhanced_support_resistance) ======
+def swing_flags(high, low, order):
+    """i번째 봉이 앞뒤 order봉을 포함한 창의 최고가/최저가인지 (is_resistance, is_support) bool 배열.
+    예전 루프(highs[i] == max(highs[i-order:i+order+1]))와 같다. 창이 다 안 차는 양 끝 order봉은 False."""
+    high, low = as_array(high), as_array(low)
+    n, span = len(high), 2 * order + 1
+    is_res = np.zeros(n, dtype=bool)
+    is_sup = np.zeros(n, dtype=bool)
+    if n >= span:
+        is_res[order:n - order] = high[order:n - order] == np.max(sliding_window_view(high, span), axis=1)
+        is_sup[order:n - order] = low[order:n - order] == np.min(sliding_window_view(low, span), axis=1)
+    return is_res, is_sup
+
+
+def _running_pair_mean(values):
+    # 예전 버킷 값 갱신 순서 그대로 (val + lv) / 2 — 합산 순서를 바꾸면 마지막 자리가 달라진다
+    val = values[0]
+    for lv in values[1:]:
+        val = (val + lv) / 2.0
+    return val
+
+
+def cluster_levels(levels, threshold, min_touch_count=2):
+    """정렬한 레벨을 threshold 안쪽끼리 묶고(버킷 값 = 넣을 때마다 (기존 + 새 값) / 2), 터치 수가 min_touch_count
+    이상인 버킷 값만 오름차순으로.
+
+    예전 규칙은 '버킷 현재 값'과 비교하므로 이웃 간격만으로는 나눌 수 없다. 다만 이웃 간격이 threshold를
+    넘으면 반드시 새 버킷이다(버킷 값 ≤ 직전 레벨) → 정렬 후 np.diff로 먼저 자르고,
+    폭(끝 - 처음)이 threshold 이하인 구간은 통째로 한 버킷, 그보다 넓은 구간만 예전 규칙을 그대로 돈다."""
+    lv = np.sort(as_array(levels))
+    if len(lv) == 0:
+        return []
+    cuts = np.flatnonzero(np.abs(np.diff(lv)) > threshold) + 1
+    out = []
+    for seg in np.split(lv, cuts):
+        if len(seg) < min_touch_count:
+            continue
+        if seg[-1] - seg[0] <= threshold:
+            out.append(_running_pair_mean(seg.tolist()))
+            continue
+        val, cnt = seg[0], 1
+        for x in seg[1:].tolist():
+            if abs(val - x) > threshold:
+                if cnt >= min_touch_count:
+                    out.append(val)
+                val, cnt = x, 1
+            else:
+                val, cnt = (val + x) / 2.0, cnt + 1
+        if cnt >= min_touch_count:
+            out.append(val)
+    # np.float64로 돌려준다 — 예전 레벨도 np.float64였고, round(np.float64)는 파이썬 float의 round와
+    # 반올림 방식이 달라서(299.695 → 299.7 / 299.69) 호출부의 round 결과까지 같게 하려면 타입도 같아야 한다
+    return list(np.asarray(out, dtype=np.float64))
@@ -12,13 +12,42 @@ import numpy as np
 import gspread
 import threading
 from concurrent.futures import ThreadPoolExecutor
-import ta
 import time as _t
 import math
 import base64
+import hashlib
 import os
 import asyncio
-from playwright.sync_api import sync_playwright
+import functools
+from candle_store import (
+    CandleCache, CandleRingStore, CandleArchive, CANDLE_CACHE_MAX_AGE_SEC, CANDLE_RING_SIZE,
+    CANDLE_ARCHIVE_DIR, CANDLE_ARCHIVE_GRANULARITIES, granularity_seconds, frame_time_ns, format_bar_times,
+    resample_frame, FX_SESSION_ANCHOR_SEC, STOCK_SESSION_ANCHOR_SEC, bar_start_epoch, next_bar_close_epoch,
+)
+from candle_decode import decode_oanda_candles, decode_alpaca_bars, alpaca_bars_columns, loads_json
+from singleflight import SingleFlight, AsyncSingleFlight
+from bar_builder import BarBuilder, LIVE_BAR_GRANULARITIES
+from indicator_engine import IndicatorEngine
+from candle_context import CandleContextStore
+from gpt_cache import GptDecisionCache, decision_key
+from openai_scheduler import PRIORITY_LIVE, PRIORITY_REPORT, gpt_scheduler
+from token_estimate import gpt_token_estimator
+from gpt_payload import compact_payload
+from chart_capture import CHART_WARM_PAIRS, ChartCapturePool, tradingview_symbol
+from chart_render import render_chart
+from score_rules import RULE_STATS_FLUSH_SEC, SIGNAL_RULES, rule_stats, signal_features
+from indicators import (
+    PATTERN_BODY_WINDOW, calculate_atr, calculate_bollinger_bands, calculate_candle_patterns, calculate_ema,
+    calculate_macd, calculate_rsi, cluster_levels, ewm_mean, macd as macd_arrays,
+    stoch_rsi as stoch_rsi_array, swing_flags, wilder_rsi,
+)
+from price_stream import (
+    PRICE_STREAM_ENABLED, QUOTE_MAX_AGE_SEC, AlpacaQuoteStream, OandaPriceStream, PriceStreams, quote_cache,
+)
+from http_client import (
+    oanda_http, alpaca_data_http, alpaca_trade_http, openai_http, web_http, http_stats,
+    oanda_ahttp, alpaca_data_ahttp, alpaca_trade_ahttp, openai_ahttp, web_ahttp, close_async_clients,
+)
 import time
 import time as _t
 # 🟥 [FIX-E1] API 키 전문을 stdout에 출력하던 줄을 제거.
@@ -31,10 +60,7 @@ def _mask_secret(v: str | None) -> str:
 
 
 print("🔑 OPENAI KEY 로드:", _mask_secret(os.getenv("OPENAI_API_KEY")))
-_gpt_lock = threading.Lock()
-_gpt_last_ts = 0.0
 _gpt_cooldown_until = 0.0
-_gpt_rate_lock = threading.Lock()
 # 🟦 같은 종목 반복신호 감지용 — 1시간 내 같은 종목에서 2번째 신호가 나오면,
 #    그 신호까지는 허용하고 그 다음(3번째)부터는 그 종목만 1시간 쉬게 한다.
 _symbol_signal_lock = threading.Lock()
@@ -46,7 +72,7 @@ _symbol_signal_lock = threading.Lock()
 #  (웹훅이 스레드풀에서 병렬 처리되므로 실제로 가능한 시나리오다).
 #  또 TradingView가 같은 봉에 대해 알림을 재전송해도 걸러낼 키가 없었다.
 # ============================================================
-_order_locks: dict[str, threading.Lock] = {}
+_order_locks: dict[str, asyncio.Lock] = {}
 _order_locks_guard = threading.Lock()
 _recent_alert_keys: dict[str, float] = {}
 _recent_alert_guard = threading.Lock()
@@ -54,13 +80,17 @@ _recent_alert_guard = threading.Lock()
 ALERT_DEDUP_SECONDS = int(os.getenv("ALERT_DEDUP_SECONDS", "60"))
 
 
-def _get_order_lock(symbol: str) -> threading.Lock:
-    """심볼별 주문 락을 가져온다(없으면 생성)."""
+def _get_order_lock(symbol: str) -> asyncio.Lock:
+    """
+    심볼별 주문 락을 가져온다(없으면 생성).
+    🟦 [PERF-07] 웹훅이 이벤트 루프의 코루틴으로 돌게 되면서 asyncio.Lock으로 바꿨다
+       (threading.Lock을 잡고 await 하면 루프 전체가 멈춘다).
+    """
     key = (symbol or "").upper()
     with _order_locks_guard:
         lk = _order_locks.get(key)
         if lk is None:
-            lk = threading.Lock()
+            lk = asyncio.Lock()
             _order_locks[key] = lk
         return lk
 
@@ -87,136 +117,66 @@ _symbol_signal_history = {}   # symbol -> [datetime, ...] (최근 1시간 이내
 _symbol_cooldown_until = {}   # symbol -> datetime (이 시각까지 신규진입 차단)
 SYMBOL_REPEAT_WINDOW_MINUTES = int(os.getenv("SYMBOL_REPEAT_WINDOW_MINUTES", "60"))
 SYMBOL_REPEAT_COOLDOWN_MINUTES = int(os.getenv("SYMBOL_REPEAT_COOLDOWN_MINUTES", "60"))
-_gpt_next_slot = 0.0
 _last_execution_time = 0.0  # 마지막 실행 시간을 저장할 변수
 # 🟥 [FIX-E3] 전역(전 종목 공통) 쿨다운 초. 0이면 비활성(기본).
 #    종목별 쿨다운은 SYMBOL_REPEAT_* 로 따로 관리한다.
 GLOBAL_COOLDOWN_SECONDS = int(os.getenv("GLOBAL_COOLDOWN_SECONDS", "0"))
-# 🟦 OpenAI Tier 3 기준 gpt-4o 한도가 5,000 RPM이라 20은 너무 낮았음(슬롯 대기가 불필요한 지연의 큰 원인).
-#    안전마진 두고 3000으로 상향. 필요시 환경변수로 재조정 가능.
-GPT_RPM = int(os.getenv("GPT_RPM", "3000"))
-_SLOT = 60.0 / GPT_RPM
 from oauth2client.service_account import ServiceAccountCredentials
 
-# ===== (NEW) 글로벌 레이트/토큰 상태 =====
-_tpm_remaining = 1e9
-_tpm_reset_ts  = 0.0
-_rpm_remaining = 1e9
-_rpm_reset_ts  = 0.0
-
-def _approx_tokens(msgs: list[dict]) -> int:
-    """메시지 리스트의 대략적 토큰 수 추정(문자수/4)"""
-    import json
-    s = json.dumps(msgs, ensure_ascii=False)
-    return max(1, int(len(s) / 4))
-
-def _preflight_gate(need_tokens: int):
-    """요청 보내기 직전에 남은 토큰/RPM으로 선대기"""
-    import time as _t, random
-    global _tpm_remaining, _tpm_reset_ts, _rpm_remaining, _rpm_reset_ts
-    now = _t.time()
-    wait_until = now
-    # TPM 부족 시 토큰 리셋까지 대기
-    if (_tpm_remaining - need_tokens) < 0 and now < _tpm_reset_ts:
-        wait_until = max(wait_until, _tpm_reset_ts)
-    # RPM 0이면 요청 리셋까지 대기
-    if (_rpm_remaining - 1) < 0 and now < _rpm_reset_ts:
-        wait_until = max(wait_until, _rpm_reset_ts)
-    if wait_until > now:
-        _t.sleep((wait_until - now) + random.uniform(0.05, 0.2))
-# 1. 트레이딩뷰 차트를 캡처하는 함수
-def capture_tradingview_chart(pair):
-    print(f"📸 {pair} 차트 캡처 프로세스 시작...")
-    with sync_playwright() as p:
-        try:
-            # 브라우저 실행
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(viewport={'width': 1920, 'height': 1080})
-            page = context.new_page()
-
-            # ✅ 중요: 아래 URL을 사용자님의 실제 차트 레이아웃 주소로 바꾸세요!
-            # 주소 끝에 ?symbol=FX:USDJPY 처럼 종목을 붙여주면 해당 종목 차트가 열립니다.
-            # 🟦 주식은 FX: 대신 거래소 prefix(NASDAQ/NYSE 등)가 필요. 정확한 거래소를 모를 땐
-            #     TradingView가 prefix 없이도 종목명만으로 자동 매칭해주는 경우가 많아 우선 prefix 없이 시도.
-            if is_stock_pair(pair):
-                target_url = f"https://www.tradingview.com/chart/iHBYFrNs/?symbol={pair.replace('/', '')}"
-            else:
-                target_url = f"https://www.tradingview.com/chart/iHBYFrNs/?symbol=FX:{pair.replace('/', '')}"
-            
-            page.goto(target_url, wait_until="networkidle")
-            print("⏳ 지표와 신호가 차트에 나타날 때까지 10초 대기...")
-            _t.sleep(10) # 지표가 많을수록 로딩 시간이 필요하므로 넉넉히 줍니다.
-
-            # 파일명 설정 및 저장
-            filename = f"chart_{pair.replace('/', '_')}.png"
-            page.screenshot(path=filename)
-            browser.close()
-            
-            return filename
-        except Exception as e:
-            print(f"❌ 캡처 실패: {e}")
-            return None
+# 1. 트레이딩뷰 차트 캡처
+# 🟦 [PERF-24] 알림마다 Chromium을 새로 띄우고 10초 sleep 하던 것 → 상주 브라우저 풀 (chart_capture.py).
+#    PNG 파일(chart_{pair}.png) 대신 메모리 바이트로 받는다 (동시 알림끼리 파일 덮어쓰기 없음)
+chart_pool = ChartCapturePool(lambda pair: tradingview_symbol(pair, is_stock_pair(pair)))
 
-def encode_image(image_path):
-    """이미지를 GPT가 읽을 수 있는 문자열로 변환"""
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
 
+async def capture_tradingview_chart(pair):
+    """차트 스크린샷 PNG 바이트. 실패하면 None."""
+    print(f"📸 {pair} 차트 캡처 시작...")
+    return await chart_pool.capture(pair)
 
-def _save_rate_headers(h: dict) -> None:
-    """
-    OpenAI 응답 헤더에서 남은 요청/토큰 수와 리셋까지 남은 초를 읽어
-    전역 상태(_rpm_remaining/_tpm_remaining/_rpm_reset_ts/_tpm_reset_ts)에 반영한다.
-    키 대소문자/변형에 관대하게 처리.
-    """
-    import time as _t
-    global _tpm_remaining, _tpm_reset_ts, _rpm_remaining, _rpm_reset_ts
 
-    if not h:
-        return
+# 🟦 [PERF-25] GPT에 붙일 차트 이미지 출처 (자산군별): tradingview(스크린샷) / local(캔들로 직접 그림) / none
+CHART_SOURCE_FX = os.getenv("CHART_SOURCE_FX", "tradingview").strip().lower()
+CHART_SOURCE_STOCK = os.getenv("CHART_SOURCE_STOCK", "none").strip().lower()
 
-    # 헤더 키를 관대하게 조회 (소문자/TitleCase 모두 허용)
-    def _hget(*keys):
-        for k in keys:
-            v = h.get(k)
-            if v is None:  # requests가 소문자로 줄 수도 있음
-                v = h.get(k.lower())
-            if v is None:  # 일부 프록시는 TitleCase로 줄 수도 있음
-                v = h.get(k.title())
-            if v is not None:
-                return v
-        return None
 
-    now = _t.time()
+def chart_source_for(pair):
+    return CHART_SOURCE_STOCK if is_stock_pair(pair) else CHART_SOURCE_FX
 
+
+def render_alert_chart(pair, payload, candles, ctx=None):
+    """웹훅에서 이미 계산한 캔들/지표/지지·저항으로 차트 PNG를 그린다 (chart_render.py). 실패하면 None."""
+    t0 = _t.perf_counter()
     try:
-        # 남은 개수(요청/토큰)
-        rem_req = _hget("x-ratelimit-remaining-requests", "X-RateLimit-Remaining-Requests")
-        rem_tok = _hget("x-ratelimit-remaining-tokens",   "X-RateLimit-Remaining-Tokens")
-        if rem_req is not None:
-            _rpm_remaining = float(rem_req)
-        if rem_tok is not None:
-            _tpm_remaining = float(rem_tok)
-
-        # 리셋까지 남은 초(요청/토큰)
-        rst_req = _hget("x-ratelimit-reset-requests", "X-RateLimit-Reset-Requests")
-        rst_tok = _hget("x-ratelimit-reset-tokens",   "X-RateLimit-Reset-Tokens")
-        if rst_req is not None:
-            _rpm_reset_ts = now + float(rst_req)
-        if rst_tok is not None:
-            _tpm_reset_ts = now + float(rst_tok)
+        if ctx is not None:
+            cols = [ctx.column(k) for k in ("open", "high", "low", "close")]
+            ind = {k: ctx.series(k).to_numpy(dtype=float) for k in ("boll_up", "boll_low", "rsi", "macd", "macd_signal")}
+        else:
+            cols = [candles[k].to_numpy(dtype=float) for k in ("open", "high", "low", "close")]
+            boll_up, _mid, boll_low = calculate_bollinger_bands(candles["close"])
+            macd_line, macd_sig = calculate_macd(candles["close"])
+            ind = {"boll_up": boll_up, "boll_low": boll_low, "rsi": calculate_rsi(candles["close"]),
+                   "macd": macd_line, "macd_signal": macd_sig}
+        png = render_chart(
+            *cols, **ind,
+            support=payload.get("support"), resistance=payload.get("resistance"),
+            signal=payload.get("signal"), digits=price_digits_for(pair),
+        )
+    except Exception as e:
+        print(f"❌ [차트 렌더] {pair} 실패: {e}")
+        return None
+    print(f"🖼️ [차트 렌더] {pair} {(_t.perf_counter() - t0) * 1000:.1f}ms ({len(png)} bytes)")
+    return png
+
 
-    except Exception:
-        # 형식이 이상해도 전체 흐름 멈추지 않음
-        pass
-        
 # === OpenAI 공통 설정 & 세션 ===
 OPENAI_URL = "https://api.openai.com/v1/responses"
 OPENAI_HEADERS = {
     "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
     "Content-Type": "application/json",
 }
-_openai_sess = requests.Session()  # keep-alive로 커넥션 재사용 (429 억제에 도움)
+# 🟦 [PERF-06] OpenAI 호출은 http_client.openai_http(keep-alive 풀 + 5xx 재시도 + 지연시간 집계)로 나간다
+# 🟦 [PERF-20] 레이트리밋 대기는 openai_scheduler.gpt_scheduler 한 곳에서 (예전 gpt_rate_gate / _preflight_gate / 최소 간격 락)
 
 # === 간단 디버그 (알림 한 건 추적용) ===
 import uuid, time as _t, random
@@ -227,178 +187,6 @@ def dbg(tag, **k):
         pairs = str(k)
     print(f"[DBG] {tag} {pairs}")
     
-def gpt_rate_gate():
-    """계정 단위 요청 슬롯(=RPM) 대기"""
-    global _gpt_next_slot, _gpt_rate_lock, _SLOT
-    with _gpt_rate_lock:
-        now = _t.time()                 # ← time.time() 말고 _t.time()
-        if _gpt_next_slot < now:
-            _gpt_next_slot = now
-        slot = _gpt_next_slot
-        _gpt_next_slot += _SLOT         # 다음 슬롯 예약
-
-    wait = slot - now
-    if wait > 0:
-        _t.sleep(wait) 
-def recent_high_break(highs, last_n=2):
-    if not highs or last_n <= 0:
-        return False
-    if len(highs) < last_n + 1:
-        return False
-    prev_high = max(highs[:-last_n])
-    recent_high = max(highs[-last_n:])
-    return recent_high > prev_high
-
-    
-def recent_low_break(lows, last_n=2):
-    if not lows or last_n <= 0:
-        return False
-    if len(lows) < last_n + 1:
-        return False
-    prev_low = min(lows[:-last_n])
-    recent_low = min(lows[-last_n:])
-    return recent_low < prev_low
-
-def must_capture_opportunity(rsi, stoch_rsi, macd, macd_signal, pattern, candles, trend, atr, price, bollinger_upper, bollinger_lower, support, resistance, support_distance, resistance_distance, pip_size, expected_direction=None):
-    opportunity_score = 0
-    reasons = []
-
-    
-    is_buy = expected_direction == "BUY"
-    is_sell = expected_direction == "SELL"
-
-    # 🟦 버그 수정: breakout_confirmed가 정의된 적 없이 사용되고 있었음(stoch_rsi>0.9일 때 NameError로 크래시).
-    #    "저항을 이미 뚫고 올라간 상태인가"를 의미하므로, price>resistance로 정의.
-    breakout_confirmed = (price is not None and resistance is not None and price > resistance)
-
-    # === macd_signal fallback ===
-    if macd_signal is None:
-        macd_signal = macd
-        reasons.append("⚠️ macd_signal 없음 → macd 자체 사용")
-
-    # ==================================================
-    # 1️⃣ 강한 기회 포착 (기존 로직 유지)
-    # ==================================================
-    if stoch_rsi < 0.05 and rsi > 50 and macd > macd_signal and is_buy:
-        opportunity_score += 2
-        reasons.append("💡 Stoch RSI 극단 과매도 + RSI 상단 + MACD 상승 → 강한 BUY (+2)")
-
-    if stoch_rsi < 0.1 and rsi < 40 and macd < 0 and is_sell:
-        opportunity_score += 0.5
-        reasons.append("⚠️ 약한 SELL 조건 충족 (+0.5)")
-
-    if stoch_rsi > 0.9:
-    
-        if (
-            resistance_distance < atr * 0.3
-            and not breakout_confirmed
-        ):
-    
-            opportunity_score -= 2
-            reasons.append(
-                "🔴 과열 + 저항 근접 + breakout 실패 위험"
-            )
-    
-        elif trend == "UPTREND" and macd > macd_signal:
-    
-            opportunity_score -= 0.3
-            reasons.append(
-                "⚠️ 과열이지만 continuation 유지"
-            )
-
-
-    # ==============================
-    # 🔥 2순위 방어: 극단 영역 + 패턴 없음 (칼날/천장 방어)
-    # 위치: '강한 기회 포착' 끝나고, '추세 필터' 시작 바로 위
-    # ==============================
-    
-    # BUY 방어: 극단 과매도 + 반등 패턴 없음 (+ MACD 약화) = 하락 가속(칼날) 위험
-    if is_buy and stoch_rsi < 0.1:
-        if (pattern is None or pattern == "NEUTRAL") and macd < macd_signal:
-            opportunity_score -= 2.0
-            reasons.append("🔴 (방어) Stoch RSI 극단 과매도(<0.1) + 반등 패턴 없음 + MACD 약화 → 하락 가속 위험 (opportunity -2)")
-        elif (pattern is None or pattern == "NEUTRAL"):
-            opportunity_score -= 1.0
-            reasons.append("⚠️ (방어) Stoch RSI 극단 과매도(<0.1) + 반등 패턴 없음 → 반등 신뢰도 낮음 (opportunity -1)")
-    
-    # SELL 방어(미러): 극단 과매수 + 반전 패턴 없음 (+ MACD 강세 유지) = 상승 추세 속 역방향 SELL 말림 위험
-    if is_sell and stoch_rsi > 0.9:
-        # 여기서는 BUY와 반대로, MACD가 "여전히 강세"일 때가 더 위험
-        if (pattern is None or pattern == "NEUTRAL") and macd > macd_signal:
-            opportunity_score -= 2.0
-            reasons.append("🔴 (방어) Stoch RSI 극단 과매수(>0.9) + 반전 패턴 없음 + MACD 강세 → 상승 지속 위험(SELL 말림) (opportunity -2)")
-        elif (pattern is None or pattern == "NEUTRAL"):
-            opportunity_score -= 1.0
-            reasons.append("⚠️ (방어) Stoch RSI 극단 과매수(>0.9) + 반전 패턴 없음 → 반전 신뢰도 낮음 (opportunity -1)")
-    # ==================================================
-    # 4️⃣ 추세 필터 (가장 중요)
-    # ==================================================
-    highs = list(candles["high"].tail(20).astype(float).values)
-    lows  = list(candles["low"].tail(20).astype(float).values)
-    if is_buy and trend == "DOWNTREND":
-    
-        opportunity_score -= 1.5
-    
-        reasons.append(
-            "🟠 하락 추세 + BUY 역방향 → continuation 신뢰도 낮음 (-1.5)"
-        )
-
-    if is_sell and trend == "UPTREND":
-    
-        opportunity_score -= 1.5
-    
-        reasons.append(
-            "🟠 상승 추세 + SELL 역방향 → continuation 신뢰도 낮음 (-1.5)"
-        )
-
-    # BUY mirror penalty: overbought + no higher-high recently
-    if is_buy and trend == "UPTREND":
-        if rsi > 65:
-            if not recent_high_break(highs, last_n=2):
-                opportunity_score -= 0.5
-                reasons.append(
-                    "⚠️ 과매수 이후 고점 갱신 실패 → 되밀림 위험 BUY 감점 (-0.5)"
-                )
-    
-    # SELL mirror penalty: oversold + no lower-low recently
-    if is_sell and trend == "DOWNTREND":
-        if rsi < 35:
-            if not recent_low_break(lows, last_n=2):
-                opportunity_score -= 0.5
-                reasons.append(
-                    "⚠️ 과매도 이후 저점 갱신 실패 → 반등 위험 SELL 감점 (-0.5)"
-                )
-    # ==================================================
-    # 6️⃣ 캔들 패턴
-    # ==================================================
-    if is_buy and pattern in ["HAMMER", "BULLISH_ENGULFING", "PIERCING_LINE"]:
-        opportunity_score += 0.5
-        reasons.append(f"🕯 BUY 패턴 {pattern} (0.5)")
-
-    if is_sell and pattern in ["SHOOTING_STAR", "BEARISH_ENGULFING", "DARK_CLOUD_COVER"]:
-        opportunity_score += 0.5
-        reasons.append(f"🕯 SELL 패턴 {pattern} (0.5)")
-
-    # ==================================================
-    # 7️⃣ ATR 필터
-    # ==================================================
-    if atr is not None and atr < 0.001:
-        opportunity_score -= 0.5
-        reasons.append("⚠️ ATR 매우 낮음 → 변동성 부족 (-0.5)")
-
-    # ==================================================
-    # 8️⃣ 최종 방향 충돌 필터 (조기 차단)
-    # ==================================================
-    if is_buy and opportunity_score < 0:
-        opportunity_score -= 1.5
-        reasons.append("⚠️ BUY 기대 방향 대비 opportunity_score 역행 → 신호 약화 (-1.5)")
-    
-    if is_sell and opportunity_score < 0:
-        opportunity_score -= 1.5
-        reasons.append("⚠️ SELL 기대 방향 대비 opportunity_score 역행 → 신호 약화 (-1.5)")
-
-    return opportunity_score, reasons
-    
 def get_enhanced_support_resistance(candles, price, atr, timeframe, pair, window=20, min_touch_count=2):
     # 단타(3h/10pip) 최적화된 창 길이
     window_map = {'M5': 72, 'M15': 32, 'M30': 48, 'H1': 48, 'H4': 60}
@@ -406,10 +194,6 @@ def get_enhanced_support_resistance(candles, price, atr, timeframe, pair, window
     
     if price is None:
         return None, None
-    highs = candles["high"].tail(window).astype(float)
-    lows = candles["low"].tail(window).astype(float)
-    df = candles.tail(window).copy()
-
     pip = pip_value_for(pair)
     round_digits = int(abs(np.log10(pip)))
 
@@ -427,72 +211,39 @@ def get_enhanced_support_resistance(candles, price, atr, timeframe, pair, window
     if window < (2 * order + 1):  # 이론적 안전 장치
         order = max(2, (window - 1) // 2)
     
-    # 초기화 (UnboundLocalError 방지)
-    support_rows = pd.DataFrame(columns=candles.columns)
-    resistance_rows = pd.DataFrame(columns=candles.columns)
-
-
     # 기본값
     price = float(price)
-    price_rounded = round(price, round_digits)
-
-    # 🔍 스윙 고점/저점 기반 지지선/저항선 추출
-    def find_local_extrema(candles, order=3):
-        highs = candles["high"].values
-        lows = candles["low"].values
-        resistance = []
-        support = []
-
-        for i in range(order, len(highs) - order):
-            if highs[i] == max(highs[i - order:i + order + 1]):
-                resistance.append(highs[i])
-            if lows[i] == min(lows[i - order:i + order + 1]):
-                support.append(lows[i])
-        return support, resistance
-
-    # 🎯 가까운 레벨 병합 (군집화)
-    def cluster_levels(levels, *, pip: float, threshold_pips: int = 6, min_touch_count: int = 2):
-        """
-        인접 레벨 병합(클러스터) + 최소 터치 수 필터
-        - threshold_pips: 단타는 6~8pip 권장(기본 6)
-        - 통화쌍/가격 스케일에 무관하게 동작
-        """
-        if not levels:
-            return []
-
-        threshold = threshold_pips * pip
-        buckets = []  # [{ "val": float, "cnt": int }]
-
-        for lv in sorted(levels):
-            if not buckets or abs(buckets[-1]["val"] - lv) > threshold:
-                # 새 클러스터 시작
-                buckets.append({"val": lv, "cnt": 1})
-            else:
-                # 가까우면 평균으로 병합 + 터치 수 증가
-                buckets[-1]["val"] = (buckets[-1]["val"] + lv) / 2.0
-                buckets[-1]["cnt"] += 1
 
-        # 최소 터치 수 필터 적용
-        return [b["val"] for b in buckets if b["cnt"] >= min_touch_count]
-   
+    # 🟦 [PERF-15] 스윙 고점/저점 + 레벨 군집을 NumPy로 (indicators.swing_flags / cluster_levels — 결과 레벨은 예전과 같다)
+    #    후보가 모자랄 때 쓰는 2배 창까지 한 번에 본다: 2배 창 꼬리에서 스윙 판정을 한 번만 하고
+    #    기본 창 결과는 그중 "앞뒤 order봉이 모두 기본 창 안에 있는 위치"만 고른다 (order가 같으면 판정도 같다).
+    threshold = 6 * cluster_pip
+    wide = candles.tail(window * 2)
+    highs = wide["high"].to_numpy(dtype=np.float64)
+    lows = wide["low"].to_numpy(dtype=np.float64)
+    n2 = len(highs)
+    n1 = min(window, n2)
+    order2 = max(2, min(3, (window * 2) // 10))
+    is_res2, is_sup2 = swing_flags(highs, lows, order2)
+    if order2 == order:
+        inner = np.zeros(n2, dtype=bool)
+        inner[n2 - n1 + order:max(n2 - order, n2 - n1 + order)] = True
+        is_res, is_sup = is_res2 & inner, is_sup2 & inner
+    else:
+        is_res, is_sup = (np.r_[np.zeros(n2 - n1, dtype=bool), f]
+                          for f in swing_flags(highs[n2 - n1:], lows[n2 - n1:], order))
 
-    # 📌 스윙 지지/저항 구하기
-    support_levels, resistance_levels = find_local_extrema(df, order=order)
-    support_levels    = cluster_levels(support_levels,    pip=cluster_pip, threshold_pips=6, min_touch_count=min_touch_count)
-    resistance_levels = cluster_levels(resistance_levels, pip=cluster_pip, threshold_pips=6, min_touch_count=min_touch_count)
-    
-    # >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
-    # [A] 후보 부족 시 창을 2배로 확장해 1회 재시도 (단타용)
+    # 📌 스윙 지지/저항 구하기 (가까운 레벨 병합 + 최소 터치 수 필터)
+    support_levels = cluster_levels(lows[is_sup], threshold, min_touch_count)
+    resistance_levels = cluster_levels(highs[is_res], threshold, min_touch_count)
+
+    # [A] 후보 부족 시 창을 2배로 확장한 결과 사용 (단타용)
     if (not support_levels) or (not resistance_levels):
-        df2 = candles.tail(window * 2).copy()
-        order2 = max(2, min(3, (window * 2) // 10))
         if (window * 2) >= (2 * order2 + 1):
-            s2, r2 = find_local_extrema(df2, order=order2)
-            s2 = cluster_levels(s2, pip=cluster_pip, threshold_pips=6, min_touch_count=min_touch_count)
-            r2 = cluster_levels(r2, pip=cluster_pip, threshold_pips=6, min_touch_count=min_touch_count)
+            s2 = cluster_levels(lows[is_sup2], threshold, min_touch_count)
+            r2 = cluster_levels(highs[is_res2], threshold, min_touch_count)
             if s2: support_levels = s2
             if r2: resistance_levels = r2
-    # <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
     min_distance = max(6 * pip, 0.8 * last_atr)  # 기존 10*pip, 1.2*ATR → 6*pip, 0.8*ATR
 
 
@@ -505,47 +256,6 @@ def get_enhanced_support_resistance(candles, price, atr, timeframe, pair, window
     return round(support_price, round_digits), round(resistance_price, round_digits)
 
 
-def additional_opportunity_score(rsi, stoch_rsi, macd, macd_signal, pattern, trend, signal):
-    """ 기존 필터 이후, 추가 가중치 기반 보완 점수 """
-    score = 0
-    reasons = []
-    is_buy = signal == "BUY"
-    is_sell = signal == "SELL"
-
-    if macd_signal is None:
-        macd_signal = macd
-        reasons.append("⚠️ macd_signal 없음 → macd 사용")
-
-    # BUY 측 (미러링)
-    if is_buy and (macd > 0) and (macd < macd_signal):
-        if (stoch_rsi >= 0.80) or (rsi >= 65):
-            score -= 0.5
-            reasons.append("⚠️ BUY 중 MACD 약화 + 과열 구간 → 되돌림 위험 (감점 -0.5)")
-    
-    # SELL 측 (미러링)
-    if is_sell and (macd < 0) and (macd > macd_signal):
-        if (stoch_rsi <= 0.25) or (rsi <= 45):
-            score -= 0.5
-            reasons.append("⚠️ SELL 중 MACD 반등 + 과매도 구간 → 되돌림 위험 (감점 -0.5)")
-
-        # ✅ NEUTRAL 구간 하락 재개(continuation) SELL 가점
-    # - trend는 NEUTRAL이라도 "되돌림 후 재하락"이면 숏 기회로 봄
-    # - 조건: MACD 약세 유지 + RSI 되돌림(50+) + Stoch 중립~상단(되돌림 완료 구간)
-    if is_sell and (trend == "NEUTRAL"):
-        if (macd < 0) and (macd < macd_signal) and (rsi >= 50) and (stoch_rsi >= 0.55):
-            score += 1.0
-            reasons.append("✅ NEUTRAL이지만 되돌림 후 하락 재개(continuation) → SELL 가점 +1.0")
-
-        # ✅ NEUTRAL continuation BUY 가점 (미러링)
-    # - trend는 NEUTRAL이어도 "되돌림 후 상승 재개"면 롱 기회로 봄
-    if is_buy and (trend == "NEUTRAL"):
-        if (macd > 0) and (macd > macd_signal) and (rsi <= 50) and (stoch_rsi <= 0.45):
-            score += 1.0
-            reasons.append("✅ NEUTRAL이지만 되돌림 후 상승 재개(continuation) → BUY 가점 +1.0")
-
-    return score, reasons
-
-
 # === pip/거리 헬퍼 ===
 def pip_value_for(pair: str) -> float:
     """
@@ -566,7 +276,19 @@ def pip_value_for(pair: str) -> float:
     if p.endswith("/JPY") or p.endswith("JPY"):
         return 0.01
     return 0.0001
-    
+
+
+def price_digits_for(pair: str) -> int:
+    """가격 표시 자릿수 (payload 반올림용). 주식은 센트(2), FX는 pip 자릿수 (EURUSD=4, JPY계열=2)."""
+    # 🟥 [FIX-E8] 주식에서 자릿수가 뭉개지던 버그.
+    #    pip_value_for(주식) = max(0.01, 가격×0.0001)이라 $500짜리 주식은 pip=0.05가 되고
+    #    log10(0.05)≈-1.3 → int(abs(...))=1 → GPT payload의 지지/저항·OHLC가
+    #    소수 1자리로 반올림돼 정밀도가 통째로 날아갔다.
+    #    → 주식은 항상 센트 단위(2자리)를 쓴다.
+    if is_stock_pair(pair):
+        return 2
+    return int(abs(np.log10(pip_value_for(pair))))
+
 # ★ 추가: ATR을 pips로 변환
 def atr_in_pips(atr_value: float, pair: str) -> float:
     pv = pip_value_for(pair)
@@ -641,33 +363,6 @@ def calculate_realistic_tp_sl(price, atr, pip_value, risk_reward_ratio=1, min_pi
     tp_price = price + (atr_pips * pip_value * risk_reward_ratio)
     return round(tp_price, 5), round(sl_price, 5), atr_pips
 
-def conflict_check(rsi, pattern, trend, signal):
-    """
-    추세-패턴-시그널 충돌 방지 필터 (V2 최종)
-    """
-
-    # 1️⃣ 기본 추세-패턴 충돌 방지
-    if rsi > 85 and pattern in ["SHOOTING_STAR", "BEARISH_ENGULFING"] and trend == "UPTREND":
-        return True
-    if rsi < 15 and pattern in ["HAMMER", "BULLISH_ENGULFING"] and trend == "DOWNTREND":
-        return True
-
-    # 2️⃣ 🟥 [FIX-B7] 주석과 코드가 정반대였다.
-    #    주석은 "역방향이면 관망"인데 코드는 '같은 방향'일 때 return False(충돌 없음)였다.
-    #    코드 쪽이 의도상 맞다(패턴이 없어도 신호와 추세가 같으면 충돌 아님).
-    #    → 주석을 실제 동작에 맞게 고치고, 조기 return이 아래 3️⃣ 규칙을 건너뛰지 않도록
-    #      정리한다(현재 조건상 겹치지는 않지만, 나중에 규칙을 추가할 때 함정이 된다).
-    if pattern == "NEUTRAL":
-        if (signal == "BUY" and trend == "UPTREND") or (signal == "SELL" and trend == "DOWNTREND"):
-            return False   # 패턴은 없지만 신호와 추세가 일치 → 충돌 아님
-
-    # 3️⃣ 기타 보수적 예외 추가
-    if trend == "UPTREND" and signal == "SELL" and rsi > 80:
-        return True
-    if trend == "DOWNTREND" and signal == "BUY" and rsi < 20:
-        return True
-
-    return False
     
 def check_recent_opposite_signal(pair, current_signal, within_minutes=30, *,
                                  strategy=None, timeframe=None, score=None):
@@ -720,75 +415,6 @@ def check_recent_opposite_signal(pair, current_signal, within_minutes=30, *,
     return conflict
 
 
-
-def calculate_structured_sl_tp(entry_price, direction, symbol, support, resistance, pip_size, atr=None):
-    """
-    🟥 [FIX-B8] 구조적(지지/저항 기반) SL/TP.
-
-    기존 구현은 TP를 항상 `SL거리 × 1.8`로 만들었기 때문에 r_ratio가 수학적으로
-    언제나 정확히 1.8이었다. 그런데 호출부에서는 `if r_ratio < 1.4: -4.0점` 감점을
-    걸어놨다 — 절대 발동할 수 없는 죽은 감점이었다.
-    → r_ratio를 "구조상 실제로 얻을 수 있는 손익비"로 계산하도록 바꾼다.
-       즉 TP는 저항(BUY)/지지(SELL)라는 실제 구조 목표에 두고, 그 목표까지의 거리와
-       SL 거리의 비율을 r_ratio로 본다. 구조 목표가 없으면 기존 1.8 폴백을 쓴다.
-    """
-    buffer = get_buffer_by_symbol(symbol, atr=atr)
-
-    if direction == 'BUY':
-        sl = support - buffer if support is not None else None
-        structural_tp = resistance
-    else:
-        sl = resistance + buffer if resistance is not None else None
-        structural_tp = support
-
-    # SL을 못 구하면 (지지/저항 없음) 판정 불가 — 중립값 반환
-    if sl is None or entry_price is None or abs(sl - entry_price) < 1e-12:
-        print(f"[SL/TP 계산] {symbol} 구조 SL 산출 불가(support={support}, resistance={resistance}) → r_ratio 중립(1.8) 처리")
-        return sl, None, 1.8
-
-    risk = abs(entry_price - sl)
-
-    if structural_tp is not None:
-        reward = abs(structural_tp - entry_price)
-        # 🟥 [FIX-B8b] "반대편에 있으면 폴백"이라고 써놓고 실제 방향 체크가 없었다.
-        #    BUY인데 저항이 이미 진입가 아래(=돌파 후 낡은 값)면 tp가 진입가보다 낮아지고,
-        #    abs() 때문에 r_ratio는 오히려 커져서 감점을 우회한다.
-        wrong_side = (
-            (direction == 'BUY' and structural_tp <= entry_price)
-            or (direction != 'BUY' and structural_tp >= entry_price)
-        )
-        if wrong_side or reward < risk * 0.1:
-            tp = entry_price + risk * 1.8 if direction == 'BUY' else entry_price - risk * 1.8
-        else:
-            tp = structural_tp
-    else:
-        tp = entry_price + risk * 1.8 if direction == 'BUY' else entry_price - risk * 1.8
-
-    r_ratio = abs(tp - entry_price) / risk
-
-    # ✅ 로그 출력
-    print(f"[SL/TP 계산 로그] symbol={symbol}, direction={direction}")
-    print(f" - entry_price: {entry_price}")
-    print(f" - support: {support}, resistance: {resistance}, buffer: {buffer}")
-    print(f" - SL: {sl}, TP: {tp}, 손익비(r_ratio): {r_ratio:.2f}")
-    return sl, tp, r_ratio
-
-def get_buffer_by_symbol(symbol, atr=None):
-    # 🟦 주식: 가격비례 pip(10*pip_value_for)는 ATR 대비 너무 작아짐
-    #    (예: TSLA 10*0.03=0.30달러인데 ATR이 10달러면 노이즈에 바로 SL 털림)
-    #    → ATR이 있으면 ATR*0.15를 버퍼로 사용, 없으면 기존 방식으로 폴백
-    if is_stock_pair(symbol):
-        try:
-            atr_val = float(atr.iloc[-1]) if hasattr(atr, "iloc") else float(atr or 0)
-        except Exception:
-            atr_val = 0.0
-        if atr_val > 0:
-            return atr_val * ALPACA_SL_BUFFER_ATR_MULT
-        return 10 * pip_value_for(symbol)
-
-    # ===== 기존 FX 로직 (변경 없음, pip_value_for로 통합되어 있던 부분) =====
-    return 10 * pip_value_for(symbol)
-
 def get_multi_timeframe_context(pair):
     try:
         # 🟦 4h/5m 캔들 조회를 병렬로 실행 (순차 대기 시간 단축)
@@ -797,1058 +423,157 @@ def get_multi_timeframe_context(pair):
             fut_m5 = ex.submit(get_ohlcv, pair, interval='5m', limit=30)
             df_h4 = fut_h4.result()
             df_m5 = fut_m5.result()
-
-        h4_last = df_h4['close'].iloc[-1]
-
-        h4_ema = ta.trend.ema_indicator(
-            df_h4['close'],
-            window=20
-        ).iloc[-1]
-
-        if pd.isna(h4_ema):
-            h4_trend = "데이터부족"
-        elif h4_last > h4_ema:
-            h4_trend = "상승세(Bullish)"
-        else:
-            h4_trend = "하락세(Bearish)"
-
-        m5_rsi = ta.momentum.rsi(
-            df_m5['close'],
-            window=14
-        ).iloc[-1]
-
-        if pd.isna(m5_rsi):
-            print("[WARN] M5 RSI = NaN")
-            m5_rsi_text = "N/A"
-            m5_state = "데이터부족"
-        else:
-            m5_rsi_text = f"{m5_rsi:.2f}"
-
-            if m5_rsi >= 70:
-                m5_state = "과매수"
-            elif m5_rsi <= 30:
-                m5_state = "과매도"
-            else:
-                m5_state = "중립"
-
-        return (
-            f"[H4 추세]: {h4_trend} (EMA20 대비)\n"
-            f"[M5 RSI]: {m5_rsi_text} ({m5_state})"
-        )
+        return _mtf_context_text(df_h4, df_m5)
 
     except Exception as e:
         print(f"[ERROR] get_multi_timeframe_context: {e}")
         return f"타임프레임 데이터 요약 실패: {e}"
 
-def score_signal_with_filters(rsi, macd, macd_signal, stoch_rsi, prev_stoch_rsi, trend, prev_trend, signal, liquidity, pattern, pair, candles, atr, price, bollinger_upper, bollinger_lower, support, resistance, support_distance, resistance_distance, pip_size, macd_trend=None, expected_direction=None, strategy_name=None):
-    signal_score = 0
-    opportunity_score = 0  
-    reasons = []
 
-    
-    score, base_reasons = must_capture_opportunity(rsi, stoch_rsi, macd, macd_signal, pattern, candles, trend, atr, price, bollinger_upper, bollinger_lower, support, resistance, support_distance, resistance_distance, pip_size, expected_direction=signal)
-    extra_score, extra_reasons = additional_opportunity_score(rsi, stoch_rsi, macd, macd_signal, pattern, trend, signal)
-
-    # ★ 통합 임계치 준비 (pip/ATR 기반)
-    thr = dynamic_thresholds(pair, atr)
-    pv = thr["pip_value"]           # pip 크기 (JPY=0.01, 그 외=0.0001)
-    NEAR_PIPS = thr["near_pips"]    # 지지/저항 근접 금지 임계(pips)
-    close = None
+async def get_multi_timeframe_context_async(pair):
+    """🟦 [PERF-07] 4h/5m 캔들을 이벤트 루프에서 동시에 await (스레드 없이)"""
     try:
-        if candles is not None and not candles.empty and "close" in candles.columns:
-            close = float(candles["close"].iloc[-1])
-    except Exception:
-        close = None
-    
-    # price가 없으면 close로 대체, close가 없으면 price로 대체
-    if price is None:
-        price = close
-    if close is None:
-        close = price
-    
-    is_buy = expected_direction == "BUY"
-    is_sell = expected_direction == "SELL"
-
-    # RSI 중립 구간 (45~55) + 추세 중립 → 공통 감점
-    if 45 <= rsi <= 55 and trend == "NEUTRAL":
-        score -= 0.3
-        reasons.append("⚠️ RSI 중립(45~55) + 트렌드 NEUTRAL → 진입 신호 약화 (-0.3)")
-    
-    # =========================
-    # BUY 전용 감점 로직
-    # =========================
-    if is_buy:
-        if (
-            rsi > 40
-            and stoch_rsi > 0.4
-            and macd < macd_signal
-            and trend != "UPTREND"
-        ):
-            score -= 1.0
-            reasons.append(
-                "📉 RSI & Stoch RSI 반등 중이나 MACD 약세 + 추세 불확실 → BUY 감점 (-1.0)"
-            )
-    
-    # =========================
-    # SELL 전용 감점 로직
-    # =========================
-    elif is_sell:
-        if (
-            rsi < 60
-            and stoch_rsi < 0.6
-            and macd > macd_signal
-            and trend != "DOWNTREND"
-        ):
-            score -= 1.0
-            reasons.append(
-                "📈 RSI & Stoch RSI 하락 중이나 MACD 강세 + 추세 불확실 → SELL 감점 (-1.0)"
-            )
-    
-    # === SL/TP 계산 및 손익비 조건 필터 ===
-    entry_price = price
-    direction = signal
-    symbol = pair
-
-    sl, tp, r_ratio = calculate_structured_sl_tp(entry_price, direction, symbol, support, resistance, pv, atr=atr)
-
-    # 🟥 [FIX-B8] 이제 r_ratio가 실제 구조 손익비를 반영하므로 이 감점이 살아난다.
-    #    다만 -4.0은 다른 항목(대부분 ±1~2)에 비해 과도해서 단독으로 점수를 지배한다.
-    #    → -2.0으로 낮추고, 구간을 나눠 완만하게 적용한다.
-    if r_ratio < 1.0:
-        signal_score -= 2.0
-        reasons.append("📉 구조 손익비 매우 낮음 (%.2f < 1.0) → 감점 -2.0" % r_ratio)
-    elif r_ratio < 1.4:
-        signal_score -= 1.0
-        reasons.append("📉 구조 손익비 낮음 (%.2f < 1.4) → 감점 -1.0" % r_ratio)
-
-    from datetime import datetime
-    from zoneinfo import ZoneInfo
-    
-    now_atlanta = datetime.now(ZoneInfo("America/New_York"))
-    atlanta_hour = now_atlanta.hour
-    
-    # 🟥 [FIX-B9] 19~23시(ET) 감점은 FX 전용이다.
-    #    미국 주식 정규장은 09:30~16:00 ET라 이 시간대에 주식 알림이 올 수 없고,
-    #    프리/애프터 알림이 들어오면 -3점이 통째로 붙어버린다.
-    #    주식엔 이미 별도의 시간대 게이트(점심/15:30/금요일)가 있으므로 여기선 FX만 적용한다.
-    if (not is_stock_pair(pair)) and 19 <= atlanta_hour < 23:
-        signal_score -= 3
-        reasons.append("🌙 FX 19~23시(ET) 유동성 저하 구간 감점 (-3)")
-        
-    # ====================================
-    # 🟦 -0.02는 FX 스케일(가격 1.0~1.5대) 전용 절대값이라, 주식(가격 수십~수천)에서는
-    #    MACD가 조금만 음수여도 항상 걸려서 의미 없는 상시 감점이 됨. 주식은 ATR 비례로 교체.
-    # 🟦 추가 수정: "MACD가 음수다" 자체와 "MACD가 음수인데 계속 나빠지고 있다"는 다르다.
-    #    음수여도 최근 3개 값이 계속 좋아지고 있으면(회복 중) 이건 약세가 아니라 회복 신호라
-    #    패널티를 절반으로 줄인다 (완전히 없애지는 않음 — 아직 양전환 전이라는 리스크는 남아있음).
-    _macd_recovering = (
-        macd_trend and len(macd_trend) >= 3
-        and macd_trend[-1] > macd_trend[-2] > macd_trend[-3]
-    )
-    _macd_weak_thresh = -(atr * 0.02) if (is_stock_pair(pair) and atr) else -0.02
-    if macd < _macd_weak_thresh and trend != "DOWNTREND":
-        if _macd_recovering:
-            score -= 0.75
-            reasons.append("🔻 MACD 음수지만 회복 중 → 약세 판정 완화 (감점 -0.75, 기존 -1.5)")
-        else:
-            score -= 1.5
-            reasons.append("🔻 MACD 약세 + 추세 모호 → 신호 신뢰도 낮음 (감점 -1.5)")
-
-    # RSI + Stoch RSI 과매수 상태에서 SELL 진입 위험
-    if signal == "SELL" and rsi > 70 and stoch_rsi > 0.85:
-        score -= 1.5
-        reasons.append("🔻 RSI + Stoch RSI 과매수 → SELL 진입 위험 (감점 -1.5)")
-    # (추세 일치 가점 바로 아래에 추가 추천)
-    # ✅ NEUTRAL인데도 하락 전환/초기 하락 지속이면 SELL 기회 가점
-    if signal == "SELL" and trend == "NEUTRAL":
-        # 전환/지속의 “증거”를 지표로 강제: MACD 약세 + Stoch 상단권 + RSI 50+ (되돌림 후 하락 재개 자리)
-        if (macd < 0) and (macd < macd_signal) and (stoch_rsi >= 0.6) and (rsi >= 50):
-            signal_score += 1.5
-            reasons.append("✅ NEUTRAL 구간이지만 MACD 약세 + 되돌림(고Stoch) → 하락 재개 SELL 가점 +1.5")
-        
-    # ⚠️ RSI + Stoch RSI 과매도 + 패턴 없음 or 애매한 추세 → 바닥 예측 위험
-    if rsi < 30 and stoch_rsi < 0.15 and (pattern is None or trend == "NEUTRAL"):
-        score -= 1.5
-        reasons.append("⚠️ RSI + Stoch RSI 과매도 + 반등 근거 부족 → 진입 위험 (감점 -1.5)")
-
-    if signal == "BUY" and stoch_rsi < 0.15 and prev_stoch_rsi > 0.3 and (macd < 0 or trend != "UPTREND"):
-        score -= 1.5
-        reasons.append("⚠️ Stoch RSI 급락 + MACD/추세 불확실 → 하락 지속 우려 (감점 -1.5)")
-    # 장대 음봉 직후 + 반등 신호 없음 ➝ 위험
-    if signal == "BUY" and candles["close"].iloc[-1] < candles["open"].iloc[-1] and \
-       (candles["open"].iloc[-1] - candles["close"].iloc[-1]) > (candles["high"].iloc[-2] - candles["low"].iloc[-2]) * 0.9 and \
-       pattern is None and trend != "UPTREND":
-        score -= 1.5
-        reasons.append("📉 장대 음봉 직후 + 반등 패턴 없음 + 추세 불확실 ➝ BUY 진입 위험 (감점 -1.5)")
-
-    # 장대 양봉 직후 + 반전 신호 없음 ➝ 위험
-    if signal == "SELL" and candles["close"].iloc[-1] > candles["open"].iloc[-1] and \
-       (candles["close"].iloc[-1] - candles["open"].iloc[-1]) > (candles["high"].iloc[-2] - candles["low"].iloc[-2]) * 0.9 and \
-       pattern is None and trend != "DOWNTREND":
-        score -= 1.5
-        reasons.append("📈 장대 양봉 직후 + 반전 패턴 없음 + 추세 불확실 ➝ SELL 진입 위험 (감점 -1.5)")
-
-    # 🔻 최근 캔들 흐름이 진입 방향과 반대인 경우 경고 감점
-    if signal == "BUY" and trend != "UPTREND":
-    
-        # 완전 약세 흐름만 제한
-        if (
-            candles["close"].iloc[-1] < candles["open"].iloc[-1] and
-            candles["close"].iloc[-2] < candles["open"].iloc[-2] and
-            rsi < 40
-        ):
-    
-            score -= 0.5
-    
-            reasons.append(
-                "⚠ 최근 약세 흐름 지속 → BUY continuation 약화 (-0.5)"
-            )
-
-    if signal == "SELL" and trend != "DOWNTREND":
-    
-        # 완전 강세 흐름만 제한
-        if (
-            candles["close"].iloc[-1] > candles["open"].iloc[-1] and
-            candles["close"].iloc[-2] > candles["open"].iloc[-2] and
-            rsi > 60
-        ):
-    
-            score -= 0.5
-    
-            reasons.append(
-                "⚠ 최근 강세 흐름 지속 → SELL continuation 약화 (-0.5)"
-            )
-
-    # 🟥 [FIX-B4] 추세 전환 직후 감점 — 중복 제거.
-    #    기존엔 완전히 동일한 조건(UPTREND & prev DOWNTREND & BUY)에 -0.5와 -1.0이
-    #    연달아 적용돼 합계 -1.5가 걸렸다. SELL 미러 조건도 마찬가지.
-    #    조건이 같은데 블록만 두 개였던 것이라 하나로 합친다.
-    if trend == "UPTREND" and prev_trend == "DOWNTREND" and signal == "BUY":
-        score -= 1.0
-        reasons.append("🔄 하락→상승 추세 전환 직후 BUY → 조기 진입 경고 (감점 -1.0)")
-
-    if trend == "DOWNTREND" and prev_trend == "UPTREND" and signal == "SELL":
-        score -= 1.0
-        reasons.append("🔄 상승→하락 추세 전환 직후 SELL → 조기 진입 경고 (감점 -1.0)")
-    
-
-    
-    signal_score += score + extra_score
-    reasons.extend(base_reasons + extra_reasons)
-    # ✅ 캔들 패턴과 추세 강한 일치 시 보너스 점수 부여
-    if signal == "BUY" and trend == "UPTREND" and pattern in ["BULLISH_ENGULFING", "HAMMER", "PIERCING_LINE"]:
-        signal_score += 1
-        opportunity_score += 0.5  # ✅ 패턴-추세 일치 시 추가 점수
-        reasons.append("✅ 강한 상승추세 + 매수 캔들 패턴 일치 → 보너스 + 기회 점수 강화 가점 +1.5")
-
-    elif signal == "SELL" and trend == "DOWNTREND" and pattern in ["BEARISH_ENGULFING", "SHOOTING_STAR", "DARK_CLOUD_COVER"]:
-        signal_score += 1
-        opportunity_score += 0.5  # ✅ 패턴-추세 일치 시 추가 점수
-        reasons.append("✅ 강한 하락추세 + 매도 캔들 패턴 일치 → 보너스 + 기회 점수 강화 가점 +1.5")
-        
-        # ✅ 거래 제한 시간 필터 (애틀랜타 기준)
-        now_atlanta = datetime.now(ZoneInfo("America/New_York"))
-        
-        atlanta_hour = now_atlanta.hour
-        atlanta_minute = now_atlanta.minute
-        
-        # ❌ 거래 금지 시간대 정의
-        #is_restricted = (
-        #    (3 <= atlanta_hour < 5) or  # 새벽 3~5시
-        #    (atlanta_hour == 11) or  # 오전 11시부터 오후 2시
-        #    (atlanta_hour == 12) or  # 
-        #    (13 <= atlanta_hour < 14) or  # 
-        #    (16 <= atlanta_hour < 19)  # 오후 4시부터 오후 7시
-        #)
-        
-        #if is_restricted:
-        #    print("❌ 현재 시간은 거래 제한 시간대입니다. GPT 호출 생략")
-        #    return 0, reasons
-
-
-    
-    # ▼▼▼ 여기에 붙여넣기 ▼▼▼
-    digits = int(abs(np.log10(pip_value_for(pair))))   # EURUSD=4, JPY계열=2
-    pv = pip_value_for(pair)
-
-    # 인자로 받은 값을 원시값으로 잡고, 표시는 반올림
-    sup_raw = float(support)
-    res_raw = float(resistance)
-
-    sup = round(sup_raw, digits)
-    res = round(res_raw, digits)
-
-    # 거리는 반올림 전 원시값으로 계산(정확도 ↑)
-    dist_to_res_pips = abs(res_raw - price) / pv
-    dist_to_sup_pips = abs(price - sup_raw) / pv
-    
-
-    conflict_flag = conflict_check(rsi, pattern, trend, signal)
-
-    # 보완 조건 정의: 극단적 RSI + Stoch RSI or MACD 반전 조짐
-    extreme_buy = signal == "BUY" and rsi < 25 and stoch_rsi < 0.2
-    extreme_sell = signal == "SELL" and rsi > 75 and stoch_rsi > 0.8
-    macd_reversal_buy = signal == "BUY" and macd > macd_signal and trend == "DOWNTREND"
-    macd_reversal_sell = signal == "SELL" and macd < macd_signal and trend == "UPTREND"
-
-    # 완화된 조건: 강력한 역추세 진입 근거가 있을 경우 관망 무시
-    if conflict_flag:
-        if extreme_buy or extreme_sell or macd_reversal_buy or macd_reversal_sell:
-            reasons.append("🔄 추세-패턴 충돌 BUT 강한 역추세 조건 충족 → 진입 허용")
-        else:
-            signal_score -= 1
-            reasons.append("⚠️ 추세+패턴 충돌 + 보완 조건 미충족 → 감점-1")
-
-        # === 저항/지지 근접 추격 진입 금지 규칙 ===
-    # BUY: 저항 3pip 이내면 금지(FX). 주식은 3pip(가격비례, 예 TSLA $0.09)가 너무 타이트해 ATR*0.15로 대체.
-    _near_atr_val = float(atr.iloc[-1]) if hasattr(atr, "iloc") else float(atr or 0)
-
-    # 🟦 돌파 확정 버퍼: 주식은 2pip(예: TSLA $0.06)가 틱 노이즈 수준이라 ATR*0.05로 대체.
-    #    너무 크게 잡으면(예 ATR*0.15=$1.5) 돌파 인식이 늦어지므로 0.05 비율 사용.
-    if is_stock_pair(pair):
-        _breakout_buf = _near_atr_val * 0.05
-    else:
-        # ===== 기존 FX 로직 (변경 없음) =====
-        _breakout_buf = 2 * pip_value_for(pair)
-
-    if signal == "BUY":
-        dist_to_res_pips = pips_between(price, resistance, pair)
-        if is_stock_pair(pair):
-            near_res_block = (resistance is not None and price is not None
-                               and abs(resistance - price) < (_near_atr_val * 0.15))
-        else:
-            # ===== 기존 FX 로직 (변경 없음) =====
-            near_res_block = dist_to_res_pips < 3
-        if near_res_block:
-            signal_score -= 2
-            reasons.append(f"📉 저항선 근접 → 신중 진입 필요 (감점-2) [dist={dist_to_res_pips:.1f}pip]")
-
-        last2 = candles.tail(2)
-        over1 = (last2.iloc[-1]['close'] > resistance + _breakout_buf) if not last2.empty else False
-        over2 = (len(last2) > 1 and last2.iloc[-2]['close'] > resistance + _breakout_buf) if not last2.empty else False
-        confirmed_breakout_up = over1 or (over1 and over2)
-
-
-    # SELL: 지지 3pip 이내면 금지(FX). 주식은 동일하게 ATR*0.15로 대체.
-    if signal == "SELL":
-        dist_to_sup_pips = pips_between(price, support, pair)
-        if is_stock_pair(pair):
-            near_sup_block = (support is not None and price is not None
-                               and abs(price - support) < (_near_atr_val * 0.15))
-        else:
-            # ===== 기존 FX 로직 (변경 없음) =====
-            near_sup_block = dist_to_sup_pips < 3
-        if near_sup_block:
-            signal_score -= 1.5
-            reasons.append(f"📉 지지선 근접 → 신중 진입 필요 (감점-1.5) [dist={dist_to_sup_pips:.1f}pip]")
-
-        last2 = candles.tail(2)
-        under1 = (last2.iloc[-1]['close'] < support - _breakout_buf) if not last2.empty else False
-        under2 = (len(last2) > 1 and last2.iloc[-2]['close'] < support - _breakout_buf) if not last2.empty else False
-        confirmed_breakdown = under1 or (under1 and under2)
-
-
-        # ✅ RSI, MACD, Stoch RSI 모두 중립 + Trend도 NEUTRAL → 횡보장 진입 방어
-    # ==================================================
-    # 1️⃣ 완전 중립 횡보장 방어
-    # ==================================================
-    if trend == "NEUTRAL":
-    
-        # 진짜 chop만 약하게 제한
-        if (
-            47 <= rsi <= 53 and
-            abs(macd) < 0.015 and
-            0.4 <= stoch_rsi <= 0.6
-        ):
-    
-            signal_score -= 0.5
-            reasons.append(
-                "⚠️ 완전 횡보(chop) 상태 → 약한 감점 (-0.5)"
-            )
-    
-        # 🔥 애매한 전환/되돌림 구간
-        else:
-            # 🟦 주식은 Pine이 이미 "3봉 고점 돌파"를 확인한 뒤에야 알림을 보낸다.
-            #    이 시점의 NEUTRAL은 추세가 진짜 없다는 뜻이 아니라, EMA 기반 추세 판정이
-            #    막 시작된 돌파를 아직 못 따라잡은 지표 지연일 가능성이 높다.
-            #    그래서 주식은 감점을 더 약하게(-0.15), FX는 기존 그대로(-0.3) 유지.
-            #    (표시 문구가 "-0.7"로 돼있었는데 실제 감점은 -0.3이었던 불일치도 같이 수정)
-            if is_stock_pair(pair):
-                signal_score -= 0.15
-                reasons.append("🟡 NEUTRAL 추세(돌파 초기 지표 지연 가능성) → 약한 감점 (-0.15)")
-            else:
-                signal_score -= 0.3
-                reasons.append("🟡 NEUTRAL 추세 → continuation 신뢰도 낮음 (-0.3)")
-    
-    
-    # ==================================================
-    # 2️⃣ BUY 과열 진입 방어 (강력)
-    # ==================================================
-    if signal == "BUY" and rsi > 85 and stoch_rsi > 0.9:
-        if macd < macd_signal:
-            signal_score -= 1.0
-            reasons.append("⛔ RSI/Stoch RSI 극단 과열 + MACD 약세 → BUY (감점 -1.0)")
-        else:
-            signal_score -= 0.5
-            reasons.append("⚠️ RSI/Stoch 과열 → BUY 피로 구간 (감점 -0.5)")
-    
-    
-        # ③ SELL 과매도 방어 (하락추세 예외 허용)
-    # ==================================================
-    if signal == "SELL" and rsi < 40:
-    
-        # ✅ [수정3 핵심] 강한 하락추세(DOWNTREND)에서는 '과매도'라도
-        # 추세 지속 SELL이 자주 먹히므로, 과도한 차단을 완화한다.
-        if trend == "DOWNTREND":
-            # (선택) 너무 극단 과매도면 그래도 조심: rsi<30이면 가볍게만 패널티
-            if rsi < 30:
-                signal_score -= 0.5
-                reasons.append("⚠️ DOWNTREND지만 RSI<30 극단 과매도 → 반등 리스크 경고 (감점 -0.5)")
-            else:
-                signal_score += 0.5
-                reasons.append("📉 하락 추세 지속 + 과매도 → 추세 SELL 허용 (+0.5)")
-
-        
-    
-        # ✅ NEUTRAL/UPTREND에서는 기존 방어 로직 유지
-        else:
-            if macd > macd_signal and 0.3 < stoch_rsi < 0.7:
-                signal_score += 1
-                reasons.append("✅ 과매도 SELL이나 MACD/Stoch 반등 → 예외적 진입 허용 (+1)")
-            elif stoch_rsi > 0.3:
-                signal_score -= 2
-                reasons.append("⚠️ 과매도 SELL + 반등 가능성 → 신중 (감점 -2)")
-            else:
-                signal_score -= 1.5
-                reasons.append("❌ 과매도 SELL + 반등 신호 부족 → 진입 위험 (감점 -1.5)")
-    
-    # ==================================================
-    # 4️⃣ Stoch RSI 바닥 + 패턴 없음 방어
-    # ==================================================
-    if stoch_rsi < 0.1 and pattern is None:
-        signal_score -= 1
-        reasons.append("🔴 Stoch RSI 극단 과매도 + 반등 패턴 없음 → 반등 신뢰도 낮음 (감점 -1)")
-    
-    
-    # ==================================================
-    # 5️⃣ RSI < 30 구간 정리 (중복 제거)
-    # ==================================================
-    if rsi < 30:
-    
-        if pattern in ["HAMMER", "BULLISH_ENGULFING"]:
-            signal_score += 2
-            reasons.append("🟢 RSI < 30 + 반등 캔들 패턴 → 진입 강화 (+2)")
-    
-        elif (
-            macd < macd_signal
-            and trend == "DOWNTREND"
-            and len(macd_trend) >= 3
-            and macd_trend[-1] <= macd_trend[-2]
-        ):
-            signal_score -= 1.5
-            reasons.append("🔴 RSI < 30 + MACD/추세 약세 지속 → 반등 기대 낮음 (감점 -1.5)")
-    
-        elif (
-            len(macd_trend) >= 3
-            and macd_trend[-1] > macd_trend[-2] > macd_trend[-3]
-        ):
-            signal_score += 1.0
-            reasons.append("🟢 RSI 과매도 + MACD 회복 → 반등 기대 (+1.0)")
-    
-        else:
-            signal_score -= 0.5
-            reasons.append("⚠️ RSI < 30 but 반등 근거 부족 → 주의 (-0.5)")
-    
-    
-    # ==================================================
-    # 6️⃣ RSI > 70 과열 구간
-    # ==================================================
-    if rsi > 70 and pattern not in ["SHOOTING_STAR", "BEARISH_ENGULFING"]:
-        if macd > macd_signal and macd > 0 and trend == "UPTREND":
-            signal_score += 0.5
-            reasons.append("📈 RSI > 70이나 MACD/UPTREND 유지 → 조건부 BUY 허용 (+0.5)")
-        else:
-            signal_score -= 1
-            reasons.append("⚠️ RSI > 70 + 반전 패턴 없음 → 진입 위험 (감점 -2)")
-    
-    
-    # ==================================================
-    # 7️⃣ 눌림목 BUY 강화 (페어 공통)
-    # ==================================================
-    BOOST_BUY_PAIRS = {"EUR_USD", "GBP_USD", "USD_JPY"}
-    
-    if pair in BOOST_BUY_PAIRS and signal == "BUY":
-    
-        # ❌ 하락/횡보 추세에서는 눌림목 BUY 보너스 금지
-        if trend != "UPTREND":
-            reasons.append(f"{pair}: 하락/중립 추세 → 눌림목 BUY 보너스 제외")
-    
-        # ❌ 과열 late-entry 방지
-        elif (
-            rsi is not None and
-            stoch_rsi is not None and
-            rsi > 75 and
-            stoch_rsi > 0.9
-        ):
-            reasons.append(
-                f"{pair}: RSI/Stoch 과열 → late BUY 위험, 눌림목 BUY 보너스 제한"
-            )
-    
-        else:
-    
-            # ✅ RSI 눌림목
-            if 40 <= rsi <= 50:
-                signal_score += 0.7
-                reasons.append(f"{pair}: RSI 40~50 눌림목 영역 (+0.7)")
-    
-            # ✅ 초기 반등
-            if 0.1 <= stoch_rsi <= 0.3:
-                signal_score += 0.5
-                reasons.append(f"{pair}: Stoch RSI 바닥 반등 초기 (+0.5)")
-    
-            # ✅ 캔들 패턴
-            if pattern in ["HAMMER", "LONG_BODY_BULL"]:
-                signal_score += 0.5
-                reasons.append(f"{pair}: 매수 캔들 패턴 확인 (+0.5)")
-    
-            # ✅ MACD 확인 (보조 역할만)
-            if macd > 0:
-                signal_score += 0.3
-                reasons.append(f"{pair}: MACD 양수 유지 (+0.3)")
-
-
-        # 7️⃣-2 과매도 반등 BUY (DOWNTREND 허용, 단 조건 엄격)
-    if signal == "BUY" and trend == "DOWNTREND":
-        if rsi < 30 and stoch_rsi < 0.15 and macd > macd_signal:
-            signal_score += 1.5
-            reasons.append("🟢 하락추세 과매도 + MACD 반등 → 제한적 반등 BUY (+1.5)")
-        else:
-            signal_score -= 1
-            reasons.append("❌ 하락추세 BUY → 반등 조건 미흡 (감점 -1)")
-    
-    # ==================================================
-    # 8️⃣ 눌림목 조건 (모든 페어 공통)
-    # ==================================================
-    if signal == "BUY" and trend == "UPTREND":
-        if 45 <= rsi <= 55 and 0.0 <= stoch_rsi <= 0.3 and macd > 0:
-            signal_score += 1.5
-            reasons.append("📈 눌림목 BUY 조건 충족 → 반등 기대 (+1.5)")
-    
-    if signal == "SELL" and trend == "DOWNTREND":
-        if 45 <= rsi <= 55 and 0.7 <= stoch_rsi <= 1.0 and macd < 0:
-            signal_score += 1.5
-            reasons.append("📉 눌림목 SELL 조건 충족 → 반락 기대 (+1.5)")
-    
-    
-    # ==================================================
-    # 9️⃣ RSI 중립 BUY 보정 (과도 방지)
-    # ==================================================
-    if signal == "BUY" and trend == "UPTREND" and 50 <= rsi <= 60:
-        signal_score += 0.5
-        reasons.append("RSI 중립(50~60) + 상승추세 → 눌림목 반등 기대 (+0.5)")
-    
-    
-    # ==================================================
-    # 🔟 볼린저 밴드 위치
-    # ==================================================
-    if price >= bollinger_upper:
-        reasons.append("🔴 볼린저 상단 → 과매수 경계 (참고)")
-    elif price <= bollinger_lower:
-        reasons.append("🟢 볼린저 하단 → 반등 관찰 구간 (가점 없음)")
-    
-    
-    # ==================================================
-    # 1️⃣1️⃣ 장대 바디 캔들 (과도 점수 축소)
-    # ==================================================
-    # 🟥 [FIX-B6b] 기존엔 방향을 안 봤다. FIX-B6로 LONG_BODY_* 라벨이 처음 생성되기
-    #    시작하면, 큰 "음봉"이 BUY 신호에 +1.5를 주는 정반대 동작이 실제로 발생한다.
-    #    → 캔들 방향과 신호 방향이 일치할 때만 가점하고, 역방향이면 감점한다.
-    if pattern == "LONG_BODY_BULL":
-        if signal == "BUY":
-            signal_score += 1.5
-            reasons.append("📊 장대 양봉 + BUY → 추세 지속 가능성 (+1.5)")
-        elif signal == "SELL":
-            signal_score -= 1.0
-            reasons.append("⚠️ 장대 양봉인데 SELL → 역방향 진입 위험 (-1.0)")
-    elif pattern == "LONG_BODY_BEAR":
-        if signal == "SELL":
-            signal_score += 1.5
-            reasons.append("📊 장대 음봉 + SELL → 추세 지속 가능성 (+1.5)")
-        elif signal == "BUY":
-            signal_score -= 1.0
-            reasons.append("⚠️ 장대 음봉인데 BUY → 역방향 진입 위험 (-1.0)")
-
-    box_info = detect_box_breakout(candles, pair)
-    
-    high_low_flags = analyze_highs_lows(candles)
-    if high_low_flags["new_high"]:
-        reasons.append("📈 최근 고점 갱신 → 상승세 유지 가능성↑")
-    if high_low_flags["new_low"]:
-        reasons.append("📉 최근 저점 갱신 → 하락세 지속 가능성↑")
-
-    if trend == "NEUTRAL" \
-       and box_info.get("in_box") \
-       and box_info.get("breakout") in ("UP", "DOWN") \
-       and (high_low_flags.get("new_high") or high_low_flags.get("new_low")):
-
-        # 신호 일치(+3) 블록과 중복 가점 방지
-        aligns = ((box_info["breakout"] == "UP"   and signal == "BUY") or
-              (box_info["breakout"] == "DOWN" and signal == "SELL"))
-
-        if not aligns:
-            signal_score += 1.5
-            reasons.append("🟡 NEUTRAL 예외: 박스 이탈 + 고/저 갱신 → 기본 가점(+1.5)")
-
-    
-    if box_info["in_box"] and box_info["breakout"] == "UP" and signal == "BUY":
-        signal_score += 3
-        reasons.append("📦 박스권 상단 돌파 + 매수 신호 일치 (breakout 가점 강화 +3)")
-    elif box_info["in_box"] and box_info["breakout"] == "DOWN" and signal == "SELL":
-        signal_score += 3
-        reasons.append("📦 박스권 하단 돌파 + 매도 신호 일치 가점+3")
-    elif box_info["in_box"] and box_info["breakout"] is None:
-        reasons.append("📦 박스권 유지 중 → 관망 경계")
-
-    # SELL 점수 상한 제한
-    if signal == "SELL" and signal_score > 5:
-        reasons.append("⚠️ SELL 점수 상한 적용 (최대 5점)")
-        signal_score = 5
-
-        # --- MACD 교차 가점: 모든 페어 공통 (pip/ATR 스케일 적용) ---
-    macd_diff = macd - macd_signal
-    _macd_atr = float(atr.iloc[-1]) if hasattr(atr, "iloc") else float(atr or 0)
-    if is_stock_pair(pair):
-        # 🟦 주식: MACD 값 자체가 가격 스케일이 아니라 '변동성(ATR)' 스케일로 움직이므로
-        #    가격 비례(pv) 대신 ATR 비례로 강/약 임계치를 산정. (TSLA처럼 MACD diff가 0.3~2.0대인 경우
-        #    pv=price*0.0001 기준 임계치(예: 0.045)는 너무 작아 거의 항상 'strong'으로 잘못 판정되는 문제 수정)
-        strong = max(_macd_atr * 0.20, pv * 1.5)
-        weak = max(_macd_atr * 0.07, pv * 0.5)
-    else:
-        # FX는 기존 로직 그대로 유지 (JPY strong=0.015, 그 외 strong=0.00015와 동일)
-        strong = 1.5 * pv
-        weak = 0.5 * pv
-    micro  = 2 * pv               # 미세변동(≈2 pip) 판단용
-
-    if (macd_diff > strong) and trend == "UPTREND":
-        signal_score += 3
-        reasons.append("MACD 골든크로스(강) + 상승추세 일치 가점+3")
-    elif (macd_diff < -strong) and trend == "DOWNTREND":
-        signal_score += 3
-        reasons.append("MACD 데드크로스(강) + 하락추세 일치 가점+3")
-    elif abs(macd_diff) >= weak:
-        signal_score += 1
-        reasons.append("MACD 교차(약) → 초입 가점 +1")
-    else:
-        reasons.append("MACD 미세변동 → 가점 보류")
-    if signal == "BUY" and len(macd_trend) >= 3:
-
-        if (
-            macd_trend[-1] > macd_trend[-2]
-            and macd_trend[-2] > macd_trend[-3]
-        ):
-    
-            if macd_trend[-1] < 0:
-                # 🟦 MACD 음수권에서 3봉 연속 상승 — 회복 속도를 판단해서 차등 적용
-                #    데이터 분석(6/22~7/8, 48건): 이 패턴 전체 승률 46%, 손익 -$186
-                #    원인: 빠른 수렴(진짜 전환)과 느린 수렴(노이즈)이 섞여있음
-                #    해결: MACD와 시그널선 간 갭이 얼마나 빠르게 줄어드는지로 구분
-                _gap_now  = abs(macd_trend[-1] - (macd_signal if not hasattr(macd_signal, 'iloc') else float(macd_signal.iloc[-1])))
-                _gap_prev = abs(macd_trend[-2] - (macd_signal if not hasattr(macd_signal, 'iloc') else float(macd_signal.iloc[-2])))
-                _recovery_speed = (_gap_prev - _gap_now) / max(_gap_prev, 1e-9)
-
-                if _recovery_speed >= 0.15:
-                    # 갭이 15% 이상 빠르게 줄어듦 → 진짜 전환 신호 → 가점 유지
-                    signal_score += 0.7
-                    reasons.append(
-                        f"🟢 MACD 음수권 빠른 회복(수렴속도 {_recovery_speed*100:.0f}%) → 반등 가점 (+0.7)"
-                    )
-                else:
-                    # 갭이 15% 미만으로 느리게 줄어듦 → 노이즈성 튀기 → 강한 감점
-                    signal_score -= 1.5
-                    reasons.append(
-                        f"🔴 MACD 음수권 느린 회복(수렴속도 {_recovery_speed*100:.0f}%) → 노이즈 의심 강감점 (-1.5)"
-                    )
-    
-            else:
-    
-                signal_score += 0.3
-    
-                reasons.append(
-                    "🟢 MACD 상승 모멘텀 유지 (+0.3)"
-                )
-
-    # (선택) 히스토그램 보조 판단은 유지하되 임계도 pip화
-    macd_hist = macd_diff
-        # =========================
-    # 개선1: MACD 방향(약화/반등) + Stoch 과열/과매도 추격 방지 (BUY/SELL 공통)
-    if stoch_rsi is not None and macd is not None and macd_signal is not None:
-    
-        # 1) BUY 추격 방지 (과열 + MACD 약화)
-        if signal == "BUY" and stoch_rsi > 0.8 and macd < macd_signal:
-            # 🟦 4번 수정: -2 → -3으로 강화
-            #    데이터(14건): 이 필터 있어도 실거래 36% 승률 -$85 → 감점이 부족해서 threshold 통과 중
-            #    -3으로 올리면 threshold -2.5 기준 대부분 차단됨
-            signal_score -= 3.0
-            reasons.append("⛔ BUY 차단: Stoch RSI 과열 + MACD 약화(macd<signal) → 추격 매수 위험 강감점 -3")
-    
-        # 2) SELL 추격 방지 (과매도 + MACD 약화)  ✅ 여기서부터 보완이 핵심
-        if signal == "SELL" and stoch_rsi < 0.2 and macd < macd_signal:
-    
-            # (A) 하락 추세면: 과매도라도 '추세형 하락'이 계속될 수 있으니 강차단 금지
-            if trend == "DOWNTREND":
-                signal_score -= 0.5
-                reasons.append("🟡 DOWNTREND + 과매도(Stoch<0.2) + MACD 약화 → 추세형 하락 지속 가능(경고 -0.5)")
-    
-            # (B) NEUTRAL(전환/분배) 구간: RSI가 50 아래면 하락쪽 우세 가능 → 강차단 금지(중립 처리)
-            elif trend == "NEUTRAL" and rsi is not None and rsi < 50:
-                # 점수는 건드리지 않고 '중립 경고'만 남김
-                reasons.append("🟡 NEUTRAL 전환 구간 + RSI<50 + 과매도(Stoch<0.2) → 추격 숏 단정 금지(중립)")
-    
-            # (C) 나머지(상승/횡보 성격): 과매도 숏은 반등에 말릴 확률 높음 → 기존처럼 강차단
-            else:
-                signal_score -= 2.0
-                reasons.append("⛔ SELL 차단: 과매도(Stoch<0.2) + MACD 약화 + 추세 불리 → 추격 매도 위험 감점 -2")
-   
-    # 🟦 breakout_confirmed/near_resistance를 stoch_rsi>=0.95 체크보다 먼저 계산해서,
-    #    "추세 라벨(UPTREND)"이 아니라 "실제 돌파 확정 여부"로 과열 판정을 보완할 수 있게 함.
-    _atr_val_early = atr if atr is not None else 0.0
-    _res_val_early = resistance if resistance is not None else None
-    _near_resistance_early = False
-    if _res_val_early is not None and price is not None:
-        # 🟥 [FIX-B2] 방향 조건(_res_val_early > price)이 빠져 있었다.
-        #    가격이 저항을 뚫고 위로 올라가면 (저항 - 가격)이 음수라 이 식은 항상 True가 됐고,
-        #    그 결과 아래 "돌파확정 + 저항 안 가까움" 조건이 수학적으로 성립 불가였다.
-        #    → 모멘텀 가점(+2/+1.5)은 한 번도 안 나가고 항상 -2 감점만 적용됐다.
-        _near_resistance_early = (
-            _res_val_early > price
-            and (_res_val_early - price) <= max(10 * pv, _atr_val_early * 0.6)
-        )
-    _buffer_early = max(2 * pv, _atr_val_early * 0.10)
-    _breakout_confirmed_early = False
-    if _res_val_early is not None and close is not None:
-        _breakout_confirmed_early = close >= (_res_val_early + _buffer_early)
-
-    if stoch_rsi >= 0.95:
-        # 🟦 주식은 detect_trend의 NEUTRAL 판정이 막 시작된 돌파를 못 따라잡는 경우가 많아서,
-        #    "UPTREND여야만 봐준다"는 조건 대신 실제 돌파 확정 여부(breakout_confirmed)도 같이 인정.
-        _confirmed_momentum = (trend == "UPTREND" and macd is not None and macd > 0) or (
-            is_stock_pair(pair) and _breakout_confirmed_early and not _near_resistance_early
-            and macd is not None and macd > 0
+        df_h4, df_m5 = await asyncio.gather(
+            get_candles_async(pair, "H4", 50),
+            get_candles_async(pair, "M5", 30),
         )
-        if _confirmed_momentum:
-            signal_score -= 0.5
-            reasons.append("🟡 Stoch RSI 과열이지만 돌파확정/상승추세 + MACD 양수 → 조건부 감점 -0.5")
-        else:
-            signal_score -= 1
-            reasons.append("🔴 Stoch RSI 1.0 → 극단적 과매수 → 피로감 주의 감점 -1")
-    
-    pip = pv  # 🟦 고정 0.01(JPY 가정) 대신 자산군별 pip_value(pv)로 통일 (FX는 페어별, 주식은 가격비례)
-    
-    # 안전 처리
-    if price is None:
-        price = close
-    if close is None:
-        close = price
-    
-    atr_val = atr if atr is not None else 0.0
-    res_val = resistance if resistance is not None else None
-    
-    near_resistance = False
-    if res_val is not None and price is not None:
-        # 🟥 [FIX-B2] 위와 동일한 부호 버그. 저항이 "위에 있을 때"만 근접으로 본다.
-        near_resistance = (
-            res_val > price
-            and (res_val - price) <= max(10 * pip, atr_val * 0.6)
-        )
-    
-    buffer = max(2 * pip, atr_val * 0.10)
-    breakout_confirmed = False
-    if res_val is not None and close is not None:
-        breakout_confirmed = close >= (res_val + buffer)
-    
-    if stoch_rsi is not None and stoch_rsi > 0.8:
-    
-        if signal == "BUY" and trend == "UPTREND" and rsi < 70 and macd is not None and macd_signal is not None and macd >= macd_signal:
-    
-            if breakout_confirmed and not near_resistance:
-                if pair == "USD_JPY":
-                    signal_score += 2
-                    reasons.append("USDJPY: Stoch RSI 과열 + 돌파확정 → 모멘텀 가점 +2")
-                else:
-                    signal_score += 1.5
-                    reasons.append("Stoch RSI 과열 + 돌파확정 → 모멘텀 가점 +1.5")
-            else:
-                signal_score -= 2
-                reasons.append("Stoch RSI 과열 + 저항 근접/돌파미확정 → 추격 BUY 위험 감점 -2")
-    
-        else:
-            reasons.append("Stoch RSI 과열 → 고점 피로, 관망")
-    
-    elif stoch_rsi < 0.2:
-        # BUY일 때만 과매도 처리
-        if signal == "BUY":
-    
-            # 🔥 1순위 핵심 수정:
-            # 극단 과매도 + MACD 약화(macd < macd_signal)이면
-            # 반등 가점(+1) 주지 말고 "칼날"로 보고 감점
-            if stoch_rsi < 0.05 and macd < macd_signal:
-                signal_score -= 1.5
-                reasons.append("🔴 Stoch RSI 극단 과매도(<0.05) + MACD<Signal → 하락 가속/전환 위험 (감점 -1.5)")
-    
-            else:
-                # 기존 로직 유지
-                if trend == "DOWNTREND":
-                    signal_score += 0.5
-                    reasons.append("Stoch RSI 과매도 + 하락추세 → 반등은 제한적(+0.5)")
-                else:
-                    # ✅ 방법1: Balance breakout에서는 과매도 반등 BUY(+1) 가점 제거
-                    if (strategy_name or "").strip().lower() == "balance breakout":
-                        reasons.append("ℹ Balance breakout: Stoch RSI 과매도 반등 BUY 가점 미적용")
-                    else:
-                        # 🟦 데이터 분석(6/22~7/8): Stoch 과매도 BUY 11건, 승률 45%, 손익 -$25
-                        #    가점을 줘도 승률이 오히려 낮아짐 → 가점 제거, 중립 처리
-                        #    "과매도 = 반등"이라는 가정이 이 전략에서 성립하지 않음
-                        reasons.append("🟡 Stoch RSI 과매도 → BUY 반등 기대 (데이터상 효과 미검증, 가점 0)")
-    
-        else:
-            # SELL은 기존대로 관망
-            reasons.append("Stoch RSI 과매도 → SELL은 추격 위험, 관망")
-    
-    else:
-        reasons.append("Stoch RSI 중립")
+        return _mtf_context_text(df_h4, df_m5)
 
-    if trend == "UPTREND" and signal == "BUY":
-    
-        # 🔥 과열 late-entry 방지
-        if (
-            stoch_rsi is not None and
-            rsi is not None and
-            stoch_rsi > 0.9 and
-            rsi > 75
-        ):
-            reasons.append(
-                "⚠️ RSI/Stoch 과열 → late BUY 위험, 추세 가점 제외"
-            )
-    
-        # 🔥 칼날 방지
-        elif stoch_rsi < 0.05 and macd < macd_signal:
-            reasons.append(
-                "⚠️ 표기상 UPTREND지만 Stoch 극단 과매도 + MACD 약화 → 추세 전환 의심(추세일치 가점 제외)"
-            )
-    
-        else:
-            signal_score += 0.5
-            reasons.append("추세 상승 + 매수 일치 가점+0.5")
-    
-    
-    elif trend == "DOWNTREND" and signal == "SELL":
-    
-        # 🔥 과매도 추격 SELL 방지
-        if (
-            stoch_rsi is not None and
-            rsi is not None and
-            stoch_rsi < 0.1 and
-            rsi < 25
-        ):
-            reasons.append(
-                "⚠️ RSI/Stoch 과매도 → late SELL 위험, 추세 가점 제외"
-            )
-    
-        # 🔥 숏말림 방지
-        elif stoch_rsi is not None and stoch_rsi >= 0.95:
-            reasons.append(
-                "⛔ Stoch RSI 과열(≥0.95) → 숏 말림 위험, 추세 매도 가점 미적용"
-            )
-    
-        else:
-            signal_score += 0.5
-            reasons.append("추세 하락 + 매도 일치 가점+0.5")
-
-
-    if liquidity == "좋음":
-        reasons.append("🟡 유동성 양호 (참고)")
-    last_3 = candles.tail(3)
-    if (
-        all(last_3["close"] < last_3["open"]) 
-        and trend == "DOWNTREND" 
-        and pattern in ["NEUTRAL", "SHOOTING_STAR", "LONG_BODY_BEAR"]
-    ):
-    
-        # 🔥 과매도 추격 SELL 방지
-        if (
-            rsi is not None and
-            stoch_rsi is not None and
-            rsi < 25 and
-            stoch_rsi < 0.1
-        ):
-            reasons.append(
-                "⚠️ 3봉 연속 음봉이지만 RSI/Stoch 과매도 → late SELL 위험, 추가 가점 제외"
-            )
-    
-        else:
-            signal_score += 0.5
-            reasons.append(
-                "🔻 최근 3봉 연속 음봉 + 하락추세 → SELL continuation 가점+0.5"
-            )
-
-        # === 박스권 상단/하단 근접 진입 제한 ===
-    recent = candles.tail(10)
-    if not recent.empty:
-        box_high = recent['high'].max()
-        box_low  = recent['low'].min()
-
-        # pip 단위 거리 계산(동적)
-        near_top_pips = abs(box_high - price) / pv
-        near_low_pips = abs(price - box_low) / pv
-
-        # 돌파/이탈 확인을 위한 가격 버퍼(동적)
-        buf_price = thr["breakout_buf_pips"] * pv  # 가격단위
-
-        # 상단 근접 매수 금지 (확정 돌파 or 리테스트만 허용)
-        if signal == "BUY" and box_info.get("in_box") and box_info.get("breakout") is None:
-            confirmed_top_break = recent.iloc[-1]['close'] > (box_high + buf_price)
-            retest_support = (recent.iloc[-1]['low'] > box_high - buf_price) and (near_top_pips <= NEAR_PIPS)
-            if near_top_pips <= NEAR_PIPS and not (confirmed_top_break or retest_support):
-                signal_score -= 1.5
-                reasons.append("⚠️ 박스 상단 근접 매수 위험 (감점-1.5)")
-
-        # 하단 근접 매도 금지 (확정 이탈 or 리테스트만 허용)
-        if signal == "SELL" and box_info.get("in_box") and box_info.get("breakout") is None:
-            confirmed_bottom_break = recent.iloc[-1]['close'] < (box_low - buf_price)
-            retest_resist = (recent.iloc[-1]['high'] < box_low + buf_price) and (near_low_pips <= NEAR_PIPS)
-            if near_low_pips <= NEAR_PIPS and not (confirmed_bottom_break or retest_resist):
-                signal_score -= 1.5
-                reasons.append("⚠️ 박스 하단 근접 매도 위험 (감점-1.5)")
-                
-    # 상승 연속 양봉 패턴 보정 BUY
-    if (
-        all(last_3["close"] > last_3["open"]) 
-        and trend == "UPTREND" 
-        and pattern in ["NEUTRAL", "LONG_BODY_BULL", "INVERTED_HAMMER"]
-    ):
-    
-        # 🔥 과열 late-entry 방지
-        if (
-            rsi is not None and
-            stoch_rsi is not None and
-            rsi > 75 and
-            stoch_rsi > 0.9
-        ):
-            reasons.append(
-                "⚠️ 3봉 연속 양봉이지만 RSI/Stoch 과열 → late BUY 위험, 추가 가점 제외"
-            )
-
-        elif rsi is not None and rsi < 70:
-            # 🟦 데이터 분석(6/22~7/8): RSI<70 + 3봉양봉 케이스 15건 승률 20%, 손익 -$215
-            #    모멘텀이 약한 상태에서의 3봉 연속 양봉은 오히려 추격 진입 신호.
-            #    스코어 감점으로는 해결 안 됨(다른 가점들이 상쇄) → 하드 차단
-            reasons.append(
-                "⛔ 3봉 연속 양봉이지만 RSI<70(모멘텀 부족) → 추격 진입 위험, 진입 차단"
-            )
-            # should_execute는 이 함수 밖에서 결정되므로, 강한 감점으로 threshold 이하로 내림
-            signal_score -= 3.0
-
-        else:
-            signal_score += 0.5
-            reasons.append(
-                "🟢 최근 3봉 연속 양봉 + 상승추세 → BUY continuation 가점+0.5"
-            )
-
-        # 1) 패턴 그룹 먼저 정의
-    # 🟥 [FIX-B6d] detect_candle_pattern()이 실제로 반환하는 라벨과 목록을 일치시킨다.
-    #    PIERCING_LINE / DARK_CLOUD_COVER가 빠져 있어서, 같은 성격의 반전 패턴인데
-    #    BULLISH_ENGULFING만 ±2를 받고 이 둘은 0점이 되는 비대칭이 있었다.
-    #    반대로 MORNING_STAR / EVENING_STAR / HANGING_MAN은 생성되지 않으므로 제거.
-    bullish_patterns = ["BULLISH_ENGULFING", "HAMMER", "PIERCING_LINE"]
-    bearish_patterns = ["SHOOTING_STAR", "BEARISH_ENGULFING", "DARK_CLOUD_COVER"]
-        # 2) 방향에 따라 가점/감점 다르게 적용
-    if pattern in bullish_patterns:
-        if is_buy:
-            signal_score += 2
-            reasons.append(f"🟢 강한 매수형 패턴 ({pattern}) ➜ BUY 근거 강화 (+2)")
-        elif is_sell:
-            signal_score -= 1.5
-            reasons.append(f"⚠️ 매수 반전 패턴 ({pattern}) ➜ SELL 신뢰도 하락 (-1.5)")
-    
-    elif pattern in bearish_patterns:
-        if is_sell:
-            signal_score += 2
-            reasons.append(f"🔴 강한 매도형 패턴 ({pattern}) ➜ SELL 근거 강화 (+2)")
-        elif is_buy:
-            signal_score -= 1.5
-            reasons.append(f"⚠️ 매도 반전 패턴 ({pattern}) ➜ BUY 신뢰도 하락 (-1.5)")
-    # 교과서적 기회 포착 보조 점수
-    # 🟥 [FIX-B5] 이 블록은 그대로 두면 이중 계산이 된다.
-    #    must_capture_opportunity()는 이미 함수 맨 위(L757)에서 expected_direction=signal로
-    #    호출돼 score에 반영됐다. 여기서 또 부르면 같은 점수를 두 번 더하게 된다.
-    #    (기존엔 expected_direction=None이라 op_score가 0 이하로만 나와서 `if op_score > 0`이
-    #     절대 참이 되지 않았고, 그래서 이중 계산이 우연히 안 일어났을 뿐이다.
-    #     B1 수정으로 방향이 제대로 전달되기 시작하면 이 블록이 실제 버그가 된다.)
-    #    → 계산 자체를 제거한다.
+    except Exception as e:
+        print(f"[ERROR] get_multi_timeframe_context: {e}")
+        return f"타임프레임 데이터 요약 실패: {e}"
 
-    try:
-        # 하락 추세 말기: 과매도 + 지지선 근접에서 SELL은 숏스퀴즈 위험 → 감점
-        if trend == "DOWNTREND" and signal == "SELL":
-        
-            near_support = (
-                support is not None and
-                price is not None and
-                atr is not None and
-                abs(price - support) <= atr * 0.25
-            )
-        
-            if (rsi is not None) and (rsi < 32) and near_support:
-        
-                signal_score -= 3.0
-                reasons.append(
-                    "🔴 과매도 + 지지선 매우 근접(ATR 기준) → late SELL / 숏스퀴즈 위험 (-3.0)"
-                )
-        
-            elif (rsi is not None) and (rsi < 32):
-        
-                signal_score -= 1.0
-                reasons.append(
-                    "🟠 과매도 구간 SELL → 반등 위험 (-1.0)"
-                )
 
-        # 상승 추세 말기: 과매수 + 저항선 근접에서 BUY는 고점 물림 위험 → 감점
-        if trend == "UPTREND" and signal == "BUY":
-
-            # 🟥 [FIX-B2] 여기도 방향 조건 추가. 이미 저항 위로 뚫고 올라간 상태는
-            #    "저항 근접(돌파 실패 위험)"이 아니라 "돌파 성공"이다.
-            near_resistance = (
-                resistance is not None and
-                price is not None and
-                atr is not None and
-                resistance > price and
-                (resistance - price) <= atr * 0.25
-            )
+def _mtf_context_text(df_h4, df_m5):
+    """H4 EMA20 추세 + M5 RSI 상태를 GPT 프롬프트용 두 줄로 요약 (sync/async 공용)"""
+    h4_last = df_h4['close'].iloc[-1]
 
-            if (rsi is not None) and (rsi > 68) and near_resistance:
+    # 🟦 [PERF-13] ta.trend.ema_indicator / ta.momentum.rsi 와 같은 공식 (indicators.py)
+    h4_ema = ewm_mean(df_h4['close'], span=20, adjust=False, min_periods=20)[-1]
 
-                signal_score -= 3.0
-                reasons.append(
-                    "🔴 과매수 + 저항선 매우 근접(ATR 기준) → late BUY / 돌파 실패 위험 (-3.0)"
-                )
+    if pd.isna(h4_ema):
+        h4_trend = "데이터부족"
+    elif h4_last > h4_ema:
+        h4_trend = "상승세(Bullish)"
+    else:
+        h4_trend = "하락세(Bearish)"
 
-            # 🟥 [FIX-B3] "과매수면 무조건 감점" 로직 제거.
-            #    실거래 665건 분석 결과 RSI 구간별 승률이 정반대였다:
-            #      RSI 50~60 → 42.6% / 70~80 → 53.0% / 80~100 → 53.6%
-            #    이 봇은 돌파·모멘텀 지속 전략인데, 반전(reversal) 매매용 과열 페널티를
-            #    붙여놓아서 가장 잘 맞는 구간을 스스로 깎아내리고 있었다.
-            #    → 저항 근접(위 조건)일 때만 감점하고, 단순 과매수는 감점하지 않는다.
-            elif (rsi is not None) and (rsi > 68):
-                reasons.append(
-                    "🟢 과매수 구간 BUY — 모멘텀 전략에서는 오히려 승률이 높은 구간 "
-                    "(실거래 RSI 70~80: 53.0%, 80~100: 53.6%) → 감점 없음"
-                )
+    m5_rsi = wilder_rsi(df_m5['close'], 14)[-1]
+
+    if pd.isna(m5_rsi):
+        print("[WARN] M5 RSI = NaN")
+        m5_rsi_text = "N/A"
+        m5_state = "데이터부족"
+    else:
+        m5_rsi_text = f"{m5_rsi:.2f}"
+
+        if m5_rsi >= 70:
+            m5_state = "과매수"
+        elif m5_rsi <= 30:
+            m5_state = "과매도"
+        else:
+            m5_state = "중립"
+
+    return (
+        f"[H4 추세]: {h4_trend} (EMA20 대비)\n"
+        f"[M5 RSI]: {m5_rsi_text} ({m5_state})"
+    )
 
-    except Exception as e:
-        # 배포 중 예외로 전략이 멈추는 걸 방지 (안전장치)
-        reasons.append(f"⚠️ 추세 말기 감점 필터 예외 발생(무시): {e}")
-    
 
-    return signal_score, reasons
+def _score_features(candles, pair, **inputs):
+    """score_rules.signal_features에 페어 공통값(pip 크기, 주식 여부, SL 버퍼 배수)을 채워 넣는다."""
+    return signal_features(
+        candles, pair=pair, pv=pip_value_for(pair), is_stock=is_stock_pair(pair),
+        sl_buffer_atr_mult=ALPACA_SL_BUFFER_ATR_MULT, **inputs,
+    )
+
+
+def score_signal(rsi, macd, macd_signal, stoch_rsi, prev_stoch_rsi, trend, prev_trend, signal, liquidity, pattern, pair, candles, atr, price, bollinger_upper, bollinger_lower, support, resistance, support_distance, resistance_distance, pip_size, macd_trend=None, expected_direction=None, strategy_name=None, ctx=None):
+    """🟦 [PERF-17] 알림 1건 채점 → score_rules.ScoreResult (점수 + 걸린 규칙 코드, reasons()는 필요할 때 문장으로).
+    규칙은 score_rules.SIGNAL_RULES 한 곳에만 있다. 캔들은 최근 20봉만 본다."""
+    macd_trend = list(macd_trend or [])
+    last3 = ([np.nan] * 3 + macd_trend)[-3:]
+    t0 = _t.perf_counter()
+    feats = _score_features(
+        candles.tail(20), pair,
+        signal=signal, direction=expected_direction, rsi=rsi, macd=macd, macd_signal=macd_signal,
+        stoch=stoch_rsi, prev_stoch=prev_stoch_rsi, trend=trend, prev_trend=prev_trend, pattern=pattern,
+        atr=atr, price=price, boll_up=bollinger_upper, boll_low=bollinger_lower,
+        support=support, resistance=resistance, resistance_distance=resistance_distance, liquidity=liquidity,
+        macd_t1=last3[2], macd_t2=last3[1], macd_t3=last3[0], macd_trend_len=len(macd_trend),
+        strategy_name=strategy_name, hour=datetime.now(ZoneInfo("America/New_York")).hour,
+    ).row(-1)
+    if rule_stats.enabled:
+        rule_stats.add_feature_time(_t.perf_counter() - t0)     # 🟦 [PERF-18]
+    print(f"[SL/TP 계산 로그] symbol={pair}, direction={signal}")
+    print(f" - entry_price: {feats.price}")
+    print(f" - support: {support}, resistance: {resistance}, buffer: {feats.sl_buffer}")
+    print(f" - SL: {feats.sl}, TP: {feats.tp}, 손익비(r_ratio): {feats.r_ratio:.2f}")
+    return SIGNAL_RULES.score(feats, stats=rule_stats, key=(pair, strategy_name))
+
+
+def score_signal_with_filters(rsi, macd, macd_signal, stoch_rsi, prev_stoch_rsi, trend, prev_trend, signal, liquidity, pattern, pair, candles, atr, price, bollinger_upper, bollinger_lower, support, resistance, support_distance, resistance_distance, pip_size, macd_trend=None, expected_direction=None, strategy_name=None, ctx=None):
+    """예전 인터페이스 그대로 (signal_score, reasons). 규칙 코드가 필요하면 score_signal()."""
+    result = score_signal(
+        rsi, macd, macd_signal, stoch_rsi, prev_stoch_rsi, trend, prev_trend, signal, liquidity, pattern,
+        pair, candles, atr, price, bollinger_upper, bollinger_lower, support, resistance,
+        support_distance, resistance_distance, pip_size, macd_trend=macd_trend,
+        expected_direction=expected_direction, strategy_name=strategy_name, ctx=ctx,
+    )
+    return result.score, result.reasons()
+
+
+def _last_valid(values, default, back=0):
+    """봉마다 'NaN이 아닌 끝에서 back+1번째 값' (CandleContext.last/prev를 전 구간에)."""
+    valid = ~np.isnan(values)
+    picked = values[valid]
+    if not picked.size:
+        return np.full(len(values), default)
+    k = np.cumsum(valid) - 1 - back
+    return np.where(k >= 0, picked[np.maximum(k, 0)], default)
+
+
+def score_signal_history(candles, pair, signal, support=None, resistance=None, strategy_name=None):
+    """🟦 [PERF-17] 과거 봉마다 '이 봉에서 signal 알림이 왔다면' 점수 → score_rules.BatchScore (배열 모드).
+    지표/추세/패턴은 웹훅과 같은 정의로 전 구간을 한 번에 만든다. 지지/저항은 봉마다 배열로 넘기고,
+    없으면 마지막 봉 기준 get_enhanced_support_resistance 값을 전 구간에 쓴다. 시간대 감점은 봉 시각(ET) 기준."""
+    close = candles["close"].to_numpy(dtype=np.float64)
+    rsi = calculate_rsi(candles["close"]).to_numpy()
+    stoch = stoch_rsi_array(rsi)
+    macd_line, macd_sig = macd_arrays(close)
+    boll_up, boll_mid, boll_low = (s.to_numpy() for s in calculate_bollinger_bands(candles["close"]))
+    atr_raw = calculate_atr(candles).to_numpy()
+    atr = _last_valid(atr_raw, 0.0)
+
+    ema20 = ewm_mean(close, span=20, adjust=False)
+    ema50 = ewm_mean(close, span=50, adjust=False)
+    trend = _trend_labels(ema20, ema50, close, boll_mid, np.nan_to_num(atr_raw), pair)
+    prev_trend = np.concatenate([["NEUTRAL"], trend[:-1]]).astype(object)
+
+    macd_r = np.round(macd_line, 5)
+    shift = lambda x, k: np.concatenate([np.full(k, np.nan), x[:len(x) - k]])
+
+    if support is None or resistance is None:
+        s, r = get_enhanced_support_resistance(candles, price=close[-1], atr=atr[-1],
+                                               timeframe=base_granularity_for(pair), pair=pair)
+        support = s if support is None else support
+        resistance = r if resistance is None else resistance
+
+    hour = 0
+    if "time" in candles.columns:
+        hour = pd.to_datetime(candles["time"], utc=True, format="ISO8601").dt.tz_convert("America/New_York").dt.hour.to_numpy()
+
+    feats = _score_features(
+        candles, pair,
+        signal=signal, direction=signal, rsi=rsi, macd=macd_line, macd_signal=macd_sig,
+        stoch=_last_valid(stoch, 0.0), prev_stoch=_last_valid(stoch, 0.0, back=1),
+        trend=trend, prev_trend=prev_trend, pattern=calculate_candle_patterns(candles).to_numpy(dtype=object),
+        atr=atr, boll_up=boll_up, boll_low=boll_low, support=support, resistance=resistance,
+        macd_t1=macd_r, macd_t2=shift(macd_r, 1), macd_t3=shift(macd_r, 2),
+        macd_trend_len=np.minimum(np.arange(1, len(close) + 1), 14),
+        strategy_name=strategy_name, hour=hour,
+    )
+    return SIGNAL_RULES.score_batch(feats)
 
 app = FastAPI()
 
@@ -1864,6 +589,10 @@ ACCOUNT_ID = os.getenv("ACCOUNT_ID")
 OANDA_LIVE = os.getenv("OANDA_LIVE", "false").strip().lower() == "true"
 OANDA_BASE_URL = "https://api-fxtrade.oanda.com" if OANDA_LIVE else "https://api-fxpractice.oanda.com"
 print(f"🏦 OANDA 엔드포인트: {OANDA_BASE_URL} ({'실계좌' if OANDA_LIVE else '데모'})")
+# 🟦 [PERF-10] 가격 스트리밍은 REST와 호스트가 다르다 (stream-fxpractice / stream-fxtrade). 로컬 가짜 서버로 바꿀 수 있게 env 허용
+OANDA_STREAM_BASE_URL = os.getenv("OANDA_STREAM_BASE_URL") or (
+    "https://stream-fxtrade.oanda.com" if OANDA_LIVE else "https://stream-fxpractice.oanda.com"
+)
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
 # ============================================================
@@ -1877,6 +606,8 @@ ALPACA_TRADE_BASE_URL = (
     "https://paper-api.alpaca.markets" if ALPACA_PAPER else "https://api.alpaca.markets"
 )
 ALPACA_DATA_BASE_URL = "https://data.alpaca.markets"
+# 🟦 [PERF-10] 실시간 시세 웹소켓 (무료 플랜은 iex 피드)
+ALPACA_STREAM_URL = os.getenv("ALPACA_STREAM_URL", "wss://stream.data.alpaca.markets/v2/iex")
 # 주문당 고정 매수 금액(달러). sizing_mode="fixed"일 때 또는 risk 계산 실패시 폴백으로 사용.
 ALPACA_FIXED_NOTIONAL_USD = float(os.getenv("ALPACA_FIXED_NOTIONAL_USD", "1000"))
 
@@ -1886,7 +617,7 @@ ALPACA_SIZING_MODE = os.getenv("ALPACA_SIZING_MODE", "tiered").strip().lower()
 ALPACA_RISK_PCT = float(os.getenv("ALPACA_RISK_PCT", "0.5"))
 # SL이 너무 타이트해서 risk 계산상 수량이 과도하게 커지는 것을 막는 안전 캡(달러, notional 기준).
 ALPACA_MAX_NOTIONAL_USD = float(os.getenv("ALPACA_MAX_NOTIONAL_USD", "5000"))
-# 주식 SL 버퍼 = ATR * 이 배수 (get_buffer_by_symbol). 페이퍼 트레이딩하면서 0.15/0.20/0.25 A/B 테스트용.
+# 주식 SL 버퍼 = ATR * 이 배수 (score_rules 구조 SL/TP). 페이퍼 트레이딩하면서 0.15/0.20/0.25 A/B 테스트용.
 ALPACA_SL_BUFFER_ATR_MULT = float(os.getenv("ALPACA_SL_BUFFER_ATR_MULT", "0.15"))
 # 신호가 vs 주문 직전 실시간가 차이 허용 한도(%). 이걸 넘으면 신호를 신뢰할 수 없다고 보고 주문 스킵.
 ALPACA_MAX_PRICE_GAP_PCT = float(os.getenv("ALPACA_MAX_PRICE_GAP_PCT", "1.5"))
@@ -2044,8 +775,10 @@ def analyze_highs_lows(candles, window=20):
     if highs.empty or lows.empty:
         return {"new_high": False, "new_low": False}
 
-    new_high = highs.iloc[-1] > highs.max()
-    new_low = lows.iloc[-1] < lows.min()
+    # 🟥 [FIX-K1] 예전엔 마지막 봉을 '자기 자신을 포함한' 최고/최저와 비교해서(x > max(…, x))
+    #    고점/저점 갱신이 절대 참이 될 수 없었다 → 마지막 봉 앞의 봉들과 비교한다.
+    new_high = highs.iloc[-1] > highs.iloc[:-1].max()
+    new_low = lows.iloc[-1] < lows.iloc[:-1].min()
     return {
         "new_high": new_high,
         "new_low": new_low
@@ -2093,8 +826,26 @@ _bg_tasks: set = set()
 _bg_lock = threading.Lock()
 _bg_running = 0
 
+# ============================================================
+# 🟦 [PERF-07] 웹훅 처리는 이벤트 루프 위의 코루틴으로 돈다.
+#  예전엔 알림 1건 = to_thread 스레드 1개였고, 그 스레드가 캔들/뉴스/브로커/OpenAI 응답을
+#  순서대로 블로킹 대기했다. 봉 마감에 알림이 몰리면 기본 스레드풀(≈CPU+4)이 금방 차서
+#  뒤의 알림은 앞 알림의 GPT 응답(수 초~수십 초)을 줄 서서 기다렸다.
+#  이제 네트워크 대기는 전부 aiohttp(await)라 스레드를 점유하지 않는다.
+#  아직 동기 라이브러리뿐인 작업(gspread 시트 기록, Playwright 캡처, 주문 전송)만
+#  전용 스레드풀에서 돌린다.
+# ============================================================
+WEBHOOK_IO_WORKERS = int(os.getenv("WEBHOOK_IO_WORKERS", "16"))
+_webhook_io_pool = ThreadPoolExecutor(max_workers=WEBHOOK_IO_WORKERS, thread_name_prefix="webhook-io")
+
+
+async def _run_blocking(fn, *args, **kwargs):
+    """동기 함수를 웹훅 전용 스레드풀에서 실행하고 결과를 await 한다."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_webhook_io_pool, functools.partial(fn, *args, **kwargs))
 
-def _run_webhook_bg(raw: bytes):
+
+async def _run_webhook_bg(raw: bytes):
     """백그라운드 실행 래퍼 — 예외를 삼키지 않고 로그로 남긴다."""
     global _bg_running
     with _bg_lock:
@@ -2104,7 +855,7 @@ def _run_webhook_bg(raw: bytes):
         print(f"⚠️ [웹훅] 동시 처리 {n}건 — 알림이 몰리고 있습니다(처리 지연 가능)")
     _t0 = _t.time()
     try:
-        return process_webhook_sync(raw)
+        return await process_webhook(raw)
     except Exception as e:
         import traceback
         print(f"❌ [웹훅 백그라운드] 처리 중 예외: {e}")
@@ -2124,7 +875,7 @@ async def webhook(request: Request):
     TradingView는 응답 본문을 쓰지 않으므로, 빨리 200/202를 주는 것이 유일하게 중요하다.
     """
     raw = (await request.body()) or b""
-    task = asyncio.create_task(asyncio.to_thread(_run_webhook_bg, raw))
+    task = asyncio.create_task(_run_webhook_bg(raw))
     # create_task 결과를 어디에도 안 붙들면 GC가 태스크를 회수할 수 있다 → 참조 유지
     _bg_tasks.add(task)
     task.add_done_callback(_bg_tasks.discard)
@@ -2138,10 +889,20 @@ async def webhook_sync(request: Request):
     (curl로 수동 테스트할 때 사용. TradingView에는 절대 이 주소를 쓰지 말 것)
     """
     raw = (await request.body()) or b""
-    return await asyncio.to_thread(process_webhook_sync, raw)
+    return await process_webhook(raw)
+
+
+async def _webhook_news_risk(pair):
+    """웹훅용 뉴스 리스크 (score, message) — 주식은 Alpaca News, FX는 경제캘린더."""
+    if is_stock_pair(pair):
+        news_score, news_msg, news_headlines = await get_stock_news_risk_async(pair)
+        if news_headlines:
+            news_msg += " — " + " / ".join(news_headlines[:2])
+        return news_score, news_msg
+    return await news_risk_score_async(pair)
 
 
-def process_webhook_sync(raw: bytes):
+async def process_webhook(raw: bytes):
     print("✅ STEP 1: 웹훅 진입")
     # 🟥 [FIX-E3] 전역 10분 쿨다운은 완전히 죽은 코드였다.
     #    _last_execution_time이 0.0으로 선언된 뒤 어디서도 갱신되지 않아서
@@ -2193,7 +954,7 @@ def process_webhook_sync(raw: bytes):
         # 🟥 [FIX-D6b] 조기 종료하더라도 감사 흔적은 남긴다.
         #    그냥 return하면 이 알림이 왔다는 사실 자체가 시트에서 사라져서
         #    "제외 종목에 알림이 몇 건이나 낭비되는지"를 나중에 셀 수 없다.
-        _log_blocked_alert(pair, data.get("signal"), data.get("alert_name"), _early_reason)
+        await _run_blocking(_log_blocked_alert, pair, data.get("signal"), data.get("alert_name"), _early_reason)
         return JSONResponse(content={
             "status": "blocked", "reason": _early_reason, "pair": pair
         })
@@ -2237,6 +998,9 @@ def process_webhook_sync(raw: bytes):
             status_code=400
         )
 
+    # 🟦 [PERF-10] 알림이 온 종목은 가격 스트림 구독 목록에 올린다 (주문 직전엔 이미 시세가 들어와 있도록)
+    price_streams.track(pair)
+
     alert_name = data.get("alert_name", "기본알림")
 
     # 🟥 [FIX-B1] 전략명을 여기서 한 번만 확정해서 아래 전부(스코어 함수 인자 / threshold 조회)가
@@ -2253,7 +1017,11 @@ def process_webhook_sync(raw: bytes):
     )
     strategy_name = str(strategy_name).strip() or "기본알림"
 
-    candles = get_candles(pair, base_granularity_for(pair), 200)
+    # 🟦 [PERF-07] 기준봉 캔들과 뉴스 리스크를 동시에 받는다 (예전엔 캔들 → 지표 계산 → 뉴스 순서로 직렬 대기)
+    candles, (news_score, news_msg) = await asyncio.gather(
+        get_candles_async(pair, base_granularity_for(pair), 200),
+        _webhook_news_risk(pair),
+    )
     # ✅ 캔들 방어 로직 — ATR(14) 계산 가능한 최소 개수(14개)로 강화
     candle_count = len(candles) if candles is not None else 0
     print(f"📊 [{pair}] 캔들 수신: {candle_count}개")
@@ -2279,8 +1047,17 @@ def process_webhook_sync(raw: bytes):
             status_code=400
         )
     # ✅ ATR 먼저 계산 (Series)
-    atr_series = calculate_atr(candles)
-    last_atr = float(atr_series.dropna().iloc[-1]) if not atr_series.dropna().empty else None
+    # 🟦 [PERF-12] RSI/StochRSI/MACD/ATR/볼린저는 (pair, 기준봉)별 증분 엔진에서 한 번에 — 지난 알림 이후 새 봉만 반영
+    # 🟦 [PERF-14] 이 봉의 파생값(지표/패턴/지지저항/추세/MTF)은 CandleContext 하나에 모아 두고
+    #    스코어 → payload → GPT 단계가 같은 값을 나눠 쓴다 (같은 봉에 알림이 또 오면 컨텍스트째 재사용)
+    _base_tf = base_granularity_for(pair)
+    ctx = _candle_contexts.get(
+        pair, _base_tf, candles,
+        lambda: _indicator_engine.series_for((str(pair).upper(), _base_tf), candles),
+    )
+    candles = ctx.candles
+    atr_series = ctx.series("atr")
+    last_atr = ctx.last("atr")
 
     # ✅ ATR 계산 불가(캔들 부족 등)면 여기서 죽지 않고 깔끔하게 에러 응답
     if last_atr is None:
@@ -2293,8 +1070,10 @@ def process_webhook_sync(raw: bytes):
         )
 
     # ✅ 지지/저항 계산 - timeframe 키 "H1" 로, atr에는 Series 전달
-    support, resistance = get_enhanced_support_resistance(
-        candles, price=current_price, atr=last_atr, timeframe=base_granularity_for(pair), pair=pair
+    support, resistance = ctx.memo(
+        ("support_resistance", float(current_price), last_atr),
+        get_enhanced_support_resistance,
+        candles, price=current_price, atr=last_atr, timeframe=_base_tf, pair=pair,
     )
 
     support_resistance = {"support": support, "resistance": resistance}
@@ -2309,62 +1088,38 @@ def process_webhook_sync(raw: bytes):
         return JSONResponse(content={"error": "캔들 데이터를 불러올 수 없음"}, status_code=400)
 
     close = candles["close"]
-    rsi = calculate_rsi(close)
-    stoch_rsi_series = calculate_stoch_rsi(rsi)
-    stoch_rsi = stoch_rsi_series.dropna().iloc[-1] if not stoch_rsi_series.dropna().empty else 0
-    macd, macd_signal = calculate_macd(close)
+    rsi = ctx.series("rsi")
+    stoch_rsi = ctx.last("stoch_rsi", 0)
+    macd, macd_signal = ctx.series("macd"), ctx.series("macd_signal")
     lookback = 14  # 최근 14봉 기준 추세 분석용
-    # RSI 트렌드
-    rsi_trend = list(rsi.iloc[-lookback:].round(2)) if not rsi.empty else []
-
-    # MACD 트렌드
-    macd_trend = list(macd.iloc[-lookback:].round(5)) if not macd.empty else []
-
-    # MACD 시그널 트렌드
-    macd_signal_trend = list(macd_signal.iloc[-lookback:].round(5)) if not macd_signal.empty else []
-
-    # Stoch RSI 트렌드
-    if not stoch_rsi_series.dropna().empty:
-        stoch_rsi_trend = list(stoch_rsi_series.dropna().iloc[-lookback:].round(2))
-    else:
-        stoch_rsi_trend = []
+    # RSI / MACD / MACD 시그널 / Stoch RSI 트렌드
+    rsi_trend = ctx.trend_values("rsi", lookback, 2)
+    macd_trend = ctx.trend_values("macd", lookback, 5)
+    macd_signal_trend = ctx.trend_values("macd_signal", lookback, 5)
+    stoch_rsi_trend = ctx.clean_trend_values("stoch_rsi", lookback, 2)
     
     print(f"✅ STEP 5: 보조지표 계산 완료 | RSI: {rsi.iloc[-1]}")
-    boll_up, boll_mid, boll_low = calculate_bollinger_bands(close)
-
-    pattern = detect_candle_pattern(candles)
-    trend = detect_trend(candles, rsi, boll_mid, pair=pair)
-    prev_trend = detect_trend(candles.iloc[:-1], rsi.iloc[:-1], boll_mid.iloc[:-1], pair=pair)
-    stoch_rsi_clean = stoch_rsi_series.dropna()
-    prev_stoch_rsi = stoch_rsi_clean.iloc[-2] if len(stoch_rsi_clean) >= 2 else 0
-    liquidity = estimate_liquidity(candles)
+    boll_up, boll_mid, boll_low = ctx.series("boll_up"), ctx.series("boll_mid"), ctx.series("boll_low")
+
+    pattern = ctx.memo("pattern", detect_candle_pattern, candles)
+    trend = context_trend(ctx, pair)
+    prev_trend = context_trend(ctx, pair, back=1)
+    prev_stoch_rsi = ctx.prev("stoch_rsi", 0)
+    liquidity = ctx.memo("liquidity", estimate_liquidity, candles)
     # 🟦 버그 수정: 예전엔 fetch_forex_news()(포렉스팩토리 홈페이지를 단순 스크래핑, 거의 항상
     #    고정값만 반환)를 모든 자산에 공통으로 썼고, 주식은 filter_relevant_news가 항상 []을 반환해서
     #    뉴스 체크가 사실상 아무 의미가 없었음(항상 "영향 적음"만 나옴).
     #    주식은 Alpaca News API로 그 종목의 실제 최근 뉴스를 확인하고, FX는 기존 경제캘린더 기반을 유지.
-    if is_stock_pair(pair):
-        news_score, news_msg, news_headlines = get_stock_news_risk(pair)
-        if news_headlines:
-            news_msg += " — " + " / ".join(news_headlines[:2])
-        news = news_msg
-    else:
-        news_score, news_msg = news_risk_score(pair)
-        news = news_msg
-    high_low_analysis = analyze_highs_lows(candles)
-    atr = float(atr_series.dropna().iloc[-1]) if not atr_series.dropna().empty else 0.0
-    fibo_levels = calculate_fibonacci_levels(candles["high"].max(), candles["low"].min())
+    #    (조회 자체는 위에서 캔들과 함께 _webhook_news_risk()로 끝났다)
+    news = news_msg
+    high_low_analysis = ctx.memo("highs_lows", analyze_highs_lows, candles)
+    atr = ctx.last("atr", 0.0)
+    fibo_levels = ctx.memo("fibo", lambda: calculate_fibonacci_levels(candles["high"].max(), candles["low"].min()))
     # 📌 현재가 계산
     price = current_price
-    # 🟥 [FIX-E8] 주식에서 자릿수가 뭉개지던 버그.
-    #    pip_value_for(주식) = max(0.01, 가격×0.0001)이라 $500짜리 주식은 pip=0.05가 되고
-    #    log10(0.05)≈-1.3 → int(abs(...))=1 → GPT payload의 지지/저항·OHLC가
-    #    소수 1자리로 반올림돼 정밀도가 통째로 날아갔다.
-    #    → 주식은 항상 센트 단위(2자리)를 쓴다.
-    if is_stock_pair(pair):
-        price_digits = 2
-    else:
-        price_digits = int(abs(np.log10(pip_value_for(pair))))  # EURUSD=4, JPY계열=2
-    signal_score, reasons = score_signal_with_filters(
+    price_digits = price_digits_for(pair)
+    # 🟦 [PERF-17] 점수 + 걸린 규칙 코드 (아래 역행/골든크로스 판정은 reasons 문자열 대신 코드로)
+    score_result = score_signal(
         rsi.iloc[-1],
         macd.iloc[-1],
         macd_signal.iloc[-1],
@@ -2398,17 +1153,18 @@ def process_webhook_sync(raw: bytes):
         #    사실상 0이었던 직접 원인.
         expected_direction=signal,
         strategy_name=strategy_name,
+        ctx=ctx,
     )
+    signal_score, reasons = score_result.score, score_result.reasons()
     # ===== GPT 입력 업그레이드용 안전한 추가 정보 =====
     try:
-        recent_ohlc = []
-        for _, row in candles.tail(5).iterrows():
-            recent_ohlc.append({
-                "open": round(float(row["open"]), price_digits),
-                "high": round(float(row["high"]), price_digits),
-                "low": round(float(row["low"]), price_digits),
-                "close": round(float(row["close"]), price_digits),
-            })
+        # 🟦 [PERF-14] iterrows() 대신 컨텍스트의 컬럼 배열 꼬리에서 바로
+        _ohlc = [ctx.column(c)[-5:] for c in ("open", "high", "low", "close")]
+        recent_ohlc = [
+            {"open": round(float(o), price_digits), "high": round(float(h), price_digits),
+             "low": round(float(l), price_digits), "close": round(float(c), price_digits)}
+            for o, h, l, c in zip(*_ohlc)
+        ]
     except Exception as e:
         print("❌ recent_ohlc 생성 실패:", e)
         recent_ohlc = []
@@ -2515,6 +1271,8 @@ def process_webhook_sync(raw: bytes):
         ),
         "alert_name": data.get("alert_name", "").strip(),
         "alert_data": data.get("alert_data", {}),
+        # 🟦 [PERF-23] 걸린 규칙을 "코드±가감점"으로, 0점 안내 규칙은 "코드:문구"로 (GPT에는 score_components 문장 대신 이걸 보낸다)
+        "score_codes": score_result.brief(),
     }
 
 
@@ -2529,8 +1287,8 @@ def process_webhook_sync(raw: bytes):
     #    역행만 있고 골든크로스 없을 때는 68% 승률 +$172로 오히려 좋음
     #    → 이 두 가지가 같이 오면 "추세와 반대 방향으로 강하게 올라온 것"을 의미
     #      골든크로스가 실제 추세 전환이 아닌 단기 과열 신호일 가능성이 높음
-    _has_opp_reverse = any("opportunity_score 역행" in r for r in reasons)
-    _has_golden = any("골든크로스(강)" in r for r in reasons)
+    _has_opp_reverse = score_result.has("OPP_AGAINST_BUY", "OPP_AGAINST_SELL")
+    _has_golden = score_result.has("MACD_GOLDEN_STRONG")
     if _has_opp_reverse and _has_golden:
         signal_score -= 1.5
         reasons.append("🔴 opportunity_score 역행 + MACD 골든크로스 동시 발생 → 과열 추격 위험 추가감점 (-1.5)")
@@ -2583,58 +1341,21 @@ def process_webhook_sync(raw: bytes):
     gpt_raw = None
     raw_text = ""  # ✅ 조건문 전에 미리 초기화
     if signal_score >= threshold:
-        # 📸 [추가] 1. 사진 찍기
-        # 🟦 주식은 차트 캡처를 스킵한다 (Playwright 미설치로 매번 실패할 뿐 아니라,
-        #    GPT 분석 전 불필요한 지연(수 초)을 줄여서 알림→체결 시차를 최소화하기 위함).
-        #    FX는 기존과 동일하게 캡처 시도.
-        if is_stock_pair(pair):
-            chart_path = None
+        # 🟦 [PERF-19] 같은 봉 · 거의 같은 payload(전략만 다른 알림, 재전송)면 OpenAI를 다시 부르지 않고
+        #    저장해 둔 판단을 쓴다. 같은 키가 동시에 들어오면 _gpt_flight로 한 번만 호출해서 결과를 나눠 받는다.
+        _gpt_bar_time = str(candles["time"].iloc[-1]) if "time" in candles.columns and len(candles) else _bar_time
+        _gpt_key = decision_key(pair, signal, _gpt_bar_time, payload, pip_size)
+        _gpt_cached = gpt_decision_cache.get(_gpt_key)
+        _gpt_shared = False
+        if _gpt_cached is not None:
+            # 롤오버/주말 시간제한은 저장된 판단이어도 지금 시각 기준으로 다시 본다
+            gpt_raw = _gpt_time_restriction() or _gpt_cached
+            print(f"♻️ [GPT 캐시] {pair} {signal} bar={_gpt_bar_time} → 저장된 판단 재사용 (OpenAI 호출 없음)")
         else:
-            try:
-                chart_path = capture_tradingview_chart(pair)
-            except Exception as e:
-                print(f"❌ 차트 캡처 실패, 이미지 없이 계속 진행: {e}")
-                chart_path = None
-    
-        # 🖼 [추가] 2. 이미지를 GPT가 읽을 수 있는 문자열로 변환
-        base64_image = encode_image(chart_path) if chart_path else None
-    
-        # 🤖 [수정] 3. GPT 분석 함수 호출 (base64_image 인자 추가)
-        # ※ 주의: analyze_with_gpt 함수 정의 부분에도 image 인자를 받도록 수정해야 합니다.
-        gpt_raw = None
-        
-        for attempt in range(3):
-        
-            try:
-        
-                gpt_raw = analyze_with_gpt(
-                    payload,
-                    price,
-                    pair,
-                    candles,
-                    base64_image
-                )
-        
-                if (
-                    gpt_raw
-                    and "GPT_ERROR" not in str(gpt_raw)
-                ):
-                    break
-        
-                print(
-                    f"⚠ GPT 실패 → 재시도 {attempt+2}/3"
-                )
-        
-                _t.sleep(2)
-        
-            except Exception as e:
-        
-                print(
-                    f"⚠ GPT 호출 실패 {attempt+1}/3: {e}"
-                )
-        
-                _t.sleep(2)
-        
+            gpt_raw, _gpt_shared = await _gpt_flight.do(_gpt_key, _gpt_decide_async, payload, price, pair, candles, ctx)
+            if _gpt_shared:
+                print(f"♻️ [GPT 합류] {pair} {signal} bar={_gpt_bar_time} → 같은 판단을 동시 알림과 나눠 씀 (OpenAI 호출 1번)")
+
         # ============================================================
         # 🟥 [FIX-C1] GPT 실패 = 진입 차단
         # ------------------------------------------------------------
@@ -2660,6 +1381,10 @@ def process_webhook_sync(raw: bytes):
         elif "쿨다운" in _raw_probe or "429" in _raw_probe:
             _gpt_failed, _gpt_fail_reason = True, "GPT_RATE_LIMITED"
 
+        # 합류한 알림도 같은 값을 다시 넣을 뿐이라 shared 여부와 상관없이 저장한다
+        if not _gpt_failed and _gpt_cached is None and isinstance(gpt_raw, str):
+            gpt_decision_cache.put(_gpt_key, gpt_raw, expires_at=_gpt_cache_expiry(pair, _gpt_bar_time))
+
         if _gpt_failed:
             print(f"❌ GPT 검증 실패({_gpt_fail_reason}) → 이 신호는 진입하지 않는다 (무검증 진입 금지)")
             gpt_feedback = f"{_gpt_fail_reason}: {_raw_probe[:500]}"
@@ -2768,7 +1493,8 @@ def process_webhook_sync(raw: bytes):
 
         
     print(f"✅ STEP 10: 전략 요약 저장 호출 | decision: {decision}, TP: {tp}, SL: {sl}")
-    sheet_row_idx = log_trade_result(
+    sheet_row_idx = await _run_blocking(
+        log_trade_result,
         pair=pair,
         signal=signal,
         decision=final_decision,
@@ -2870,7 +1596,7 @@ def process_webhook_sync(raw: bytes):
                 )
                 # 🟦 log_trade_result()가 이 재계산보다 먼저 호출돼서, GPT가 보고한 값이 공식과
                 #    미묘하게 다른 드문 경우엔 시트에 그 (틀린) 값이 남을 수 있다. 사후 보정으로 확정.
-                correct_sheet_trade_prices(sheet_row_idx, current_price, final_tp, final_sl)
+                await _run_blocking(correct_sheet_trade_prices, sheet_row_idx, current_price, final_tp, final_sl)
             else:
                 # WAIT — 실제 final_tp/final_sl(None)은 그대로 두고(주문 로직에 영향 없게),
                 # 시트에는 사후보정으로 가상의 TP/SL을 채워넣는다.
@@ -2881,7 +1607,7 @@ def process_webhook_sync(raw: bytes):
                 # 🟦 log_trade_result()는 이미 위(line~2285)에서 이 값들 계산 전에 호출돼서
                 #    시트에 price/tp/sl이 빈칸으로 박혀있다. 같은 행을 사후 보정해서 채워넣는다.
                 #    (price는 로그 당시와 동일한 값을 그대로 다시 써서 다른 컬럼은 안 건드림)
-                correct_sheet_trade_prices(sheet_row_idx, current_price, _hyp_tp, _hyp_sl)
+                await _run_blocking(correct_sheet_trade_prices, sheet_row_idx, current_price, _hyp_tp, _hyp_sl)
 
     # ✅ 여기서부터 검증 블록 삽입 (FX는 기존과 동일하게 tp/sl 기준으로 계산)
     pip = pip_value_for(pair)
@@ -3010,7 +1736,7 @@ def process_webhook_sync(raw: bytes):
     #  둘 다 "보유 없음"을 보고 둘 다 주문할 수 있었다(웹훅이 스레드풀에서 병렬 처리됨).
     #  락은 심볼 단위라 서로 다른 종목의 처리는 그대로 병렬로 돈다.
     # ============================================================
-    with _get_order_lock(pair_for_order):
+    async with _get_order_lock(pair_for_order):
         if should_execute:
 
             if is_stock_pair(pair_for_order):
@@ -3028,11 +1754,11 @@ def process_webhook_sync(raw: bytes):
                 #    누적 보유 한도로 둔다. 이미 그 한도까지 채워져 있으면 추가 진입 스킵.
                 #    (FIFO 완전차단은 NFA 규정상 FX에만 강제되는 룰이라 주식에 그대로 가져올 필요는 없음.
                 #     다만 한 종목에 무제한 집중되는 것은 막기 위해 한도를 둠.)
-                existing_qty = get_alpaca_position_qty(pair_for_order)
+                existing_qty = await get_alpaca_position_qty_async(pair_for_order)
                 # 🟥 [FIX-E6b] 한도 계산도 실제 주문 수량 산출기(calc_alpaca_qty)와 같은 값을 써야 한다.
                 #    기존엔 캡이 적용되지 않은 get_tiered_qty()를 쓰다 보니, 캡으로 수량이 줄어든
                 #    고가주에서 한도가 실제 주문 4회분이 되어 의도(2회분)보다 느슨해졌다.
-                intended_qty = calc_alpaca_qty(price, final_sl, ALPACA_FIXED_NOTIONAL_USD)
+                intended_qty = await _run_blocking(calc_alpaca_qty, price, final_sl, ALPACA_FIXED_NOTIONAL_USD)
                 max_total_qty = intended_qty * 2
                 if existing_qty + intended_qty > max_total_qty:
                     print(f"[SKIP] {pair_for_order} 기존 보유 {existing_qty}주 + 신규 {intended_qty}주 "
@@ -3044,7 +1770,7 @@ def process_webhook_sync(raw: bytes):
                           f"≤ 한도({max_total_qty}주) → 진입 허용")
             elif should_execute and not is_stock_pair(pair_for_order):
                 # ✅ FX: 이미 열린 트레이드가 있으면 신규 진입 스킵 (FIFO 방지, NFA 규정 준수)
-                opened, cnt = has_open_trade(pair_for_order)
+                opened, cnt = await has_open_trade_async(pair_for_order)
                 if opened:
                     print(f"[SKIP] {pair_for_order} openTrades={cnt} → FIFO 방지로 신규진입 스킵")
                     should_execute = False
@@ -3061,13 +1787,15 @@ def process_webhook_sync(raw: bytes):
                 #    계좌 규모·변동성과 무관한 고정 랏이라 리스크 관리가 사실상 없었다.
                 #    (OANDA 데모 계좌 150건에서 거래손익 -$1,566 + 스왑 -$1,094가 나온 배경)
                 #    → SL 거리 기준 리스크 사이징으로 바꾸고, FX_UNITS_FIXED로 옛 동작 복원 가능.
-                units = calc_fx_units(pair, price, final_sl, final_decision)
+                units = await _run_blocking(calc_fx_units, pair, price, final_sl, final_decision)
                 digits = 3 if pair.endswith("JPY") else 5
     
             print(f"[DEBUG] WILL PLACE ORDER → pair={pair}, side={final_decision}, units={units}, "
                   f"price={price}, tp={final_tp}, sl={final_sl}, digits={digits}, score={signal_score}")
     
-            result = place_order(pair_for_order, units, final_tp, final_sl, digits, price=price, atr=atr)
+            result = await _run_blocking(
+                place_order, pair_for_order, units, final_tp, final_sl, digits, price=price, atr=atr
+            )
             # 🟥 [FIX-E3b] 전역 쿨다운 타이머를 실제로 갱신한다.
             #    이 값이 한 번도 갱신되지 않아 GLOBAL_COOLDOWN_SECONDS 설정이 무의미했다.
             if isinstance(result, dict) and result.get("status") == "order_placed":
@@ -3078,7 +1806,8 @@ def process_webhook_sync(raw: bytes):
             # 🟦 주식이고 실제로 가격 재조정이 일어난 경우, 시트에 이미 적힌 옛날 price/tp/sl을
             #    실제 주문에 쓰인 최종값으로 다시 보정한다 (결과추적이 보는 기준값을 일치시키기 위함).
             if is_stock_pair(pair_for_order) and isinstance(result, dict) and "final_tp" in result:
-                correct_sheet_trade_prices(
+                await _run_blocking(
+                    correct_sheet_trade_prices,
                     sheet_row_idx,
                     result.get("final_price", price),
                     result.get("final_tp"),
@@ -3089,7 +1818,7 @@ def process_webhook_sync(raw: bytes):
             result = {"status": "skipped"}
     
     executed_time = datetime.now(ZoneInfo("UTC"))   # 🟥 [FIX-E9]
-    candles_post = get_candles(pair, base_granularity_for(pair), 8)
+    candles_post = await get_candles_async(pair, base_granularity_for(pair), 8)
     price_movements = candles_post[["high", "low"]].to_dict("records")
 
     if final_decision in ("BUY", "SELL") and isinstance(result, dict) and result.get("status") == "order_placed":
@@ -3149,7 +1878,8 @@ def process_webhook_sync(raw: bytes):
     if _block_label and not str(_effective).startswith("EXECUTED_"):
         _effective = f"SKIPPED_{_block_label}"
 
-    _finalize_sheet_row(
+    await _run_blocking(
+        _finalize_sheet_row,
         sheet_row_idx,
         effective_decision=_effective,
         gpt_decision=gpt_parsed_decision,
@@ -3176,13 +1906,7 @@ def process_webhook_sync(raw: bytes):
     })
 
 
-def calculate_atr(candles, period=14):
-    high_low = candles['high'] - candles['low']
-    high_close = np.abs(candles['high'] - candles['close'].shift())
-    low_close = np.abs(candles['low'] - candles['close'].shift())
-    tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-    atr = tr.rolling(window=period).mean()
-    return atr
+# 🟦 [PERF-13] calculate_atr / calculate_rsi / calculate_macd / … 는 indicators.py 공용 구현을 쓴다
 
 def calculate_fibonacci_levels(high, low):
     diff = high - low
@@ -3192,46 +1916,75 @@ def calculate_fibonacci_levels(high, low):
         "0.618": high - 0.618 * diff,
         "1.0": high
     }
-def get_multi_tf_scalping_data(pair):
+def get_multi_tf_scalping_data(pair, base_candles=None):
     """
     단타 분석을 위한 MTF 캔들 + 보조지표 추세 리스트 수집.
     진입 타임프레임은 base_granularity_for(pair) — FX는 M30, 주식은 M15. H1(보조 흐름), H4(큰 흐름)는 공통.
     🟦 3개 타임프레임 캔들 조회를 순차 대신 병렬로 실행해서 대기 시간을 줄인다(네트워크 왕복 3번→1번 분량).
+    🟦 [PERF-14] base_candles(웹훅이 이미 받은 기준봉)가 있으면 기준봉은 다시 받지 않고 그 꼬리를 쓴다.
     """
     base_tf = base_granularity_for(pair)
+    timeframes = _scalping_timeframes(base_tf)
+    fetched = _scalping_base_frame(base_tf, timeframes, base_candles)
+
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        futures = {tf: ex.submit(get_candles, pair, tf, count) for tf, count in timeframes.items() if tf not in fetched}
+        fetched.update({tf: f.result() for tf, f in futures.items()})
+
+    return _scalping_indicators(base_tf, {tf: fetched[tf] for tf in timeframes})
+
+
+async def get_multi_tf_scalping_data_async(pair, base_candles=None):
+    """🟦 [PERF-07] get_multi_tf_scalping_data()의 async 버전 — 3개 타임프레임을 asyncio.gather로 동시에"""
+    base_tf = base_granularity_for(pair)
+    timeframes = _scalping_timeframes(base_tf)
+    fetched = _scalping_base_frame(base_tf, timeframes, base_candles)
+    todo = [tf for tf in timeframes if tf not in fetched]
+    frames = await asyncio.gather(*(get_candles_async(pair, tf, timeframes[tf]) for tf in todo))
+    fetched.update(zip(todo, frames))
+    return _scalping_indicators(base_tf, {tf: fetched[tf] for tf in timeframes})
+
 
-    timeframes = {
+def _scalping_base_frame(base_tf, timeframes, base_candles):
+    """기준봉 캔들을 이미 갖고 있으면 {base_tf: 꼬리 count개} (get_candles(pair, base_tf, count)와 같은 봉들)."""
+    count = timeframes[base_tf]
+    if base_candles is None or len(base_candles) < count:
+        return {}
+    return {base_tf: base_candles.tail(count)}
+
+
+def _scalping_timeframes(base_tf):
+    return {
         base_tf: 100,
         'H1': 100,
         'H4': 60
     }
 
-    tf_data = {}
 
-    with ThreadPoolExecutor(max_workers=3) as ex:
-        futures = {tf: ex.submit(get_candles, pair, tf, count) for tf, count in timeframes.items()}
-        fetched = {tf: f.result() for tf, f in futures.items()}
+def _scalping_indicators(base_tf, fetched):
+    """타임프레임별 캔들 → RSI/MACD/StochRSI 최근 추세 리스트 (sync/async 공용)"""
+    tf_data = {}
 
     for tf, candles in fetched.items():
         if candles is None or candles.empty:
             continue
 
-        df = candles.copy()
         try:
             # 보조지표 계산
-            df['rsi'] = ta.momentum.RSIIndicator(close=df['close'], window=14).rsi()
-            macd = ta.trend.MACD(close=df['close'])
-            df['macd'] = macd.macd()
-            df['macd_signal'] = macd.macd_signal()
-            df['stoch_rsi'] = ta.momentum.StochRSIIndicator(close=df['close'], window=14).stochrsi()
+            # 🟦 [PERF-13] ta 패키지와 같은 공식(Wilder RSI, MACD adjust=False + 워밍업)을 indicators.py 커널로
+            # 🟦 [PERF-14] 캔들을 copy해서 컬럼을 붙이지 않고 배열로만 계산한다
+            close = candles['close']
+            rsi = wilder_rsi(close, 14)
+            macd, macd_signal = macd_arrays(close, adjust=False, warmup=True)
+            stoch_rsi = stoch_rsi_array(rsi, 14)
 
             # 최근 14개 (H4는 10개) 보조지표 리스트 저장
             n = 14 if tf in [base_tf, 'H1'] else 10
             tf_data[tf] = {
-                'rsi_trend': df['rsi'].dropna().iloc[-n:].tolist(),
-                'macd_trend': df['macd'].dropna().iloc[-n:].tolist(),
-                'macd_signal_trend': df['macd_signal'].dropna().iloc[-n:].tolist(),
-                'stoch_rsi_trend': df['stoch_rsi'].dropna().iloc[-n:].tolist()
+                'rsi_trend': _valid_tail(rsi, n),
+                'macd_trend': _valid_tail(macd, n),
+                'macd_signal_trend': _valid_tail(macd_signal, n),
+                'stoch_rsi_trend': _valid_tail(stoch_rsi, n)
             }
 
         except Exception as e:
@@ -3239,6 +1992,11 @@ def get_multi_tf_scalping_data(pair):
             continue
 
     return tf_data
+
+
+def _valid_tail(values, n):
+    """NaN을 뺀 마지막 n개 (예전 Series.dropna().iloc[-n:].tolist()와 같다)."""
+    return values[~np.isnan(values)][-n:].tolist()
     
 def summarize_mtf_indicators(mtf_data):
     summary = {}  # ✅ 문자열 리스트 → 딕셔너리로 변경
@@ -3272,8 +2030,8 @@ _ALPACA_BARS_PER_TRADING_DAY = {
 }
 
 
-def get_alpaca_candles(symbol, granularity, count):
-    """Alpaca Market Data API에서 주식 캔들(바)을 가져와 OANDA 캔들과 동일한 포맷의 DataFrame으로 반환."""
+def _alpaca_candles_request(symbol, granularity, count, since=None):
+    """get_alpaca_candles / get_alpaca_candles_async 공용 — (url, params, timeframe) 구성."""
     timeframe = _ALPACA_GRANULARITY_MAP.get(granularity, "30Min")
 
     # 🟦 start를 안 주면 Alpaca가 충분히 과거로 안 거슬러가고 "오늘 일부만" 주는 경우가 있어서,
@@ -3297,69 +2055,441 @@ def get_alpaca_candles(symbol, granularity, count):
         #    desc로 최신 것부터 limit개를 받은 뒤 아래에서 시간순으로 다시 뒤집는다.
         "sort": "desc",
     }
+    if since:
+        # 🟦 [PERF-03] 델타 모드: 마지막 저장 봉부터 오름차순으로 받으면 limit 안에서 잘릴 일이 없다
+        params["start"] = since
+        params["sort"] = "asc"
+    return url, params, timeframe
+
+
+def _alpaca_candles_frame(symbol, timeframe, params, bars):
+    """Alpaca bars 응답(DecodedBars) → OANDA 캔들과 같은 포맷의 DataFrame."""
+    if not len(bars):
+        print(f"❗ [Alpaca] {symbol} 캔들 데이터 없음 (start={params['start']})")
+        return pd.DataFrame(columns=["time", "open", "high", "low", "close", "volume"])
+
+    # desc로 받았으니 시간 오름차순으로 뒤집어서, candles.iloc[-1]이 항상 "가장 최근" 캔들이 되게 한다.
+    if params["sort"] == "desc":
+        bars = bars.reversed()
+
+    print(f"📊 [Alpaca] {symbol} {timeframe} 캔들 {len(bars)}개 수신 "
+          f"(최근: {bars.time[-1]}, 가장 오래된: {bars.time[0]})")
+
+    return bars.to_frame()
+
+
+def get_alpaca_candles(symbol, granularity, count, since=None):
+    """
+    Alpaca Market Data API에서 주식 캔들(바)을 가져와 OANDA 캔들과 동일한 포맷의 DataFrame으로 반환.
+    since(RFC3339)를 주면 그 시각 이후(그 봉 포함) 바만 오름차순으로 최대 count개 받는다 (링버퍼 델타 갱신용).
+    """
+    url, params, timeframe = _alpaca_candles_request(symbol, granularity, count, since)
     try:
-        r = requests.get(url, headers=ALPACA_HEADERS, params=params, timeout=15)
+        r = alpaca_data_http.get(url, headers=ALPACA_HEADERS, params=params, timeout=15)
         r.raise_for_status()
-        bars = r.json().get("bars", [])
+        bars = decode_alpaca_bars(r.content)   # 🟦 [PERF-09] JSON → 컬럼 배열 직행
     except Exception as e:
         print(f"❗ [Alpaca] {symbol} 캔들 요청 실패: {e}")
         return pd.DataFrame(columns=["time", "open", "high", "low", "close", "volume"])
+    return _alpaca_candles_frame(symbol, timeframe, params, bars)
 
-    if not bars:
-        print(f"❗ [Alpaca] {symbol} 캔들 데이터 없음 (start={params['start']})")
+
+async def get_alpaca_candles_async(symbol, granularity, count, since=None):
+    """🟦 [PERF-07] get_alpaca_candles의 aiohttp 버전 (이벤트 루프에서 바로 await)."""
+    url, params, timeframe = _alpaca_candles_request(symbol, granularity, count, since)
+    try:
+        r = await alpaca_data_ahttp.get(url, headers=ALPACA_HEADERS, params=params, timeout=15)
+        r.raise_for_status()
+        bars = decode_alpaca_bars(r.content)
+    except Exception as e:
+        print(f"❗ [Alpaca] {symbol} 캔들 요청 실패: {e}")
         return pd.DataFrame(columns=["time", "open", "high", "low", "close", "volume"])
+    return _alpaca_candles_frame(symbol, timeframe, params, bars)
 
-    # desc로 받았으니 시간 오름차순으로 뒤집어서, candles.iloc[-1]이 항상 "가장 최근" 캔들이 되게 한다.
-    bars = list(reversed(bars))
 
-    print(f"📊 [Alpaca] {symbol} {timeframe} 캔들 {len(bars)}개 수신 "
-          f"(최근: {bars[-1].get('t')}, 가장 오래된: {bars[0].get('t')})")
+# 🟦 [PERF-05] 여러 종목을 한 번에: /v2/stocks/bars?symbols=A,B,C (next_page_token 페이지네이션)
+#    40개 넘는 주식 포트폴리오를 종목별로 한 번씩 부르던 것을 몇 번의 요청으로 줄인다.
+ALPACA_BULK_SYMBOLS_PER_REQUEST = int(os.getenv("ALPACA_BULK_SYMBOLS_PER_REQUEST", "50"))
+ALPACA_BULK_PAGE_LIMIT = 10000   # multi-symbol bars 1페이지 최대 바 개수(종목 합산)
 
-    return pd.DataFrame([
-        {
-            "time": b.get("t"),
-            "open": float(b["o"]),
-            "high": float(b["h"]),
-            "low": float(b["l"]),
-            "close": float(b["c"]),
-            "volume": b.get("v", 0),
+
+def _alpaca_bars_to_frame(bars):
+    return alpaca_bars_columns(bars).to_frame()
+
+
+def get_alpaca_bars_bulk(symbols, granularity, count=None, start=None):
+    """
+    여러 종목의 바를 multi-symbol 엔드포인트로 한꺼번에 받아
+    {symbol: DataFrame(get_alpaca_candles와 같은 포맷)}으로 반환.
+    - start(aware datetime)를 주면 그 시각 이후 전부, 안 주면 count 기준으로 get_alpaca_candles와 같은 방식으로 start를 잡는다
+    - count를 주면 종목별로 최근 count개만 남긴다
+    바가 없거나 실패한 종목은 결과에서 빠진다(호출부가 개별 조회로 폴백하면 됨).
+    """
+    symbols = sorted({str(s).upper() for s in symbols if s})
+    if not symbols:
+        return {}
+    timeframe = _ALPACA_GRANULARITY_MAP.get(granularity, "30Min")
+    if start is not None:
+        start_dt = start.astimezone(ZoneInfo("UTC"))
+    else:
+        bars_per_day = _ALPACA_BARS_PER_TRADING_DAY.get(timeframe, 26)
+        needed_trading_days = max(5, ((count or 0) // max(1, bars_per_day)) + 5)
+        start_dt = datetime.now(ZoneInfo("UTC")) - timedelta(days=int(needed_trading_days * 1.6))
+
+    collected = {s: [] for s in symbols}
+    requests_made = 0
+    for i in range(0, len(symbols), ALPACA_BULK_SYMBOLS_PER_REQUEST):
+        chunk = symbols[i:i + ALPACA_BULK_SYMBOLS_PER_REQUEST]
+        params = {
+            "symbols": ",".join(chunk),
+            "timeframe": timeframe,
+            "limit": ALPACA_BULK_PAGE_LIMIT,
+            "adjustment": "raw",
+            "feed": "iex",
+            "start": start_dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            # multi-symbol은 종목 단위로 묶여서 오므로 asc로 받고 종목별로 꼬리 count개만 남긴다
+            "sort": "asc",
         }
-        for b in bars
-    ])
+        while True:
+            try:
+                r = alpaca_data_http.get(f"{ALPACA_DATA_BASE_URL}/v2/stocks/bars", headers=ALPACA_HEADERS,
+                                 params=params, timeout=30)
+                r.raise_for_status()
+                data = loads_json(r.content)
+            except Exception as e:
+                print(f"❗ [Alpaca] 다종목 캔들 요청 실패 ({','.join(chunk)}): {e}")
+                break
+            requests_made += 1
+            for sym, bars in (data.get("bars") or {}).items():
+                if sym in collected and bars:
+                    collected[sym].extend(bars)
+            token = data.get("next_page_token")
+            if not token:
+                break
+            params["page_token"] = token
+
+    out = {}
+    for sym, bars in collected.items():
+        if bars:
+            out[sym] = _alpaca_bars_to_frame(bars[-count:] if count else bars)
+    print(f"📊 [Alpaca] 다종목 {timeframe} 캔들: {len(out)}/{len(symbols)}종목, 요청 {requests_made}회")
+    return out
 
 
-def get_candles(pair, granularity, count):
+def get_alpaca_latest_prices_bulk(symbols):
+    """여러 종목 최신 체결가를 /v2/stocks/trades/latest?symbols= 로 한 번에. {symbol: price}, 실패 종목은 빠짐."""
+    symbols = sorted({str(s).upper() for s in symbols if s})
+    out = {}
+    for i in range(0, len(symbols), ALPACA_BULK_SYMBOLS_PER_REQUEST):
+        chunk = symbols[i:i + ALPACA_BULK_SYMBOLS_PER_REQUEST]
+        try:
+            r = alpaca_data_http.get(f"{ALPACA_DATA_BASE_URL}/v2/stocks/trades/latest", headers=ALPACA_HEADERS,
+                             params={"symbols": ",".join(chunk), "feed": "iex"}, timeout=10)
+            r.raise_for_status()
+            for sym, tr in (r.json().get("trades") or {}).items():
+                try:
+                    out[sym] = float(tr["p"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+        except Exception as e:
+            print(f"[Alpaca] 다종목 최신가 조회 실패 ({','.join(chunk)}): {e}")
+    return out
+
+
+# 🟦 [PERF-01] 한 알림 안에서 base 200개 / MTF 100개 / H1·H4 / 주문 후 8개를 매번 REST로 다시 받던 것을
+#    (pair, granularity) 단위 캐시로 재사용. 만료는 해당 봉의 다음 마감 시각, 큰 항목은 꼬리만 잘라서 재사용.
+_candle_cache = CandleCache(max_age_sec=CANDLE_CACHE_MAX_AGE_SEC)
+
+# 🟦 [PERF-02] 봉 마감 알림 폭주 때 여러 웹훅 스레드가 같은 (pair, granularity, count)를 동시에 요청하면
+#    실제 REST 호출은 하나만 나가고 나머지는 그 결과를 같이 받는다. 캔들/최신가/뉴스 조회에 공통 사용.
+_upstream_flight = SingleFlight()
+
+
+# 🟦 [PERF-03] (pair, granularity)별 링버퍼. 두 번째 요청부터는 마지막 저장 봉 이후만 받는다.
+_candle_rings = CandleRingStore(CANDLE_RING_SIZE)
+
+
+def _fetch_candles_from_broker(pair, granularity, count, since=None):
     # 🟦 주식 심볼이면 Alpaca 데이터로 분기
     if is_stock_pair(pair):
-        return get_alpaca_candles(pair, granularity, count)
+        return get_alpaca_candles(pair, granularity, count, since=since)
+    return get_oanda_candles(pair, granularity, count, since=since)
+
+
+# 🟦 [PERF-04] M1 히스토리 디스크 아카이브. 결과추적의 수천 개짜리 M1 요청은 로컬 슬라이스 + 빠진 꼬리만 받는다.
+_candle_archive = CandleArchive(CANDLE_ARCHIVE_DIR)
+_ARCHIVE_DELTA_LIMIT = 5000   # OANDA count 상한
+
+
+def _archive_closed_bars(pair, granularity, df):
+    """형성 중인 마지막 봉은 빼고 닫힌 봉만 아카이브에 기록."""
+    if df is None or df.empty:
+        return 0
+    gran_sec = granularity_seconds(granularity)
+    t_sec = frame_time_ns(df) // 1_000_000_000
+    closed = (t_sec + gran_sec) <= int(time.time())
+    if not closed.any():
+        return 0
+    return _candle_archive.append(
+        pair, granularity, t_sec[closed],
+        df["open"].to_numpy()[closed], df["high"].to_numpy()[closed], df["low"].to_numpy()[closed],
+        df["close"].to_numpy()[closed], df["volume"].to_numpy()[closed],
+    )
+
+
+def _load_candles_via_archive(pair, granularity, count):
+    oanda_style = not is_stock_pair(pair)
+    try:
+        with _candle_archive.lock_for(pair, granularity):
+            local = _candle_archive.tail(pair, granularity, count)
+            if local is not None and local.shape[1]:
+                last_t = int(local[0, -1])
+                since = format_bar_times([last_t], oanda_style)[0]
+                delta = _fetch_candles_from_broker(pair, granularity, _ARCHIVE_DELTA_LIMIT, since=since)
+                if not delta.empty and len(delta) < _ARCHIVE_DELTA_LIMIT:
+                    new = delta[(frame_time_ns(delta) // 1_000_000_000) > last_t]
+                    if local.shape[1] + len(new) >= count:
+                        _archive_closed_bars(pair, granularity, new)
+                        out = pd.concat([CandleArchive.to_frame(local, oanda_style), new], ignore_index=True)
+                        return out.iloc[len(out) - count:].reset_index(drop=True)
+
+            # 시드 조회는 상한까지 한 번에 받아둔다 — 결과추적은 경과 시간만큼 count가 조금씩 늘어나서
+            # 딱 count만 받아두면 다음 주기에 또 전체 조회로 떨어진다
+            full = _fetch_candles_from_broker(pair, granularity, max(count, _ARCHIVE_DELTA_LIMIT))
+            if not full.empty:
+                # 아카이브 끝과 안 이어지면(프로세스 중단 등으로 빈 구간) 이번 구간 시작을 연속 하한으로 기록
+                prev_last = _candle_archive.last_time(pair, granularity)
+                first_t = int(frame_time_ns(full.iloc[:1])[0] // 1_000_000_000)
+                if prev_last is None or prev_last < first_t:
+                    _candle_archive.set_floor(pair, granularity, first_t)
+                _archive_closed_bars(pair, granularity, full)
+            return full.iloc[max(0, len(full) - count):].reset_index(drop=True)
+    except OSError as e:
+        # 디스크 문제로 아카이브를 못 쓰면 기존처럼 통째로 받는다
+        print(f"⚠️ [캔들아카이브] {pair} {granularity} 아카이브 사용 실패 → 원격 조회: {e}")
+        return _fetch_candles_from_broker(pair, granularity, count)
+
+
+def _load_candles_via_ring(pair, granularity, count):
+    # 링버퍼보다 긴 요청(성과 추적의 M1 수천 개 등)은 아카이브 대상이면 아카이브로,
+    # 아니면(또는 모르는 granularity면) 기존처럼 통째로 받는다
+    if count > _candle_rings.capacity or granularity_seconds(granularity) is None:
+        if str(granularity).upper() in CANDLE_ARCHIVE_GRANULARITIES and granularity_seconds(granularity):
+            return _load_candles_via_archive(pair, granularity, count)
+        return _fetch_candles_from_broker(pair, granularity, count)
+
+    ring = _candle_rings.ring(pair, granularity)
+    with ring.lock:
+        live = _live_ring_frame(pair, granularity, count, ring)   # 🟦 [PERF-11] 스트림이 최신으로 유지 중이면 REST 없음
+        if live is not None:
+            return live
+        t0 = time.time()
+        if len(ring) >= count:
+            delta = _fetch_candles_from_broker(pair, granularity, ring.capacity, since=ring.last_time_str)
+            # 델타가 capacity만큼 꽉 차서 오면 공백이 더 길 수 있으니 전체를 다시 받는다
+            if not delta.empty and len(delta) < ring.capacity:
+                _candle_rings.count_fetch(True, len(delta))
+                ring.merge_frame(delta)
+                _mark_ring_synced(ring, granularity, t0)
+                return ring.frame(count)
+
+        full = _fetch_candles_from_broker(pair, granularity, count)
+        if full.empty:
+            return full
+        _candle_rings.count_fetch(False, len(full))
+        ring.reset()
+        ring.merge_frame(full)
+        _mark_ring_synced(ring, granularity, t0)
+        return full
+
+
+# =====================================================================
+# 🟦 [PERF-08] H1/H4는 기준봉(FX M30 / 주식 M15)을 로컬에서 묶어서 만든다.
+#    MTF 분석(get_multi_timeframe_context / get_multi_tf_scalping_data)이 알림마다
+#    H1 100개, H4 60개·50개를 따로 받던 것을 기준봉 캐시/링버퍼 하나로 해결한다.
+#    기준봉 히스토리가 모자라면(링버퍼 크기 초과 등) 기존처럼 브로커에서 해당 granularity를 직접 받는다.
+#    주식은 H1만 (Alpaca 1Hour와 같은 정각 버킷). H4는 Alpaca 4Hour 경계와 맞는다는 보장이 없어 브로커에서 받는다.
+# =====================================================================
+LOCAL_RESAMPLE_GRANULARITIES = tuple(
+    g.strip().upper() for g in os.getenv("LOCAL_RESAMPLE_GRANULARITIES", "H1,H4").split(",") if g.strip()
+)
+STOCK_LOCAL_RESAMPLE_GRANULARITIES = tuple(
+    g.strip().upper() for g in os.getenv("STOCK_LOCAL_RESAMPLE_GRANULARITIES", "H1").split(",") if g.strip()
+)
+
+
+def _resample_plan(pair, granularity, count):
+    """로컬 리샘플이 가능하면 (기준 granularity, 필요한 기준봉 수, target 초, 세션 anchor 초), 아니면 None."""
+    gran = str(granularity).upper()
+    if gran not in (STOCK_LOCAL_RESAMPLE_GRANULARITIES if is_stock_pair(pair) else LOCAL_RESAMPLE_GRANULARITIES):
+        return None
+    base = base_granularity_for(pair)
+    target_sec, base_sec = granularity_seconds(gran), granularity_seconds(base)
+    if not target_sec or not base_sec or target_sec <= base_sec or target_sec % base_sec:
+        return None
+    # 맨 앞 버킷은 잘려서 버려질 수 있으니 한 봉 분량 더
+    need = (int(count) + 1) * (target_sec // base_sec)
+    if need > _candle_rings.capacity:
+        return None
+    anchor = STOCK_SESSION_ANCHOR_SEC if is_stock_pair(pair) else FX_SESSION_ANCHOR_SEC
+    return base, need, target_sec, anchor
+
+
+def _resample_from_base(pair, count, plan, base_df):
+    """기준봉 DataFrame → 리샘플 결과 꼬리 count개. 기준봉이 모자라 count개가 안 나오면 None."""
+    _base, _need, target_sec, anchor = plan
+    if base_df is None or base_df.empty:
+        return None
+    out = resample_frame(base_df, target_sec, anchor, oanda_style=not is_stock_pair(pair))
+    if len(out) < int(count):
+        return None
+    return out.iloc[-int(count):].reset_index(drop=True)
+
+
+def _fetch_candles_uncached(pair, granularity, count):
+    plan = _resample_plan(pair, granularity, count)
+    if plan is not None:
+        df = _resample_from_base(pair, count, plan, get_candles(pair, plan[0], plan[1]))
+        if df is not None:
+            _candle_cache.put(pair, granularity, count, df)
+            return df
+
+    df = _load_candles_via_ring(pair, granularity, count)
+    _candle_cache.put(pair, granularity, count, df)
+    return df
+
+
+def get_candles(pair, granularity, count):
+    cached = _candle_cache.get(pair, granularity, count)
+    if cached is not None:
+        return cached
+
+    df, shared = _upstream_flight.do(
+        ("candles", str(pair).upper(), str(granularity).upper(), int(count)),
+        _fetch_candles_uncached, pair, granularity, count,
+    )
+    # 같이 받은 쪽은 DataFrame을 복사해서 넘긴다 (호출부에서 컬럼을 추가/수정해도 서로 영향 없게)
+    return df.copy() if shared else df
+
+
+# =====================================================================
+# 🟦 [PERF-07] 캔들 조회 async 경로 — 캐시/링버퍼는 동기 경로와 공유한다.
+#    링버퍼 lock은 스레드 lock이라 await 중에는 잡지 않고, 병합(CPU 작업) 때만 잠깐 잡는다.
+# =====================================================================
+_upstream_flight_async = AsyncSingleFlight()
+
+
+async def _fetch_candles_from_broker_async(pair, granularity, count, since=None):
+    if is_stock_pair(pair):
+        return await get_alpaca_candles_async(pair, granularity, count, since=since)
+    return await get_oanda_candles_async(pair, granularity, count, since=since)
+
+
+async def _load_candles_via_ring_async(pair, granularity, count):
+    if count > _candle_rings.capacity or granularity_seconds(granularity) is None:
+        # 아카이브(디스크) 경로는 파일 I/O라 전용 스레드풀에서
+        return await _run_blocking(_load_candles_via_ring, pair, granularity, count)
+
+    ring = _candle_rings.ring(pair, granularity)
+    with ring.lock:
+        live = _live_ring_frame(pair, granularity, count, ring)   # 🟦 [PERF-11]
+        if live is not None:
+            return live
+        have, since = len(ring), ring.last_time_str
+    t0 = time.time()
+    if have >= count:
+        delta = await _fetch_candles_from_broker_async(pair, granularity, ring.capacity, since=since)
+        if not delta.empty and len(delta) < ring.capacity:
+            with ring.lock:
+                ring.merge_frame(delta)
+                _mark_ring_synced(ring, granularity, t0)
+                if len(ring) >= count:
+                    _candle_rings.count_fetch(True, len(delta))
+                    return ring.frame(count)
+
+    full = await _fetch_candles_from_broker_async(pair, granularity, count)
+    if full.empty:
+        return full
+    _candle_rings.count_fetch(False, len(full))
+    with ring.lock:
+        ring.reset()
+        ring.merge_frame(full)
+        _mark_ring_synced(ring, granularity, t0)
+    return full
+
+
+async def _fetch_candles_uncached_async(pair, granularity, count):
+    plan = _resample_plan(pair, granularity, count)
+    if plan is not None:
+        base_df = await get_candles_async(pair, plan[0], plan[1])
+        df = _resample_from_base(pair, count, plan, base_df)
+        if df is not None:
+            _candle_cache.put(pair, granularity, count, df)
+            return df
+
+    df = await _load_candles_via_ring_async(pair, granularity, count)
+    _candle_cache.put(pair, granularity, count, df)
+    return df
+
+
+async def get_candles_async(pair, granularity, count):
+    """get_candles()의 async 버전. 이벤트 루프에서 바로 await 한다."""
+    cached = _candle_cache.get(pair, granularity, count)
+    if cached is not None:
+        return cached
+
+    df, shared = await _upstream_flight_async.do(
+        ("candles", str(pair).upper(), str(granularity).upper(), int(count)),
+        _fetch_candles_uncached_async, pair, granularity, count,
+    )
+    return df.copy() if shared else df
+
 
+def _oanda_candles_request(pair, granularity, count, since=None):
+    """get_oanda_candles / get_oanda_candles_async 공용 — (url, headers, params) 구성."""
     url = f"{OANDA_BASE_URL}/v3/instruments/{pair}/candles"   # 🟥 [FIX-E2] 하드코딩 제거
     headers = {"Authorization": f"Bearer {OANDA_API_KEY}"}
     params = {"granularity": granularity, "count": count, "price": "M"}
-    
+    if since:
+        params["from"] = since
+    return url, headers, params
+
+
+def _oanda_candles_frame(pair, candles):
+    if not len(candles):
+        print(f"❗ {pair} 캔들 데이터 없음")
+        return pd.DataFrame(columns=["time", "open", "high", "low", "close", "volume"])
+
+    return candles.to_frame()
+
+
+def get_oanda_candles(pair, granularity, count, since=None):
+    """
+    OANDA에서 캔들을 직접 받아온다 (캐시 미경유). 평소엔 get_candles()를 쓸 것.
+    since(RFC3339)를 주면 그 시각 봉부터 최대 count개만 받는다 (링버퍼 델타 갱신용).
+    """
+    url, headers, params = _oanda_candles_request(pair, granularity, count, since)
     try:
-        r = requests.get(url, headers=headers, params=params)
+        r = oanda_http.get(url, headers=headers, params=params)
         r.raise_for_status()
-        candles = r.json().get("candles", [])
+        candles = decode_oanda_candles(r.content)   # 🟦 [PERF-09] JSON → 컬럼 배열 직행
     except Exception as e:
         print(f"❗ 캔들 요청 실패: {e}")
         return pd.DataFrame(columns=["time", "open", "high", "low", "close", "volume"])
+    return _oanda_candles_frame(pair, candles)
 
-    if not candles:
-        print(f"❗ {pair} 캔들 데이터 없음")
+
+async def get_oanda_candles_async(pair, granularity, count, since=None):
+    """🟦 [PERF-07] get_oanda_candles의 aiohttp 버전."""
+    url, headers, params = _oanda_candles_request(pair, granularity, count, since)
+    try:
+        r = await oanda_ahttp.get(url, headers=headers, params=params)
+        r.raise_for_status()
+        candles = decode_oanda_candles(r.content)
+    except Exception as e:
+        print(f"❗ 캔들 요청 실패: {e}")
         return pd.DataFrame(columns=["time", "open", "high", "low", "close", "volume"])
-         
-    return pd.DataFrame([
-        {
-            "time": c["time"],
-            "open": float(c["mid"]["o"]),
-            "high": float(c["mid"]["h"]),
-            "low": float(c["mid"]["l"]),
-            "close": float(c["mid"]["c"]),
-            "volume": c.get("volume", 0)
-        }
-        for c in candles
-    ])
+    return _oanda_candles_frame(pair, candles)
 
 def get_ohlcv(pair, interval="30m", limit=100):
     """
@@ -3382,33 +2512,12 @@ def get_ohlcv(pair, interval="30m", limit=100):
 
     return get_candles(pair, granularity, limit)
 
-def calculate_rsi(series, period=14):
-    delta = series.diff()
-    gain = delta.clip(lower=0).rolling(window=period).mean()
-    loss = -delta.clip(upper=0).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-def calculate_macd(series):
-    ema12 = series.ewm(span=12).mean()
-    ema26 = series.ewm(span=26).mean()
-    macd = ema12 - ema26
-    signal = macd.ewm(span=9).mean()
-    return macd, signal
-
-def calculate_stoch_rsi(rsi, period=14):
-    min_rsi = rsi.rolling(window=period).min()
-    max_rsi = rsi.rolling(window=period).max()
-    return (rsi - min_rsi) / (max_rsi - min_rsi)
-
-def calculate_bollinger_bands(series, window=20):
-    mid = series.rolling(window=window).mean()
-    std = series.rolling(window=window).std()
-    upper = mid + 2 * std
-    lower = mid - 2 * std
-    return upper, mid, lower
-    
-def detect_box_breakout(candles, pair, box_window=10, box_threshold_pips=None):
+# 🟦 [PERF-12] 웹훅 기준봉 지표용 증분 엔진. 전체 계산(다른 경로/백테스트)은 indicators.py의 calculate_* (PERF-13)
+_indicator_engine = IndicatorEngine()
+# 🟦 [PERF-14] (pair, 기준봉, 마지막 봉)별 파생값 묶음
+_candle_contexts = CandleContextStore()
+
+def detect_box_breakout(candles, pair, box_window=10, box_threshold_pips=None, atr_series=None):
     """
     박스권 돌파 감지 (통합/동적 임계치 버전)
     - box_threshold_pips가 None이면 ATR 기반으로 동적으로 결정
@@ -3418,8 +2527,9 @@ def detect_box_breakout(candles, pair, box_window=10, box_threshold_pips=None):
     if candles is None or candles.empty:
         return {"in_box": False, "breakout": None}
 
-    # ATR 기반 임계치 계산
-    atr_series = calculate_atr(candles)
+    # ATR 기반 임계치 계산 (🟦 [PERF-14] 이미 계산한 ATR Series가 있으면 그대로)
+    if atr_series is None:
+        atr_series = calculate_atr(candles)
     last_atr = float(atr_series.dropna().iloc[-1]) if not atr_series.dropna().empty else 0.0
 
     recent = candles.tail(box_window)
@@ -3442,11 +2552,14 @@ def detect_box_breakout(candles, pair, box_window=10, box_threshold_pips=None):
         if box_range_pips > box_threshold_pips:
             return {"in_box": False, "breakout": None}
 
+    # 🟥 [FIX-K2] 돌파 기준도 마지막 봉을 포함한 고/저가라서 종가가 그 봉의 고가를 넘을 수 없는 한
+    #    UP/DOWN이 나올 수 없었다 → 박스 폭 판정은 그대로 두고, 종가는 마지막 봉 앞 봉들의 고/저와 비교한다.
     last_close = recent["close"].iloc[-1]
+    box_before = recent.iloc[:-1]
 
-    if last_close > high_max:
+    if last_close > box_before["high"].max():
         return {"in_box": True, "breakout": "UP"}
-    elif last_close < low_min:
+    elif last_close < box_before["low"].min():
         return {"in_box": True, "breakout": "DOWN"}
     else:
         return {"in_box": True, "breakout": None}
@@ -3454,18 +2567,24 @@ def detect_box_breakout(candles, pair, box_window=10, box_threshold_pips=None):
 
 def detect_trend(candles, rsi, mid_band, pair=None):
     close = candles["close"]
-    ema20 = close.ewm(span=20, adjust=False).mean()
-    ema50 = close.ewm(span=50, adjust=False).mean()
-
-    gap = abs(ema20.iloc[-1] - ema50.iloc[-1])
-
-    # 🟦 주식: 고정 0.05달러는 가격대(예: TSLA $300)에서 의미가 없으므로 ATR 비례로 판정
+    ema20 = calculate_ema(close, 20, adjust=False)
+    ema50 = calculate_ema(close, 50, adjust=False)
+    last_atr = 0.0
     if pair and is_stock_pair(pair):
         try:
             atr_series = calculate_atr(candles)
             last_atr = float(atr_series.dropna().iloc[-1]) if not atr_series.dropna().empty else 0.0
         except Exception:
             last_atr = 0.0
+    return _trend_at(ema20.iloc[-1], ema50.iloc[-1], close.iloc[-1], mid_band.iloc[-1], last_atr, pair)
+
+
+def _trend_at(ema20, ema50, close, mid, last_atr, pair):
+    """detect_trend 판정부 — 한 봉의 EMA20/EMA50/종가/볼린저 중심선/ATR로 추세 라벨."""
+    gap = abs(ema20 - ema50)
+
+    # 🟦 주식: 고정 0.05달러는 가격대(예: TSLA $300)에서 의미가 없으므로 ATR 비례로 판정
+    if pair and is_stock_pair(pair):
         neutral_threshold = (last_atr * 0.10) if last_atr > 0 else 0.05
         if gap < neutral_threshold:
             return "NEUTRAL"
@@ -3474,12 +2593,42 @@ def detect_trend(candles, rsi, mid_band, pair=None):
         if gap < 0.05:   # 필요시 0.03~0.08로 조정
             return "NEUTRAL"
 
-    if ema20.iloc[-1] > ema50.iloc[-1] and close.iloc[-1] > mid_band.iloc[-1]:
+    if ema20 > ema50 and close > mid:
         return "UPTREND"
-    elif ema20.iloc[-1] < ema50.iloc[-1] and close.iloc[-1] < mid_band.iloc[-1]:
+    elif ema20 < ema50 and close < mid:
         return "DOWNTREND"
     return "NEUTRAL"
 
+
+def _trend_labels(ema20, ema50, close, mid, atr, pair):
+    """🟦 [PERF-17] _trend_at을 전 구간 배열로 (score_signal_history용). atr은 NaN을 0으로 채워서 넘긴다."""
+    gap = np.abs(ema20 - ema50)
+    if pair and is_stock_pair(pair):
+        neutral = gap < np.where(atr > 0, atr * 0.10, 0.05)
+    else:
+        neutral = gap < 0.05
+    return np.select(
+        [neutral, (ema20 > ema50) & (close > mid), (ema20 < ema50) & (close < mid)],
+        ["NEUTRAL", "UPTREND", "DOWNTREND"], "NEUTRAL",
+    ).astype(object)
+
+
+def context_trend(ctx, pair, back=0):
+    """🟦 [PERF-14] detect_trend(candles.iloc[:len-back], …)와 같은 결과를 컨텍스트의 전체 시리즈로.
+    EMA(adjust=False)/ATR/볼린저는 앞쪽 봉만 보고 계산되므로 i번째 값은 잘라서 다시 계산한 값과 같다
+    → prev_trend(back=1)를 위해 캔들을 잘라 처음부터 다시 계산하지 않는다."""
+    def _calc():
+        close = ctx.column("close")
+        ema20 = ctx.memo("ema20", ewm_mean, close, span=20, adjust=False)
+        ema50 = ctx.memo("ema50", ewm_mean, close, span=50, adjust=False)
+        i = len(close) - 1 - back
+        last_atr = 0.0
+        if pair and is_stock_pair(pair):
+            a = ctx.series("atr").iloc[i]
+            last_atr = 0.0 if pd.isna(a) else float(a)   # ATR NaN은 앞쪽 워밍업 구간에만 있다
+        return _trend_at(ema20[i], ema50[i], close[i], ctx.series("boll_mid").iloc[i], last_atr, pair)
+    return ctx.memo(("trend", back), _calc)
+
 def detect_candle_pattern(candles):
     """
     🟥 [FIX-B6] 캔들 패턴 인식 확장.
@@ -3497,75 +2646,12 @@ def detect_candle_pattern(candles):
     """
     if candles is None or candles.empty:
         return "NEUTRAL"
-
-    last = candles.iloc[-1]
-    for c in ("open", "high", "low", "close"):
-        if c not in candles.columns or pd.isna(last[c]):
-            return "NEUTRAL"
-
-    o, h, l, c_ = float(last["open"]), float(last["high"]), float(last["low"]), float(last["close"])
-    body = abs(c_ - o)
-    rng = h - l
-    if rng <= 0:
+    if any(c not in candles.columns for c in ("open", "high", "low", "close")):
         return "NEUTRAL"
 
-    upper_wick = h - max(c_, o)
-    lower_wick = min(c_, o) - l
-    bull = c_ > o
-    bear = c_ < o
-
-    # 최근 바디 평균(직전 10봉) — "장대"의 기준을 종목/변동성에 맞춰 상대화한다.
-    try:
-        prev = candles.iloc[-11:-1]
-        avg_body = float((prev["close"] - prev["open"]).abs().mean())
-    except Exception:
-        avg_body = 0.0
-    if not avg_body or pd.isna(avg_body) or avg_body <= 0:
-        # 직전 봉들이 전부 도지라 평균 바디가 0인 경우 — 현재 바디를 기준으로 쓰면
-        # (body >= body*1.8)이 절대 성립하지 않아 장대봉 판정이 영원히 막힌다.
-        avg_body = rng * 0.3
-
-    # ---------- 2봉 패턴 ----------
-    if len(candles) >= 2:
-        p = candles.iloc[-2]
-        if not any(pd.isna(p[c]) for c in ("open", "high", "low", "close")):
-            po, pc = float(p["open"]), float(p["close"])
-            p_body = abs(pc - po)
-            p_bull, p_bear = pc > po, pc < po
-            p_mid = (po + pc) / 2.0
-
-            # 상승 장악형: 직전 음봉을 현재 양봉이 완전히 감쌈
-            if bull and p_bear and c_ >= po and o <= pc and body > p_body:
-                return "BULLISH_ENGULFING"
-            # 하락 장악형
-            if bear and p_bull and c_ <= po and o >= pc and body > p_body:
-                return "BEARISH_ENGULFING"
-            # 관통형: 음봉 뒤 양봉이 직전 몸통 중간 이상까지 회복(단 완전 장악은 아님)
-            if bull and p_bear and o < pc and c_ > p_mid and c_ < po:
-                return "PIERCING_LINE"
-            # 흑운형: 양봉 뒤 음봉이 직전 몸통 중간 아래까지 하락
-            if bear and p_bull and o > pc and c_ < p_mid and c_ > po:
-                return "DARK_CLOUD_COVER"
-
-    # ---------- 장대 바디 ----------
-    #  바디가 최근 평균의 1.8배 이상이고, 전체 범위의 60% 이상을 차지 = 방향성 강한 봉
-    if body >= avg_body * 1.8 and body >= rng * 0.6:
-        return "LONG_BODY_BULL" if bull else "LONG_BODY_BEAR"
-
-    # ---------- 1봉 꼬리 패턴 ----------
-    if body > 0:
-        # 🟥 [FIX-B6c] 아래꼬리/위꼬리 패턴은 기존 동작(HAMMER / SHOOTING_STAR)을 그대로 유지한다.
-        #    한때 "상승 흐름 뒤 아래꼬리 = HANGING_MAN(약세)"으로 세분화했으나,
-        #    HANGING_MAN은 bearish_patterns에 들어 있어서 BUY 신호에 -1.5가 붙는다.
-        #    즉 상승추세 중 망치형(원래 +2)이 갑자기 -1.5가 되는 3.5점짜리 역전이 생긴다.
-        #    이 전략은 실거래에서 "과열/추세지속 구간이 더 잘 맞는" 것으로 확인됐으므로,
-        #    검증되지 않은 반전 신호를 새로 도입하지 않는다.
-        if lower_wick > 2 * body and upper_wick < body:
-            return "HAMMER"
-        if upper_wick > 2 * body and lower_wick < body:
-            return "SHOOTING_STAR"
-
-    return "NEUTRAL"
+    # 🟦 [PERF-16] 판정 규칙은 indicators.candle_patterns(전 구간 한 번에 분류) 하나로 둔다.
+    #    마지막 봉 라벨에 필요한 건 직전 10봉(평균 바디) + 직전 1봉(2봉 패턴)뿐 → 끝 11봉만 분류해서 마지막 값
+    return calculate_candle_patterns(candles.tail(PATTERN_BODY_WINDOW + 1)).iloc[-1]
 
 def calculate_candle_psychology_score(candles, signal):
     """
@@ -3606,9 +2692,27 @@ def estimate_liquidity(candles):
 import feedparser
 import pytz
 
+FF_CALENDAR_URL = "https://nfs.faireconomy.media/ff_calendar_thisweek.xml"
+
+
+@_upstream_flight.wrap
 def fetch_news_events():
-    url = "https://nfs.faireconomy.media/ff_calendar_thisweek.xml"
-    feed = feedparser.parse(url)
+    return _feed_events(feedparser.parse(FF_CALENDAR_URL))
+
+
+@_upstream_flight_async.wrap
+async def fetch_news_events_async():
+    """🟦 [PERF-07] 경제캘린더 XML을 aiohttp로 받아서 파싱만 feedparser에 맡긴다."""
+    try:
+        r = await web_ahttp.get(FF_CALENDAR_URL, timeout=10)
+        r.raise_for_status()
+    except Exception as e:
+        print(f"❗ [뉴스] 경제캘린더 조회 실패: {e}")
+        return []
+    return _feed_events(feedparser.parse(r.content))
+
+
+def _feed_events(feed):
     events = []
     for entry in feed.entries:
         events.append({
@@ -3618,6 +2722,7 @@ def fetch_news_events():
         })
     return events
 
+@_upstream_flight.wrap
 def get_stock_news_risk(symbol, within_minutes=90):
     """
     Alpaca News API(GET /v1beta1/news)로 해당 종목의 최근 뉴스를 실제로 확인한다.
@@ -3625,22 +2730,46 @@ def get_stock_news_risk(symbol, within_minutes=90):
     return: (score, message, headlines)
     """
     try:
-        end = datetime.now(ZoneInfo("UTC"))
-        start = end - timedelta(minutes=within_minutes)
-        url = "https://data.alpaca.markets/v1beta1/news"
-        params = {
-            "symbols": symbol,
-            "start": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
-            "end": end.strftime("%Y-%m-%dT%H:%M:%SZ"),
-            "limit": 10,
-        }
-        r = requests.get(url, headers=ALPACA_HEADERS, params=params, timeout=10)
+        end, params = _stock_news_params(symbol, within_minutes)
+        r = alpaca_data_http.get(ALPACA_NEWS_URL, headers=ALPACA_HEADERS, params=params, timeout=10)
+        r.raise_for_status()
+        articles = r.json().get("news", [])
+    except Exception as e:
+        print(f"❗ [뉴스] {symbol} Alpaca News API 조회 실패: {e}")
+        return 0, "❓ 뉴스 확인 실패", []
+    return _stock_news_result(symbol, within_minutes, end, articles)
+
+
+@_upstream_flight_async.wrap
+async def get_stock_news_risk_async(symbol, within_minutes=90):
+    """get_stock_news_risk()의 async 버전. return: (score, message, headlines)"""
+    try:
+        end, params = _stock_news_params(symbol, within_minutes)
+        r = await alpaca_data_ahttp.get(ALPACA_NEWS_URL, headers=ALPACA_HEADERS, params=params, timeout=10)
         r.raise_for_status()
         articles = r.json().get("news", [])
     except Exception as e:
         print(f"❗ [뉴스] {symbol} Alpaca News API 조회 실패: {e}")
         return 0, "❓ 뉴스 확인 실패", []
+    return _stock_news_result(symbol, within_minutes, end, articles)
 
+
+ALPACA_NEWS_URL = "https://data.alpaca.markets/v1beta1/news"
+
+
+def _stock_news_params(symbol, within_minutes):
+    end = datetime.now(ZoneInfo("UTC"))
+    start = end - timedelta(minutes=within_minutes)
+    params = {
+        "symbols": symbol,
+        "start": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "end": end.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "limit": 10,
+    }
+    return end, params
+
+
+def _stock_news_result(symbol, within_minutes, end, articles):
     if not articles:
         return 0, f"🟢 최근 {within_minutes}분 내 뉴스 없음", []
 
@@ -3659,7 +2788,7 @@ def get_stock_news_risk(symbol, within_minutes=90):
         return 0, f"🟡 {symbol} 최근 {within_minutes}분 내 뉴스 {len(articles)}건", headlines
 
 
-def filter_relevant_news(pair, within_minutes=90):
+def filter_relevant_news(pair, within_minutes=90, events=None):
     # 🟦 주식은 "통화코드" 개념이 없어서(ForexFactory류 경제지표 뉴스는 FX 전용) 매칭 대상이 없음.
     #    pair.split("_")[1] 같은 FX 전용 파싱이 'NVDA'처럼 '_' 없는 티커에서 IndexError를 내던 부분 수정.
     if is_stock_pair(pair):
@@ -3667,7 +2796,8 @@ def filter_relevant_news(pair, within_minutes=90):
 
     currency = pair.split("_")[0] if pair.startswith("USD") else pair.split("_")[1]
     now_utc = datetime.now(ZoneInfo("UTC"))   # 🟥 [FIX-E9] utcnow()+replace 대신 직접 aware 생성
-    events = fetch_news_events()
+    if events is None:
+        events = fetch_news_events()
     relevant = []
 
     for e in events:
@@ -3683,7 +2813,17 @@ def filter_relevant_news(pair, within_minutes=90):
     return relevant
 
 def news_risk_score(pair):
-    relevant = filter_relevant_news(pair)
+    return _news_risk_from_titles(filter_relevant_news(pair))
+
+
+async def news_risk_score_async(pair):
+    if is_stock_pair(pair):
+        return _news_risk_from_titles([])
+    events = await fetch_news_events_async()
+    return _news_risk_from_titles(filter_relevant_news(pair, events=events))
+
+
+def _news_risk_from_titles(relevant):
     if any("High" in title for title in relevant):
         return -2, "⚠️ 고위험 뉴스 임박"
     elif any("Medium" in title for title in relevant):
@@ -3693,9 +2833,10 @@ def news_risk_score(pair):
     else:
         return 0, "🟢 영향 있는 뉴스 없음"
 
+@_upstream_flight.wrap
 def fetch_forex_news():
     try:
-        response = requests.get("https://www.forexfactory.com/", timeout=5)
+        response = web_http.get("https://www.forexfactory.com/", timeout=5)
         if "High Impact Expected" in response.text:
             return "⚠️ 고위험 뉴스 존재"
         return "🟢 뉴스 영향 적음"
@@ -3709,7 +2850,7 @@ def fetch_and_score_forex_news(pair):
     message = ""
 
     try:
-        response = requests.get("https://www.forexfactory.com/", timeout=5)
+        response = web_http.get("https://www.forexfactory.com/", timeout=5)
         text = response.text
 
         if "High Impact Expected" in text:
@@ -3770,18 +2911,32 @@ def get_alpaca_position_qty(symbol: str) -> float:
     """
     url = f"{ALPACA_TRADE_BASE_URL}/v2/positions/{symbol}"
     try:
-        r = requests.get(url, headers=ALPACA_HEADERS, timeout=10)
-        if r.status_code == 404:
-            return 0.0
-        if r.status_code == 200:
-            return abs(float(r.json().get("qty", 0)))
-        print(f"[Alpaca] 포지션 수량 조회 status={r.status_code} body={r.text}")
-        return 99999.0
+        r = alpaca_trade_http.get(url, headers=ALPACA_HEADERS, timeout=10)
+        return _alpaca_position_qty_from(r)
+    except Exception as e:
+        print("[Alpaca] 포지션 수량 조회 실패:", e)
+        return 99999.0
+
+
+async def get_alpaca_position_qty_async(symbol: str) -> float:
+    url = f"{ALPACA_TRADE_BASE_URL}/v2/positions/{symbol}"
+    try:
+        r = await alpaca_trade_ahttp.get(url, headers=ALPACA_HEADERS, timeout=10)
+        return _alpaca_position_qty_from(r)
     except Exception as e:
         print("[Alpaca] 포지션 수량 조회 실패:", e)
         return 99999.0
 
 
+def _alpaca_position_qty_from(r) -> float:
+    if r.status_code == 404:
+        return 0.0
+    if r.status_code == 200:
+        return abs(float(r.json().get("qty", 0)))
+    print(f"[Alpaca] 포지션 수량 조회 status={r.status_code} body={r.text}")
+    return 99999.0
+
+
 def has_open_position_alpaca(symbol: str) -> tuple[bool, int]:
     """
     Alpaca 계좌에 해당 심볼의 열린 포지션이 있는지 확인.
@@ -3789,7 +2944,7 @@ def has_open_position_alpaca(symbol: str) -> tuple[bool, int]:
     """
     url = f"{ALPACA_TRADE_BASE_URL}/v2/positions/{symbol}"
     try:
-        r = requests.get(url, headers=ALPACA_HEADERS, timeout=10)
+        r = alpaca_trade_http.get(url, headers=ALPACA_HEADERS, timeout=10)
         if r.status_code == 200:
             return True, 1
         if r.status_code == 404:
@@ -3817,23 +2972,56 @@ def has_open_trade(pair_for_order: str) -> tuple[bool, int]:
     }
 
     try:
-        r = requests.get(url, headers=headers, timeout=10)
-        j = r.json() if r.ok else {}
-        trades = j.get("trades", []) if isinstance(j, dict) else []
+        r = oanda_http.get(url, headers=headers, timeout=10)
+        return _count_open_trades(r, pair_for_order)
+
+    except Exception as e:
+        # 조회 실패 시엔 보수적으로 "진입 막기"가 안전
+        print("[OANDA] openTrades check failed:", e)
+        return True, -1
 
-        cnt = 0
-        for t in trades:
-            if t.get("instrument") == pair_for_order:
-                cnt += 1
 
-        return (cnt > 0), cnt
+async def has_open_trade_async(pair_for_order: str) -> tuple[bool, int]:
+    """has_open_trade()의 async 버전."""
+    if is_stock_pair(pair_for_order):
+        url = f"{ALPACA_TRADE_BASE_URL}/v2/positions/{pair_for_order}"
+        try:
+            r = await alpaca_trade_ahttp.get(url, headers=ALPACA_HEADERS, timeout=10)
+            if r.status_code == 200:
+                return True, 1
+            if r.status_code == 404:
+                return False, 0
+            print(f"[Alpaca] 포지션 조회 status={r.status_code} body={r.text}")
+            return True, -1
+        except Exception as e:
+            print("[Alpaca] 포지션 조회 실패:", e)
+            return True, -1
 
+    url = f"{OANDA_BASE_URL}/v3/accounts/{ACCOUNT_ID}/openTrades"
+    headers = {
+        "Authorization": f"Bearer {OANDA_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    try:
+        r = await oanda_ahttp.get(url, headers=headers, timeout=10)
+        return _count_open_trades(r, pair_for_order)
     except Exception as e:
-        # 조회 실패 시엔 보수적으로 "진입 막기"가 안전
         print("[OANDA] openTrades check failed:", e)
         return True, -1
 
 
+def _count_open_trades(r, pair_for_order):
+    j = r.json() if r.ok else {}
+    trades = j.get("trades", []) if isinstance(j, dict) else []
+
+    cnt = 0
+    for t in trades:
+        if t.get("instrument") == pair_for_order:
+            cnt += 1
+
+    return (cnt > 0), cnt
+
+
 # ============================================================
 # 🟥 [FIX-D2] 시트 접근 공통 헬퍼
 # ------------------------------------------------------------
@@ -4137,7 +3325,7 @@ def get_alpaca_account_equity():
     """Alpaca 계좌의 현재 equity(자산)를 조회. 실패 시 None."""
     url = f"{ALPACA_TRADE_BASE_URL}/v2/account"
     try:
-        r = requests.get(url, headers=ALPACA_HEADERS, timeout=10)
+        r = alpaca_trade_http.get(url, headers=ALPACA_HEADERS, timeout=10)
         r.raise_for_status()
         j = r.json()
         return float(j["equity"])
@@ -4305,7 +3493,7 @@ def get_oanda_account_balance():
     if not (OANDA_API_KEY and ACCOUNT_ID):
         return None
     try:
-        r = requests.get(
+        r = oanda_http.get(
             f"{OANDA_BASE_URL}/v3/accounts/{ACCOUNT_ID}/summary",
             headers={"Authorization": f"Bearer {OANDA_API_KEY}"},
             timeout=10,
@@ -4326,7 +3514,7 @@ def get_alpaca_fill_status(symbol, after_iso):
     url = f"{ALPACA_TRADE_BASE_URL}/v2/orders"
     params = {"symbols": symbol, "status": "all", "after": after_iso, "limit": 50, "direction": "asc"}
     try:
-        r = requests.get(url, headers=ALPACA_HEADERS, params=params, timeout=10)
+        r = alpaca_trade_http.get(url, headers=ALPACA_HEADERS, params=params, timeout=10)
         r.raise_for_status()
         orders = r.json()
         for o in orders:
@@ -4348,12 +3536,135 @@ def get_alpaca_fill_status(symbol, after_iso):
         return False, None, None, None
 
 
+# 🟦 [PERF-10] 브로커 가격 스트림 구독 → quote_cache (심볼 → 최신 bid/ask/체결가).
+#    주문 직전 가격 괴리 체크가 REST 왕복 없이 메모리에서 바로 읽는다. 값이 없거나 QUOTE_MAX_AGE_SEC보다
+#    오래됐으면(스트림 끊김/장외) 기존 REST 조회로 폴백.
+price_streams = PriceStreams(
+    AlpacaQuoteStream(ALPACA_STREAM_URL, ALPACA_API_KEY or "", ALPACA_SECRET_KEY or ""),
+    OandaPriceStream(OANDA_STREAM_BASE_URL, ACCOUNT_ID or "", OANDA_API_KEY or ""),
+    is_stock=is_stock_pair,
+)
+
+
+def get_live_price(symbol, max_age=QUOTE_MAX_AGE_SEC):
+    """스트림 캐시의 최신가(주식=체결가, FX=mid). 신선한 값이 없으면 None."""
+    return quote_cache.price(symbol, max_age=max_age)
+
+
+# =====================================================================
+# 🟦 [PERF-11] 스트림 틱 → 실시간 봉(M1~H1) → 링버퍼
+#    봉이 닫히는 순간 링버퍼에 확정 봉으로 들어가므로, 구독 중인 종목은 알림 직후 캔들 조회가
+#    REST 없이 링버퍼(확정 봉) + 형성 중 봉으로 끝난다.
+#    링버퍼의 closed_until_ns(이 시각 이전 봉은 확정) 뒤로 빈틈 없이 이어질 때만 붙이고,
+#    이어지지 않으면(첫 구독, 재접속, 놓친 봉) 잠깐 기다렸다가 REST 델타로 메운다.
+# =====================================================================
+_NS = 1_000_000_000
+# REST로 받은 "방금 닫힌 봉"은 브로커가 아직 확정 전일 수 있어서, 조회 시각에서 이만큼 뺀 시점까지만 확정으로 본다
+LIVE_BAR_REST_SETTLE_SEC = float(os.getenv("LIVE_BAR_REST_SETTLE_SEC", "2"))
+_ring_gap_fills = set()
+
+
+def _mark_ring_synced(ring, granularity, t0):
+    """REST 병합 후: t0(조회 시작) - settle 시점에 형성 중이던 봉 이전까지는 확정. ring.lock 잡은 상태로."""
+    sec = granularity_seconds(granularity)
+    if sec:
+        settled = int((t0 - LIVE_BAR_REST_SETTLE_SEC) // sec) * sec * _NS
+        ring.closed_until_ns = max(ring.closed_until_ns, settled)
+
+
+def _live_bar_row(pair, bar):
+    return pd.DataFrame({
+        "time": format_bar_times([bar.start], oanda_style=not is_stock_pair(pair)),
+        "open": [bar.open], "high": [bar.high], "low": [bar.low], "close": [bar.close],
+        "volume": np.asarray([bar.volume], dtype=np.int64),
+    })
+
+
+def _live_ring_frame(pair, granularity, count, ring):
+    """링버퍼가 실시간 봉으로 지금까지 확정돼 있으면 (확정 봉 + 형성 중 봉) count개, 아니면 None. ring.lock 잡은 상태로."""
+    if not _live_bars.tracks(pair, granularity) or not len(ring):
+        return None
+    sec = granularity_seconds(granularity)
+    now = time.time()
+    cur = int(now // sec) * sec
+    if ring.closed_until_ns < cur * _NS:
+        return None
+    forming = _live_bars.forming(pair, granularity, now)
+    has_cur = ring.last_time_ns >= cur * _NS
+    if has_cur and forming is None:
+        return None     # 링버퍼의 형성 봉은 REST 스냅샷이라 낡았고, 스트림 쪽 형성 봉이 없다
+    df = ring.frame(count + 1 if has_cur else count)
+    if has_cur:
+        df = df.iloc[:-1]
+    if forming is not None:
+        df = pd.concat([df, _live_bar_row(pair, forming)], ignore_index=True)
+    if len(df) < count:
+        return None
+    _candle_rings.count_live()
+    return df.iloc[len(df) - count:].reset_index(drop=True)
+
+
+def _publish_live_bar(symbol, granularity, bar):
+    """BarBuilder.on_close — 닫힌 봉을 링버퍼에 반영. lock이 잡혀 있으면 False(잠시 뒤 재시도)."""
+    ring = _candle_rings.peek(symbol, granularity)
+    if ring is None:
+        return True     # 아직 아무도 안 쓰는 (종목, 봉) — 첫 조회 때 REST로 시드된다
+    if not ring.lock.acquire(blocking=False):
+        return False    # REST 조회 중 (동기 경로는 lock을 잡고 조회한다)
+    try:
+        last = ring.last_time_ns
+        start_ns = bar.start * _NS
+        if last is None or last > start_ns:
+            return True     # 비었거나 REST가 이미 더 최신
+        since = _live_bars.live_since(symbol)
+        # 확정 구간 끝(closed_until) ~ 이 봉 사이가 비어 있지 않아야 한다:
+        # 확정 구간이 이 봉 시작까지 왔거나, 스트림이 확정 구간 끝 전부터 계속 붙어 있었으면(그 사이 틱 없음) OK
+        if ring.closed_until_ns >= start_ns or (since is not None and since * _NS <= ring.closed_until_ns):
+            ring.append_arrays(
+                [start_ns], format_bar_times([bar.start], oanda_style=not is_stock_pair(symbol)),
+                [bar.open], [bar.high], [bar.low], [bar.close], [bar.volume],
+            )
+            ring.closed_until_ns = max(ring.closed_until_ns, start_ns + granularity_seconds(granularity) * _NS)
+            return True
+    finally:
+        ring.lock.release()
+    _schedule_ring_gap_fill(symbol, granularity)
+    return True
+
+
+def _schedule_ring_gap_fill(pair, granularity):
+    key = (str(pair).upper(), str(granularity).upper())
+    if key in _ring_gap_fills:
+        return
+    _ring_gap_fills.add(key)
+    asyncio.get_running_loop().create_task(_ring_gap_fill(key))
+
+
+async def _ring_gap_fill(key):
+    pair, granularity = key
+    try:
+        # 방금 닫힌 봉을 브로커가 확정할 시간을 준 뒤 델타 조회
+        await asyncio.sleep(LIVE_BAR_REST_SETTLE_SEC)
+        ring = _candle_rings.peek(pair, granularity)
+        if ring is not None and len(ring):
+            await _load_candles_via_ring_async(pair, granularity, len(ring))
+    except Exception as e:
+        print(f"⚠️ [봉집계] {pair} {granularity} 빈 구간 REST 보충 실패: {e}")
+    finally:
+        _ring_gap_fills.discard(key)
+
+
+_live_bars = BarBuilder(LIVE_BAR_GRANULARITIES, on_close=_publish_live_bar)
+price_streams.add_listeners(on_tick=_live_bars.on_tick, on_reset=_live_bars.reset)
+
+
+@_upstream_flight.wrap
 def get_alpaca_latest_price(symbol):
     """Alpaca 최신 체결가(latest trade) 조회. 실패 시 None."""
     url = f"{ALPACA_DATA_BASE_URL}/v2/stocks/{symbol}/trades/latest"
     params = {"feed": "iex"}
     try:
-        r = requests.get(url, headers=ALPACA_HEADERS, params=params, timeout=10)
+        r = alpaca_data_http.get(url, headers=ALPACA_HEADERS, params=params, timeout=10)
         r.raise_for_status()
         return float(r.json()["trade"]["p"])
     except Exception as e:
@@ -4373,7 +3684,8 @@ def place_order_alpaca(symbol, side, notional_usd, ref_price, tp, sl, digits=2,
        → 주문 직전 최신가를 다시 조회해서, TP/SL을 "원래 의도했던 거리"만큼 그대로 이동시켜
          항상 실시간가 기준으로 유효하게 만든다.
     """
-    fresh_price = get_alpaca_latest_price(symbol)
+    # 🟦 [PERF-10] 스트림 캐시가 신선하면 REST 왕복 생략
+    fresh_price = get_live_price(symbol) or get_alpaca_latest_price(symbol)
     if fresh_price and ref_price:
         try:
             delta = fresh_price - float(ref_price)
@@ -4445,7 +3757,7 @@ def place_order_alpaca(symbol, side, notional_usd, ref_price, tp, sl, digits=2,
     }
 
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=15)
+        response = alpaca_trade_http.post(url, headers=headers, json=data, timeout=15)
         try:
             j = response.json()
         except Exception:
@@ -4491,7 +3803,7 @@ def place_order(pair, units, tp, sl, digits, price=None, atr=None):
     # 🟦 주식이면 Alpaca Bracket Order로 분기
     if is_stock_pair(pair):
         side = "BUY" if units > 0 else "SELL"
-        ref_price = price if price is not None else (_last_price_cache.get(pair) or tp)
+        ref_price = price if price is not None else (get_live_price(pair) or _last_price_cache.get(pair) or tp)
         _atr_val = None
         try:
             if atr is not None:
@@ -4525,7 +3837,7 @@ def place_order(pair, units, tp, sl, digits, price=None, atr=None):
     }
 
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=15)
+        response = oanda_http.post(url, headers=headers, json=data, timeout=15)
 
         # ✅ 성공/실패와 무관하게 바디를 먼저 읽는다 (취소/거절 사유가 여기 들어있음)
         try:
@@ -4798,18 +4110,11 @@ def adjust_tp_sl_for_structure(pair, entry, tp, sl, support, resistance, atr):
 
     digits = price_round_digits(pair)
     return round(tp, digits), round(sl, digits)   
-def analyze_with_gpt(payload, current_price, pair, candles, base64_image=None):
-    try:
-        mtf_info = get_multi_timeframe_context(pair)
-    except Exception as e:
-        print(f"❌ MTF 정보 생성 실패: {e}")
-        mtf_info = "MTF 정보 없음"
-    global _gpt_cooldown_until, _gpt_last_ts
-    dbg("gpt.enter", t=int(_t.time()*1000))
-    #✅ 거래 시간대 필터 추가
-    from datetime import datetime
-    from zoneinfo import ZoneInfo
-    
+def _gpt_time_restriction():
+    """
+    GPT 호출 전 거래 제한 시간대 확인 (NY 기준 롤오버 / 일요일 오픈 직후 / 금요일 오후).
+    제한 중이면 "⛔ 거래 제한: ..." 문자열, 아니면 None.
+    """
     # ==========================================
     # 거래 제한 시간 필터 (Atlanta 기준)
     # ==========================================
@@ -4869,43 +4174,243 @@ def analyze_with_gpt(payload, current_price, pair, candles, base64_image=None):
         return (
             f"⛔ 거래 제한: {restriction_reason}"
         )
-        
-    # ── 전역 쿨다운: 429 맞은 뒤 일정 시간은 호출 자체 스킵 ──
-    global _gpt_cooldown_until
-    now = _t.time()
-    if now < _gpt_cooldown_until:
-        dbg("gpt.skip.cooldown", wait=round(_gpt_cooldown_until - now, 2))
-        return "GPT 응답 없음(쿨다운)"
-    gpt_rate_gate()  # 3-b: 계정 단위 슬롯 대기
-    headers = OPENAI_HEADERS
+    return None
+
+
+# =====================================================================
+# 🟦 [PERF-22] GPT 시스템 프롬프트 = 시장 종류별 고정 블록 (프로세스 시작 때 한 번 만든다)
+#    예전엔 매 호출 f-string으로 수 KB짜리 지침을 다시 조립했고, 중간에 pair/점수/MTF JSON 같은 알림별 값이
+#    섞여 있어서 두 요청이 같은 앞부분(prefix)을 가질 수가 없었다 → OpenAI 프롬프트 캐시가 한 번도 안 걸림.
+#    - 지침은 fx / jpy / stock 세 변형 중 하나를 그대로(바이트 단위로 같게) 보낸다
+#    - 알림별 값은 전부 user 메시지 맨 앞의 [알림 데이터] 섹션으로
+#    - 시작할 때 check_gpt_static_prompts()가 변형을 다시 만들어 해시가 같은지 확인한다
+# =====================================================================
+GPT_PROMPT_KINDS = ("fx", "jpy", "stock")
+
+
+def gpt_prompt_kind(pair):
+    if is_stock_pair(pair):
+        return "stock"
+    return "jpy" if "JPY" in (pair or "") else "fx"
+
+
+def _build_gpt_system_prompt(kind):
+    """시스템 프롬프트 고정 블록. 알림마다 달라지는 값은 넣지 않는다 (넣으면 프롬프트 캐시가 깨진다)."""
+    gran = "M15" if kind == "stock" else "M30"
+    return (
+        "너는 실전 FX 트레이딩 전략 조력자야.\n\n"
+        "⚠️ [역할 정의 - 매우 중요]\n"
+        "- 이미 이 신호는 사전 score / signal_score 필터를 통과했다.\n"
+        "- 그러나 GPT는 필터 결과를 맹신하지 말고 현재 차트 구조를 독립적으로 검증해야 한다,\n"
+        "  승률이 55% 미만으로 판단되면 WAIT을 선택할 수 있다.명백한 반대 시그널 뿐 아니라추세 부재, 모멘텀 부재, 박스권 상단/하단 정체도 WAIT 근거가 될 수 있다.\n"
+        "- 애매함, 가능성, 추측만으로 WAIT을 선택해서는 안 된다.\n\n"
+
+        f"📌 [{gran} 알림 전용: 멀티 타임프레임 분석 지침 - 추가됨]\n"
+        f"현재 알림은 {gran}에서 발생했습니다. [알림 데이터]의 'MTF 맥락'(상위/하위 맥락)을 반드시 참고하세요.\n"
+        "- H4 추세가 진입 방향과 일치하면 강력한 가점 요소입니다.\n"
+        "- M5 RSI가 극단적(80 이상/20 이하)일 때만 진입 타이밍 조절을 위해 WAIT을 검토하세요.\n\n"
+
+        "📌 [판단 원칙]\n"
+        "- 추세와 진입 방향이 일치하면 진입을 선호한다 그러나 NEUTRAL 추세에서는 모멘텀 증가가 확인되어야 한다 RSI, MACD, Stoch RSI가 모두 중립이면 기본 판단은 WAIT이다..\n"
+        "- 실제로 가격이 SL을 먼저 터치할 명확한 근거가 없는 한 진입을 유지한다.\n"
+        "- 결과 예측(사후적 반등/되돌림 가정)을 근거로 WAIT을 선택하지 마라.\n\n"
+
+        "아래 JSON 테이블을 기반으로 전략 리포트를 작성해. `score_components` 리스트는 각 전략 요소가 신호 판단에 어떤 기여를 했는지를 설명해 (\"규칙코드±가감점\" 형식, 뒤쪽 문장은 뉴스·추가 감점 사유).\n"
+        "- 너의 목표는 알림에서 울린 BUY 또는 SELL을 사전에 '고정'하지 않고, BUY 점수와 SELL 점수를 각각 산출한 뒤 더 높은 점수를 최종 판단으로 선택하는 것이야.\n"
+        "- 판단할 때는 아래 고차원 전략 사고 프레임을 참고하라.\n"
+        "  • GI = (O × C × P × S) / (A + B): 감정, 언급, 패턴, 종합을 강화하고 고정관념과 편향을 최소화하라.\n"
+        "  • MDA = Σ(Di × Wi × Ii): 시간, 공간, 인과 등 다양한 차원에서 통찰과 영향을 조합하라.\n"
+        "  • IL = (S × E × T) / (L × R): 직관도 논리/경험과 파악하고 전략과 경험 기반 도약도 반영하라.\n\n"
+
+        "(2) 거래는 기본적으로 1~2시간 내 청산을 목표로 하는 단타 스캘핑 트레이딩이다.\n"
+        "- 이 전략은 reversal 전략이 아니라 breakout/continuation scalp 전략이다.\n"
+        "- resistance 근접, RSI 45~60, stoch 과열은 단독으로 WAIT 근거가 아니다 단, resistance/supply zone까지 3 pip 이하이고 Stoch RSI > 0.9 인 경우는 예외다 이 경우 breakout 확인 전 BUY 추격 진입은 높은 실패 확률로 간주한다.\n"
+        "- recent_ohlc, candle_micro, breakout_context, structure_context를 우선 해석하라.\n"
+        "- SL과 TP는 ATR 기준 가급적 최소 50% 이상 거리로 설정하되, 시간이 너무 오래 걸릴 것 같으면 무시해도 좋다.\n"
+        "- 하지만 반드시 **현재가 기준으로 TP는 ATR기반으로 계산하되 과도한 목표 설정을 방지하기 위해, 계산식 TP distance는 max(ATRx1.2, 0.11) 이 공식을 항상 따라라**, SL distance는 max(ATRx1.1, 0.11)이 공식을 항상 따르되 SL은 항상 16pip을 초과하지 않도록 한다. 이내로 설정하게 해줘 어떻게 계산했는지도 보여줘. 예외는 없다 그렇지 않으면 시장 변동성 대비 손실 확률이 급격히 높아진다.\n"
+        "  (※ 위 TP/SL 공식은 FX 전용이다. 아래 (3-1)에서 종목이 미국 주식인 경우 이 공식 대신 별도 규칙을 따른다.)\n"
+        "- 최근 5개 캔들의 고점/저점을 참고해서 너가 설정한 TP/SL이 **REASONABLE한지 꼭 검토**해.\n"
+        "- RSI가 60 이상이고 Stoch RSI가 0.8 이상이며, 가격이 볼린저밴드 상단에 근접한 경우에는 'BUY 피로감'으로 간주해 'SELL'을 좀 더 고려해라.\n"
+        "- RSI가 40 이하이고 Stoch RSI가 0.1 이하이며, 가격이 볼린저밴드 하단에 근접한 경우에는 'SELL 피로감'으로 간주해'BUY'을 좀 더 고려해라.\n\n"
+
+        "(3) 지지선(support), 저항선(resistance)은 최근 1시간봉 기준 마지막 6개 캔들의 고점/저점에서 계산되었고 이미 JSON에 포함되어 있다.\n"
+        "  • 현재가/지지선/저항선 값은 [알림 데이터]에 있다.\n"
+        "- BUY 결정일 경우 TP는 반드시 현재가보다 높은 가격(상방)에, SL은 반드시 현재가보다 낮은 가격(하방)에 설정해야 한다.\n"
+        "- SELL 결정일 경우 TP는 반드시 현재가보다 낮은 가격(하방)에, SL은 반드시 현재가보다 높은 가격(상방)에 설정해야 한다.\n"
+        "- 이 규칙은 예외 없이 무조건 지켜야 하며, 이를 위반하는 TP 또는 SL을 생성하는 것은 허용되지 않는다.\n"
+        "- GPT는 BUY/SELL 방향을 기준으로 TP/SL의 방향을 항상 먼저 판단한 후 값(pip 거리)을 계산해야 한다.\n"
+        "- USD/JPY는 pip 단위가 소수점 둘째 자리입니다. TP와 SL은 반드시 이 기준으로 계산하세요. 이 규칙을 어기면 거래가 취소되므로 반드시 지켜야 한다. 예를들면 sell 거래의 진입가가 155.015라면 TP는 154.915가 10pip차이이다 \n\n"
+        + (
+            f"(3-1) ⚠️ 이번 종목은 미국 주식(Alpaca)이다. 위 (2)의 FX용 TP/SL 공식(ATRx1.2/1.1, pip, 16pip 캡)은 "
+            f"이 종목에는 적용하지 마라. 대신 TradingView Pine 전략과 동일한 아래 공식을 반드시 사용하라:\n"
+            f"  • BUY: TP = 현재가 + ATR×{STOCK_TP_ATR_MULT}, SL = 현재가 − ATR×{STOCK_SL_ATR_MULT}\n"
+            f"  • SELL: TP = 현재가 − ATR×{STOCK_TP_ATR_MULT}, SL = 현재가 + ATR×{STOCK_SL_ATR_MULT}\n"
+            f"  • 단위는 'pip'이 아니라 달러(센트, 소수점 둘째 자리)이다.\n"
+            f"  • (참고: 이 값은 서버에서 동일한 공식으로 다시 한번 강제 재계산되어 최종 주문에 사용되니, "
+            f"네가 계산한 값이 위 공식과 다르면 그건 서버 값으로 덮어써진다. 그래도 보고하는 값은 위 공식과 일치시켜라.)\n\n"
+            f"(3-2) ⚠️ [주식 전용 판단 규칙 — 반드시 지켜라]\n"
+            f"이 주식 알림들은 'breakout + continuation(지속)' 전략에서 나온다. 원본 Pine 진입 조건은 정확히 이렇다:\n"
+            f"  • 최근 3봉 고점 돌파 + 모멘텀 캔들(종가>시가, 종가>전봉고가) + RSI>50 + StochRSI K>20\n"
+            f"이 조건들은 이미 알림이 발사된 시점에 전부 충족된 상태다. 즉 너의 역할은 '진입할지 말지를 새로 정하는 것'이 아니라, "
+            f"'그 사이 추세가 꺾일 명백한 반대 증거가 있는지'만 확인하는 것이다.\n"
+            f"  ❌ 아래 항목은 절대로 '단독' WAIT 근거로 쓰지 마라 (이 전략에서는 경고가 아니라 돌파 확인 신호다):\n"
+            f"     - 볼린저밴드 상단 돌파/근접 (continuation 전략에서는 돌파가 강하다는 뜻)\n"
+            f"     - 저항선 근접 (저항을 뚫고 가는 게 이 전략의 핵심이다)\n"
+            f"     - Stoch RSI 과열(>0.8) 단독 (RSI/MACD가 같은 방향이면 과열은 모멘텀 강도일 뿐이다)\n"
+            f"     - RSI 60~80대 '과매수 경계' 단독 (이 전략은 RSI>50만 요구하며 상한이 없다)\n"
+            f"  ✅ WAIT은 아래처럼 '명백한 반대 증거'가 있을 때만 선택하라:\n"
+            f"     - MACD가 시그널선 아래로 새로 꺾이며(약세 교차) RSI도 같이 하락 중인 경우\n"
+            f"     - 최근 캔들이 분명한 약세 패턴(예: 강한 장대음봉, 갭다운)으로 돌파를 무효화한 경우\n"
+            f"     - RSI/MACD/StochRSI 셋 다 동시에 하락 방향으로 전환된 경우\n"
+            f"  위 '✅ WAIT 근거'에 해당하지 않는다면, 위 (3-1) 공식 그대로 BUY/SELL을 확정하라. "
+            f"애매하다고 보수적으로 WAIT을 고르지 마라 — 애매함은 BUY/SELL 유지 근거다.\n\n"
+            f"(3-3) ⚠️ [WAIT 선택 시 추가 규칙 — 둘 다 만족해야만 WAIT 가능]\n"
+            f"WAIT은 함부로 선택하면 안 된다. 아래 두 조건을 **모두** 만족해야만 WAIT을 선택할 수 있다:\n"
+            f"  1. 위 '✅ WAIT 근거' 중 최소 하나를 reason에 구체적으로(어떤 지표가 어떻게 꺾였는지) 명시해야 한다.\n"
+            f"     ('과매수라서', '저항 근접이라서' 같은 금지된 이유만 댄 WAIT은 무효다.)\n"
+            f"  2. 이 신호가 실패할 것이라는 확신도(wait_confidence, 0~100 정수)가 **80 이상**이어야 한다.\n"
+            f"     80 미만이면 WAIT을 선택할 수 없다 — 원래 알림 방향(BUY/SELL)을 그대로 확정하라.\n"
+            f"  위 둘 중 하나라도 못 만족하면 절대 WAIT을 출력하지 말고, 원래 신호 방향으로 decision을 내라.\n"
+            f"  JSON에 wait_confidence 필드를 추가하라 (WAIT이 아니면 0으로 채워라).\n\n"
+            if kind == "stock" else ""
+        )
+        +
+        (
+            f"(3-FX) ⚠️ [USD/JPY 전용 판단 규칙 — 반드시 지켜라]\n"
+            f"USD/JPY는 M30 기준 추세 추종 전략이다. WAIT을 선택하면 거래 기회 자체가 사라지므로, "
+            f"WAIT 기준을 주식보다 훨씬 엄격하게 적용한다.\n"
+            f"  ❌ 아래 이유만으로는 절대 WAIT을 고르지 마라:\n"
+            f"     - RSI 70 이상 '과매수' — FX 추세 추종에서 RSI 70~85는 강한 추세의 증거다\n"
+            f"     - Stoch RSI 과열 — 주가 아닌 환율에서는 단기 과열이 바로 반전으로 이어지지 않는다\n"
+            f"     - NEUTRAL 추세 — 지표 지연으로 인해 방향 전환 초기에 NEUTRAL이 뜨는 게 정상이다\n"
+            f"     - 저항선/지지선 근접 — 돌파하면 강한 모멘텀이 생기므로 오히려 진입 근거다\n"
+            f"     - 박스권 상단/하단 — 박스권을 뚫고 가는 것이 이 전략의 진입 시그널이다\n"
+            f"  ✅ WAIT이 허용되는 유일한 조건 (아래 중 최소 2개가 동시에 충족될 때만):\n"
+            f"     - MACD가 시그널선을 방금 새로 하향 돌파했으며 RSI도 동반 하락 중인 경우\n"
+            f"     - 직전 봉이 신호 방향과 반대되는 강한 장대음봉/장대양봉인 경우\n"
+            f"     - 중앙은행(BOJ/FED) 긴급 개입 뉴스가 방금 나온 경우\n"
+            f"  조건이 충족되지 않으면 무조건 BUY/SELL로 거래를 진행하라.\n"
+            f"  wait_confidence는 95 이상일 때만 WAIT을 허용하며, 그 미만이면 BUY/SELL을 확정하라.\n\n"
+            if kind == "jpy" else ""
+        )
+        +
+        "- '🟢 최근 N분 내 뉴스 없음'이면 뉴스 요인은 무시해도 된다.\n"
+        "- '⚠️ ... 뉴스 직후(...) — 뉴스 주도 변동 가능성'이면, 지금 이 돌파/움직임이 순수 기술적 돌파가 아니라 "
+        "특정 뉴스(헤드라인이 같이 제공됨)에 의해 촉발된 것일 수 있다는 뜻이다. 이 경우:\n"
+        "  · 뉴스가 진짜 호재/펀더멘털 변화라면 돌파에 더 신뢰를 줄 수 있다.\n"
+        "  · 반대로 1회성 헤드라인 스파이크(예: 단순 소문, 루머, 과장된 헤드라인)로 보이면 "
+        "되돌림(reversal) 위험이 더 크다고 보고 신중해야 한다.\n"
+        "  · 리포트의 1️⃣ 전략 요약에서 뉴스 헤드라인 내용과 그게 이 신호에 어떤 영향을 주는지 반드시 한 줄 언급하라.\n"
+        "- '🟡 ... 최근 N분 내 뉴스 M건'(뉴스가 있지만 막 나온 건 아님)이면, 그 뉴스가 이미 가격에 반영됐을 가능성이 높으니 "
+        "참고만 하고 과도하게 비중을 두지 마라.\n\n"
+        "(4) 추세 판단 시 캔들 패턴뿐 아니라 보조지표(RSI, MACD, Stoch RSI, 볼린저밴드)의 **방향성과 강도**를 반드시 함께 고려하라.\n"
+        "- 특히 보조지표의 최근 14봉 흐름 분석은 핵심 판단 자료다. 반드시 함께 고려해라\n"
+        f"- [알림 데이터]의 'MTF 요약'은 멀티타임프레임({gran}, H1, H4) 기준 요약 정보이다. 각 시간대별 추세가 일치하면 강한 확신으로 간주하고, 상반된 경우 보수적으로 판단하라.\n"
+        "- [알림 데이터]의 RSI, MACD, Stoch RSI 최근 14개 수치를 기반으로 최근 추세 흐름이 '상승세', '하락세', 또는 '횡보세'인지 간단히 요약해줘. 강도나 방향성도 덧붙여 분석에 반영해.\n"
+        "- 각 지표의 상승/하락 추세, 변화 속도, 과매수/과매도 여부, 꺾임 여부 등을 분석해\n"
+        "- 가능하면 수치적인 기준 또는 '강세', '약세', '중립' 등의 판단 용어를 사용해 설명하라.\n\n"
+
+        "(5) 전략 리포트는 자유롭게 작성하되 반드시 아래 4단계 형식을 따르라:\n"
+        "1️⃣ 전략 요약 (BUY/SELL 이유 요약)\n"
+        "2️⃣ 기술 지표 분석 요약\n"
+        "3️⃣ TP/SL 설정 근거 및 리스크 관리\n"
+        "4️⃣ 최종 판단 및 이유\n\n"
+
+        "(6) 마지막에는 반드시 아래 JSON 의사결정 블록을 작성하라. 양식은 정확히 아래처럼!\n\n"
+        "{\n"
+        "  \"decision\": \"BUY\" | \"SELL\" | \"WAIT\",\n"
+        "  \"tp\": <숫자>,       // 반드시 숫자(float). 따옴표 금지. 예: 1.1745\n"
+        "  \"sl\": <숫자>,       // 반드시 숫자(float). 따옴표 금지.\n"
+        "  \"wait_confidence\": <0~100 정수>,  // WAIT일 때만 의미 있음. WAIT이 아니면 0.\n"
+        "  \"reason\": \"<간단한 핵심 이유 하나만 간결하게>\"\n"
+        "}\n\n"
+        "‼️ 출력 시 유의사항:\n"
+        "- 코드블럭(````json .... ````) 사용 금지. 마크다운 태그 금지.\n"
+        "- JSON 외의 텍스트(리포트)는 위에 모두 쓰고, 마지막 줄에는 **JSON 하나만** 단독 출력해야 한다.\n"
+    )
+
+
+GPT_SYSTEM_PROMPTS = {k: _build_gpt_system_prompt(k) for k in GPT_PROMPT_KINDS}
+GPT_SYSTEM_PROMPT_SHA = {k: hashlib.sha256(v.encode("utf-8")).hexdigest()[:16] for k, v in GPT_SYSTEM_PROMPTS.items()}
+
+
+def check_gpt_static_prompts():
+    """시작 시 점검: 고정 블록을 다시 만들어도 해시가 같은지(알림별 값이 섞여 들어오지 않았는지) + 캐시 최소 길이.
+    OpenAI 프롬프트 캐시는 1024토큰 이상 같은 prefix에만 걸린다."""
+    ok = True
+    for kind in GPT_PROMPT_KINDS:
+        again = hashlib.sha256(_build_gpt_system_prompt(kind).encode("utf-8")).hexdigest()[:16]
+        tokens = gpt_token_estimator.estimate([{"role": "system", "content": GPT_SYSTEM_PROMPTS[kind]}]).tokens
+        if again != GPT_SYSTEM_PROMPT_SHA[kind]:
+            ok = False
+            print(f"⚠️ [GPT 프롬프트] {kind} 고정 블록 해시가 호출마다 다름 ({GPT_SYSTEM_PROMPT_SHA[kind]} → {again}) — 프롬프트 캐시 안 걸림")
+        else:
+            print(f"✅ [GPT 프롬프트] {kind} 고정 블록 sha={again} ≈{tokens}tok"
+                  + ("" if tokens >= 1024 else " (1024토큰 미만 — 프롬프트 캐시 대상 아님)"))
+    return ok
+
+
+def _gpt_alert_section(pair, current_price, support, resistance, score, signal_score,
+                       recent_candle_summary, mtf_info, mtf_summary, rsi_trend, macd_trend, stoch_rsi_trend,
+                       recent_rsi_values, recent_macd_values, recent_stoch_rsi_values):
+    """알림마다 달라지는 값만 모은 [알림 데이터] 섹션 (user 메시지 맨 앞)."""
+    return (
+        f"[알림 데이터]\n"
+        f"종목: {pair} ({base_granularity_for(pair)} 알림) / 현재가: {current_price}, 지지선: {support}, 저항선: {resistance}\n"
+        f"📌 시스템 스코어: {score}, 신호 스코어: {signal_score}\n"
+        f"🕯️ 최근 캔들 흐름 요약: {recent_candle_summary}\n"
+        f"🧭 MTF 맥락:\n{mtf_info}\n"
+        f"📊 MTF 요약: {mtf_summary}\n"
+        f"📉 RSI: {rsi_trend}, 📈 MACD: {macd_trend}, 🔄 Stoch RSI: {stoch_rsi_trend}\n"
+        f"↪️ RSI 최근 14: {recent_rsi_values}\n"
+        f"↪️ MACD 최근 14: {recent_macd_values}\n"
+        f"↪️ Stoch RSI 최근 14: {recent_stoch_rsi_values}"
+    )
+
+
+def build_gpt_request(payload, current_price, pair, candles, base64_image, mtf_info, mtf_indicators, ctx=None):
+    """analyze_with_gpt / analyze_with_gpt_async 공용 — Responses API 요청 body와 입력 토큰 추정(token_estimate.Estimate)."""
     score = payload.get("score", 0)
     signal_score = payload.get("signal_score", 0)
-    recent_candle_summary = summarize_recent_candle_flow(candles)
-    reasons = payload.get("reasons", [])
+    if ctx is not None:
+        recent_candle_summary = ctx.memo("candle_flow", summarize_recent_candle_flow, candles)
+    else:
+        recent_candle_summary = summarize_recent_candle_flow(candles)
     recent_rsi_values = payload.get("recent_rsi_values", [])
     recent_macd_values = payload.get("recent_macd_values", [])
     recent_stoch_rsi_values = payload.get("recent_stoch_rsi_values", [])
-    macd_signal = payload.get("macd_signal", None)
     rsi_trend = payload.get("rsi_trend", [])
     macd_trend = payload.get("macd_trend", [])
     stoch_rsi_trend = payload.get("stoch_rsi_trend", [])
     support     = payload.get("support", current_price)
     resistance  = payload.get("resistance", current_price)
-    boll_up     = payload.get("bollinger_upper", current_price)
-    boll_low    = payload.get("bollinger_lower", current_price)
-    mtf_indicators = get_multi_tf_scalping_data(pair)
     mtf_summary_dict = summarize_mtf_indicators(mtf_indicators)
     mtf_summary = json.dumps(mtf_summary_dict, ensure_ascii=False, indent=2)
     print("✅ 테스트 출력: ", mtf_summary)
-        
+
+    # 🟦 [PERF-22] 고정 지침(system)이 맨 앞, 알림별 값은 그 뒤 user 메시지로 — 앞부분이 요청마다 같아야 캐시된다
+    kind = gpt_prompt_kind(pair)
+    alert_section = _gpt_alert_section(
+        pair, current_price, support, resistance, score, signal_score, recent_candle_summary,
+        mtf_info, json.dumps(mtf_summary_dict, ensure_ascii=False, separators=(",", ":")),
+        rsi_trend, macd_trend, stoch_rsi_trend, recent_rsi_values, recent_macd_values, recent_stoch_rsi_values,
+    )
+
+    # 🟦 [PERF-23] payload는 압축본으로 — 숫자 반올림, [알림 데이터]와 겹치는 키/alert_data 제외, 점수 근거는 규칙코드.
+    #    예산(GPT_PAYLOAD_TOKEN_BUDGET)을 넘으면 덜 중요한 항목부터 줄인다. 원본 payload는 시트 기록용으로 그대로 둔다
+    compact, payload_tokens, trimmed = compact_payload(
+        payload, price_digits_for(pair), skip=("pair", "price", "support", "resistance"),
+    )
+
     # 1. GPT에게 보낼 콘텐츠 리스트 생성 (텍스트와 이미지를 분리해서 담기)
     user_content = [
+        {"type": "input_text", "text": alert_section},
         {
-            "type": "input_text", 
-            "text": f"데이터 분석 보고: {json.dumps(payload, ensure_ascii=False)}"
-        }
+            "type": "input_text",
+            "text": f"데이터 분석 보고: {json.dumps(compact, ensure_ascii=False, separators=(',', ':'))}"
+        },
     ]
-    
+
     # 2. 사진(base64_image)이 있다면 리스트에 추가
     if base64_image:
         user_content.append({
@@ -4915,156 +4420,10 @@ def analyze_with_gpt(payload, current_price, pair, candles, base64_image=None):
                 "detail": "high"
             }
         })
-    
+
     # 3. 전체 메시지 구조 구성
     messages = [
-        {
-            "role": "system",
-            "content": (
-                "너는 실전 FX 트레이딩 전략 조력자야.\n\n"
-                "⚠️ [역할 정의 - 매우 중요]\n"
-                "- 이미 이 신호는 사전 score / signal_score 필터를 통과했다.\n"
-                "- 그러나 GPT는 필터 결과를 맹신하지 말고 현재 차트 구조를 독립적으로 검증해야 한다,\n"
-                "  승률이 55% 미만으로 판단되면 WAIT을 선택할 수 있다.명백한 반대 시그널 뿐 아니라추세 부재, 모멘텀 부재, 박스권 상단/하단 정체도 WAIT 근거가 될 수 있다.\n"
-                "- 애매함, 가능성, 추측만으로 WAIT을 선택해서는 안 된다.\n\n"
-                
-                f"📌 [{base_granularity_for(pair)} 알림 전용: 멀티 타임프레임 분석 지침 - 추가됨]\n"
-                f"현재 알림은 {base_granularity_for(pair)}에서 발생했습니다. 아래 상위/하위 맥락을 반드시 참고하세요:\n"
-                f"{mtf_info}\n"
-                "- H4 추세가 진입 방향과 일치하면 강력한 가점 요소입니다.\n"
-                "- M5 RSI가 극단적(80 이상/20 이하)일 때만 진입 타이밍 조절을 위해 WAIT을 검토하세요.\n\n"
-
-                
-
-                "📌 [판단 원칙]\n"
-                "- 추세와 진입 방향이 일치하면 진입을 선호한다 그러나 NEUTRAL 추세에서는 모멘텀 증가가 확인되어야 한다 RSI, MACD, Stoch RSI가 모두 중립이면 기본 판단은 WAIT이다..\n"
-                "- 실제로 가격이 SL을 먼저 터치할 명확한 근거가 없는 한 진입을 유지한다.\n"
-                "- 결과 예측(사후적 반등/되돌림 가정)을 근거로 WAIT을 선택하지 마라.\n\n"
-                
-                "아래 JSON 테이블을 기반으로 전략 리포트를 작성해. `score_components` 리스트는 각 전략 요소가 신호 판단에 어떤 기여를 했는지를 설명해.\n"
-                "- 너의 목표는 알림에서 울린 BUY 또는 SELL을 사전에 '고정'하지 않고, BUY 점수와 SELL 점수를 각각 산출한 뒤 더 높은 점수를 최종 판단으로 선택하는 것이야.\n"
-                "- 판단할 때는 아래 고차원 전략 사고 프레임을 참고하라.\n"
-                "  • GI = (O × C × P × S) / (A + B): 감정, 언급, 패턴, 종합을 강화하고 고정관념과 편향을 최소화하라.\n"
-                "  • MDA = Σ(Di × Wi × Ii): 시간, 공간, 인과 등 다양한 차원에서 통찰과 영향을 조합하라.\n"
-                "  • IL = (S × E × T) / (L × R): 직관도 논리/경험과 파악하고 전략과 경험 기반 도약도 반영하라.\n\n"
-
-                "(2) 거래는 기본적으로 1~2시간 내 청산을 목표로 하는 단타 스캘핑 트레이딩이다.\n"
-                "- 이 전략은 reversal 전략이 아니라 breakout/continuation scalp 전략이다.\n"
-                "- resistance 근접, RSI 45~60, stoch 과열은 단독으로 WAIT 근거가 아니다 단, resistance/supply zone까지 3 pip 이하이고 Stoch RSI > 0.9 인 경우는 예외다 이 경우 breakout 확인 전 BUY 추격 진입은 높은 실패 확률로 간주한다.\n"
-                "- recent_ohlc, candle_micro, breakout_context, structure_context를 우선 해석하라.\n"
-                "- SL과 TP는 ATR 기준 가급적 최소 50% 이상 거리로 설정하되, 시간이 너무 오래 걸릴 것 같으면 무시해도 좋다.\n"
-                "- 하지만 반드시 **현재가 기준으로 TP는 ATR기반으로 계산하되 과도한 목표 설정을 방지하기 위해, 계산식 TP distance는 max(ATRx1.2, 0.11) 이 공식을 항상 따라라**, SL distance는 max(ATRx1.1, 0.11)이 공식을 항상 따르되 SL은 항상 16pip을 초과하지 않도록 한다. 이내로 설정하게 해줘 어떻게 계산했는지도 보여줘. 예외는 없다 그렇지 않으면 시장 변동성 대비 손실 확률이 급격히 높아진다.\n"
-                "  (※ 위 TP/SL 공식은 FX 전용이다. 아래 (3-1)에서 종목이 미국 주식인 경우 이 공식 대신 별도 규칙을 따른다.)\n"
-                "- 최근 5개 캔들의 고점/저점을 참고해서 너가 설정한 TP/SL이 **REASONABLE한지 꼭 검토**해.\n"
-                "- RSI가 60 이상이고 Stoch RSI가 0.8 이상이며, 가격이 볼린저밴드 상단에 근접한 경우에는 'BUY 피로감'으로 간주해 'SELL'을 좀 더 고려해라.\n"
-                "- RSI가 40 이하이고 Stoch RSI가 0.1 이하이며, 가격이 볼린저밴드 하단에 근접한 경우에는 'SELL 피로감'으로 간주해'BUY'을 좀 더 고려해라.\n\n"
-
-                "(3) 지지선(support), 저항선(resistance)은 최근 1시간봉 기준 마지막 6개 캔들의 고점/저점에서 계산되었고 이미 JSON에 포함되어 있다.\n"
-                f"  • 현재가: {current_price}, 지지선: {support}, 저항선: {resistance}\n"
-                "- BUY 결정일 경우 TP는 반드시 현재가보다 높은 가격(상방)에, SL은 반드시 현재가보다 낮은 가격(하방)에 설정해야 한다.\n"
-                "- SELL 결정일 경우 TP는 반드시 현재가보다 낮은 가격(하방)에, SL은 반드시 현재가보다 높은 가격(상방)에 설정해야 한다.\n"
-                "- 이 규칙은 예외 없이 무조건 지켜야 하며, 이를 위반하는 TP 또는 SL을 생성하는 것은 허용되지 않는다.\n"
-                "- GPT는 BUY/SELL 방향을 기준으로 TP/SL의 방향을 항상 먼저 판단한 후 값(pip 거리)을 계산해야 한다.\n"
-                "- USD/JPY는 pip 단위가 소수점 둘째 자리입니다. TP와 SL은 반드시 이 기준으로 계산하세요. 이 규칙을 어기면 거래가 취소되므로 반드시 지켜야 한다. 예를들면 sell 거래의 진입가가 155.015라면 TP는 154.915가 10pip차이이다 \n\n"
-                + (
-                    f"(3-1) ⚠️ 이번 종목({pair})은 미국 주식(Alpaca)이다. 위 (2)의 FX용 TP/SL 공식(ATRx1.2/1.1, pip, 16pip 캡)은 "
-                    f"이 종목에는 적용하지 마라. 대신 TradingView Pine 전략과 동일한 아래 공식을 반드시 사용하라:\n"
-                    f"  • BUY: TP = 현재가 + ATR×{STOCK_TP_ATR_MULT}, SL = 현재가 − ATR×{STOCK_SL_ATR_MULT}\n"
-                    f"  • SELL: TP = 현재가 − ATR×{STOCK_TP_ATR_MULT}, SL = 현재가 + ATR×{STOCK_SL_ATR_MULT}\n"
-                    f"  • 단위는 'pip'이 아니라 달러(센트, 소수점 둘째 자리)이다.\n"
-                    f"  • (참고: 이 값은 서버에서 동일한 공식으로 다시 한번 강제 재계산되어 최종 주문에 사용되니, "
-                    f"네가 계산한 값이 위 공식과 다르면 그건 서버 값으로 덮어써진다. 그래도 보고하는 값은 위 공식과 일치시켜라.)\n\n"
-                    f"(3-2) ⚠️ [주식 전용 판단 규칙 — 반드시 지켜라]\n"
-                    f"이 주식 알림들은 'breakout + continuation(지속)' 전략에서 나온다. 원본 Pine 진입 조건은 정확히 이렇다:\n"
-                    f"  • 최근 3봉 고점 돌파 + 모멘텀 캔들(종가>시가, 종가>전봉고가) + RSI>50 + StochRSI K>20\n"
-                    f"이 조건들은 이미 알림이 발사된 시점에 전부 충족된 상태다. 즉 너의 역할은 '진입할지 말지를 새로 정하는 것'이 아니라, "
-                    f"'그 사이 추세가 꺾일 명백한 반대 증거가 있는지'만 확인하는 것이다.\n"
-                    f"  ❌ 아래 항목은 절대로 '단독' WAIT 근거로 쓰지 마라 (이 전략에서는 경고가 아니라 돌파 확인 신호다):\n"
-                    f"     - 볼린저밴드 상단 돌파/근접 (continuation 전략에서는 돌파가 강하다는 뜻)\n"
-                    f"     - 저항선 근접 (저항을 뚫고 가는 게 이 전략의 핵심이다)\n"
-                    f"     - Stoch RSI 과열(>0.8) 단독 (RSI/MACD가 같은 방향이면 과열은 모멘텀 강도일 뿐이다)\n"
-                    f"     - RSI 60~80대 '과매수 경계' 단독 (이 전략은 RSI>50만 요구하며 상한이 없다)\n"
-                    f"  ✅ WAIT은 아래처럼 '명백한 반대 증거'가 있을 때만 선택하라:\n"
-                    f"     - MACD가 시그널선 아래로 새로 꺾이며(약세 교차) RSI도 같이 하락 중인 경우\n"
-                    f"     - 최근 캔들이 분명한 약세 패턴(예: 강한 장대음봉, 갭다운)으로 돌파를 무효화한 경우\n"
-                    f"     - RSI/MACD/StochRSI 셋 다 동시에 하락 방향으로 전환된 경우\n"
-                    f"  위 '✅ WAIT 근거'에 해당하지 않는다면, 위 (3-1) 공식 그대로 BUY/SELL을 확정하라. "
-                    f"애매하다고 보수적으로 WAIT을 고르지 마라 — 애매함은 BUY/SELL 유지 근거다.\n\n"
-                    f"(3-3) ⚠️ [WAIT 선택 시 추가 규칙 — 둘 다 만족해야만 WAIT 가능]\n"
-                    f"WAIT은 함부로 선택하면 안 된다. 아래 두 조건을 **모두** 만족해야만 WAIT을 선택할 수 있다:\n"
-                    f"  1. 위 '✅ WAIT 근거' 중 최소 하나를 reason에 구체적으로(어떤 지표가 어떻게 꺾였는지) 명시해야 한다.\n"
-                    f"     ('과매수라서', '저항 근접이라서' 같은 금지된 이유만 댄 WAIT은 무효다.)\n"
-                    f"  2. 이 신호가 실패할 것이라는 확신도(wait_confidence, 0~100 정수)가 **80 이상**이어야 한다.\n"
-                    f"     80 미만이면 WAIT을 선택할 수 없다 — 원래 알림 방향(BUY/SELL)을 그대로 확정하라.\n"
-                    f"  위 둘 중 하나라도 못 만족하면 절대 WAIT을 출력하지 말고, 원래 신호 방향으로 decision을 내라.\n"
-                    f"  JSON에 wait_confidence 필드를 추가하라 (WAIT이 아니면 0으로 채워라).\n\n"
-                    if is_stock_pair(pair) else ""
-                )
-                +
-                (
-                    f"(3-FX) ⚠️ [USD/JPY 전용 판단 규칙 — 반드시 지켜라]\n"
-                    f"USD/JPY는 M30 기준 추세 추종 전략이다. WAIT을 선택하면 거래 기회 자체가 사라지므로, "
-                    f"WAIT 기준을 주식보다 훨씬 엄격하게 적용한다.\n"
-                    f"  ❌ 아래 이유만으로는 절대 WAIT을 고르지 마라:\n"
-                    f"     - RSI 70 이상 '과매수' — FX 추세 추종에서 RSI 70~85는 강한 추세의 증거다\n"
-                    f"     - Stoch RSI 과열 — 주가 아닌 환율에서는 단기 과열이 바로 반전으로 이어지지 않는다\n"
-                    f"     - NEUTRAL 추세 — 지표 지연으로 인해 방향 전환 초기에 NEUTRAL이 뜨는 게 정상이다\n"
-                    f"     - 저항선/지지선 근접 — 돌파하면 강한 모멘텀이 생기므로 오히려 진입 근거다\n"
-                    f"     - 박스권 상단/하단 — 박스권을 뚫고 가는 것이 이 전략의 진입 시그널이다\n"
-                    f"  ✅ WAIT이 허용되는 유일한 조건 (아래 중 최소 2개가 동시에 충족될 때만):\n"
-                    f"     - MACD가 시그널선을 방금 새로 하향 돌파했으며 RSI도 동반 하락 중인 경우\n"
-                    f"     - 직전 봉이 신호 방향과 반대되는 강한 장대음봉/장대양봉인 경우\n"
-                    f"     - 중앙은행(BOJ/FED) 긴급 개입 뉴스가 방금 나온 경우\n"
-                    f"  조건이 충족되지 않으면 무조건 BUY/SELL로 거래를 진행하라.\n"
-                    f"  wait_confidence는 95 이상일 때만 WAIT을 허용하며, 그 미만이면 BUY/SELL을 확정하라.\n\n"
-                    if (not is_stock_pair(pair) and "JPY" in pair) else ""
-                )
-                +
-                "- '🟢 최근 N분 내 뉴스 없음'이면 뉴스 요인은 무시해도 된다.\n"
-                "- '⚠️ ... 뉴스 직후(...) — 뉴스 주도 변동 가능성'이면, 지금 이 돌파/움직임이 순수 기술적 돌파가 아니라 "
-                "특정 뉴스(헤드라인이 같이 제공됨)에 의해 촉발된 것일 수 있다는 뜻이다. 이 경우:\n"
-                "  · 뉴스가 진짜 호재/펀더멘털 변화라면 돌파에 더 신뢰를 줄 수 있다.\n"
-                "  · 반대로 1회성 헤드라인 스파이크(예: 단순 소문, 루머, 과장된 헤드라인)로 보이면 "
-                "되돌림(reversal) 위험이 더 크다고 보고 신중해야 한다.\n"
-                "  · 리포트의 1️⃣ 전략 요약에서 뉴스 헤드라인 내용과 그게 이 신호에 어떤 영향을 주는지 반드시 한 줄 언급하라.\n"
-                "- '🟡 ... 최근 N분 내 뉴스 M건'(뉴스가 있지만 막 나온 건 아님)이면, 그 뉴스가 이미 가격에 반영됐을 가능성이 높으니 "
-                "참고만 하고 과도하게 비중을 두지 마라.\n\n"
-                "(4) 추세 판단 시 캔들 패턴뿐 아니라 보조지표(RSI, MACD, Stoch RSI, 볼린저밴드)의 **방향성과 강도**를 반드시 함께 고려하라.\n"
-                "- 특히 보조지표의 최근 14봉 흐름 분석은 핵심 판단 자료다. 반드시 함께 고려해라\n"
-                f"- 아래는 멀티타임프레임({base_granularity_for(pair)}, H1, H4) 기준 요약 정보이다. 각 시간대별 추세가 일치하면 강한 확신으로 간주하고, 상반된 경우 보수적으로 판단하라:\n"
-                f"📌 시스템 스코어: {score}, 신호 스코어: {signal_score}\n"
-                f"📎 점수 산정 근거 (reasons):\n" + "\n".join([f"- {r}" for r in reasons]) + "\n\n"
-                f"🕯️ 최근 캔들 흐름 요약: {recent_candle_summary}\n\n" +
-                "📊 MTF 요약:\n"
-                f"{summarize_mtf_indicators(mtf_indicators)}\n\n" +
-                f"📉 RSI: {rsi_trend}, 📈 MACD: {macd_trend}, 🔄 Stoch RSI: {stoch_rsi_trend}\n" +
-                "📊 아래는 RSI, MACD, Stoch RSI의 최근 14개 수치야. 이를 기반으로 추세를 요약해줘.\n" +
-                f"↪️ RSI: {recent_rsi_values}\n" +
-                f"↪️ MACD: {recent_macd_values}\n" +
-                f"↪️ Stoch RSI: {recent_stoch_rsi_values}\n" +
-                "➡️ 위 수치를 기반으로 최근 추세 흐름이 '상승세', '하락세', 또는 '횡보세'인지 간단히 요약해줘. 강도나 방향성도 덧붙여 분석에 반영해.\n"
-                "- 각 지표의 상승/하락 추세, 변화 속도, 과매수/과매도 여부, 꺾임 여부 등을 분석해\n"
-                "- 가능하면 수치적인 기준 또는 '강세', '약세', '중립' 등의 판단 용어를 사용해 설명하라.\n\n"
-
-                "(5) 전략 리포트는 자유롭게 작성하되 반드시 아래 4단계 형식을 따르라:\n"
-                "1️⃣ 전략 요약 (BUY/SELL 이유 요약)\n"
-                "2️⃣ 기술 지표 분석 요약\n"
-                "3️⃣ TP/SL 설정 근거 및 리스크 관리\n"
-                "4️⃣ 최종 판단 및 이유\n\n"
-
-                "(6) 마지막에는 반드시 아래 JSON 의사결정 블록을 작성하라. 양식은 정확히 아래처럼!\n\n"
-                "{\n"
-                "  \"decision\": \"BUY\" | \"SELL\" | \"WAIT\",\n"
-                "  \"tp\": <숫자>,       // 반드시 숫자(float). 따옴표 금지. 예: 1.1745\n"
-                "  \"sl\": <숫자>,       // 반드시 숫자(float). 따옴표 금지.\n"
-                "  \"wait_confidence\": <0~100 정수>,  // WAIT일 때만 의미 있음. WAIT이 아니면 0.\n"
-                "  \"reason\": \"<간단한 핵심 이유 하나만 간결하게>\"\n"
-                "}\n\n"
-                "‼️ 출력 시 유의사항:\n"
-                "- 코드블럭(````json .... ````) 사용 금지. 마크다운 태그 금지.\n"
-                "- JSON 외의 텍스트(리포트)는 위에 모두 쓰고, 마지막 줄에는 **JSON 하나만** 단독 출력해야 한다.\n"
-            )
-        },
+        {"role": "system", "content": GPT_SYSTEM_PROMPTS[kind]},
         {
             "role": "user",
             "content": user_content # 텍스트 데이터 + 이미지 데이터가 포함된 리스트 전달
@@ -5082,116 +4441,262 @@ def analyze_with_gpt(payload, current_price, pair, candles, base64_image=None):
         #    (기존엔) 강제 환원으로 무검증 진입까지 이어졌다.
         "max_output_tokens": int(os.getenv("GPT_MAX_OUTPUT_TOKENS", "1800")),
     }
-    need_tokens = _approx_tokens(messages)
-    _preflight_gate(need_tokens)   # 요청 직전 선대기
+    # 🟦 [PERF-21] 이미지는 픽셀 크기/detail로, 텍스트는 토크나이저 근사 × usage 보정 배율로 (base64 문자열은 세지 않는다)
+    est = gpt_token_estimator.estimate(messages)
 
     try:
-        _bytes = len(json.dumps(payload, ensure_ascii=False))
+        _bytes = len(json.dumps(compact, ensure_ascii=False, separators=(",", ":")))
     except Exception:
         _bytes = -1
 
-    dbg("gpt.body", bytes=_bytes, max_tokens=body.get("max_output_tokens"))
+    dbg("gpt.body", bytes=_bytes, max_tokens=body.get("max_output_tokens"), prompt=f"{kind}:{GPT_SYSTEM_PROMPT_SHA[kind]}",
+        payload_tokens=payload_tokens, trimmed=",".join(trimmed) or "-")
     # 🟥 [FIX-E1b] 프롬프트 전문을 매번 stdout에 찍으면 로그가 비대해지고
     #    민감 정보가 남는다. 길이만 남긴다. (전문이 필요하면 GPT_DEBUG_BODY=true)
     if os.getenv("GPT_DEBUG_BODY", "false").strip().lower() == "true":
         print("🔍 FULL BODY DEBUG:", json.dumps(body, indent=2, ensure_ascii=False))
     else:
-        print(f"🔍 GPT 요청 준비 완료 (model={body['model']}, prompt≈{need_tokens}tok, payload={_bytes}B)")
+        print(f"🔍 GPT 요청 준비 완료 (model={body['model']}, prompt≈{est.tokens}tok "
+              f"(text {est.text}×{gpt_token_estimator.ratio:.2f} + image {est.image}), payload={_bytes}B)")
+
+    return body, est
+
+
+def _gpt_ticket_tokens(body, prompt_tokens):
+    """스케줄러 토큰 버킷에서 미리 뺄 양 — OpenAI TPM은 프롬프트 + max_output_tokens로 센다."""
+    return prompt_tokens + int(body.get("max_output_tokens") or 0)
 
-    # ============================================================
-    # 🟥 [FIX-C2] 최소 스로틀 — 락을 잡은 채로 sleep 하지 않는다.
-    # ------------------------------------------------------------
-    #  기존 코드는 `with _gpt_lock:` 안에서 최대 12초를 sleep 했다.
-    #  알림이 N건 동시에 오면 12×N초가 직렬로 쌓여서, 스캘핑 신호가
-    #  체결 시점에는 이미 무의미해지는 상태였다(진입 슬리피지의 큰 원인).
-    #  → 락 안에서는 "내가 언제 쏠지" 슬롯만 예약하고, 실제 대기는 락 밖에서 한다.
-    #    이러면 대기가 병렬로 겹쳐서 총 지연이 12×N이 아니라 12초 수준으로 줄어든다.
-    #  기본 간격도 12초 → 1.5초로 낮춘다(GPT_RPM 3000이면 12초는 과도한 보수 설정).
-    # ============================================================
-    _min_gap = float(os.getenv("GPT_MIN_INTERVAL_SEC", "1.5"))
-    with _gpt_lock:
-        # (global _gpt_last_ts 선언은 이 함수 상단에 이미 있다)
-        _slot_at = max(_t.time(), _gpt_last_ts + _min_gap)
-        _gpt_last_ts = _slot_at
-    _wait = _slot_at - _t.time()
-    if _wait > 0:
-        dbg("gpt.throttle", wait=round(_wait, 2))
-        _t.sleep(_wait)
 
+def _gpt_handle_response(r, estimate=None):
+    """OpenAI 응답(requests.Response / http_client.AsyncResponse) → 출력 텍스트. 429면 쿨다운을 건다.
+    estimate(build_gpt_request의 추정치)가 있으면 응답 usage로 토큰 추정 배율을 보정한다."""
+    global _gpt_cooldown_until
+    print("GPT STATUS:", r.status_code)
+    # 🟥 [FIX-C3] 응답 헤더의 레이트리밋 정보를 실제로 저장한다.
+    #    (예전 _save_rate_headers()는 정의만 되어 있고 호출하는 곳이 없어서 선대기가 항상 no-op이었다)
+    # 🟦 [PERF-20] 저장 위치는 gpt_scheduler의 요청/토큰 버킷
     try:
-        dbg("gpt.call")
-        r = requests.post(
-            OPENAI_URL,
-            headers=OPENAI_HEADERS,
-            json=body,
-            timeout=int(os.getenv("GPT_TIMEOUT_SEC", "60")),
-        )
-        print("GPT STATUS:", r.status_code)
-        # 🟥 [FIX-C3] 응답 헤더의 레이트리밋 정보를 실제로 저장한다.
-        #    _save_rate_headers()는 정의만 되어 있고 호출하는 곳이 없어서
-        #    _preflight_gate()가 항상 no-op이었고 429 백오프도 작동하지 않았다.
+        gpt_scheduler.observe_headers(r.headers)
+    except Exception as _e:
+        dbg("gpt.rate_headers.fail", err=str(_e))
+    if r.status_code == 429:
+        # 429는 재시도해도 소용없으니 쿨다운을 걸고 즉시 실패로 반환
+        _retry_after = 30.0
         try:
-            _save_rate_headers(r.headers)
-        except Exception as _e:
-            dbg("gpt.rate_headers.fail", err=str(_e))
-        if r.status_code == 429:
-            # 429는 재시도해도 소용없으니 쿨다운을 걸고 즉시 실패로 반환
-            # (global 선언은 이 함수 상단에 이미 있다)
-            _retry_after = 30.0
-            try:
-                _retry_after = float(r.headers.get("retry-after") or 30.0)
-            except Exception:
-                pass
-            _gpt_cooldown_until = _t.time() + _retry_after
-            print(f"⛔ GPT 429 레이트리밋 → {_retry_after:.0f}초 쿨다운 설정")
-            return f"GPT_ERROR: 429 rate limited, cooldown {_retry_after:.0f}s"
-        r.raise_for_status()  # HTTP 에러 체크
-        data = r.json()
-        
-        
-        output_blocks = data.get("output", [])
-        
-        text = ""
-        for block in output_blocks:
-            # 1) assistant 메시지 찾기
-            if block.get("role") == "assistant":
-                # 2) 그 안에서 output_text 찾기
-                for c in block.get("content", []):
-                    if c.get("type") == "output_text":
-                        text = c.get("text", "")
-                        break
-                if text:
+            _retry_after = float(r.headers.get("retry-after") or 30.0)
+        except Exception:
+            pass
+        _gpt_cooldown_until = _t.time() + _retry_after
+        print(f"⛔ GPT 429 레이트리밋 → {_retry_after:.0f}초 쿨다운 설정")
+        return f"GPT_ERROR: 429 rate limited, cooldown {_retry_after:.0f}s"
+    r.raise_for_status()  # HTTP 에러 체크
+    data = r.json()
+    gpt_token_estimator.observe(estimate, data.get("usage"))   # 🟦 [PERF-21]
+
+    output_blocks = data.get("output", [])
+
+    text = ""
+    for block in output_blocks:
+        # 1) assistant 메시지 찾기
+        if block.get("role") == "assistant":
+            # 2) 그 안에서 output_text 찾기
+            for c in block.get("content", []):
+                if c.get("type") == "output_text":
+                    text = c.get("text", "")
                     break
-        
-        text = (text or "").strip()
-        print(f"📩 GPT 원문 응답: {text[:500]}...")
-        return text if text else "GPT 응답 없음"
+            if text:
+                break
+
+    text = (text or "").strip()
+    print(f"📩 GPT 원문 응답: {text[:500]}...")
+    return text if text else "GPT 응답 없음"
+
+
+def _gpt_log_error(e, r):
+    print("\n========== GPT ERROR ==========")
+    print("ERROR:", str(e))
+    try:
+        print("STATUS:", r.status_code)
+    except:
+        print("STATUS: UNKNOWN")
+    try:
+        print("BODY:")
+        print(r.text)
+    except:
+        print("BODY: NONE")
+    print("================================\n")
+
+
+def analyze_with_gpt(payload, current_price, pair, candles, base64_image=None, ctx=None):
+    # 🟦 [PERF-14] ctx(CandleContext)가 있으면 MTF 요약/지표는 컨텍스트에 한 번만 만들어 둔다 (GPT 재시도 때 재사용)
+    try:
+        mtf_info = ctx.memo("mtf_info", get_multi_timeframe_context, pair) if ctx is not None \
+            else get_multi_timeframe_context(pair)
+    except Exception as e:
+        print(f"❌ MTF 정보 생성 실패: {e}")
+        mtf_info = "MTF 정보 없음"
+    dbg("gpt.enter", t=int(_t.time()*1000))
+    restricted = _gpt_time_restriction()
+    if restricted:
+        return restricted
+
+    # ── 전역 쿨다운: 429 맞은 뒤 일정 시간은 호출 자체 스킵 ──
+    now = _t.time()
+    if now < _gpt_cooldown_until:
+        dbg("gpt.skip.cooldown", wait=round(_gpt_cooldown_until - now, 2))
+        return "GPT 응답 없음(쿨다운)"
+    if ctx is not None:
+        mtf_indicators = ctx.memo("mtf_indicators", get_multi_tf_scalping_data, pair, base_candles=candles)
+    else:
+        mtf_indicators = get_multi_tf_scalping_data(pair)
+    body, est = build_gpt_request(
+        payload, current_price, pair, candles, base64_image, mtf_info, mtf_indicators, ctx=ctx
+    )
+
+    r = None
+    try:
+        # 🟦 [PERF-20] 레이트리밋 대기는 gpt_scheduler 티켓 하나로 (요청/토큰 버킷 + 우선순위 + 동시성 상한)
+        with gpt_scheduler.ticket(_gpt_ticket_tokens(body, est.tokens), PRIORITY_LIVE):
+            dbg("gpt.call")
+            r = openai_http.post(
+                OPENAI_URL,
+                headers=OPENAI_HEADERS,
+                json=body,
+                timeout=int(os.getenv("GPT_TIMEOUT_SEC", "60")),
+            )
+            return _gpt_handle_response(r, est)
 
     except requests.exceptions.Timeout:
         print("❌ GPT 응답 시간 초과")
         return "GPT_TIMEOUT"
-    
+
     except Exception as e:
-    
-        print("\n========== GPT ERROR ==========")
-    
-        print("ERROR:", str(e))
-    
+        _gpt_log_error(e, r)
+        return f"GPT_ERROR: {str(e)}"
+
+
+async def analyze_with_gpt_async(payload, current_price, pair, candles, base64_image=None, ctx=None):
+    """🟦 [PERF-07] analyze_with_gpt()의 async 버전 — 대기는 asyncio.sleep, 호출은 openai_ahttp."""
+    try:
+        # 🟦 [PERF-14] ctx(CandleContext)가 있으면 MTF 요약/지표는 컨텍스트에 한 번만 만들어 둔다 (GPT 재시도 때 재사용)
+        if ctx is not None:
+            mtf_info = await ctx.amemo("mtf_info", get_multi_timeframe_context_async, pair)
+        else:
+            mtf_info = await get_multi_timeframe_context_async(pair)
+    except Exception as e:
+        print(f"❌ MTF 정보 생성 실패: {e}")
+        mtf_info = "MTF 정보 없음"
+    dbg("gpt.enter", t=int(_t.time()*1000))
+    restricted = _gpt_time_restriction()
+    if restricted:
+        return restricted
+
+    now = _t.time()
+    if now < _gpt_cooldown_until:
+        dbg("gpt.skip.cooldown", wait=round(_gpt_cooldown_until - now, 2))
+        return "GPT 응답 없음(쿨다운)"
+    if ctx is not None:
+        mtf_indicators = await ctx.amemo("mtf_indicators", get_multi_tf_scalping_data_async, pair, base_candles=candles)
+    else:
+        mtf_indicators = await get_multi_tf_scalping_data_async(pair)
+    body, est = build_gpt_request(
+        payload, current_price, pair, candles, base64_image, mtf_info, mtf_indicators, ctx=ctx
+    )
+
+    r = None
+    try:
+        # 🟦 [PERF-20] 티켓을 기다리는 동안 이벤트 루프는 다른 알림을 계속 처리한다
+        async with gpt_scheduler.ticket(_gpt_ticket_tokens(body, est.tokens), PRIORITY_LIVE):
+            dbg("gpt.call")
+            r = await openai_ahttp.post(
+                OPENAI_URL,
+                headers=OPENAI_HEADERS,
+                json=body,
+                timeout=int(os.getenv("GPT_TIMEOUT_SEC", "60")),
+            )
+            return _gpt_handle_response(r, est)
+
+    except asyncio.TimeoutError:
+        print("❌ GPT 응답 시간 초과")
+        return "GPT_TIMEOUT"
+
+    except Exception as e:
+        _gpt_log_error(e, r)
+        return f"GPT_ERROR: {str(e)}"
+
+
+# 🟦 [PERF-19] GPT 판단 캐시 (gpt_cache.py) + 같은 키 동시 호출 합치기
+gpt_decision_cache = GptDecisionCache()
+_gpt_flight = AsyncSingleFlight()
+
+
+def _gpt_cache_expiry(pair, bar_time):
+    """bar_time 봉 기준 다음 봉 마감 epoch (캐시 만료). 봉 시각을 못 읽으면 None → max_age만 적용."""
+    start = bar_start_epoch(bar_time)
+    gran_sec = granularity_seconds(base_granularity_for(pair))
+    if start is None or gran_sec is None:
+        return None
+    return next_bar_close_epoch(start, gran_sec)
+
+
+async def _gpt_decide_async(payload, price, pair, candles, ctx=None):
+    """차트 캡처 → analyze_with_gpt_async (최대 3회 재시도) → GPT 원문 응답. 실패하면 마지막 에러 문자열/None."""
+    # 📸 [추가] 1. 사진 찍기
+    # 🟦 주식은 기본으로 차트를 생략한다 (GPT 분석 전 불필요한 지연을 줄여서 알림→체결 시차를 최소화하기 위함).
+    # 🟦 [PERF-25] 출처는 자산군별 CHART_SOURCE_FX / CHART_SOURCE_STOCK — local이면 브라우저 없이 수 ms에 그린다
+    source = chart_source_for(pair)
+    chart_png = None
+    if source == "local":
+        chart_png = render_alert_chart(pair, payload, candles, ctx)
+    elif source == "tradingview":
         try:
-            print("STATUS:", r.status_code)
-        except:
-            print("STATUS: UNKNOWN")
-    
+            chart_png = await capture_tradingview_chart(pair)
+        except Exception as e:
+            print(f"❌ 차트 캡처 실패, 이미지 없이 계속 진행: {e}")
+
+    # 🖼 [추가] 2. 이미지를 GPT가 읽을 수 있는 문자열로 변환
+    base64_image = base64.b64encode(chart_png).decode("utf-8") if chart_png else None
+
+    # 🤖 [수정] 3. GPT 분석 함수 호출 (base64_image 인자 추가)
+    # ※ 주의: analyze_with_gpt 함수 정의 부분에도 image 인자를 받도록 수정해야 합니다.
+    gpt_raw = None
+
+    for attempt in range(3):
+
         try:
-            print("BODY:")
-            print(r.text)
-        except:
-            print("BODY: NONE")
-    
-        print("================================\n")
-    
-        return f"GPT_ERROR: {str(e)}"
-    
+
+            gpt_raw = await analyze_with_gpt_async(
+                payload,
+                price,
+                pair,
+                candles,
+                base64_image,
+                ctx=ctx,
+            )
+
+            if (
+                gpt_raw
+                and "GPT_ERROR" not in str(gpt_raw)
+            ):
+                break
+
+            print(
+                f"⚠ GPT 실패 → 재시도 {attempt+2}/3"
+            )
+
+            await asyncio.sleep(2)
+
+        except Exception as e:
+
+            print(
+                f"⚠ GPT 호출 실패 {attempt+1}/3: {e}"
+            )
+
+            await asyncio.sleep(2)
+
+    return gpt_raw
+
+
 def safe_float(val):
     try:
         if val is None:
@@ -5471,6 +4976,39 @@ def _generate_outcome_note(outcome: str, reasons_text: str, decision_text: str,
     return ""
 
 
+def _prefetch_outcome_stock_candles(rows, max_lookback_days: int = 16):
+    """
+    🟦 [PERF-05] 결과추적 대상인 주식 행들의 M1 캔들을 다종목 요청으로 한 번에 받아둔다.
+    (40개 넘는 종목을 행마다 get_candles로 부르던 것 → 몇 번의 페이지 요청)
+    시작 시각은 가장 오래된 미평가 진입시각 기준. 반환: {symbol: DataFrame}
+    """
+    symbols = set()
+    earliest = None
+    for row in rows:
+        try:
+            pair = row[1] if len(row) > 1 else ""
+            if not pair or not is_stock_pair(pair):
+                continue
+            if (row[3] if len(row) > 3 else "") not in ("BUY", "SELL"):
+                continue
+            if (row[16] if len(row) > 16 else "") not in ("", "미정"):
+                continue
+            entry_time = datetime.fromisoformat(row[0])
+        except Exception:
+            continue
+        if entry_time.tzinfo is None:
+            continue
+        symbols.add(pair.upper())
+        if earliest is None or entry_time < earliest:
+            earliest = entry_time
+    if not symbols:
+        return {}
+    # 4500개 캡(약 11.5거래일)보다 오래된 구간은 어차피 개별 조회로도 못 덮으니 받지 않는다
+    floor_dt = datetime.now(ZoneInfo("UTC")) - timedelta(days=max_lookback_days)
+    start = max(earliest.astimezone(ZoneInfo("UTC")) - timedelta(minutes=30), floor_dt)
+    return get_alpaca_bars_bulk(symbols, "M1", start=start)
+
+
 def evaluate_pending_outcomes(max_window_minutes: int = 240, min_elapsed_minutes: int = 5):
     """
     구글시트에서 아직 결과가 안 채워진 행들을 찾아서,
@@ -5504,6 +5042,11 @@ def evaluate_pending_outcomes(max_window_minutes: int = 240, min_elapsed_minutes
     # 🟥 [FIX-F1] 셀 쓰기를 즉시 보내지 않고 여기에 모았다가 마지막에 한 번에 flush 한다.
     #    (행마다 update_cell 5회 → 429 Quota exceeded 로 배포가 실패했다)
     pending: list = []
+    try:
+        _bulk_m1 = _prefetch_outcome_stock_candles(all_rows[1:])
+    except Exception as e:
+        print(f"⚠️ [결과추적] 주식 다종목 캔들 프리페치 실패 → 종목별 조회로 진행: {e}")
+        _bulk_m1 = {}
 
     for i, row in enumerate(all_rows[1:], start=2):  # 1번째 줄은 헤더, 시트 row는 1-indexed
         try:
@@ -5610,7 +5153,15 @@ def evaluate_pending_outcomes(max_window_minutes: int = 240, min_elapsed_minutes
         #    OANDA/Alpaca 쪽 1회 요청 한도(보통 5000개 안팎)를 넘기면 400 에러가 나므로 안전하게 캡.
         bars_needed = int(elapsed_minutes / _gran_minutes) + 20  # 여유 버퍼 20개
         bars_capped = min(bars_needed, 4500)
-        candles = get_candles(pair, gran, max(50, bars_capped))
+        # 🟦 [PERF-04] 링버퍼(500개)보다 긴 M1 요청은 get_candles 안에서 디스크 아카이브를 먼저 읽고
+        #    마지막 저장 봉 이후 꼬리만 원격으로 받는다.
+        _pref = _bulk_m1.get(str(pair).upper()) if is_stock_pair(pair) else None
+        if _pref is not None:
+            # 🟦 [PERF-05] 개별 조회와 같은 모양(최근 N개)으로 잘라서 쓴다
+            _n = max(50, bars_capped)
+            candles = _pref.iloc[max(0, len(_pref) - _n):].reset_index(drop=True)
+        else:
+            candles = get_candles(pair, gran, max(50, bars_capped))
         if candles is None or candles.empty:
             # 캔들 자체를 못 가져온 경우 — 그래도 4시간 넘었으면 더 기다릴 의미 없으니 시간초과로 정리
             if elapsed_minutes > max_window_minutes:
@@ -5766,7 +5317,7 @@ def _find_force_close_fill(symbol, entry_time_iso):
     url = f"{ALPACA_TRADE_BASE_URL}/v2/orders"
     params = {"symbols": symbol, "status": "closed", "after": entry_time_iso, "limit": 20, "direction": "asc"}
     try:
-        r = requests.get(url, headers=ALPACA_HEADERS, params=params, timeout=10)
+        r = alpaca_trade_http.get(url, headers=ALPACA_HEADERS, params=params, timeout=10)
         r.raise_for_status()
         for o in r.json():
             # bracket의 자식(legs)이 아니라, 독립적으로 들어간 시장가 청산 주문만 찾는다.
@@ -5830,7 +5381,7 @@ def _get_latest_entry_time_for_open_position(symbol, side):
         # limit 20 → 500. Alpaca 1회 조회 상한이 500이다.
         params = {"symbols": symbol, "status": "all", "direction": "desc", "limit": 500,
                   "nested": "true"}
-        r = requests.get(url, headers=ALPACA_HEADERS, params=params, timeout=15)
+        r = alpaca_trade_http.get(url, headers=ALPACA_HEADERS, params=params, timeout=15)
         r.raise_for_status()
         want_side = "buy" if side == "long" else "sell"
         for o in r.json():
@@ -5897,7 +5448,7 @@ def _cancel_open_orders_for_symbol(symbol: str) -> int:
     if not symbol:
         return 0
     try:
-        r = requests.get(
+        r = alpaca_trade_http.get(
             f"{ALPACA_TRADE_BASE_URL}/v2/orders",
             headers=ALPACA_HEADERS,
             # nested 제거 — 자식 leg를 최상위로 받아야 취소할 수 있다
@@ -5923,7 +5474,7 @@ def _cancel_open_orders_for_symbol(symbol: str) -> int:
     cancelled = 0
     for oid in dict.fromkeys(ids):          # 중복 제거, 순서 유지
         try:
-            rr = requests.delete(f"{ALPACA_TRADE_BASE_URL}/v2/orders/{oid}",
+            rr = alpaca_trade_http.delete(f"{ALPACA_TRADE_BASE_URL}/v2/orders/{oid}",
                                  headers=ALPACA_HEADERS, timeout=15)
             if rr.status_code in (200, 204):
                 cancelled += 1
@@ -5957,7 +5508,7 @@ def _force_close_position(symbol: str, side: str | None = None) -> bool:
         if attempt:
             _t.sleep(1.5)               # 취소 반영 대기
         try:
-            r = requests.delete(f"{ALPACA_TRADE_BASE_URL}/v2/positions/{symbol}",
+            r = alpaca_trade_http.delete(f"{ALPACA_TRADE_BASE_URL}/v2/positions/{symbol}",
                                 headers=ALPACA_HEADERS, timeout=15)
         except Exception as e:
             print(f"❌ [강제청산] {symbol} 청산 요청 예외({attempt+1}/3): {e}")
@@ -6001,7 +5552,7 @@ def _close_all_positions_with_orders() -> dict:
     '모든 예약주문 취소 + 모든 포지션 청산'을 한 번에 해준다(단일 종목 엔드포인트에는 없는 옵션).
     """
     try:
-        r = requests.delete(f"{ALPACA_TRADE_BASE_URL}/v2/positions",
+        r = alpaca_trade_http.delete(f"{ALPACA_TRADE_BASE_URL}/v2/positions",
                             headers=ALPACA_HEADERS,
                             params={"cancel_orders": "true"}, timeout=30)
         ok = r.status_code in (200, 207)
@@ -6030,7 +5581,7 @@ def close_stale_positions(cutoff_minutes=None):
     cutoff = STOCK_TIME_EXIT_MINUTES if cutoff_minutes is None else cutoff_minutes
     time_exit_on = cutoff is not None and cutoff > 0
     try:
-        r = requests.get(f"{ALPACA_TRADE_BASE_URL}/v2/positions", headers=ALPACA_HEADERS, timeout=15)
+        r = alpaca_trade_http.get(f"{ALPACA_TRADE_BASE_URL}/v2/positions", headers=ALPACA_HEADERS, timeout=15)
         r.raise_for_status()
         positions = r.json()
     except Exception as e:
@@ -6179,7 +5730,7 @@ def sync_alpaca_trade_log():
             params = {"status": "all", "nested": "true", "limit": 500, "direction": "desc"}
             if until_param:
                 params["until"] = until_param
-            r = requests.get(url, headers=ALPACA_HEADERS, params=params, timeout=15)
+            r = alpaca_trade_http.get(url, headers=ALPACA_HEADERS, params=params, timeout=15)
             r.raise_for_status()
             page = r.json()
             if not page:
@@ -6485,7 +6036,7 @@ def sync_top_active_candidates(top_n: int = 5):
         # 🟥 [FIX-A5] 필터링 후에도 top_n개가 남도록 넉넉히 가져온다.
         #    (거래량 상위는 페니주·레버리지 ETF가 대부분이라 그냥 5개만 받으면 전부 걸러진다)
         params = {"by": "volume", "top": max(top_n * 8, 40)}
-        r = requests.get(url, headers=ALPACA_HEADERS, params=params, timeout=15)
+        r = alpaca_data_http.get(url, headers=ALPACA_HEADERS, params=params, timeout=15)
         r.raise_for_status()
         data = r.json()
         actives = data.get("most_actives") or data.get("mostActives") or []
@@ -6500,12 +6051,16 @@ def sync_top_active_candidates(top_n: int = 5):
     #    주식 수가 많아서지 유동성이 좋아서가 아니다.
     #    → is_blocked_instrument()로 레버리지 ETF·페니주를 걸러내고, 걸러진 이유도 표기한다.
     skipped = 0
+    # 🟦 [PERF-05] 종목마다 최신가를 한 번씩 부르던 것을 다종목 요청 한 번으로
+    _prices = get_alpaca_latest_prices_bulk([it.get("symbol") for it in actives if it.get("symbol")])
     for item in actives:
         symbol = item.get("symbol")
         volume = item.get("volume") or item.get("trade_count")
         if not symbol:
             continue
-        price = get_alpaca_latest_price(symbol)
+        price = _prices.get(symbol.upper())
+        if price is None:
+            price = get_alpaca_latest_price(symbol)
         blocked, block_reason = is_blocked_instrument(symbol, price)
         if blocked:
             skipped += 1
@@ -6907,9 +6462,14 @@ def _ask_gpt_for_report(stats_text, period_label):
             "temperature": 0.3,
             "max_output_tokens": 1800,
         }
-        r = requests.post(OPENAI_URL, headers=OPENAI_HEADERS, json=body, timeout=60)
+        # 🟦 [PERF-20] 리포트는 실시간 진입 호출보다 뒤에 선다
+        est = gpt_token_estimator.estimate(body["input"])
+        with gpt_scheduler.ticket(_gpt_ticket_tokens(body, est.tokens), PRIORITY_REPORT):
+            r = openai_http.post(OPENAI_URL, headers=OPENAI_HEADERS, json=body, timeout=60)
+            gpt_scheduler.observe_headers(r.headers)
         r.raise_for_status()
         resp = r.json()
+        gpt_token_estimator.observe(est, resp.get("usage"))
         report_text = ""
         for item in resp.get("output", []):
             for c in item.get("content", []):
@@ -7047,12 +6607,44 @@ async def _time_exit_loop():
         await asyncio.sleep(max(60, TIME_EXIT_CHECK_MINUTES * 60))
 
 
+async def _rule_stats_flush_loop():
+    """🟦 [PERF-18] RULE_STATS_FLUSH_SEC마다 규칙별 집계를 RULE_STATS_PATH에 남긴다 (재시작해도 마지막 스냅샷은 파일에)."""
+    while True:
+        await asyncio.sleep(max(10, RULE_STATS_FLUSH_SEC))
+        try:
+            await asyncio.to_thread(rule_stats.flush)
+        except Exception as e:
+            print(f"❌ [규칙 집계] 파일 저장 실패: {e}")
+
+
 @app.on_event("startup")
 async def _start_background_tasks():
     asyncio.create_task(_hourly_outcome_tracker_loop())
     asyncio.create_task(_time_exit_loop())          # 🟥 [FIX-A3] 신규
     asyncio.create_task(_daily_top_movers_loop())
     asyncio.create_task(_weekly_report_loop())
+    if PRICE_STREAM_ENABLED:
+        price_streams.start()                       # 🟦 [PERF-10]
+        asyncio.create_task(_live_bars.run())       # 🟦 [PERF-11] 봉 마감 처리
+    if rule_stats.enabled:
+        asyncio.create_task(_rule_stats_flush_loop())   # 🟦 [PERF-18]
+    check_gpt_static_prompts()                      # 🟦 [PERF-22]
+    if CHART_WARM_PAIRS:
+        asyncio.create_task(chart_pool.warm(CHART_WARM_PAIRS))   # 🟦 [PERF-24]
+
+
+@app.on_event("shutdown")
+async def _close_http_clients():
+    # 🟦 [PERF-07] aiohttp 세션/커넥터 정리 (안 닫으면 종료 시 "Unclosed client session" 경고)
+    await price_streams.stop()
+    await close_async_clients()
+    await chart_pool.close()                        # 🟦 [PERF-24]
+    _webhook_io_pool.shutdown(wait=False)
+    if rule_stats.enabled:
+        try:
+            rule_stats.flush()                      # 🟦 [PERF-18] 마지막 집계
+        except Exception as e:
+            print(f"❌ [규칙 집계] 파일 저장 실패: {e}")
 
 
 @app.post("/run_outcome_tracker")
@@ -7090,6 +6682,52 @@ async def sync_symbol_performance_endpoint():
     return JSONResponse(content={"status": "done"})
 
 
+@app.get("/http_stats")
+async def http_stats_endpoint():
+    """🟦 [PERF-06] 공급자별(OANDA/Alpaca/OpenAI) HTTP 호출 수·상태코드·지연시간(p50/p95) 확인용."""
+    return JSONResponse(content=http_stats())
+
+
+@app.get("/rule_stats")
+async def rule_stats_endpoint():
+    """🟦 [PERF-18] 점수 규칙별 발동 수(종목/전략별) · 적중률 · 점수 기여 합 · 조건 평가 시간, 한 번도 안 걸린 규칙 목록.
+    RULE_STATS_ENABLED=true일 때만 쌓인다."""
+    return JSONResponse(content=rule_stats.snapshot())
+
+
+@app.get("/gpt_cache_stats")
+async def gpt_cache_stats_endpoint():
+    """🟦 [PERF-19] GPT 판단 캐시 적중/미스/만료/LRU 축출 수 + 동시 호출 합치기(coalesced) 수."""
+    return JSONResponse(content={
+        **gpt_decision_cache.stats(),
+        "flight": _gpt_flight.stats(),
+    })
+
+
+@app.get("/gpt_scheduler_stats")
+async def gpt_scheduler_stats_endpoint():
+    """🟦 [PERF-20] OpenAI 스케줄러 대기열 · 동시 호출 수 · 요청/토큰 버킷 잔량 · 우선순위별 대기시간(p50/p99).
+    🟦 [PERF-21] token_estimate: 입력 토큰 추정 보정 배율과 usage 대비 오차."""
+    return JSONResponse(content={**gpt_scheduler.stats(), "token_estimate": gpt_token_estimator.stats()})
+
+
+@app.get("/chart_pool_stats")
+async def chart_pool_stats_endpoint():
+    """🟦 [PERF-24] 차트 캡처 풀: 열린 페이지(종목) · 재사용/심볼 전환/새로 열기 횟수 · 캡처 지연(p50/p99)."""
+    return JSONResponse(content=chart_pool.stats())
+
+
+@app.get("/price_stream_stats")
+async def price_stream_stats_endpoint():
+    """🟦 [PERF-10] 가격 스트림 연결 상태 / 구독 종목 / 종목별 마지막 시세 수신 후 경과초."""
+    return JSONResponse(content={
+        **price_streams.stats(),
+        "live_bars": _live_bars.stats(),          # 🟦 [PERF-11]
+        "candle_rings": _candle_rings.stats(),
+        "candle_contexts": _candle_contexts.stats(),   # 🟦 [PERF-14]
+    })
+
+
 @app.post("/sync_top_active_candidates")
 @app.get("/sync_top_active_candidates")
 async def sync_top_active_candidates_endpoint():
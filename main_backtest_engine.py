@@ -3,36 +3,17 @@ import numpy as np
 from datetime import datetime, timedelta
 import math
 
+from indicators import (
+    calculate_bollinger_bands, calculate_ema, calculate_hammer_star_pattern, calculate_macd, calculate_rsi,
+    calculate_stoch_rsi,
+)
+
 # ====== 지표 계산 ======
-def calculate_rsi(series, period=14):
-    delta = series.diff()
-    gain = delta.clip(lower=0).rolling(window=period).mean()
-    loss = -delta.clip(upper=0).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
-
-def calculate_macd(series):
-    ema12 = series.ewm(span=12).mean()
-    ema26 = series.ewm(span=26).mean()
-    macd = ema12 - ema26
-    signal = macd.ewm(span=9).mean()
-    return macd, signal
-
-def calculate_stoch_rsi(rsi, period=14):
-    min_rsi = rsi.rolling(window=period).min()
-    max_rsi = rsi.rolling(window=period).max()
-    return (rsi - min_rsi) / (max_rsi - min_rsi)
-
-def calculate_bollinger_bands(series, window=20):
-    mid = series.rolling(window=window).mean()
-    std = series.rolling(window=window).std()
-    upper = mid + 2 * std
-    lower = mid - 2 * std
-    return upper, mid, lower
+# 🟦 [PERF-13] RSI/MACD/StochRSI/볼린저는 라이브(main.py)와 같은 indicators.py 구현을 쓴다
 
 def detect_trend(df):
-    ema20 = df['close'].ewm(span=20).mean()
-    ema50 = df['close'].ewm(span=50).mean()
+    ema20 = calculate_ema(df['close'], 20)
+    ema50 = calculate_ema(df['close'], 50)
     if ema20.iloc[-1] > ema50.iloc[-1]:
         return "UPTREND"
     elif ema20.iloc[-1] < ema50.iloc[-1]:
@@ -40,16 +21,6 @@ def detect_trend(df):
     else:
         return "NEUTRAL"
 
-def detect_candle_pattern(row):
-    body = abs(row['close'] - row['open'])
-    upper_wick = row['high'] - max(row['close'], row['open'])
-    lower_wick = min(row['close'], row['open']) - row['low']
-    if lower_wick > 2 * body and upper_wick < body:
-        return "HAMMER"
-    elif upper_wick > 2 * body and lower_wick < body:
-        return "SHOOTING_STAR"
-    return "NEUTRAL"
-
 def detect_box_breakout(df, pip_value, box_window=10, box_threshold_pips=30):
     recent = df.tail(box_window)
     high = recent['high'].max()
@@ -90,7 +61,7 @@ def backtest_main(df, pair):
     df['macd'], df['macd_signal'] = calculate_macd(df['close'])
     df['stoch_rsi'] = calculate_stoch_rsi(df['rsi'])
     df['boll_up'], df['boll_mid'], df['boll_low'] = calculate_bollinger_bands(df['close'])
-    df['pattern'] = df.apply(detect_candle_pattern, axis=1)
+    df['pattern'] = calculate_hammer_star_pattern(df)   # 🟦 [PERF-13] 행마다 apply 대신 한 번에
 
     last_trade_time = None
     
@@ -173,6 +144,9 @@ def backtest_fastfury(df):
     df['rsi'] = calculate_rsi(df['close'])
     df['macd'], df['macd_signal'] = calculate_macd(df['close'])
     df['stoch_rsi'] = calculate_stoch_rsi(df['rsi'])
+    # 🟦 [PERF-13] 봉마다 전체 구간 ewm을 다시 돌리던 것을 한 번만 계산 (전체 시리즈 기준이라 값은 같다)
+    ema9_all = calculate_ema(df['close'], 9)
+    ema21_all = calculate_ema(df['close'], 21)
 
     last_trade_time = None
     
@@ -194,8 +168,8 @@ def backtest_fastfury(df):
         else:
             continue
 
-        ema9 = df['close'].ewm(span=9).mean().iloc[i]
-        ema21 = df['close'].ewm(span=21).mean().iloc[i]
+        ema9 = ema9_all.iloc[i]
+        ema21 = ema21_all.iloc[i]
         if signal == "BUY" and ema9 > ema21:
             score += 1
             reasons.append("EMA 상승추세")
@@ -0,0 +1,301 @@
+# 🟦 [PERF-20] OpenAI 호출 스케줄러
+#    예전엔 GPT 호출 앞에 서로 모르는 스로틀이 세 겹으로 있었고, 셋 다 워커 스레드를 sleep 시켰다.
+#      1) gpt_rate_gate()        — GPT_RPM 기준 슬롯 예약
+#      2) _preflight_gate()      — x-ratelimit-* 헤더로 남은 TPM/RPM이 없으면 리셋까지 대기
+#      3) _gpt_lock + GPT_MIN_INTERVAL_SEC — 호출 간 최소 간격
+#    알림이 몰리면 대기가 겹겹이 쌓였고(p99), 주간 리포트 호출도 실시간 진입과 같은 줄에 섰다.
+#    → 요청/토큰 토큰버킷 하나 + 우선순위 큐 + 동시 호출 수 상한으로 합친다.
+#    - 버킷 용량/충전 속도는 GPT_RPM/GPT_TPM으로 시작하고, 응답의 x-ratelimit-* 헤더(limit/remaining)로 계속 맞춘다
+#    - 대기는 티켓 단위: async with / with 둘 다 된다. async 쪽은 이벤트 루프를, sync 쪽은 자기 스레드만 기다린다
+#    - 우선순위 숫자가 작을수록 먼저 (실시간 진입 PRIORITY_LIVE < 주간 리포트 PRIORITY_REPORT). 같은 우선순위는 먼저 온 순서
+import asyncio
+import heapq
+import itertools
+import os
+import re
+import threading
+import time as _t
+from collections import deque
+
+
+GPT_RPM = int(os.getenv("GPT_RPM", "3000"))
+GPT_TPM = int(os.getenv("GPT_TPM", "800000"))
+GPT_MAX_CONCURRENCY = int(os.getenv("GPT_MAX_CONCURRENCY", "4"))
+# 호출 간 최소 간격. 버킷 + 동시성 상한이 있으니 기본은 0(끔). 예전처럼 간격을 두려면 1.5 등으로
+GPT_MIN_INTERVAL_SEC = float(os.getenv("GPT_MIN_INTERVAL_SEC", "0"))
+
+PRIORITY_LIVE = 0
+PRIORITY_REPORT = 10
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNIT = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value):
+    """x-ratelimit-reset-* 값('6m0s', '1.5s', '20ms', '12') → 초. 못 읽으면 None."""
+    if value is None:
+        return None
+    s = str(value).strip()
+    try:
+        return float(s)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(s)
+    if not parts:
+        return None
+    return sum(float(n) * _DURATION_UNIT[u] for n, u in parts)
+
+
+def _header(h, name):
+    v = h.get(name)
+    if v is None:
+        v = h.get(name.title())
+    return v
+
+
+class TokenBucket:
+    """용량 capacity, 초당 rate씩 차는 버킷. 락은 스케줄러가 잡는다."""
+
+    __slots__ = ("capacity", "rate", "level", "updated")
+
+    def __init__(self, per_minute, now):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = now
+
+    def refill(self, now):
+        if now > self.updated:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount):
+        """지금 level에서 amount를 쓰려면 기다려야 하는 초 (refill 직후 호출)."""
+        short = min(amount, self.capacity) - self.level
+        return short / self.rate if short > 0 and self.rate > 0 else 0.0
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+    def observe(self, limit, remaining, now):
+        """응답 헤더 기준으로 맞춘다 — 한도가 바뀌었으면 용량/속도를, 서버가 본 잔량이 더 적으면 level을."""
+        self.refill(now)
+        if limit is not None and limit > 0 and limit != self.capacity:
+            self.capacity = float(limit)
+            self.rate = self.capacity / 60.0
+            self.level = min(self.level, self.capacity)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+
+
+class Ticket:
+    """스케줄러 대기표. `async with scheduler.ticket(n):` 또는 `with scheduler.ticket(n):` 안에서만 호출한다."""
+
+    __slots__ = ("scheduler", "tokens", "priority", "seq", "granted", "queued_at", "_event", "_loop")
+
+    def __init__(self, scheduler, tokens, priority):
+        self.scheduler = scheduler
+        self.tokens = max(1, int(tokens))
+        self.priority = priority
+        self.seq = 0
+        self.granted = False
+        self.queued_at = 0.0
+        self._event = None
+        self._loop = None
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def _wake(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._event.set)
+        else:
+            self._event.set()
+
+    async def __aenter__(self):
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        s = self.scheduler
+        s._enqueue(self)
+        try:
+            while True:
+                self._event.clear()
+                delay = s._pump()
+                if self.granted:
+                    return self
+                try:
+                    await asyncio.wait_for(self._event.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            s._abandon(self)
+            raise
+
+    async def __aexit__(self, *exc):
+        self.scheduler._release(self)
+
+    def __enter__(self):
+        self._event = threading.Event()
+        s = self.scheduler
+        s._enqueue(self)
+        try:
+            while True:
+                self._event.clear()
+                delay = s._pump()
+                if self.granted:
+                    return self
+                self._event.wait(timeout=delay)
+        except BaseException:
+            s._abandon(self)
+            raise
+
+    def __exit__(self, *exc):
+        self.scheduler._release(self)
+
+
+class OpenAIScheduler:
+    """
+    요청 수/토큰 수 토큰버킷 + 우선순위 큐 + 동시 호출 상한.
+    - ticket(tokens, priority): 대기표. 진입하면 버킷에서 요청 1개 + tokens를 미리 빼고, 빠져나올 때 동시성 슬롯을 돌려준다
+    - observe_headers(h): OpenAI 응답 헤더(x-ratelimit-limit/remaining-requests/tokens)로 버킷을 맞춘다
+    - 큐 맨 앞 티켓만 버킷을 본다 (뒤에 있는 작은 요청이 앞지르지 않는다 — 우선순위가 곧 순서)
+    """
+
+    def __init__(self, rpm=GPT_RPM, tpm=GPT_TPM, max_concurrency=GPT_MAX_CONCURRENCY,
+                 min_interval=GPT_MIN_INTERVAL_SEC, window=512):
+        now = _t.time()
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(rpm, now)
+        self._tokens = TokenBucket(tpm, now)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.min_interval = float(min_interval)
+        self._queue = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._last_dispatch = 0.0
+        self._resets = {"requests": None, "tokens": None}
+        self.granted = 0
+        self.abandoned = 0
+        self._waits = {}
+        self._window = window
+
+    def ticket(self, tokens, priority=PRIORITY_LIVE):
+        return Ticket(self, tokens, priority)
+
+    # ---- 내부: 락 안에서만 상태를 바꾼다 ----
+    def _enqueue(self, t):
+        with self._lock:
+            t.seq = next(self._seq)
+            t.queued_at = _t.time()
+            heapq.heappush(self._queue, t)
+
+    def _pump(self):
+        """허용되는 만큼 큐 앞에서부터 티켓을 내준다. 남은 티켓이 다시 확인해야 할 때까지의 초(없으면 None)."""
+        woken = []
+        delay = None
+        with self._lock:
+            while self._queue and self._in_flight < self.max_concurrency:
+                head = self._queue[0]
+                now = _t.time()
+                self._requests.refill(now)
+                self._tokens.refill(now)
+                wait = max(
+                    self._requests.wait_for(1),
+                    self._tokens.wait_for(head.tokens),
+                    self._last_dispatch + self.min_interval - now if self.min_interval > 0 else 0.0,
+                )
+                if wait > 0:
+                    delay = wait
+                    break
+                heapq.heappop(self._queue)
+                self._requests.take(1)
+                self._tokens.take(head.tokens)
+                self._in_flight += 1
+                self._last_dispatch = now
+                self.granted += 1
+                head.granted = True
+                waits = self._waits.get(head.priority)
+                if waits is None:
+                    waits = self._waits[head.priority] = deque(maxlen=self._window)
+                waits.append((now - head.queued_at) * 1000.0)
+                woken.append(head)
+        for t in woken:
+            t._wake()
+        return delay
+
+    def _release(self, t):
+        with self._lock:
+            self._in_flight -= 1
+        self._pump_and_wake_head()
+
+    def _abandon(self, t):
+        """대기 중 취소/예외. 이미 슬롯을 받았으면 돌려주고, 큐에 있으면 뺀다."""
+        with self._lock:
+            if t.granted:
+                self._in_flight -= 1
+            elif t in self._queue:
+                self._queue.remove(t)
+                heapq.heapify(self._queue)
+            self.abandoned += 1
+        self._pump_and_wake_head()
+
+    def _pump_and_wake_head(self):
+        # 새 맨 앞 티켓이 버킷 때문에 못 나가면, 그 티켓이 자기 대기 시간을 다시 계산하도록 깨운다
+        delay = self._pump()
+        if delay is not None:
+            with self._lock:
+                head = self._queue[0] if self._queue else None
+            if head is not None:
+                head._wake()
+
+    # ---- 응답 헤더 ----
+    def observe_headers(self, h):
+        if not h:
+            return
+
+        def num(name):
+            v = _header(h, name)
+            try:
+                return float(v) if v is not None else None
+            except (TypeError, ValueError):
+                return None
+
+        now = _t.time()
+        with self._lock:
+            self._requests.observe(num("x-ratelimit-limit-requests"), num("x-ratelimit-remaining-requests"), now)
+            self._tokens.observe(num("x-ratelimit-limit-tokens"), num("x-ratelimit-remaining-tokens"), now)
+            for kind in ("requests", "tokens"):
+                sec = parse_reset(_header(h, f"x-ratelimit-reset-{kind}"))
+                if sec is not None:
+                    self._resets[kind] = now + sec
+
+    def stats(self):
+        with self._lock:
+            now = _t.time()
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            waits = {}
+            for prio, d in sorted(self._waits.items()):
+                w = sorted(d)
+                n = len(w)
+                waits[str(prio)] = {
+                    "n": n,
+                    "avg_ms": round(sum(w) / n, 1) if n else 0.0,
+                    "p50_ms": round(w[n // 2], 1) if n else 0.0,
+                    "p99_ms": round(w[min(n - 1, int(n * 0.99))], 1) if n else 0.0,
+                    "max_ms": round(w[-1], 1) if n else 0.0,
+                }
+            return {
+                "queued": len(self._queue),
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "granted": self.granted,
+                "abandoned": self.abandoned,
+                "requests": {"level": round(self._requests.level, 1), "capacity": self._requests.capacity},
+                "tokens": {"level": round(self._tokens.level), "capacity": self._tokens.capacity},
+                "reset_in_sec": {k: (round(v - now, 1) if v and v > now else 0.0) for k, v in self._resets.items()},
+                "wait_by_priority": waits,
+            }
+
+
+gpt_scheduler = OpenAIScheduler()
@@ -0,0 +1,409 @@
+# 🟦 [PERF-10] 실시간 시세 구독: Alpaca 시세 웹소켓 + OANDA pricing stream → 프로세스 내 최신 호가/체결가 캐시
+#    주문 직전 가격 괴리 체크(place_order_alpaca)가 매번 REST로 latest trade를 받던 것을
+#    메모리 조회로 바꾸기 위한 모듈. 스트림이 끊겼거나 값이 오래됐으면 호출부가 기존 REST로 폴백한다.
+#    - 접속 주소는 env로 바꿀 수 있다 → 로컬 가짜 서버(fake_price_stream.py)로 그대로 테스트 가능
+#    - 구독 종목은 웹훅이 들어온 종목 + PRICE_STREAM_SYMBOLS (최근 것 우선 최대 PRICE_STREAM_MAX_SYMBOLS개)
+import abc
+import asyncio
+import json
+import os
+import random
+import threading
+import time as _t
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import aiohttp
+
+
+PRICE_STREAM_ENABLED = os.getenv("PRICE_STREAM_ENABLED", "true").strip().lower() == "true"
+# Alpaca 무료(IEX) 웹소켓은 구독 30종목 제한
+PRICE_STREAM_MAX_SYMBOLS = int(os.getenv("PRICE_STREAM_MAX_SYMBOLS", "30"))
+PRICE_STREAM_SYMBOLS = tuple(
+    s.strip().upper() for s in os.getenv("PRICE_STREAM_SYMBOLS", "").split(",") if s.strip()
+)
+# 이 시간보다 오래된 시세는 "없음"으로 본다 (주문 직전 괴리 체크용)
+QUOTE_MAX_AGE_SEC = float(os.getenv("QUOTE_MAX_AGE_SEC", "5"))
+
+
+class Quote(NamedTuple):
+    bid: Optional[float]
+    ask: Optional[float]
+    last: Optional[float]       # 최근 체결가 (FX는 체결가가 없어 None)
+    event_ts: float             # 브로커가 찍은 시각 (epoch 초)
+    recv_ts: float              # 이 프로세스가 받은 시각 (epoch 초) — 신선도 판단 기준
+
+    @property
+    def mid(self):
+        if self.bid is not None and self.ask is not None:
+            return (self.bid + self.ask) / 2.0
+        return self.bid if self.bid is not None else self.ask
+
+
+def parse_rfc3339(ts):
+    """'2026-10-16T13:30:00.123456789Z' → epoch 초. fromisoformat이 나노초를 못 읽어서 마이크로초까지 자른다."""
+    if not ts:
+        return _t.time()
+    try:
+        s = ts[:-1] if ts.endswith("Z") else ts
+        if "." in s:
+            head, frac = s.split(".", 1)
+            s = f"{head}.{frac[:6]}"
+        return datetime.fromisoformat(s + "+00:00").timestamp()
+    except (ValueError, TypeError):
+        return _t.time()
+
+
+class QuoteCache:
+    """
+    심볼 → Quote. 락 없이 읽고 쓴다.
+    - 쓰기: 심볼당 쓰는 쪽은 해당 스트림 태스크 하나뿐이고, 새 Quote 튜플로 dict 항목을 통째로 교체한다
+      (dict 단일 대입은 GIL 아래 원자적이라 읽는 쪽은 항상 완성된 튜플만 본다)
+    - 읽기: 주문/사이징 코드가 어느 스레드에서든 dict.get 한 번으로 끝
+    """
+
+    def __init__(self):
+        self._quotes = {}
+        self.updates = 0
+
+    def update(self, symbol, bid=None, ask=None, last=None, event_ts=None):
+        key = str(symbol).upper()
+        prev = self._quotes.get(key)
+        now = _t.time()
+        self._quotes[key] = Quote(
+            bid if bid is not None else (prev.bid if prev else None),
+            ask if ask is not None else (prev.ask if prev else None),
+            last if last is not None else (prev.last if prev else None),
+            event_ts if event_ts is not None else now,
+            now,
+        )
+        self.updates += 1
+
+    def get(self, symbol, max_age=None):
+        q = self._quotes.get(str(symbol).upper())
+        if q is None:
+            return None
+        if max_age is not None and (_t.time() - q.recv_ts) > max_age:
+            return None
+        return q
+
+    def price(self, symbol, max_age=QUOTE_MAX_AGE_SEC):
+        """최근 체결가(없으면 mid). 신선한 값이 없으면 None → 호출부가 REST로 폴백."""
+        q = self.get(symbol, max_age)
+        if q is None:
+            return None
+        return q.last if q.last is not None else q.mid
+
+    def stats(self):
+        now = _t.time()
+        return {
+            "symbols": len(self._quotes),
+            "updates": self.updates,
+            "stale_sec": {k: round(now - q.recv_ts, 1) for k, q in list(self._quotes.items())},
+        }
+
+
+quote_cache = QuoteCache()
+
+
+class _StreamSubscriber(abc.ABC):
+    """재접속(지수 백오프+지터) 루프와 구독 종목 집합 관리 공통부."""
+
+    name = "stream"
+
+    def __init__(self, cache=quote_cache):
+        self.cache = cache
+        self.symbols = set()
+        self._changed = None        # asyncio.Event — 루프 안에서 생성
+        self._loop = None
+        self._task = None
+        self.connected = False
+        self.reconnects = 0
+        self.messages = 0
+        self.last_error = None
+        # 🟦 [PERF-11] 틱 구독자 (bar_builder 등)
+        #   tick_listeners:  fn(symbol, price, size, event_ts) — 주식=체결, FX=mid 호가 갱신(size=1)
+        #   reset_listeners: fn(symbols) — 이 종목들은 틱 연속성이 끊겼다 (접속/재접속/구독 변경)
+        self.tick_listeners = []
+        self.reset_listeners = []
+
+    def _emit_tick(self, symbol, price, size, event_ts):
+        for fn in self.tick_listeners:
+            try:
+                fn(symbol, price, size, event_ts)
+            except Exception as e:
+                print(f"⚠️ [{self.name}] 틱 리스너 오류: {e}")
+
+    def _emit_reset(self, symbols):
+        if not symbols:
+            return
+        for fn in self.reset_listeners:
+            try:
+                fn(symbols)
+            except Exception as e:
+                print(f"⚠️ [{self.name}] 리셋 리스너 오류: {e}")
+
+    def set_symbols(self, symbols):
+        symbols = set(symbols)
+        if symbols == self.symbols:
+            return
+        self.symbols = symbols
+        if self._loop is not None and self._changed is not None:
+            # 웹훅 스레드 등 루프 밖에서 불려도 안전하게 깨운다
+            self._loop.call_soon_threadsafe(self._changed.set)
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._task = asyncio.create_task(self._run_forever())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _run_forever(self):
+        attempt = 0
+        while True:
+            if not self.symbols:
+                self._changed.clear()
+                await self._changed.wait()
+                continue
+            try:
+                await self._session()
+                attempt = 0
+                continue        # 구독 종목 변경으로 정상 종료 → 백오프 없이 바로 재접속
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"⚠️ [{self.name}] 시세 스트림 끊김: {self.last_error}")
+            finally:
+                self.connected = False
+                self._emit_reset(set(self.symbols))
+            self.reconnects += 1
+            await asyncio.sleep(min(60.0, 1.0 * (2 ** attempt)) + random.uniform(0, 0.5))
+            attempt = min(attempt + 1, 6)
+
+    @abc.abstractmethod
+    async def _session(self):
+        """접속 → 구독 → 수신. 구독 종목이 바뀌면 정상 반환(바로 재접속), 끊기면 예외."""
+
+    def stats(self):
+        return {
+            "connected": self.connected,
+            "symbols": sorted(self.symbols),
+            "messages": self.messages,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
+
+
+class AlpacaQuoteStream(_StreamSubscriber):
+    """
+    Alpaca market data v2 웹소켓 (trades + quotes).
+    프로토콜: 접속 → {"action":"auth"} → {"action":"subscribe","trades":[…],"quotes":[…]}
+             이후 [{"T":"t","S":..,"p":..,"t":..}, {"T":"q","S":..,"bp":..,"ap":..}] 배열 메시지
+    구독 종목이 바뀌면 재접속 없이 subscribe/unsubscribe 메시지만 보낸다.
+    """
+
+    name = "alpaca-stream"
+
+    def __init__(self, url, key, secret, cache=quote_cache):
+        super().__init__(cache)
+        self.url = url
+        self.key = key
+        self.secret = secret
+
+    async def _session(self):
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(self.url, heartbeat=20) as ws:
+                await ws.send_json({"action": "auth", "key": self.key, "secret": self.secret})
+                subscribed = set()
+                receiver = asyncio.ensure_future(ws.receive())
+                waiter = asyncio.ensure_future(self._changed.wait())
+                try:
+                    while True:
+                        if self.connected and subscribed != self.symbols:
+                            subscribed = await self._resubscribe(ws, subscribed)
+                        done, _ = await asyncio.wait({receiver, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                        if waiter in done:
+                            self._changed.clear()
+                            waiter = asyncio.ensure_future(self._changed.wait())
+                        if receiver in done:
+                            msg = receiver.result()
+                            if msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.CLOSING,
+                                            aiohttp.WSMsgType.ERROR):
+                                raise ConnectionError(f"웹소켓 종료 ({msg.type.name})")
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                self._handle(json.loads(msg.data))
+                            receiver = asyncio.ensure_future(ws.receive())
+                finally:
+                    receiver.cancel()
+                    waiter.cancel()
+
+    async def _resubscribe(self, ws, subscribed):
+        add = sorted(self.symbols - subscribed)
+        drop = sorted(subscribed - self.symbols)
+        if drop:
+            await ws.send_json({"action": "unsubscribe", "trades": drop, "quotes": drop})
+        if add:
+            await ws.send_json({"action": "subscribe", "trades": add, "quotes": add})
+        self._emit_reset(set(add) | set(drop))
+        return set(self.symbols)
+
+    def _handle(self, items):
+        for m in items if isinstance(items, list) else [items]:
+            kind = m.get("T")
+            if kind == "t":
+                price, ts = float(m["p"]), parse_rfc3339(m.get("t"))
+                self.cache.update(m["S"], last=price, event_ts=ts)
+                self._emit_tick(m["S"], price, int(m.get("s") or 0), ts)
+            elif kind == "q":
+                self.cache.update(m["S"], bid=float(m["bp"]), ask=float(m["ap"]),
+                                  event_ts=parse_rfc3339(m.get("t")))
+            elif kind == "success" and m.get("msg") == "authenticated":
+                self.connected = True
+                print(f"📡 [{self.name}] 인증 완료 — {len(self.symbols)}종목 구독")
+            elif kind == "error":
+                raise ConnectionError(f"Alpaca 스트림 오류 {m.get('code')}: {m.get('msg')}")
+            else:
+                continue
+            self.messages += 1
+
+
+class OandaPriceStream(_StreamSubscriber):
+    """
+    OANDA v20 pricing stream (줄 단위 JSON, HTTP chunked).
+    instruments가 URL 파라미터라 구독 종목이 바뀌면 연결을 끊고 새로 연다.
+    """
+
+    name = "oanda-stream"
+
+    def __init__(self, base_url, account_id, token, cache=quote_cache):
+        super().__init__(cache)
+        self.base_url = base_url.rstrip("/")
+        self.account_id = account_id
+        self.token = token
+
+    async def _session(self):
+        self._changed.clear()
+        connected_with = set(self.symbols)
+        instruments = ",".join(sorted(connected_with))
+        url = f"{self.base_url}/v3/accounts/{self.account_id}/pricing/stream"
+        headers = {"Authorization": f"Bearer {self.token}"}
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=30)   # 하트비트가 5초마다 오므로 30초 무응답이면 끊김
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(url, headers=headers, params={"instruments": instruments}) as resp:
+                if resp.status != 200:
+                    body = (await resp.text())[:200]
+                    raise ConnectionError(f"HTTP {resp.status}: {body}")
+                self.connected = True
+                self._emit_reset(connected_with)
+                print(f"📡 [{self.name}] 연결 — {instruments}")
+                reader = asyncio.ensure_future(resp.content.readline())
+                waiter = asyncio.ensure_future(self._changed.wait())
+                try:
+                    while True:
+                        done, _ = await asyncio.wait({reader, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                        if waiter in done:
+                            if self.symbols != connected_with:
+                                return      # 구독 종목 변경 → 새 instruments로 재접속
+                            self._changed.clear()
+                            waiter = asyncio.ensure_future(self._changed.wait())
+                            continue
+                        line = reader.result()
+                        if not line:
+                            raise ConnectionError("스트림 종료(EOF)")
+                        line = line.strip()
+                        if line:
+                            self._handle(json.loads(line))
+                        reader = asyncio.ensure_future(resp.content.readline())
+                finally:
+                    reader.cancel()
+                    waiter.cancel()
+
+    def _handle(self, m):
+        if m.get("type") != "PRICE":
+            return
+        bids, asks = m.get("bids") or [], m.get("asks") or []
+        bid = float(bids[0]["price"]) if bids else None
+        ask = float(asks[0]["price"]) if asks else None
+        ts = parse_rfc3339(m.get("time"))
+        self.cache.update(m["instrument"], bid=bid, ask=ask, event_ts=ts)
+        if bid is not None and ask is not None:
+            # OANDA 캔들(price=M)은 mid 기준, volume은 호가 갱신 횟수
+            self._emit_tick(m["instrument"], (bid + ask) / 2.0, 1, ts)
+        self.messages += 1
+
+
+class PriceStreams:
+    """두 스트림을 묶어서 '최근 쓰인 종목' 기준으로 구독 목록을 관리한다."""
+
+    def __init__(self, alpaca, oanda, is_stock, max_symbols=PRICE_STREAM_MAX_SYMBOLS, seed=PRICE_STREAM_SYMBOLS):
+        self.alpaca = alpaca
+        self.oanda = oanda
+        self.is_stock = is_stock
+        self.max_symbols = max_symbols
+        self._lock = threading.Lock()
+        self._recent = OrderedDict()
+        for s in seed:
+            self._recent[s] = True
+        self.started = False
+
+    def track(self, symbol):
+        """이 종목을 구독 목록에 올린다 (이미 있으면 최근 사용으로 갱신). 어느 스레드에서 불러도 된다."""
+        key = str(symbol or "").upper().replace("/", "_")
+        if not key:
+            return
+        with self._lock:
+            if key in self._recent:
+                self._recent.move_to_end(key)
+                return
+            self._recent[key] = True
+            stocks = [s for s in self._recent if self.is_stock(s)]
+            fx = [s for s in self._recent if not self.is_stock(s)]
+            # 종목 수 제한은 스트림별로 (오래된 것부터 뺀다)
+            for group in (stocks, fx):
+                for s in group[:max(0, len(group) - self.max_symbols)]:
+                    self._recent.pop(s, None)
+        self._publish()
+
+    def _publish(self):
+        with self._lock:
+            symbols = list(self._recent)
+        self.alpaca.set_symbols(s for s in symbols if self.is_stock(s))
+        self.oanda.set_symbols(s for s in symbols if not self.is_stock(s))
+
+    def add_listeners(self, on_tick=None, on_reset=None):
+        """🟦 [PERF-11] 두 스트림 모두에 틱/리셋 리스너 등록 (start 전에)."""
+        for stream in (self.alpaca, self.oanda):
+            if on_tick is not None:
+                stream.tick_listeners.append(on_tick)
+            if on_reset is not None:
+                stream.reset_listeners.append(on_reset)
+
+    def start(self):
+        self.alpaca.start()
+        self.oanda.start()
+        self.started = True
+        self._publish()
+
+    async def stop(self):
+        await self.alpaca.stop()
+        await self.oanda.stop()
+        self.started = False
+
+    def stats(self):
+        return {
+            "enabled": self.started,
+            "alpaca": self.alpaca.stats(),
+            "oanda": self.oanda.stats(),
+            "quotes": quote_cache.stats(),
+        }
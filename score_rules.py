@@ -0,0 +1,975 @@
+# 🟦 [PERF-17] score_signal_with_filters 규칙 테이블
+#    예전엔 1,000줄짜리 if 블록이 점수를 더하면서 사람이 읽는 문장을 reasons에 쌓았고,
+#    뒤에서 그 문장을 다시 훑었다(any("opportunity_score 역행" in r for r in reasons)).
+#    - 규칙 하나 = (코드, 조건, 가중치, 문구). 문구는 필요할 때만(reasons()) 만든다
+#    - if/elif 사슬은 First, 공통 조건 아래 독립 규칙 묶음은 All, 부분 합산은 Merge, 상한은 Cap
+#    - 같은 테이블을 두 방식으로 돈다: 알림 1건(score — 파이썬 스칼라) / 과거 봉 수천 개(score_batch — 배열)
+#    - 조건은 signal_features()가 만든 값만 본다 (스칼라/배열 양쪽에서 같은 식이 돌도록 &, |, no(), one_of()만 쓴다)
+#    - 합산 순서(부분 점수 score/extra → signal)와 reasons 순서는 예전 함수와 같다
+import json
+import os
+import re
+import threading
+import time as _t
+from typing import Callable, NamedTuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# 🟦 [PERF-18] 규칙별 발동/시간 집계 (기본 꺼짐). 켜면 RULE_STATS_FLUSH_SEC마다 RULE_STATS_PATH에 JSON으로 남긴다
+RULE_STATS_ENABLED = os.getenv("RULE_STATS_ENABLED", "false").strip().lower() == "true"
+RULE_STATS_PATH = os.getenv("RULE_STATS_PATH", "rule_stats.json")
+RULE_STATS_FLUSH_SEC = int(os.getenv("RULE_STATS_FLUSH_SEC", "300"))
+
+# reasons 출력 순서: 진입 필터 → must_capture_opportunity → additional_opportunity_score → 나머지 필터
+PART_ORDER = ("entry", "opportunity", "extra", "filters")
+
+# 🟥 [FIX-B6d] detect_candle_pattern()이 실제로 반환하는 라벨과 목록을 일치시킨다.
+#    PIERCING_LINE / DARK_CLOUD_COVER가 빠져 있어서 같은 성격의 반전 패턴인데 BULLISH_ENGULFING만 ±2를 받고
+#    이 둘은 0점이 되는 비대칭이 있었다. MORNING_STAR / EVENING_STAR / HANGING_MAN은 생성되지 않으므로 제거.
+BULLISH_PATTERNS = ("BULLISH_ENGULFING", "HAMMER", "PIERCING_LINE")
+BEARISH_PATTERNS = ("SHOOTING_STAR", "BEARISH_ENGULFING", "DARK_CLOUD_COVER")
+BOOST_BUY_PAIRS = ("EUR_USD", "GBP_USD", "USD_JPY")
+_LEADING_MARK = re.compile(r"^\W+")     # 문구 앞 이모지/기호
+
+
+def no(x):
+    return np.logical_not(x)
+
+
+def one_of(x, values):
+    if isinstance(x, np.ndarray):
+        mask = np.zeros(x.shape, dtype=bool)
+        for v in values:
+            mask |= (x == v)
+        return mask
+    return x in values
+
+
+def _always(f, a):
+    return True
+
+
+# ====== 규칙 노드 ======
+# apply(…, hits, cost): hits에 (규칙, 실제 더한 값)을 쌓는다. cost(dict)가 있으면 노드별 조건 평가 시간을 잰다 (RuleStats).
+# vapply(…, hits, m): m = 이 노드가 걸린 행. hits[규칙] = (마스크, 더한 값).
+def _timed(node, f, a, cost):
+    t0 = _t.perf_counter()
+    ok = node.matches(f, a)
+    cost[id(node)] = (node, _t.perf_counter() - t0)     # 노드마다 알림 1건에 최대 한 번 평가된다
+    return ok
+
+
+class Rule(NamedTuple):
+    code: str
+    when: Callable
+    weight: float = 0.0
+    text: str = ""
+    acc: str = "signal"
+    part: str = "filters"
+
+    @property
+    def label(self):
+        return self.code
+
+    def matches(self, f, a):
+        return self.when(f, a)
+
+    def apply(self, f, a, hits, cost=None):
+        if self.weight:
+            a[self.acc] += self.weight
+        hits.append((self, self.weight))
+
+    def vapply(self, f, a, hits, m):
+        if self.weight:
+            a[self.acc] = a[self.acc] + np.where(m, self.weight, 0.0)
+        hits[self] = (m, self.weight)
+
+    def rules(self):
+        yield self
+
+
+class Cap(NamedTuple):
+    """acc가 limit를 넘으면 limit로 자른다 (예: SELL 점수 상한 5)."""
+    code: str
+    when: Callable
+    limit: float
+    text: str = ""
+    acc: str = "signal"
+    part: str = "filters"
+    weight: float = 0.0
+
+    @property
+    def label(self):
+        return self.code
+
+    def matches(self, f, a):
+        return self.when(f, a) & (a[self.acc] > self.limit)
+
+    def apply(self, f, a, hits, cost=None):
+        hits.append((self, self.limit - a[self.acc]))
+        a[self.acc] = self.limit
+
+    def vapply(self, f, a, hits, m):
+        hits[self] = (m, np.where(m, self.limit - a[self.acc], 0.0))
+        a[self.acc] = np.where(m, self.limit, a[self.acc])
+
+    def rules(self):
+        yield self
+
+
+class First(NamedTuple):
+    """if / elif / else — when이 참일 때, 조건이 맞는 첫 번째 가지 하나만."""
+    branches: tuple
+    when: Callable = _always
+
+    @property
+    def label(self):
+        codes = [r.code for r in self.rules()]
+        return f"({codes[0]}..{codes[-1]})"
+
+    def matches(self, f, a):
+        return self.when(f, a)
+
+    def apply(self, f, a, hits, cost=None):
+        for b in self.branches:
+            if b.matches(f, a) if cost is None else _timed(b, f, a, cost):
+                b.apply(f, a, hits, cost)
+                return
+
+    def vapply(self, f, a, hits, m):
+        rest = m
+        for b in self.branches:
+            bm = rest & b.matches(f, a)
+            b.vapply(f, a, hits, bm)
+            rest = rest & no(bm)
+
+    def rules(self):
+        for b in self.branches:
+            yield from b.rules()
+
+
+class All(NamedTuple):
+    """when이 참이면 안의 규칙을 각각 독립적으로."""
+    nodes: tuple
+    when: Callable = _always
+
+    label = First.label
+
+    def matches(self, f, a):
+        return self.when(f, a)
+
+    def apply(self, f, a, hits, cost=None):
+        for n in self.nodes:
+            if n.matches(f, a) if cost is None else _timed(n, f, a, cost):
+                n.apply(f, a, hits, cost)
+
+    def vapply(self, f, a, hits, m):
+        for n in self.nodes:
+            n.vapply(f, a, hits, m & n.matches(f, a))
+
+    def rules(self):
+        for n in self.nodes:
+            yield from n.rules()
+
+
+class Merge(NamedTuple):
+    """acc[into] += (acc[sources[0]] + acc[sources[1]] + …) — 예전 signal_score += score + extra_score."""
+    into: str
+    sources: tuple
+
+    @property
+    def label(self):
+        return f"merge:{self.into}"
+
+    def matches(self, f, a):
+        return True
+
+    def _sum(self, a):
+        total = a[self.sources[0]]
+        for s in self.sources[1:]:
+            total = total + a[s]
+        return total
+
+    def apply(self, f, a, hits, cost=None):
+        a[self.into] = a[self.into] + self._sum(a)
+
+    def vapply(self, f, a, hits, m):
+        a[self.into] = a[self.into] + np.where(m, self._sum(a), 0.0)
+
+    def rules(self):
+        return iter(())
+
+
+# ====== 결과 ======
+class ScoreResult:
+    """알림 1건의 점수 + 걸린 규칙. reasons()는 부를 때만 문장을 만든다."""
+
+    __slots__ = ("score", "hits", "deltas", "features")
+
+    def __init__(self, score, hits, features):
+        self.score = score
+        self.hits = tuple(r for r, _ in hits)
+        self.deltas = tuple(d for _, d in hits)     # 규칙마다 실제로 더한 값 (Cap은 잘라낸 만큼 음수)
+        self.features = features
+
+    @property
+    def codes(self):
+        return tuple(r.code for r in self.hits)
+
+    def has(self, *codes):
+        return any(r.code in codes for r in self.hits)
+
+    def components(self):
+        """[(코드, 더한 값, 부분점수 이름)] — 걸린 순서대로."""
+        return [(r.code, d, r.acc) for r, d in zip(self.hits, self.deltas)]
+
+    def reasons(self):
+        hits = sorted(self.hits, key=lambda r: PART_ORDER.index(r.part))   # 같은 part 안에서는 걸린 순서 유지
+        return [r.text.format_map(self.features) for r in hits]
+
+    def brief(self):
+        """GPT용 요약 — 'CODE±가감점'. 0점 규칙(참고/안내용)은 가감점이 없어 코드만으론 뜻이 안 남으니
+        'CODE:문구'로 안내 문장을 붙인다 (앞 이모지는 뺀다)."""
+        return [f"{r.code}{d:+g}" if d else f"{r.code}:{_LEADING_MARK.sub('', r.text.format_map(self.features))}"
+                for r, d in zip(self.hits, self.deltas)]
+
+
+class BatchScore:
+    """봉/알림 여러 개의 점수 배열 + 규칙별 적중 마스크."""
+
+    def __init__(self, score, masks, deltas, features, rules):
+        self.score = score
+        self.masks = masks          # Rule → bool 배열 (한 번이라도 걸린 규칙만)
+        self.deltas = deltas        # Rule → 더한 값 (스칼라, Cap만 행별 배열)
+        self.features = features
+        self._rules = rules         # 평가 순서
+
+    def has(self, *codes):
+        out = np.zeros(len(self.score), dtype=bool)
+        for rule, m in self.masks.items():
+            if rule.code in codes:
+                out |= m
+        return out
+
+    def hit_counts(self):
+        return {r.code: int(np.count_nonzero(m)) for r, m in self.masks.items()}
+
+    def row(self, i):
+        hits = []
+        for r in self._rules:
+            if r in self.masks and self.masks[r][i]:
+                d = self.deltas[r]
+                hits.append((r, d[i].item() if isinstance(d, np.ndarray) else d))
+        return ScoreResult(float(self.score[i]), hits, self.features.row(i))
+
+
+class RuleTable:
+    def __init__(self, nodes, accumulators=("score", "extra", "signal"), total="signal"):
+        self.nodes = tuple(nodes)
+        self.accumulators = accumulators
+        self.total = total
+        self.rules = [r for n in self.nodes for r in n.rules()]
+        codes = [r.code for r in self.rules]
+        dup = {c for c in codes if codes.count(c) > 1}
+        if dup:
+            raise ValueError(f"규칙 코드 중복: {sorted(dup)}")
+
+    def score(self, features, stats=None, key=(None, None)):
+        """스칼라 모드 — features 값은 파이썬 스칼라 (Features.row).
+        stats(RuleStats)가 켜져 있으면 조건 평가 시간을 재서 key=(종목, 전략)으로 기록한다."""
+        a = {k: 0 for k in self.accumulators}
+        hits = []
+        cost = {} if stats is not None and stats.enabled else None
+        for n in self.nodes:
+            if n.matches(features, a) if cost is None else _timed(n, features, a, cost):
+                n.apply(features, a, hits, cost)
+        result = ScoreResult(a[self.total], hits, features)
+        if cost is not None:
+            stats.record(result, cost, *key)
+        return result
+
+    def score_batch(self, features):
+        """배열 모드 — features 값은 길이 n 배열 (또는 전체 공통 스칼라)."""
+        n = features.n
+        a = {k: np.zeros(n) for k in self.accumulators}
+        hits = {}
+        full = np.ones(n, dtype=bool)
+        for node in self.nodes:
+            node.vapply(features, a, hits, full & node.matches(features, a))
+        masks, deltas = {}, {}
+        for r, (m, d) in hits.items():
+            if np.any(m):
+                masks[r], deltas[r] = np.broadcast_to(m, (n,)), d
+        return BatchScore(a[self.total], masks, deltas, features, self.rules)
+
+
+# ====== 규칙별 집계 ======
+class RuleStats:
+    """🟦 [PERF-18] 규칙별 발동 수(종목/전략별) · 점수 기여 합 · 조건 평가 시간.
+    RULE_STATS_ENABLED=true일 때만 켜진다 (꺼져 있으면 RuleTable.score는 시간을 재지 않는다).
+    - evals: 조건을 평가한 횟수 (앞 가지가 걸리거나 묶음 조건이 거짓이면 평가 자체를 안 한다)
+    - hit_rate = fires / evals, per_alert = fires / alerts
+    - guards: First/All 묶음 조건 — '(첫 코드..마지막 코드)'로 표시"""
+
+    def __init__(self, table, enabled=False, path=None):
+        self.table = table
+        self.enabled = enabled
+        self.path = path
+        self._lock = threading.Lock()
+        self._labels = {}           # id(노드) → 표시 이름 (노드는 모듈 로드 때 한 번 만들어지는 고정 객체)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._since = _t.time()
+            self._alerts = 0
+            self._features_sec = 0.0
+            self._data = {}
+
+    def _entry(self, label):
+        d = self._data.get(label)
+        if d is None:
+            d = self._data[label] = {"fires": 0, "evals": 0, "score_sum": 0.0, "eval_sec": 0.0,
+                                     "by_symbol": {}, "by_strategy": {}}
+        return d
+
+    def add_feature_time(self, seconds):
+        """규칙 공통 입력(signal_features) 계산 시간 — 규칙별 시간에는 안 들어간다."""
+        with self._lock:
+            self._features_sec += seconds
+
+    def record(self, result, cost, symbol=None, strategy=None):
+        symbol, strategy = symbol or "-", (strategy or "-").strip()
+        with self._lock:
+            self._alerts += 1
+            for key, (node, sec) in cost.items():
+                label = self._labels.get(key)
+                if label is None:
+                    label = self._labels[key] = node.label
+                d = self._entry(label)
+                d["evals"] += 1
+                d["eval_sec"] += sec
+            for rule, delta in zip(result.hits, result.deltas):
+                d = self._entry(rule.code)
+                d["fires"] += 1
+                d["score_sum"] += delta
+                d["by_symbol"][symbol] = d["by_symbol"].get(symbol, 0) + 1
+                d["by_strategy"][strategy] = d["by_strategy"].get(strategy, 0) + 1
+
+    def snapshot(self):
+        codes = [r.code for r in self.table.rules]
+        with self._lock:
+            alerts = self._alerts
+
+            def _row(d):
+                return {
+                    "fires": d["fires"], "evals": d["evals"],
+                    "hit_rate": round(d["fires"] / d["evals"], 4) if d["evals"] else 0.0,
+                    "per_alert": round(d["fires"] / alerts, 4) if alerts else 0.0,
+                    "score_sum": round(d["score_sum"], 4),
+                    "eval_ms": round(d["eval_sec"] * 1000, 3),
+                    "avg_eval_us": round(d["eval_sec"] / d["evals"] * 1e6, 2) if d["evals"] else 0.0,
+                    "by_symbol": dict(d["by_symbol"]), "by_strategy": dict(d["by_strategy"]),
+                }
+
+            rules = {c: _row(self._data[c]) for c in codes if c in self._data}
+            guards = {k: {f: v for f, v in _row(d).items() if f in ("evals", "eval_ms", "avg_eval_us")}
+                      for k, d in self._data.items() if k not in rules}
+            return {
+                "enabled": self.enabled,
+                "since": _t.strftime("%Y-%m-%dT%H:%M:%SZ", _t.gmtime(self._since)),
+                "alerts": alerts,
+                "features_ms": round(self._features_sec * 1000, 3),
+                "rules_ms": round(sum(d["eval_sec"] for d in self._data.values()) * 1000, 3),
+                "rules": rules,
+                "guards": guards,
+                "never_fired": [c for c in codes if not self._data.get(c, {}).get("fires")],
+            }
+
+    def flush(self, path=None):
+        """스냅샷을 JSON 파일로 (임시 파일에 쓰고 교체 → 읽는 쪽이 반쯤 쓴 파일을 보지 않는다)."""
+        path = path or self.path
+        if not path:
+            return None
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+        return path
+
+
+# ====== 입력값 ======
+class Features(dict):
+    """이름 → 값. 속성으로도 읽는다 (f.rsi). n = 행 수 (스칼라 한 건이면 None)."""
+
+    def __init__(self, values, n=None):
+        super().__init__(values)
+        self.n = n
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def row(self, i):
+        out = {}
+        for k, v in self.items():
+            if isinstance(v, np.ndarray):
+                v = v[i]
+                if isinstance(v, np.generic):
+                    v = v.item()
+            out[k] = v
+        return Features(out)
+
+
+def _shift(x, k, fill):
+    out = np.empty_like(x)
+    out[:k] = fill
+    out[k:] = x[:len(x) - k]
+    return out
+
+
+def _rolling(x, window, fn, fill):
+    """앞쪽은 있는 봉만으로 (pandas tail(window)와 같다)."""
+    padded = np.concatenate([np.full(window - 1, fill), x])
+    return fn(sliding_window_view(padded, window), axis=1)
+
+
+def _is_balance(strategy_name):
+    if isinstance(strategy_name, np.ndarray):
+        return np.frompyfunc(_is_balance, 1, 1)(strategy_name).astype(bool)
+    return (strategy_name or "").strip().lower() == "balance breakout"
+
+
+def _col(x, n, dtype=np.float64):
+    if x is None:
+        return np.full(n, np.nan) if dtype == np.float64 else np.full(n, None, dtype=object)
+    a = np.asarray(x, dtype=dtype) if dtype == np.float64 else np.asarray(x, dtype=object)
+    return np.broadcast_to(a, (n,)) if a.ndim == 0 else a
+
+
+@np.errstate(invalid="ignore")
+def signal_features(candles, *, pair, pv, is_stock, signal, rsi, macd, macd_signal, stoch, prev_stoch,
+                    trend, prev_trend, pattern, atr, price=None, boll_up=None, boll_low=None,
+                    support=None, resistance=None, resistance_distance=None, liquidity=None,
+                    macd_t1=np.nan, macd_t2=np.nan, macd_t3=np.nan, macd_trend_len=0,
+                    direction=None, strategy_name=None, hour=0, sl_buffer_atr_mult=0.15):
+    """캔들(봉마다 한 행) + 지표 입력 → 규칙 테이블이 보는 값 (Features, 길이 len(candles) 배열).
+    지표 입력은 봉마다 배열이거나 전체 공통 스칼라. 봉 i 행은 예전 함수에 candles.iloc[:i+1]과
+    i번째 지표 값을 넘겼을 때와 같다 (캔들 창은 최대 20봉만 본다). pv/is_stock은 pip_value_for/is_stock_pair 값."""
+    n = len(candles)
+    o = candles["open"].to_numpy(dtype=np.float64)
+    h = candles["high"].to_numpy(dtype=np.float64)
+    l = candles["low"].to_numpy(dtype=np.float64)
+    c = candles["close"].to_numpy(dtype=np.float64)
+    rsi, macd, macd_signal = _col(rsi, n), _col(macd, n), _col(macd_signal, n)
+    stoch, prev_stoch, atr = _col(stoch, n), _col(prev_stoch, n), _col(atr, n)
+    price = c if price is None else _col(price, n)
+    trend, prev_trend = _col(trend, n, object), _col(prev_trend, n, object)
+    pattern = _col(pattern, n, object)
+    signal = _col(signal, n, object)
+    direction = _col(direction, n, object)
+    t1, t2, t3 = _col(macd_t1, n), _col(macd_t2, n), _col(macd_t3, n)
+    has3 = _col(macd_trend_len, n) >= 3
+    support, resistance = _col(support, n), _col(resistance, n)
+    resistance_distance = np.abs(resistance - price) if resistance_distance is None else _col(resistance_distance, n)
+    if liquidity is None:
+        vol = candles["volume"].to_numpy(dtype=np.float64)
+        vol_sum = _rolling(vol, 10, np.sum, 0.0)
+        liquidity = np.where(vol_sum / np.minimum(np.arange(1, n + 1), 10) > 100, "좋음", "낮음").astype(object)
+    liquidity = _col(liquidity, n, object)
+    up, down, neutral = trend == "UPTREND", trend == "DOWNTREND", trend == "NEUTRAL"
+    buy, sell = signal == "BUY", signal == "SELL"
+
+    # --- 캔들 흐름 (마지막 1~3봉, 직전 봉 범위) ---
+    bull_c, bear_c = c > o, c < o
+    rng_prev = _shift(h - l, 1, np.nan)
+    last3_bull = bull_c & _shift(bull_c, 1, True) & _shift(bull_c, 2, True)
+    last3_bear = bear_c & _shift(bear_c, 1, True) & _shift(bear_c, 2, True)
+
+    # --- 최근 20봉 고점/저점 갱신 (recent_high_break / recent_low_break, last_n=2) ---
+    idx = np.arange(n)
+    prev_high = _shift(_rolling(h, 18, np.max, -np.inf), 2, np.nan)
+    prev_low = _shift(_rolling(l, 18, np.min, np.inf), 2, np.nan)
+    high_break = (idx >= 2) & (np.maximum(h, _shift(h, 1, -np.inf)) > prev_high)
+    low_break = (idx >= 2) & (np.minimum(l, _shift(l, 1, np.inf)) < prev_low)
+    # 🟥 [FIX-K1] 마지막 봉 앞 19봉과 비교 (analyze_highs_lows). 첫 봉은 비교할 봉이 없어 NaN → False
+    new_high = h > _shift(_rolling(h, 19, np.max, -np.inf), 1, np.nan)
+    new_low = l < _shift(_rolling(l, 19, np.min, np.inf), 1, np.nan)
+
+    # --- dynamic_thresholds ---
+    # max(상수, x)는 x가 NaN이면 상수 → fmax, max(x, 상수)는 NaN 그대로 → maximum (파이썬 max와 같게)
+    ap = atr / pv
+    if is_stock:
+        near_pips = np.fmax(8.0, 0.35 * ap)
+        box_thr_pips = np.fmax(12.0, 0.80 * ap)
+        buf_pips = np.fmax(1.0, 0.10 * ap)
+    else:
+        ap = np.fmax(6.0, ap)
+        min_near = 6 if pair in ("EUR_USD", "GBP_USD") else 8
+        near_pips = np.floor(np.fmax(min_near, np.fmin(14, 0.35 * ap)))
+        box_thr_pips = np.floor(np.fmax(12, np.fmin(30, 0.80 * ap)))
+        buf_pips = np.floor(np.fmax(1, np.fmin(3, 0.10 * ap)))
+
+    # --- 박스권 (detect_box_breakout, 10봉) ---
+    box_high = _rolling(h, 10, np.max, -np.inf)
+    box_low = _rolling(l, 10, np.min, np.inf)
+    if is_stock:
+        in_box = (box_high - box_low) <= np.maximum(atr * 0.8, 0.12)
+    else:
+        in_box = no(((box_high - box_low) / pv) > box_thr_pips)
+    # 🟥 [FIX-K2] 돌파는 종가 vs 마지막 봉 앞 9봉의 고/저 (박스 폭 판정은 마지막 봉 포함 10봉 그대로)
+    box_up = in_box & (c > _shift(_rolling(h, 9, np.max, -np.inf), 1, np.nan))
+    box_down = in_box & no(box_up) & (c < _shift(_rolling(l, 9, np.min, np.inf), 1, np.nan))
+    box_none = in_box & no(box_up) & no(box_down)
+    near_top_pips = np.abs(box_high - price) / pv
+    near_low_pips = np.abs(price - box_low) / pv
+    buf_price = buf_pips * pv
+    top_ok = (c > box_high + buf_price) | ((l > box_high - buf_price) & (near_top_pips <= near_pips))
+    bottom_ok = (c < box_low - buf_price) | ((h < box_low + buf_price) & (near_low_pips <= near_pips))
+
+    # --- 구조 손익비 (calculate_structured_sl_tp) ---
+    # 🟥 [FIX-B8] 예전 TP는 항상 `SL거리 × 1.8`이라 r_ratio가 언제나 정확히 1.8이었고,
+    #    `r_ratio < 1.4` 감점은 절대 발동할 수 없는 죽은 감점이었다.
+    #    → TP를 저항(BUY)/지지(SELL)라는 실제 구조 목표에 두고, 그 거리와 SL 거리의 비율을 r_ratio로 본다.
+    #      구조 목표가 없으면 기존 1.8 폴백을 쓴다.
+    if is_stock:
+        sl_buf = np.where(atr > 0, atr * sl_buffer_atr_mult, 10 * pv)
+    else:
+        sl_buf = np.full(n, 10 * pv)
+    sl = np.where(buy, support - sl_buf, resistance + sl_buf)
+    target = np.where(buy, resistance, support)
+    risk = np.abs(price - sl)
+    # 🟥 [FIX-B8b] "반대편에 있으면 폴백"이라고 써놓고 실제 방향 체크가 없었다.
+    #    BUY인데 저항이 이미 진입가 아래(=돌파 후 낡은 값)면 tp가 진입가보다 낮아지고,
+    #    abs() 때문에 r_ratio는 오히려 커져서 감점을 우회했다.
+    wrong_side = np.where(buy, target <= price, target >= price)
+    fallback_tp = np.where(buy, price + risk * 1.8, price - risk * 1.8)
+    tp = np.where(wrong_side | (np.abs(target - price) < risk * 0.1), fallback_tp, target)
+    with np.errstate(divide="ignore"):
+        r_ratio = np.where(np.abs(sl - price) < 1e-12, 1.8, np.abs(tp - price) / risk)
+
+    # --- 지지/저항 근접, 돌파 확정 ---
+    dist_to_res_pips = np.abs(price - resistance) / pv
+    dist_to_sup_pips = np.abs(price - support) / pv
+    if is_stock:
+        near_res_block = np.abs(resistance - price) < atr * 0.15
+        near_sup_block = np.abs(price - support) < atr * 0.15
+    else:
+        near_res_block = dist_to_res_pips < 3
+        near_sup_block = dist_to_sup_pips < 3
+    # 🟥 [FIX-B2] 방향 조건(resistance > price)이 빠져 있었다.
+    #    가격이 저항을 뚫고 올라가면 (저항 - 가격)이 음수라 "근접"이 항상 True가 됐고,
+    #    "돌파확정 + 저항 안 가까움"(STOCH_MAX_CONFIRMED / STOCH_HOT_BREAKOUT*)이 성립 불가였다.
+    #    → 모멘텀 가점(+2/+1.5)은 한 번도 안 나가고 항상 -2 감점만 적용됐다. 저항이 "위에 있을 때"만 근접으로 본다.
+    near_resistance = (resistance > price) & ((resistance - price) <= np.fmax(10 * pv, atr * 0.6))
+    breakout_confirmed = c >= resistance + np.fmax(2 * pv, atr * 0.10)
+
+    # --- MACD ---
+    macd_diff = macd - macd_signal
+    if is_stock:
+        macd_strong = np.maximum(atr * 0.20, pv * 1.5)
+        macd_weak = np.maximum(atr * 0.07, pv * 0.5)
+        macd_weak_thresh = np.where(atr != 0, -(atr * 0.02), -0.02)
+    else:
+        macd_strong, macd_weak, macd_weak_thresh = 1.5 * pv, 0.5 * pv, -0.02
+    macd_rising3 = has3 & (t1 > t2) & (t2 > t3)
+    gap_now, gap_prev = np.abs(t1 - macd_signal), np.abs(t2 - macd_signal)
+    recovery_speed = (gap_prev - gap_now) / np.maximum(gap_prev, 1e-9)
+
+    # --- conflict_check ---
+    # 🟥 [FIX-B7] 주석과 코드가 정반대였다. 주석은 "역방향이면 관망"인데 코드는 '같은 방향'일 때 충돌 없음이었다.
+    #    코드 쪽이 의도상 맞다: 패턴이 없어도(NEUTRAL) 신호와 추세가 같으면 충돌 아님.
+    #    예전 조기 return이 아래 추세 역행 규칙을 건너뛰지 않도록 no(...) & (...)로 묶어 둔다.
+    conflict = (
+        ((rsi > 85) & one_of(pattern, ("SHOOTING_STAR", "BEARISH_ENGULFING")) & up)
+        | ((rsi < 15) & one_of(pattern, ("HAMMER", "BULLISH_ENGULFING")) & down)
+        | (no((pattern == "NEUTRAL") & ((buy & up) | (sell & down)))
+           & ((up & sell & (rsi > 80)) | (down & buy & (rsi < 20))))
+    )
+
+    return Features({
+        "pair": pair, "is_stock": bool(is_stock), "hour": _col(hour, n),
+        "boost_pair": pair in BOOST_BUY_PAIRS, "usdjpy": pair == "USD_JPY",
+        "balance": _is_balance(strategy_name),
+        "rsi": rsi, "macd": macd, "macd_signal": macd_signal, "stoch": stoch, "prev_stoch": prev_stoch,
+        "atr": atr, "price": price, "close": c, "boll_up": _col(boll_up, n), "boll_low": _col(boll_low, n),
+        "support": support, "resistance": resistance, "resistance_distance": resistance_distance,
+        "trend": trend, "prev_trend": prev_trend, "up": up, "down": down, "neutral": neutral,
+        "pattern": pattern, "no_pattern": one_of(pattern, (None, "NEUTRAL")),
+        "pattern_none": one_of(pattern, (None,)), "liquidity": liquidity,
+        "signal": signal, "buy": buy, "sell": sell, "exp_buy": direction == "BUY", "exp_sell": direction == "SELL",
+        "bull_c": bull_c, "bear_c": bear_c, "last3_bull": last3_bull, "last3_bear": last3_bear,
+        "long_bear_c": bear_c & ((o - c) > rng_prev * 0.9), "long_bull_c": bull_c & ((c - o) > rng_prev * 0.9),
+        "weak_flow": bear_c & _shift(bear_c, 1, False), "strong_flow": bull_c & _shift(bull_c, 1, False),
+        "high_break": high_break, "low_break": low_break, "new_high": new_high, "new_low": new_low,
+        "in_box": in_box, "box_up": box_up, "box_down": box_down, "box_none": box_none,
+        "box_top_risk": (near_top_pips <= near_pips) & no(top_ok),
+        "box_bottom_risk": (near_low_pips <= near_pips) & no(bottom_ok),
+        "sl_buffer": sl_buf, "sl": sl, "tp": tp, "r_ratio": r_ratio,
+        "dist_to_res_pips": dist_to_res_pips, "dist_to_sup_pips": dist_to_sup_pips,
+        "near_res_block": near_res_block, "near_sup_block": near_sup_block,
+        "near_resistance": near_resistance, "breakout_confirmed": breakout_confirmed,
+        "breakout_above": price > resistance,
+        "near_support_atr": np.abs(price - support) <= atr * 0.25,
+        # 🟥 [FIX-B2] 늦은 BUY 저항 근접도 방향 조건 추가. 이미 저항 위로 뚫고 올라간 상태는
+        #    "저항 근접(돌파 실패 위험)"이 아니라 "돌파 성공"이다.
+        "near_resistance_atr": (resistance > price) & ((resistance - price) <= atr * 0.25),
+        "macd_diff": macd_diff, "macd_strong": macd_strong, "macd_weak": macd_weak,
+        "macd_weak_thresh": macd_weak_thresh, "has3": has3, "macd_t1": t1, "macd_t2": t2, "macd_t3": t3,
+        "macd_rising3": macd_rising3, "recovery_speed": recovery_speed, "recovery_pct": recovery_speed * 100,
+        "conflict": conflict,
+    }, n)
+
+
+# ====== 규칙 테이블 (예전 score_signal_with_filters 순서 그대로) ======
+def _opportunity_rules():
+    """must_capture_opportunity — 부분 점수 score에 더한다."""
+    R = lambda code, when, w, text: Rule(code, when, w, text, "score", "opportunity")
+    return [
+        R("OPP_STRONG_BUY", lambda f, a: (f.stoch < 0.05) & (f.rsi > 50) & (f.macd > f.macd_signal) & f.buy, 2,
+          "💡 Stoch RSI 극단 과매도 + RSI 상단 + MACD 상승 → 강한 BUY (+2)"),
+        R("OPP_WEAK_SELL", lambda f, a: (f.stoch < 0.1) & (f.rsi < 40) & (f.macd < 0) & f.sell, 0.5,
+          "⚠️ 약한 SELL 조건 충족 (+0.5)"),
+        First((
+            R("OPP_HOT_NEAR_RES", lambda f, a: (f.resistance_distance < f.atr * 0.3) & no(f.breakout_above), -2,
+              "🔴 과열 + 저항 근접 + breakout 실패 위험"),
+            R("OPP_HOT_CONTINUATION", lambda f, a: f.up & (f.macd > f.macd_signal), -0.3,
+              "⚠️ 과열이지만 continuation 유지"),
+        ), lambda f, a: f.stoch > 0.9),
+        First((
+            R("OPP_BUY_KNIFE", lambda f, a: f.no_pattern & (f.macd < f.macd_signal), -2.0,
+              "🔴 (방어) Stoch RSI 극단 과매도(<0.1) + 반등 패턴 없음 + MACD 약화 → 하락 가속 위험 (opportunity -2)"),
+            R("OPP_BUY_NO_PATTERN", lambda f, a: f.no_pattern, -1.0,
+              "⚠️ (방어) Stoch RSI 극단 과매도(<0.1) + 반등 패턴 없음 → 반등 신뢰도 낮음 (opportunity -1)"),
+        ), lambda f, a: f.buy & (f.stoch < 0.1)),
+        First((
+            R("OPP_SELL_SQUEEZE", lambda f, a: f.no_pattern & (f.macd > f.macd_signal), -2.0,
+              "🔴 (방어) Stoch RSI 극단 과매수(>0.9) + 반전 패턴 없음 + MACD 강세 → 상승 지속 위험(SELL 말림) (opportunity -2)"),
+            R("OPP_SELL_NO_PATTERN", lambda f, a: f.no_pattern, -1.0,
+              "⚠️ (방어) Stoch RSI 극단 과매수(>0.9) + 반전 패턴 없음 → 반전 신뢰도 낮음 (opportunity -1)"),
+        ), lambda f, a: f.sell & (f.stoch > 0.9)),
+        R("OPP_BUY_DOWNTREND", lambda f, a: f.buy & f.down, -1.5,
+          "🟠 하락 추세 + BUY 역방향 → continuation 신뢰도 낮음 (-1.5)"),
+        R("OPP_SELL_UPTREND", lambda f, a: f.sell & f.up, -1.5,
+          "🟠 상승 추세 + SELL 역방향 → continuation 신뢰도 낮음 (-1.5)"),
+        R("OPP_BUY_NO_HIGHER_HIGH", lambda f, a: f.buy & f.up & (f.rsi > 65) & no(f.high_break), -0.5,
+          "⚠️ 과매수 이후 고점 갱신 실패 → 되밀림 위험 BUY 감점 (-0.5)"),
+        R("OPP_SELL_NO_LOWER_LOW", lambda f, a: f.sell & f.down & (f.rsi < 35) & no(f.low_break), -0.5,
+          "⚠️ 과매도 이후 저점 갱신 실패 → 반등 위험 SELL 감점 (-0.5)"),
+        R("OPP_BUY_PATTERN", lambda f, a: f.buy & one_of(f.pattern, BULLISH_PATTERNS), 0.5,
+          "🕯 BUY 패턴 {pattern} (0.5)"),
+        R("OPP_SELL_PATTERN", lambda f, a: f.sell & one_of(f.pattern, BEARISH_PATTERNS), 0.5,
+          "🕯 SELL 패턴 {pattern} (0.5)"),
+        R("OPP_LOW_ATR", lambda f, a: f.atr < 0.001, -0.5, "⚠️ ATR 매우 낮음 → 변동성 부족 (-0.5)"),
+        # 여기까지의 opportunity 합이 음수면 (예전엔 이 문장을 process_webhook이 문자열로 찾았다)
+        R("OPP_AGAINST_BUY", lambda f, a: f.buy & (a["score"] < 0), -1.5,
+          "⚠️ BUY 기대 방향 대비 opportunity_score 역행 → 신호 약화 (-1.5)"),
+        R("OPP_AGAINST_SELL", lambda f, a: f.sell & (a["score"] < 0), -1.5,
+          "⚠️ SELL 기대 방향 대비 opportunity_score 역행 → 신호 약화 (-1.5)"),
+    ]
+
+
+def _extra_rules():
+    """additional_opportunity_score — 부분 점수 extra."""
+    R = lambda code, when, w, text: Rule(code, when, w, text, "extra", "extra")
+    return [
+        R("EXTRA_BUY_MACD_FADE",
+          lambda f, a: f.buy & (f.macd > 0) & (f.macd < f.macd_signal) & ((f.stoch >= 0.80) | (f.rsi >= 65)), -0.5,
+          "⚠️ BUY 중 MACD 약화 + 과열 구간 → 되돌림 위험 (감점 -0.5)"),
+        R("EXTRA_SELL_MACD_BOUNCE",
+          lambda f, a: f.sell & (f.macd < 0) & (f.macd > f.macd_signal) & ((f.stoch <= 0.25) | (f.rsi <= 45)), -0.5,
+          "⚠️ SELL 중 MACD 반등 + 과매도 구간 → 되돌림 위험 (감점 -0.5)"),
+        R("EXTRA_SELL_NEUTRAL_RESUME",
+          lambda f, a: f.sell & f.neutral & (f.macd < 0) & (f.macd < f.macd_signal) & (f.rsi >= 50) & (f.stoch >= 0.55),
+          1.0, "✅ NEUTRAL이지만 되돌림 후 하락 재개(continuation) → SELL 가점 +1.0"),
+        R("EXTRA_BUY_NEUTRAL_RESUME",
+          lambda f, a: f.buy & f.neutral & (f.macd > 0) & (f.macd > f.macd_signal) & (f.rsi <= 50) & (f.stoch <= 0.45),
+          1.0, "✅ NEUTRAL이지만 되돌림 후 상승 재개(continuation) → BUY 가점 +1.0"),
+    ]
+
+
+def _entry_rules():
+    """score_signal_with_filters 앞부분 — 부분 점수 score와 signal_score에 직접 더하는 것이 섞여 있다."""
+    S = lambda code, when, w, text: Rule(code, when, w, text, "score", "entry")
+    G = lambda code, when, w, text: Rule(code, when, w, text, "signal", "entry")
+    return [
+        S("RSI_NEUTRAL_FLAT_TREND", lambda f, a: (45 <= f.rsi) & (f.rsi <= 55) & f.neutral, -0.3,
+          "⚠️ RSI 중립(45~55) + 트렌드 NEUTRAL → 진입 신호 약화 (-0.3)"),
+        S("BUY_MACD_WEAK_TREND_UNCLEAR",
+          lambda f, a: f.exp_buy & (f.rsi > 40) & (f.stoch > 0.4) & (f.macd < f.macd_signal) & no(f.up), -1.0,
+          "📉 RSI & Stoch RSI 반등 중이나 MACD 약세 + 추세 불확실 → BUY 감점 (-1.0)"),
+        S("SELL_MACD_STRONG_TREND_UNCLEAR",
+          lambda f, a: f.exp_sell & (f.rsi < 60) & (f.stoch < 0.6) & (f.macd > f.macd_signal) & no(f.down), -1.0,
+          "📈 RSI & Stoch RSI 하락 중이나 MACD 강세 + 추세 불확실 → SELL 감점 (-1.0)"),
+        # 🟥 [FIX-B8] 이제 r_ratio가 실제 구조 손익비를 반영하므로 이 감점이 살아난다.
+        #    다만 -4.0은 다른 항목(대부분 ±1~2)에 비해 과도해서 단독으로 점수를 지배한다 → -2.0/-1.0 두 구간으로 완만하게.
+        First((
+            G("RR_VERY_LOW", lambda f, a: f.r_ratio < 1.0, -2.0, "📉 구조 손익비 매우 낮음 ({r_ratio:.2f} < 1.0) → 감점 -2.0"),
+            G("RR_LOW", lambda f, a: f.r_ratio < 1.4, -1.0, "📉 구조 손익비 낮음 ({r_ratio:.2f} < 1.4) → 감점 -1.0"),
+        )),
+        # 🟥 [FIX-B9] 19~23시(ET) 감점은 FX 전용이다. 미국 주식 정규장은 09:30~16:00 ET라 이 시간대에 주식 알림이
+        #    올 수 없고, 프리/애프터 알림이면 -3점이 통째로 붙었다. 주식엔 별도 시간대 게이트(점심/15:30/금요일)가 있다.
+        G("FX_LATE_SESSION", lambda f, a: no(f.is_stock) & (19 <= f.hour) & (f.hour < 23), -3,
+          "🌙 FX 19~23시(ET) 유동성 저하 구간 감점 (-3)"),
+        First((
+            S("MACD_NEGATIVE_RECOVERING", lambda f, a: f.macd_rising3, -0.75,
+              "🔻 MACD 음수지만 회복 중 → 약세 판정 완화 (감점 -0.75, 기존 -1.5)"),
+            S("MACD_NEGATIVE_WEAK", _always, -1.5, "🔻 MACD 약세 + 추세 모호 → 신호 신뢰도 낮음 (감점 -1.5)"),
+        ), lambda f, a: (f.macd < f.macd_weak_thresh) & no(f.down)),
+        S("SELL_OVERBOUGHT", lambda f, a: f.sell & (f.rsi > 70) & (f.stoch > 0.85), -1.5,
+          "🔻 RSI + Stoch RSI 과매수 → SELL 진입 위험 (감점 -1.5)"),
+        G("SELL_NEUTRAL_RESUME",
+          lambda f, a: f.sell & f.neutral & (f.macd < 0) & (f.macd < f.macd_signal) & (f.stoch >= 0.6) & (f.rsi >= 50),
+          1.5, "✅ NEUTRAL 구간이지만 MACD 약세 + 되돌림(고Stoch) → 하락 재개 SELL 가점 +1.5"),
+        S("OVERSOLD_NO_BASIS", lambda f, a: (f.rsi < 30) & (f.stoch < 0.15) & (f.pattern_none | f.neutral), -1.5,
+          "⚠️ RSI + Stoch RSI 과매도 + 반등 근거 부족 → 진입 위험 (감점 -1.5)"),
+        S("STOCH_PLUNGE",
+          lambda f, a: f.buy & (f.stoch < 0.15) & (f.prev_stoch > 0.3) & ((f.macd < 0) | no(f.up)), -1.5,
+          "⚠️ Stoch RSI 급락 + MACD/추세 불확실 → 하락 지속 우려 (감점 -1.5)"),
+        S("AFTER_LONG_BEAR_BUY", lambda f, a: f.buy & f.long_bear_c & f.pattern_none & no(f.up), -1.5,
+          "📉 장대 음봉 직후 + 반등 패턴 없음 + 추세 불확실 ➝ BUY 진입 위험 (감점 -1.5)"),
+        S("AFTER_LONG_BULL_SELL", lambda f, a: f.sell & f.long_bull_c & f.pattern_none & no(f.down), -1.5,
+          "📈 장대 양봉 직후 + 반전 패턴 없음 + 추세 불확실 ➝ SELL 진입 위험 (감점 -1.5)"),
+        S("BUY_WEAK_FLOW", lambda f, a: f.buy & no(f.up) & f.weak_flow & (f.rsi < 40), -0.5,
+          "⚠ 최근 약세 흐름 지속 → BUY continuation 약화 (-0.5)"),
+        S("SELL_STRONG_FLOW", lambda f, a: f.sell & no(f.down) & f.strong_flow & (f.rsi > 60), -0.5,
+          "⚠ 최근 강세 흐름 지속 → SELL continuation 약화 (-0.5)"),
+        # 🟥 [FIX-B4] 추세 전환 직후 감점 — 중복 제거. 완전히 동일한 조건(UPTREND & prev DOWNTREND & BUY)에
+        #    -0.5와 -1.0이 연달아 걸려 합계 -1.5였다(SELL 미러도 마찬가지) → 하나로 합친다.
+        S("EARLY_UPTREND_BUY", lambda f, a: f.up & (f.prev_trend == "DOWNTREND") & f.buy, -1.0,
+          "🔄 하락→상승 추세 전환 직후 BUY → 조기 진입 경고 (감점 -1.0)"),
+        S("EARLY_DOWNTREND_SELL", lambda f, a: f.down & (f.prev_trend == "UPTREND") & f.sell, -1.0,
+          "🔄 상승→하락 추세 전환 직후 SELL → 조기 진입 경고 (감점 -1.0)"),
+    ]
+
+
+def _filter_rules():
+    """signal_score += score + extra_score 이후 — 전부 signal_score."""
+    R = Rule
+    return [
+        First((
+            R("PATTERN_TREND_BUY", lambda f, a: f.buy & f.up & one_of(f.pattern, BULLISH_PATTERNS), 1,
+              "✅ 강한 상승추세 + 매수 캔들 패턴 일치 → 보너스 + 기회 점수 강화 가점 +1.5"),
+            R("PATTERN_TREND_SELL", lambda f, a: f.sell & f.down & one_of(f.pattern, BEARISH_PATTERNS), 1,
+              "✅ 강한 하락추세 + 매도 캔들 패턴 일치 → 보너스 + 기회 점수 강화 가점 +1.5"),
+        )),
+        First((
+            R("CONFLICT_COUNTER_TREND_OK",
+              lambda f, a: ((f.buy & (f.rsi < 25) & (f.stoch < 0.2)) | (f.sell & (f.rsi > 75) & (f.stoch > 0.8))
+                            | (f.buy & (f.macd > f.macd_signal) & f.down) | (f.sell & (f.macd < f.macd_signal) & f.up)),
+              0, "🔄 추세-패턴 충돌 BUT 강한 역추세 조건 충족 → 진입 허용"),
+            R("CONFLICT", _always, -1, "⚠️ 추세+패턴 충돌 + 보완 조건 미충족 → 감점-1"),
+        ), lambda f, a: f.conflict),
+        R("NEAR_RESISTANCE_BUY", lambda f, a: f.buy & f.near_res_block, -2,
+          "📉 저항선 근접 → 신중 진입 필요 (감점-2) [dist={dist_to_res_pips:.1f}pip]"),
+        R("NEAR_SUPPORT_SELL", lambda f, a: f.sell & f.near_sup_block, -1.5,
+          "📉 지지선 근접 → 신중 진입 필요 (감점-1.5) [dist={dist_to_sup_pips:.1f}pip]"),
+        First((
+            R("CHOP", lambda f, a: (47 <= f.rsi) & (f.rsi <= 53) & (np.abs(f.macd) < 0.015)
+              & (0.4 <= f.stoch) & (f.stoch <= 0.6), -0.5, "⚠️ 완전 횡보(chop) 상태 → 약한 감점 (-0.5)"),
+            R("NEUTRAL_TREND_STOCK", lambda f, a: f.is_stock, -0.15,
+              "🟡 NEUTRAL 추세(돌파 초기 지표 지연 가능성) → 약한 감점 (-0.15)"),
+            R("NEUTRAL_TREND", _always, -0.3, "🟡 NEUTRAL 추세 → continuation 신뢰도 낮음 (-0.3)"),
+        ), lambda f, a: f.neutral),
+        First((
+            R("BUY_EXTREME_HEAT_MACD_WEAK", lambda f, a: f.macd < f.macd_signal, -1.0,
+              "⛔ RSI/Stoch RSI 극단 과열 + MACD 약세 → BUY (감점 -1.0)"),
+            R("BUY_EXTREME_HEAT", _always, -0.5, "⚠️ RSI/Stoch 과열 → BUY 피로 구간 (감점 -0.5)"),
+        ), lambda f, a: f.buy & (f.rsi > 85) & (f.stoch > 0.9)),
+        First((
+            R("SELL_OVERSOLD_DOWNTREND_EXTREME", lambda f, a: f.down & (f.rsi < 30), -0.5,
+              "⚠️ DOWNTREND지만 RSI<30 극단 과매도 → 반등 리스크 경고 (감점 -0.5)"),
+            R("SELL_OVERSOLD_DOWNTREND", lambda f, a: f.down, 0.5, "📉 하락 추세 지속 + 과매도 → 추세 SELL 허용 (+0.5)"),
+            R("SELL_OVERSOLD_EXCEPTION",
+              lambda f, a: (f.macd > f.macd_signal) & (0.3 < f.stoch) & (f.stoch < 0.7), 1,
+              "✅ 과매도 SELL이나 MACD/Stoch 반등 → 예외적 진입 허용 (+1)"),
+            R("SELL_OVERSOLD_BOUNCE_RISK", lambda f, a: f.stoch > 0.3, -2, "⚠️ 과매도 SELL + 반등 가능성 → 신중 (감점 -2)"),
+            R("SELL_OVERSOLD", _always, -1.5, "❌ 과매도 SELL + 반등 신호 부족 → 진입 위험 (감점 -1.5)"),
+        ), lambda f, a: f.sell & (f.rsi < 40)),
+        R("STOCH_FLOOR_NO_PATTERN", lambda f, a: (f.stoch < 0.1) & f.pattern_none, -1,
+          "🔴 Stoch RSI 극단 과매도 + 반등 패턴 없음 → 반등 신뢰도 낮음 (감점 -1)"),
+        First((
+            R("RSI30_REVERSAL_PATTERN", lambda f, a: one_of(f.pattern, ("HAMMER", "BULLISH_ENGULFING")), 2,
+              "🟢 RSI < 30 + 반등 캔들 패턴 → 진입 강화 (+2)"),
+            R("RSI30_WEAKNESS", lambda f, a: (f.macd < f.macd_signal) & f.down & f.has3 & (f.macd_t1 <= f.macd_t2),
+              -1.5, "🔴 RSI < 30 + MACD/추세 약세 지속 → 반등 기대 낮음 (감점 -1.5)"),
+            R("RSI30_MACD_RECOVERY", lambda f, a: f.macd_rising3, 1.0, "🟢 RSI 과매도 + MACD 회복 → 반등 기대 (+1.0)"),
+            R("RSI30_NO_BASIS", _always, -0.5, "⚠️ RSI < 30 but 반등 근거 부족 → 주의 (-0.5)"),
+        ), lambda f, a: f.rsi < 30),
+        First((
+            R("RSI70_MOMENTUM", lambda f, a: (f.macd > f.macd_signal) & (f.macd > 0) & f.up, 0.5,
+              "📈 RSI > 70이나 MACD/UPTREND 유지 → 조건부 BUY 허용 (+0.5)"),
+            R("RSI70_RISK", _always, -1, "⚠️ RSI > 70 + 반전 패턴 없음 → 진입 위험 (감점 -2)"),
+        ), lambda f, a: (f.rsi > 70) & no(one_of(f.pattern, ("SHOOTING_STAR", "BEARISH_ENGULFING")))),
+        First((
+            R("BOOST_SKIP_TREND", lambda f, a: no(f.up), 0, "{pair}: 하락/중립 추세 → 눌림목 BUY 보너스 제외"),
+            R("BOOST_SKIP_HEAT", lambda f, a: (f.rsi > 75) & (f.stoch > 0.9), 0,
+              "{pair}: RSI/Stoch 과열 → late BUY 위험, 눌림목 BUY 보너스 제한"),
+            All((
+                R("BOOST_RSI_PULLBACK", lambda f, a: (40 <= f.rsi) & (f.rsi <= 50), 0.7, "{pair}: RSI 40~50 눌림목 영역 (+0.7)"),
+                R("BOOST_STOCH_BOUNCE", lambda f, a: (0.1 <= f.stoch) & (f.stoch <= 0.3), 0.5,
+                  "{pair}: Stoch RSI 바닥 반등 초기 (+0.5)"),
+                R("BOOST_PATTERN", lambda f, a: one_of(f.pattern, ("HAMMER", "LONG_BODY_BULL")), 0.5,
+                  "{pair}: 매수 캔들 패턴 확인 (+0.5)"),
+                R("BOOST_MACD_POSITIVE", lambda f, a: f.macd > 0, 0.3, "{pair}: MACD 양수 유지 (+0.3)"),
+            )),
+        ), lambda f, a: f.boost_pair & f.buy),
+        First((
+            R("DOWNTREND_BOUNCE_BUY", lambda f, a: (f.rsi < 30) & (f.stoch < 0.15) & (f.macd > f.macd_signal), 1.5,
+              "🟢 하락추세 과매도 + MACD 반등 → 제한적 반등 BUY (+1.5)"),
+            R("DOWNTREND_BUY", _always, -1, "❌ 하락추세 BUY → 반등 조건 미흡 (감점 -1)"),
+        ), lambda f, a: f.buy & f.down),
+        R("PULLBACK_BUY", lambda f, a: f.buy & f.up & (45 <= f.rsi) & (f.rsi <= 55) & (0.0 <= f.stoch)
+          & (f.stoch <= 0.3) & (f.macd > 0), 1.5, "📈 눌림목 BUY 조건 충족 → 반등 기대 (+1.5)"),
+        R("PULLBACK_SELL", lambda f, a: f.sell & f.down & (45 <= f.rsi) & (f.rsi <= 55) & (0.7 <= f.stoch)
+          & (f.stoch <= 1.0) & (f.macd < 0), 1.5, "📉 눌림목 SELL 조건 충족 → 반락 기대 (+1.5)"),
+        R("RSI_MID_UPTREND_BUY", lambda f, a: f.buy & f.up & (50 <= f.rsi) & (f.rsi <= 60), 0.5,
+          "RSI 중립(50~60) + 상승추세 → 눌림목 반등 기대 (+0.5)"),
+        First((
+            R("BOLL_UPPER", lambda f, a: f.price >= f.boll_up, 0, "🔴 볼린저 상단 → 과매수 경계 (참고)"),
+            R("BOLL_LOWER", lambda f, a: f.price <= f.boll_low, 0, "🟢 볼린저 하단 → 반등 관찰 구간 (가점 없음)"),
+        )),
+        # 🟥 [FIX-B6b] 예전엔 방향을 안 봤다. FIX-B6로 LONG_BODY_* 라벨이 생성되기 시작하면 큰 "음봉"이
+        #    BUY 신호에 +1.5를 주는 정반대 동작이 생긴다 → 캔들 방향과 신호가 일치할 때만 +1.5, 역방향이면 -1.0.
+        First((
+            R("LONG_BULL_BUY", lambda f, a: f.buy, 1.5, "📊 장대 양봉 + BUY → 추세 지속 가능성 (+1.5)"),
+            R("LONG_BULL_SELL", lambda f, a: f.sell, -1.0, "⚠️ 장대 양봉인데 SELL → 역방향 진입 위험 (-1.0)"),
+        ), lambda f, a: f.pattern == "LONG_BODY_BULL"),
+        First((
+            R("LONG_BEAR_SELL", lambda f, a: f.sell, 1.5, "📊 장대 음봉 + SELL → 추세 지속 가능성 (+1.5)"),
+            R("LONG_BEAR_BUY", lambda f, a: f.buy, -1.0, "⚠️ 장대 음봉인데 BUY → 역방향 진입 위험 (-1.0)"),
+        ), lambda f, a: f.pattern == "LONG_BODY_BEAR"),
+        R("NEW_HIGH", lambda f, a: f.new_high, 0, "📈 최근 고점 갱신 → 상승세 유지 가능성↑"),
+        R("NEW_LOW", lambda f, a: f.new_low, 0, "📉 최근 저점 갱신 → 하락세 지속 가능성↑"),
+        R("BOX_NEUTRAL_EXCEPTION",
+          lambda f, a: f.neutral & (f.box_up | f.box_down) & (f.new_high | f.new_low)
+          & no((f.box_up & f.buy) | (f.box_down & f.sell)), 1.5,
+          "🟡 NEUTRAL 예외: 박스 이탈 + 고/저 갱신 → 기본 가점(+1.5)"),
+        First((
+            R("BOX_BREAKOUT_BUY", lambda f, a: f.box_up & f.buy, 3, "📦 박스권 상단 돌파 + 매수 신호 일치 (breakout 가점 강화 +3)"),
+            R("BOX_BREAKDOWN_SELL", lambda f, a: f.box_down & f.sell, 3, "📦 박스권 하단 돌파 + 매도 신호 일치 가점+3"),
+            R("BOX_HOLD", lambda f, a: f.box_none, 0, "📦 박스권 유지 중 → 관망 경계"),
+        )),
+        Cap("SELL_SCORE_CAP", lambda f, a: f.sell, 5, "⚠️ SELL 점수 상한 적용 (최대 5점)"),
+        First((
+            R("MACD_GOLDEN_STRONG", lambda f, a: (f.macd_diff > f.macd_strong) & f.up, 3,
+              "MACD 골든크로스(강) + 상승추세 일치 가점+3"),
+            R("MACD_DEAD_STRONG", lambda f, a: (f.macd_diff < -f.macd_strong) & f.down, 3,
+              "MACD 데드크로스(강) + 하락추세 일치 가점+3"),
+            R("MACD_CROSS_WEAK", lambda f, a: np.abs(f.macd_diff) >= f.macd_weak, 1, "MACD 교차(약) → 초입 가점 +1"),
+            R("MACD_FLAT", _always, 0, "MACD 미세변동 → 가점 보류"),
+        )),
+        First((
+            R("MACD_NEG_FAST_RECOVERY", lambda f, a: (f.macd_t1 < 0) & (f.recovery_speed >= 0.15), 0.7,
+              "🟢 MACD 음수권 빠른 회복(수렴속도 {recovery_pct:.0f}%) → 반등 가점 (+0.7)"),
+            R("MACD_NEG_SLOW_RECOVERY", lambda f, a: f.macd_t1 < 0, -1.5,
+              "🔴 MACD 음수권 느린 회복(수렴속도 {recovery_pct:.0f}%) → 노이즈 의심 강감점 (-1.5)"),
+            R("MACD_MOMENTUM", _always, 0.3, "🟢 MACD 상승 모멘텀 유지 (+0.3)"),
+        ), lambda f, a: f.buy & f.macd_rising3),
+        R("BUY_CHASE_BLOCK", lambda f, a: f.buy & (f.stoch > 0.8) & (f.macd < f.macd_signal), -3.0,
+          "⛔ BUY 차단: Stoch RSI 과열 + MACD 약화(macd<signal) → 추격 매수 위험 강감점 -3"),
+        First((
+            R("SELL_OVERSOLD_DOWNTREND_WARN", lambda f, a: f.down, -0.5,
+              "🟡 DOWNTREND + 과매도(Stoch<0.2) + MACD 약화 → 추세형 하락 지속 가능(경고 -0.5)"),
+            R("SELL_OVERSOLD_NEUTRAL", lambda f, a: f.neutral & (f.rsi < 50), 0,
+              "🟡 NEUTRAL 전환 구간 + RSI<50 + 과매도(Stoch<0.2) → 추격 숏 단정 금지(중립)"),
+            R("SELL_CHASE_BLOCK", _always, -2.0, "⛔ SELL 차단: 과매도(Stoch<0.2) + MACD 약화 + 추세 불리 → 추격 매도 위험 감점 -2"),
+        ), lambda f, a: f.sell & (f.stoch < 0.2) & (f.macd < f.macd_signal)),
+        First((
+            R("STOCH_MAX_CONFIRMED",
+              lambda f, a: (f.up & (f.macd > 0))
+              | (f.is_stock & f.breakout_confirmed & no(f.near_resistance) & (f.macd > 0)), -0.5,
+              "🟡 Stoch RSI 과열이지만 돌파확정/상승추세 + MACD 양수 → 조건부 감점 -0.5"),
+            R("STOCH_MAX", _always, -1, "🔴 Stoch RSI 1.0 → 극단적 과매수 → 피로감 주의 감점 -1"),
+        ), lambda f, a: f.stoch >= 0.95),
+        First((
+            First((
+                First((
+                    First((
+                        R("STOCH_HOT_BREAKOUT_USDJPY", lambda f, a: f.usdjpy, 2, "USDJPY: Stoch RSI 과열 + 돌파확정 → 모멘텀 가점 +2"),
+                        R("STOCH_HOT_BREAKOUT", _always, 1.5, "Stoch RSI 과열 + 돌파확정 → 모멘텀 가점 +1.5"),
+                    ), lambda f, a: f.breakout_confirmed & no(f.near_resistance)),
+                    R("STOCH_HOT_CHASE", _always, -2, "Stoch RSI 과열 + 저항 근접/돌파미확정 → 추격 BUY 위험 감점 -2"),
+                ), lambda f, a: f.buy & f.up & (f.rsi < 70) & (f.macd >= f.macd_signal)),
+                R("STOCH_HOT_WATCH", _always, 0, "Stoch RSI 과열 → 고점 피로, 관망"),
+            ), lambda f, a: f.stoch > 0.8),
+            First((
+                First((
+                    R("STOCH_COLD_KNIFE", lambda f, a: (f.stoch < 0.05) & (f.macd < f.macd_signal), -1.5,
+                      "🔴 Stoch RSI 극단 과매도(<0.05) + MACD<Signal → 하락 가속/전환 위험 (감점 -1.5)"),
+                    R("STOCH_COLD_DOWNTREND", lambda f, a: f.down, 0.5, "Stoch RSI 과매도 + 하락추세 → 반등은 제한적(+0.5)"),
+                    R("STOCH_COLD_BALANCE", lambda f, a: f.balance, 0,
+                      "ℹ Balance breakout: Stoch RSI 과매도 반등 BUY 가점 미적용"),
+                    R("STOCH_COLD_BUY", _always, 0, "🟡 Stoch RSI 과매도 → BUY 반등 기대 (데이터상 효과 미검증, 가점 0)"),
+                ), lambda f, a: f.buy),
+                R("STOCH_COLD_SELL", _always, 0, "Stoch RSI 과매도 → SELL은 추격 위험, 관망"),
+            ), lambda f, a: f.stoch < 0.2),
+            R("STOCH_NEUTRAL", _always, 0, "Stoch RSI 중립"),
+        )),
+        First((
+            R("TREND_BUY_LATE", lambda f, a: (f.stoch > 0.9) & (f.rsi > 75), 0, "⚠️ RSI/Stoch 과열 → late BUY 위험, 추세 가점 제외"),
+            R("TREND_BUY_KNIFE", lambda f, a: (f.stoch < 0.05) & (f.macd < f.macd_signal), 0,
+              "⚠️ 표기상 UPTREND지만 Stoch 극단 과매도 + MACD 약화 → 추세 전환 의심(추세일치 가점 제외)"),
+            R("TREND_ALIGN_BUY", _always, 0.5, "추세 상승 + 매수 일치 가점+0.5"),
+        ), lambda f, a: f.up & f.buy),
+        First((
+            R("TREND_SELL_LATE", lambda f, a: (f.stoch < 0.1) & (f.rsi < 25), 0, "⚠️ RSI/Stoch 과매도 → late SELL 위험, 추세 가점 제외"),
+            R("TREND_SELL_SQUEEZE", lambda f, a: f.stoch >= 0.95, 0, "⛔ Stoch RSI 과열(≥0.95) → 숏 말림 위험, 추세 매도 가점 미적용"),
+            R("TREND_ALIGN_SELL", _always, 0.5, "추세 하락 + 매도 일치 가점+0.5"),
+        ), lambda f, a: f.down & f.sell),
+        R("LIQUIDITY_GOOD", lambda f, a: f.liquidity == "좋음", 0, "🟡 유동성 양호 (참고)"),
+        First((
+            R("THREE_BEAR_LATE", lambda f, a: (f.rsi < 25) & (f.stoch < 0.1), 0,
+              "⚠️ 3봉 연속 음봉이지만 RSI/Stoch 과매도 → late SELL 위험, 추가 가점 제외"),
+            R("THREE_BEAR_CONTINUATION", _always, 0.5, "🔻 최근 3봉 연속 음봉 + 하락추세 → SELL continuation 가점+0.5"),
+        ), lambda f, a: f.last3_bear & f.down & one_of(f.pattern, ("NEUTRAL", "SHOOTING_STAR", "LONG_BODY_BEAR"))),
+        R("BOX_TOP_BUY", lambda f, a: f.buy & f.box_none & f.box_top_risk, -1.5, "⚠️ 박스 상단 근접 매수 위험 (감점-1.5)"),
+        R("BOX_BOTTOM_SELL", lambda f, a: f.sell & f.box_none & f.box_bottom_risk, -1.5, "⚠️ 박스 하단 근접 매도 위험 (감점-1.5)"),
+        First((
+            R("THREE_BULL_LATE", lambda f, a: (f.rsi > 75) & (f.stoch > 0.9), 0,
+              "⚠️ 3봉 연속 양봉이지만 RSI/Stoch 과열 → late BUY 위험, 추가 가점 제외"),
+            R("THREE_BULL_WEAK_MOMENTUM", lambda f, a: f.rsi < 70, -3.0,
+              "⛔ 3봉 연속 양봉이지만 RSI<70(모멘텀 부족) → 추격 진입 위험, 진입 차단"),
+            R("THREE_BULL_CONTINUATION", _always, 0.5, "🟢 최근 3봉 연속 양봉 + 상승추세 → BUY continuation 가점+0.5"),
+        ), lambda f, a: f.last3_bull & f.up & one_of(f.pattern, ("NEUTRAL", "LONG_BODY_BULL", "INVERTED_HAMMER"))),
+        # 🟥 [FIX-B5] 예전엔 여기서 must_capture_opportunity()를 한 번 더 불러 "교과서적 기회 포착 보조 점수"를 더했다.
+        #    맨 위 _opportunity_rules()가 이미 expected_direction=signal로 반영하므로 이중 계산이다
+        #    (expected_direction=None이던 시절엔 op_score > 0이 절대 참이 안 돼 우연히 안 터졌을 뿐, B1 수정 뒤 실제 버그) → 제거.
+        First((
+            R("BULL_PATTERN_BUY", lambda f, a: f.exp_buy, 2, "🟢 강한 매수형 패턴 ({pattern}) ➜ BUY 근거 강화 (+2)"),
+            R("BULL_PATTERN_SELL", lambda f, a: f.exp_sell, -1.5, "⚠️ 매수 반전 패턴 ({pattern}) ➜ SELL 신뢰도 하락 (-1.5)"),
+        ), lambda f, a: one_of(f.pattern, BULLISH_PATTERNS)),
+        First((
+            R("BEAR_PATTERN_SELL", lambda f, a: f.exp_sell, 2, "🔴 강한 매도형 패턴 ({pattern}) ➜ SELL 근거 강화 (+2)"),
+            R("BEAR_PATTERN_BUY", lambda f, a: f.exp_buy, -1.5, "⚠️ 매도 반전 패턴 ({pattern}) ➜ BUY 신뢰도 하락 (-1.5)"),
+        ), lambda f, a: one_of(f.pattern, BEARISH_PATTERNS)),
+        First((
+            R("LATE_SELL_NEAR_SUPPORT", lambda f, a: (f.rsi < 32) & f.near_support_atr, -3.0,
+              "🔴 과매도 + 지지선 매우 근접(ATR 기준) → late SELL / 숏스퀴즈 위험 (-3.0)"),
+            R("LATE_SELL_OVERSOLD", lambda f, a: f.rsi < 32, -1.0, "🟠 과매도 구간 SELL → 반등 위험 (-1.0)"),
+        ), lambda f, a: f.down & f.sell),
+        # 🟥 [FIX-B3] "과매수면 무조건 감점" 로직 제거. 실거래 665건 RSI 구간별 승률이 정반대였다:
+        #      RSI 50~60 → 42.6% / 70~80 → 53.0% / 80~100 → 53.6%
+        #    돌파·모멘텀 지속 전략에 반전 매매용 과열 페널티를 붙여 가장 잘 맞는 구간을 깎고 있었다
+        #    → 저항 근접(near_resistance_atr)일 때만 감점하고, 단순 과매수(OVERBOUGHT_MOMENTUM_OK)는 0점.
+        First((
+            R("LATE_BUY_NEAR_RESISTANCE", lambda f, a: (f.rsi > 68) & f.near_resistance_atr, -3.0,
+              "🔴 과매수 + 저항선 매우 근접(ATR 기준) → late BUY / 돌파 실패 위험 (-3.0)"),
+            R("OVERBOUGHT_MOMENTUM_OK", lambda f, a: f.rsi > 68, 0,
+              "🟢 과매수 구간 BUY — 모멘텀 전략에서는 오히려 승률이 높은 구간 "
+              "(실거래 RSI 70~80: 53.0%, 80~100: 53.6%) → 감점 없음"),
+        ), lambda f, a: f.up & f.buy),
+    ]
+
+
+SIGNAL_RULES = RuleTable(
+    _opportunity_rules() + _extra_rules() + _entry_rules()
+    + [Merge("signal", ("score", "extra"))]
+    + _filter_rules()
+)
+
+rule_stats = RuleStats(SIGNAL_RULES, enabled=RULE_STATS_ENABLED, path=RULE_STATS_PATH)
@@ -0,0 +1,137 @@
+# 🟦 single-flight: 같은 키의 요청이 동시에 여러 개 들어오면 하나만 실제로 실행하고
+#    나머지는 그 결과를 기다렸다가 같이 받는다.
+#    (TradingView 포트폴리오 알림이 봉 마감에 한꺼번에 들어올 때, 웹훅 스레드들이 같은 종목/봉을
+#     동시에 OANDA/Alpaca에 요청하던 중복 호출 제거용)
+import asyncio
+import functools
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "value", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    키 단위 요청 합치기(thread 기반).
+    - do(key, fn, ...) → (결과, shared). shared=True면 다른 스레드의 호출 결과를 같이 받은 것.
+    - 실행 중에 예외가 나면 기다리던 쪽에도 같은 예외를 다시 던진다.
+    - 결과는 캐시하지 않는다: 호출이 끝나면 키가 바로 비워진다 (캐시는 candle_store 쪽 책임).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.value, call.waiters > 0
+
+    def wrap(self, fn):
+        """함수 이름 + 인자를 키로 쓰는 데코레이터 (인자는 hashable이어야 함)."""
+        @functools.wraps(fn)
+        def _wrapped(*args, **kwargs):
+            key = (fn.__qualname__, args, tuple(sorted(kwargs.items())))
+            value, _shared = self.do(key, fn, *args, **kwargs)
+            return value
+        return _wrapped
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+            }
+
+
+class AsyncSingleFlight:
+    """
+    asyncio용 single-flight. 같은 이벤트 루프 안에서 같은 키의 코루틴이 겹치면 하나만 실행한다.
+    do(key, coro_fn, ...) → (결과, shared). shared는 SingleFlight와 같다 — 기다린 쪽이 하나라도 있었으면
+    실행한 쪽도 True (같은 객체를 나눠 가졌으니 고쳐 쓰려면 copy).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._waiters = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key, coro_fn, *args, **kwargs):
+        fut = self._calls.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            self._waiters[key] += 1
+            # shield: 기다리던 쪽이 취소돼도 실제 호출은 계속 진행
+            return await asyncio.shield(fut), True
+
+        self.executed += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._calls[key] = fut
+        self._waiters[key] = 0
+        try:
+            value = await coro_fn(*args, **kwargs)
+        except BaseException as e:
+            if not fut.done():
+                if isinstance(e, asyncio.CancelledError):
+                    fut.cancel()
+                else:
+                    fut.set_exception(e)
+                    fut.exception()   # 아무도 안 기다렸을 때 "never retrieved" 경고 방지
+            raise
+        else:
+            fut.set_result(value)
+            return value, self._waiters.get(key, 0) > 0
+        finally:
+            self._calls.pop(key, None)
+            self._waiters.pop(key, None)
+
+    def wrap(self, coro_fn):
+        @functools.wraps(coro_fn)
+        async def _wrapped(*args, **kwargs):
+            key = (coro_fn.__qualname__, args, tuple(sorted(kwargs.items())))
+            value, _shared = await self.do(key, coro_fn, *args, **kwargs)
+            return value
+        return _wrapped
+
+    def stats(self):
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,186 @@
+# 🟦 [PERF-21] OpenAI 입력 토큰 추정
+#    예전 _approx_tokens()는 메시지 전체를 json.dumps 해서 글자 수/4로 셌다.
+#    차트 스크린샷(base64 PNG, 수백 KB)이 붙으면 그 문자열까지 세서 수십만 "토큰"이 나왔고,
+#    레이트리밋 선대기가 필요도 없는 TPM 리셋을 기다렸다.
+#    - 이미지: 실제 픽셀 크기(PNG IHDR) + detail로 OpenAI 방식대로 계산 (low=기본 토큰, high=512px 타일 수)
+#    - 텍스트: tiktoken이 있으면 그걸로, 없으면 글자 종류(영문 단어/숫자/한글/기호)별 근사
+#    - 보정: 응답의 usage.input_tokens와 비교해서 텍스트 추정 배율을 계속 고친다 (이미지 몫은 빼고)
+import base64
+import math
+import os
+import re
+import struct
+import threading
+from collections import deque
+from typing import NamedTuple
+
+try:
+    import tiktoken as _tiktoken
+except ImportError:   # 선택 의존성 — 없으면 글자 종류별 근사
+    _tiktoken = None
+
+
+# gpt-4o 계열 이미지 과금: 기본 85 + 512px 타일당 170 (모델이 다르면 환경변수로)
+IMAGE_BASE_TOKENS = int(os.getenv("IMAGE_BASE_TOKENS", "85"))
+IMAGE_TILE_TOKENS = int(os.getenv("IMAGE_TILE_TOKENS", "170"))
+# 크기를 못 읽은 이미지는 차트 캡처 뷰포트(1920x1080)로 본다
+IMAGE_DEFAULT_SIZE = (1920, 1080)
+MESSAGE_OVERHEAD_TOKENS = 4
+TOKEN_CALIBRATION_ALPHA = float(os.getenv("TOKEN_CALIBRATION_ALPHA", "0.2"))
+TOKEN_RATIO_BOUNDS = (0.5, 2.0)
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_TEXT_PIECES = re.compile(r"[A-Za-z]+|\d+|[가-힣]+|\n+|[ \t]+|[^\sA-Za-z\d가-힣]")
+
+
+def image_tokens(width, height, detail="high"):
+    """OpenAI 이미지 입력 토큰. high/auto: 2048 안으로 줄이고 짧은 변 768로 맞춘 뒤 512px 타일 수로."""
+    if str(detail).lower() == "low":
+        return IMAGE_BASE_TOKENS
+    w, h = float(width), float(height)
+    if max(w, h) > 2048:
+        s = 2048 / max(w, h)
+        w, h = w * s, h * s
+    if min(w, h) > 768:
+        s = 768 / min(w, h)
+        w, h = w * s, h * s
+    tiles = math.ceil(w / 512) * math.ceil(h / 512)
+    return IMAGE_BASE_TOKENS + IMAGE_TILE_TOKENS * tiles
+
+
+def image_size(url):
+    """data:image/png;base64,… URL(또는 base64 문자열)의 PNG 가로/세로. PNG가 아니거나 못 읽으면 None."""
+    if not isinstance(url, str):
+        return None
+    b64 = url.split(",", 1)[1] if url.startswith("data:") else url
+    try:
+        head = base64.b64decode(b64[:44])   # 앞 33바이트: 시그니처 8 + IHDR 길이/타입 8 + 가로·세로 8
+    except (ValueError, TypeError):
+        return None
+    if len(head) < 24 or not head.startswith(_PNG_SIGNATURE) or head[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", head[16:24])
+
+
+def text_tokens(text):
+    """텍스트 토큰 수 (보정 전). tiktoken이 있으면 o200k_base, 없으면 근사."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    n = 0
+    for piece in _TEXT_PIECES.findall(text):
+        c = piece[0]
+        if c.isascii() and c.isalpha():
+            n += math.ceil(len(piece) / 5)       # 영문 단어: 짧은 단어는 1토큰, 긴 단어는 쪼개짐
+        elif c.isdigit():
+            n += math.ceil(len(piece) / 3)       # 숫자는 3자리씩
+        elif "가" <= c <= "힣":
+            n += math.ceil(len(piece) * 0.8)     # 한글 음절
+        elif c == "\n":
+            n += 1
+        elif c in " \t":
+            n += len(piece) > 1                  # 단어 앞 공백 하나는 단어 토큰에 붙는다
+        else:
+            n += 1 if c.isascii() else 2         # 기호 1, 이모지/기타 유니코드 2
+    return n
+
+
+def _load_encoding():
+    if _tiktoken is None:
+        return None
+    try:
+        return _tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+_ENCODING = _load_encoding()
+
+
+class Estimate(NamedTuple):
+    text: int       # 텍스트 원추정 (보정 전)
+    image: int      # 이미지 토큰 (계산값)
+    tokens: int     # 보정 배율 적용한 총 입력 토큰
+
+
+def _content_parts(content):
+    if isinstance(content, str):
+        yield "text", content, None
+        return
+    for part in content or ():
+        if not isinstance(part, dict):
+            yield "text", str(part), None
+        elif part.get("type") in ("input_image", "image_url"):
+            img = part.get("image_url")
+            url, detail = (img.get("url"), img.get("detail", part.get("detail", "auto"))) if isinstance(img, dict) \
+                else (img, part.get("detail", "auto"))
+            yield "image", url, detail
+        else:
+            yield "text", part.get("text") or "", None
+
+
+class TokenEstimator:
+    """메시지 → Estimate. observe()로 실제 usage를 받을 때마다 텍스트 배율(ratio)을 EWMA로 맞춘다."""
+
+    def __init__(self, alpha=TOKEN_CALIBRATION_ALPHA, bounds=TOKEN_RATIO_BOUNDS, window=256):
+        self.alpha = float(alpha)
+        self.bounds = bounds
+        self.ratio = 1.0
+        self._lock = threading.Lock()
+        self._errors = deque(maxlen=window)
+        self.observed = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0   # 🟦 [PERF-22] usage.input_tokens_details.cached_tokens 누적 (프롬프트 캐시 적중분)
+
+    def estimate(self, messages):
+        text = image = 0
+        for m in messages:
+            text += MESSAGE_OVERHEAD_TOKENS
+            for kind, value, detail in _content_parts(m.get("content")):
+                if kind == "image":
+                    image += image_tokens(*(image_size(value) or IMAGE_DEFAULT_SIZE), detail=detail)
+                else:
+                    text += text_tokens(value)
+        return Estimate(text, image, int(round(text * self.ratio)) + image)
+
+    def observe(self, est, usage):
+        """응답 usage(input_tokens / prompt_tokens)로 보정. 이미지 몫은 계산값 그대로라 텍스트 배율만 고친다."""
+        if est is None or not usage:
+            return
+        actual = usage.get("input_tokens", usage.get("prompt_tokens"))
+        try:
+            actual = float(actual)
+        except (TypeError, ValueError):
+            return
+        cached = (usage.get("input_tokens_details") or usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        actual_text = actual - est.image
+        if actual <= 0 or actual_text <= 0 or est.text <= 0:
+            return
+        lo, hi = self.bounds
+        with self._lock:
+            self._errors.append((est.tokens - actual) / actual)
+            sample = min(hi, max(lo, actual_text / est.text))
+            self.ratio += self.alpha * (sample - self.ratio)
+            self.observed += 1
+            self.input_tokens += int(actual)
+            self.cached_tokens += int(cached)
+
+    def stats(self):
+        with self._lock:
+            errs = sorted(abs(e) for e in self._errors)
+            n = len(errs)
+            return {
+                "tokenizer": "tiktoken/o200k_base" if _ENCODING is not None else "approx",
+                "ratio": round(self.ratio, 3),
+                "observed": self.observed,
+                "mean_bias_pct": round(100 * sum(self._errors) / n, 1) if n else 0.0,
+                "p50_abs_err_pct": round(100 * errs[n // 2], 1) if n else 0.0,
+                "p95_abs_err_pct": round(100 * errs[min(n - 1, int(n * 0.95))], 1) if n else 0.0,
+                "input_tokens": self.input_tokens,
+                "cached_tokens": self.cached_tokens,
+                "cached_pct": round(100 * self.cached_tokens / self.input_tokens, 1) if self.input_tokens else 0.0,
+            }
+
+
+gpt_token_estimator = TokenEstimator()